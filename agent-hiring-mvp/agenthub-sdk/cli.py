@@ -1524,9 +1524,10 @@ def hire_agent_cmd(ctx, agent_id, config, billing_cycle, user_id, wait, timeout,
 @click.option('--user-id', '-u', type=int, help='User ID')
 @click.option('--wait', '-w', is_flag=True, help='Wait for completion')
 @click.option('--timeout', '-t', default=60, help='Timeout in seconds')
+@click.option('--no-cache', is_flag=True, help='Run the agent even if its result cache holds an output for this input')
 @click.option('--base-url', help='Base URL of the AgentHub server')
 @click.pass_context
-def execute_hiring_cmd(ctx, hiring_id, input, config, user_id, wait, timeout, base_url):
+def execute_hiring_cmd(ctx, hiring_id, input, config, user_id, wait, timeout, no_cache, base_url):
     """Execute a hired agent with input data."""
     verbose = ctx.obj.get('verbose', False)
     
@@ -1546,18 +1547,24 @@ def execute_hiring_cmd(ctx, hiring_id, input, config, user_id, wait, timeout, ba
             api_key = ctx.obj.get('api_key') or cli_config.get('api_key')
             async with AgentHubClient(base_url, api_key=api_key) as client:
                 if wait:
+                    def show_status(event):
+                        echo(style(f"  ⏳ Status: {event.get('status')}", fg='blue'))
+                    
                     result = await client.run_hired_agent(
                         hiring_id=hiring_id,
                         input_data=input_data,
                         user_id=user_id,
                         wait_for_completion=True,
-                        timeout=timeout
+                        timeout=timeout,
+                        on_event=show_status,
+                        use_cache=not no_cache
                     )
                 else:
                     result = await client.execute_hired_agent(
                         hiring_id=hiring_id,
                         input_data=input_data,
-                        user_id=user_id
+                        user_id=user_id,
+                        use_cache=not no_cache
                     )
                 return result
         
@@ -1702,6 +1709,79 @@ def file(ctx, hiring_id, input_file, config, user_id, wait, timeout, base_url):
         sys.exit(1)
 
 
+def _load_batch_inputs(input_file: str) -> List[Dict[str, Any]]:
+    """Read batch inputs from a JSON array, a JSON Lines file or a CSV file with a header row."""
+    path = Path(input_file)
+    with open(path, 'r', newline='') as f:
+        if path.suffix.lower() == '.csv':
+            import csv
+            return [dict(row) for row in csv.DictReader(f)]
+        if path.suffix.lower() in ('.jsonl', '.ndjson'):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("JSON input file must contain an array of input objects")
+    return data
+
+
+@execute.command(name='batch')
+@click.argument('hiring_id', type=int)
+@click.argument('input_file', type=click.Path(exists=True))
+@click.option('--output', '-o', type=click.Path(), help='Write results as JSON Lines to this file (default: stdout)')
+@click.option('--chunk-size', default=100, help='Inputs submitted per batch request')
+@click.option('--max-in-flight', default=500, help='Maximum inputs submitted but not yet finished')
+@click.option('--base-url', help='Base URL of the AgentHub server')
+@click.pass_context
+def execute_batch_cmd(ctx, hiring_id, input_file, output, chunk_size, max_in_flight, base_url):
+    """Run a hired agent on every input of a JSON, JSON Lines or CSV file.
+
+    Results are written as JSON Lines in completion order; each line carries
+    the index of its input in the file.
+    """
+    base_url = base_url or cli_config.get('base_url', 'http://localhost:8002')
+
+    try:
+        inputs = _load_batch_inputs(input_file)
+    except Exception as e:
+        echo(style(f"✗ Error reading input file: {e}", fg='red'))
+        sys.exit(1)
+
+    if not inputs:
+        echo(style("No inputs found in file", fg='yellow'))
+        return
+
+    echo(style(f"📦 Running {len(inputs)} inputs against hiring {hiring_id}...", fg='blue'), err=True)
+
+    async def run_batch():
+        api_key = ctx.obj.get('api_key') or cli_config.get('api_key')
+        counts = {"completed": 0, "failed": 0}
+        out = open(output, 'w') if output else sys.stdout
+        try:
+            async with AgentHubClient(base_url, api_key=api_key) as client:
+                async for result in client.run_many(hiring_id, inputs, chunk_size=chunk_size, max_in_flight=max_in_flight):
+                    counts["completed" if result.get("status") == "completed" else "failed"] += 1
+                    out.write(json.dumps(result, default=str) + "\n")
+                    out.flush()
+                    done = counts["completed"] + counts["failed"]
+                    if output and (done % 50 == 0 or done == len(inputs)):
+                        echo(f"  ⏳ {done}/{len(inputs)} finished ({counts['failed']} failed)", err=True)
+        finally:
+            if output:
+                out.close()
+        return counts
+
+    try:
+        counts = asyncio.run(run_batch())
+    except Exception as e:
+        echo(style(f"✗ Batch execution failed: {e}", fg='red'), err=True)
+        sys.exit(1)
+
+    color = 'green' if counts["failed"] == 0 else 'yellow'
+    echo(style(f"✓ {counts['completed']} completed, {counts['failed']} failed", fg=color), err=True)
+    if output:
+        echo(f"  Results written to {output}", err=True)
+
+
 @jobs.command(name='list')
 @click.option('--user-id', '-u', type=int, help='User ID')
 @click.option('--limit', '-l', default=10, help='Number of results to show')
@@ -1729,9 +1809,11 @@ def list_jobs(ctx, user_id, limit, status, base_url):
 
 @jobs.command()
 @click.argument('execution_id')
+@click.option('--follow', '-f', is_flag=True, help='Stream status changes until the execution finishes')
+@click.option('--timeout', '-t', default=600, help='Timeout in seconds when following')
 @click.option('--base-url', help='Base URL of the AgentHub server')
 @click.pass_context
-def status(ctx, execution_id, base_url):
+def status(ctx, execution_id, follow, timeout, base_url):
     """Get the status of an execution job."""
     verbose = ctx.obj.get('verbose', False)
     
@@ -1743,6 +1825,11 @@ def status(ctx, execution_id, base_url):
         async def get_execution_status():
             api_key = ctx.obj.get('api_key') or cli_config.get('api_key')
             async with AgentHubClient(base_url, api_key=api_key) as client:
+                if follow:
+                    def show_status(event):
+                        echo(style(f"  ⏳ Status: {event.get('status')}", fg='blue'))
+                    
+                    return await client.wait_for_execution(execution_id, timeout=timeout, on_event=show_status)
                 result = await client.get_execution_status(execution_id)
                 return result
         
@@ -2262,6 +2349,45 @@ def config(ctx, base_url, api_key, author, email, show):
         echo("No configuration changes specified. Use --show to see current config.")
 
 
+@cli.command()
+@click.option('--concurrency', '-c', type=int, help='Executions to run at the same time (default: EXECUTION_WORKER_CONCURRENCY)')
+@click.option('--poll-interval', type=float, help='Seconds between queue checks when idle')
+@click.option('--shutdown-timeout', default=60.0, help='Seconds to wait for running executions on shutdown')
+@click.option('--server-dir', help='AgentHub server checkout (default: current directory)')
+@click.pass_context
+def worker(ctx, concurrency, poll_interval, shutdown_timeout, server_dir):
+    """Run an execution queue worker against the server database.
+
+    Workers claim queued executions from the database the API server uses,
+    so they must run on a host with the server code and its configuration
+    (DATABASE_URL, Docker access). Set EXECUTION_QUEUE_EMBEDDED_WORKER=false
+    on the API nodes to leave all executions to separate workers.
+    """
+    server_dir = Path(server_dir or os.getcwd()).resolve()
+    if str(server_dir) not in sys.path:
+        sys.path.insert(0, str(server_dir))
+
+    try:
+        from server.worker import run_worker
+        from server.config import EXECUTION_WORKER_CONCURRENCY, EXECUTION_QUEUE_POLL_INTERVAL_SECONDS
+    except ImportError as e:
+        echo(style(f"✗ AgentHub server code not found in {server_dir}: {e}", fg='red'))
+        echo("  Run this command from the agent-hiring-mvp directory or pass --server-dir")
+        sys.exit(1)
+
+    concurrency = concurrency or EXECUTION_WORKER_CONCURRENCY
+    echo(style(f"🛠  Starting execution worker (concurrency {concurrency})...", fg='blue'))
+    try:
+        asyncio.run(run_worker(
+            concurrency=concurrency,
+            poll_interval=poll_interval or EXECUTION_QUEUE_POLL_INTERVAL_SECONDS,
+            shutdown_timeout=shutdown_timeout
+        ))
+    except KeyboardInterrupt:
+        pass
+    echo(style("✓ Execution worker stopped", fg='green'))
+
+
 # ============================================================================
 # ACP Server Deployment Commands
 # ============================================================================
@@ -10,7 +10,7 @@ import tempfile
 import os
 import ssl
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator, Callable
 import asyncio
 
 try:
@@ -846,6 +846,114 @@ class AgentHubClient:
                         operation="get_execution_status"
                     )
 
+    async def stream_execution_events(self, execution_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield status events of an execution as the server pushes them.
+        
+        The stream starts with the current status and ends after the first
+        terminal event (``event["terminal"]`` is true).
+        """
+        if not self.session:
+            raise RuntimeError("Client not initialized. Use async context manager.")
+        
+        async with self.session.get(
+            f"{self.api_base}/execution/{execution_id}/events",
+            headers=self._get_headers({"Accept": "text/event-stream"}),
+            # The stream stays open for as long as the execution runs
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=None),
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise AgentHubError(
+                    f"Failed to stream execution events (HTTP {response.status})",
+                    status_code=response.status,
+                    response_body=error_text,
+                    operation="stream_execution_events"
+                )
+            
+            async for event_name, data in self._read_server_sent_events(response):
+                if event_name in (None, "status"):
+                    yield data
+    
+    @staticmethod
+    async def _read_server_sent_events(response) -> AsyncIterator[tuple]:
+        """Parse a server-sent event stream into (event name, JSON data) pairs."""
+        event_name, data_lines = None, []
+        async for raw_line in response.content:
+            line = raw_line.decode("utf-8").rstrip("\r\n")
+            if not line:
+                # A blank line ends an event
+                if data_lines:
+                    yield event_name, json.loads("\n".join(data_lines))
+                event_name, data_lines = None, []
+            elif line.startswith(":"):
+                continue  # keep-alive comment
+            elif line.startswith("event:"):
+                event_name = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[len("data:"):].lstrip())
+    
+    async def wait_for_execution(
+        self,
+        execution_id: str,
+        timeout: int = 60,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Wait for an execution to finish and return its final status.
+        
+        Waits on the server's execution event stream instead of polling, and
+        falls back to polling once per second if the server does not provide
+        the stream or the connection drops.
+        
+        Args:
+            execution_id: Execution to wait for
+            timeout: Maximum seconds to wait
+            on_event: Optional callback invoked with every status event
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        
+        async def wait_on_stream() -> bool:
+            async for event in self.stream_execution_events(execution_id):
+                if on_event:
+                    on_event(event)
+                if event.get("terminal"):
+                    return True
+            return False
+        
+        try:
+            if await asyncio.wait_for(wait_on_stream(), timeout):
+                return await self.get_execution_status(execution_id)
+        except asyncio.TimeoutError:
+            raise Exception(f"Execution timeout after {timeout} seconds")
+        except AgentHubError as e:
+            # Servers without execution event streams answer 404
+            if e.status_code != 404:
+                raise
+            logger.debug(f"Execution event stream unavailable, polling execution {execution_id}")
+        except aiohttp.ClientError as e:
+            logger.debug(f"Execution event stream for {execution_id} interrupted ({e}), polling")
+        
+        # Polling fallback
+        while True:
+            status_result = await self.get_execution_status(execution_id)
+            # Check both possible response formats
+            status = status_result.get("status")
+            if not status:
+                # Try nested format
+                execution = status_result.get("execution", {})
+                status = execution.get("status")
+            
+            if status in ["completed", "failed", "timeout", "cancelled"]:
+                return status_result
+            
+            if loop.time() >= deadline:
+                raise Exception(f"Execution timeout after {timeout} seconds")
+            
+            # Wait before checking again
+            await asyncio.sleep(1)
+
     async def run_agent(
         self,
             input_data: Dict[str, Any],
@@ -853,6 +961,8 @@ class AgentHubClient:
             user_id: int = None,
             wait_for_completion: bool = True,
             timeout: int = 60,
+            on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+            use_cache: bool = True,
     ) -> Dict[str, Any]:
         """Run an agent and optionally wait for completion."""
         # Create and trigger execution
@@ -860,6 +970,7 @@ class AgentHubClient:
             hiring_id=hiring_id,
             input_data=input_data,
             user_id=user_id,
+            use_cache=use_cache,
         )
         
         execution_id = execution_result.get("execution_id")
@@ -870,32 +981,21 @@ class AgentHubClient:
             return execution_result
         
         # Wait for completion
-        start_time = asyncio.get_event_loop().time()
-        while True:
-            if asyncio.get_event_loop().time() - start_time > timeout:
-                raise Exception(f"Execution timeout after {timeout} seconds")
-            
-            status_result = await self.get_execution_status(execution_id)
-            # Check both possible response formats
-            status = status_result.get("status")
-            if not status:
-                # Try nested format
-                execution = status_result.get("execution", {})
-                status = execution.get("status")
-            
-            if status in ["completed", "failed"]:
-                return status_result
-            
-            # Wait before checking again
-            await asyncio.sleep(1)
+        return await self.wait_for_execution(execution_id, timeout=timeout, on_event=on_event)
     
     async def execute_hired_agent(
         self,
         hiring_id: int,
         input_data: Dict[str, Any],
         user_id: Optional[int] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
-        """Execute a hired agent."""
+        """
+        Execute a hired agent.
+        
+        Agents that declare a result cache may answer a repeated input from
+        the cache; pass ``use_cache=False`` to force a fresh run.
+        """
         if not self.session:
             raise RuntimeError("Client not initialized. Use async context manager.")
         
@@ -907,6 +1007,9 @@ class AgentHubClient:
         if user_id:
             data["user_id"] = user_id
         
+        if not use_cache:
+            data["use_cache"] = False
+        
         # Step 1: Create execution
         async with self.session.post(
             f"{self.api_base}/execution",
@@ -970,6 +1073,8 @@ class AgentHubClient:
         user_id: Optional[int] = None,
         wait_for_completion: bool = True,
         timeout: int = 60,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """Run a hired agent and optionally wait for completion."""
         # Create and trigger execution
@@ -977,6 +1082,7 @@ class AgentHubClient:
             hiring_id=hiring_id,
             input_data=input_data,
             user_id=user_id,
+            use_cache=use_cache,
         )
         
         execution_id = execution_result.get("execution_id")
@@ -987,25 +1093,276 @@ class AgentHubClient:
             return execution_result
         
         # Wait for completion
-        start_time = asyncio.get_event_loop().time()
+        return await self.wait_for_execution(execution_id, timeout=timeout, on_event=on_event)
+
+    # =============================================================================
+    # BATCH EXECUTION
+    # =============================================================================
+
+    async def create_execution_batch(self, hiring_id: int, inputs: List[Dict[str, Any]],
+                                     use_cache: bool = True) -> Dict[str, Any]:
+        """Create and schedule one execution per input of a hiring in a single request."""
+        if not self.session:
+            raise RuntimeError("Client not initialized. Use async context manager.")
+
+        async with self.session.post(
+            f"{self.api_base}/execution/batch",
+            json={"hiring_id": hiring_id, "inputs": inputs, "use_cache": use_cache},
+            headers=self._get_headers(),
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            error_text = await response.text()
+            raise AgentHubError(
+                f"Failed to create execution batch (HTTP {response.status})",
+                status_code=response.status,
+                response_body=error_text,
+                operation="create_execution_batch"
+            )
+
+    async def get_execution_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Get the aggregate progress of an execution batch."""
+        if not self.session:
+            raise RuntimeError("Client not initialized. Use async context manager.")
+
+        async with self.session.get(
+            f"{self.api_base}/execution/batch/{batch_id}",
+            headers=self._get_headers(),
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            error_text = await response.text()
+            raise AgentHubError(
+                f"Failed to get execution batch (HTTP {response.status})",
+                status_code=response.status,
+                response_body=error_text,
+                operation="get_execution_batch"
+            )
+
+    async def get_execution_batch_results(self, batch_id: str, offset: int = 0, limit: int = 100,
+                                          finished_only: bool = True) -> Dict[str, Any]:
+        """Get a page of a batch's execution results in input order."""
+        if not self.session:
+            raise RuntimeError("Client not initialized. Use async context manager.")
+
+        async with self.session.get(
+            f"{self.api_base}/execution/batch/{batch_id}/results",
+            params={"offset": offset, "limit": limit, "finished_only": str(finished_only).lower()},
+            headers=self._get_headers(),
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            error_text = await response.text()
+            raise AgentHubError(
+                f"Failed to get execution batch results (HTTP {response.status})",
+                status_code=response.status,
+                response_body=error_text,
+                operation="get_execution_batch_results"
+            )
+
+    async def stream_execution_batch(
+        self,
+        batch_id: str,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the results of a batch's executions as they finish.
+
+        Each result has the item ``index`` within the batch, ``execution_id``,
+        ``status``, ``output_data`` and ``error_message``. Results are read
+        from the server's batch event stream; if the stream is unavailable or
+        drops, the remaining results are polled.
+        """
+        if not self.session:
+            raise RuntimeError("Client not initialized. Use async context manager.")
+
+        delivered = set()
+        try:
+            async with self.session.get(
+                f"{self.api_base}/execution/batch/{batch_id}/events",
+                headers=self._get_headers({"Accept": "text/event-stream"}),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=None),
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise AgentHubError(
+                        f"Failed to stream execution batch (HTTP {response.status})",
+                        status_code=response.status,
+                        response_body=error_text,
+                        operation="stream_execution_batch"
+                    )
+
+                async for event_name, data in self._read_server_sent_events(response):
+                    if event_name == "result" and data.get("execution_id") not in delivered:
+                        delivered.add(data.get("execution_id"))
+                        yield data
+                    elif event_name == "progress":
+                        if on_progress:
+                            on_progress(data)
+                        if data.get("done"):
+                            return
+        except AgentHubError as e:
+            if e.status_code != 404:
+                raise
+            logger.debug(f"Batch event stream unavailable, polling batch {batch_id}")
+        except aiohttp.ClientError as e:
+            logger.debug(f"Batch event stream for {batch_id} interrupted ({e}), polling")
+
+        # Polling fallback
         while True:
-            if asyncio.get_event_loop().time() - start_time > timeout:
-                raise Exception(f"Execution timeout after {timeout} seconds")
-            
-            status_result = await self.get_execution_status(execution_id)
-            # Check both possible response formats
-            status = status_result.get("status")
-            if not status:
-                # Try nested format
-                execution = status_result.get("execution", {})
-                status = execution.get("status")
-            
-            if status in ["completed", "failed"]:
-                return status_result
-            
-            # Wait before checking again
-            await asyncio.sleep(1)
-    
+            offset, progress = 0, None
+            while True:
+                page = await self.get_execution_batch_results(batch_id, offset=offset, limit=500)
+                progress = page.get("progress", {})
+                for result in page.get("results", []):
+                    if result.get("execution_id") not in delivered:
+                        delivered.add(result.get("execution_id"))
+                        yield result
+                if len(page.get("results", [])) < 500:
+                    break
+                offset += 500
+            if on_progress:
+                on_progress(progress)
+            if progress.get("done"):
+                return
+            await asyncio.sleep(2)
+
+    async def run_many(
+        self,
+        hiring_id: int,
+        inputs: List[Dict[str, Any]],
+        chunk_size: int = 100,
+        max_in_flight: int = 500,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        use_cache: bool = True,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run a hired agent on many inputs and yield results as they finish.
+
+        Inputs are submitted as batches of ``chunk_size`` executions (one
+        request each), and at most ``max_in_flight`` inputs are submitted but
+        not yet finished at any time. Results arrive in completion order; the
+        ``index`` of each result is the position of its input in ``inputs``.
+
+        Example:
+            async for result in client.run_many(hiring_id, inputs):
+                print(result["index"], result["status"], result["output_data"])
+        """
+        if not inputs:
+            return
+        max_in_flight = max(1, max_in_flight)
+        chunk_size = max(1, min(chunk_size, max_in_flight))
+        in_flight = asyncio.Semaphore(max_in_flight)
+        results: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+
+        async def follow(batch_id: str, start: int):
+            try:
+                async for result in self.stream_execution_batch(batch_id):
+                    await results.put({**result, "index": start + result["index"], "batch_id": batch_id})
+            except Exception as e:
+                await results.put(e)
+
+        async def submit():
+            try:
+                for start in range(0, len(inputs), chunk_size):
+                    chunk = inputs[start:start + chunk_size]
+                    for _ in chunk:
+                        await in_flight.acquire()
+                    batch = await self.create_execution_batch(hiring_id, chunk, use_cache=use_cache)
+                    if on_progress:
+                        on_progress(batch)
+                    tasks.append(asyncio.create_task(follow(batch["batch_id"], start)))
+            except Exception as e:
+                await results.put(e)
+
+        tasks.append(asyncio.create_task(submit()))
+        try:
+            for _ in range(len(inputs)):
+                result = await results.get()
+                if isinstance(result, Exception):
+                    raise result
+                in_flight.release()
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # =============================================================================
+    # EXTERNAL RESOURCES
+    # =============================================================================
+
+    async def stream_llm_completion(
+        self,
+        messages: List[Dict[str, str]],
+        provider: str = "openai",
+        model: str = "gpt-3.5-turbo",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        execution_id: Optional[str] = None,
+        **options,
+    ) -> AsyncIterator[str]:
+        """
+        Yield the text of an LLM completion as the server relays it from the provider.
+
+        Usage is tracked against ``execution_id`` when given. Extra options
+        (e.g. ``cache``) are passed through to ``/resources/llm``.
+        """
+        if not self.session:
+            raise RuntimeError("Client not initialized. Use async context manager.")
+
+        payload = {
+            "provider": provider,
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True,
+            **options,
+        }
+        headers = {"Accept": "text/event-stream"}
+        if execution_id:
+            headers["X-Execution-ID"] = execution_id
+
+        async with self.session.post(
+            f"{self.api_base}/resources/llm",
+            json=payload,
+            headers=self._get_headers(headers),
+            # Long completions keep the stream open for as long as they generate
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=None),
+        ) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise AgentHubError(
+                    f"Failed to stream LLM completion (HTTP {response.status})",
+                    status_code=response.status,
+                    response_body=error_text,
+                    operation="stream_llm_completion"
+                )
+
+            if not response.content_type.startswith("text/event-stream"):
+                # Errors raised before the stream starts come back as JSON
+                result = await response.json()
+                raise AgentHubError(
+                    f"Failed to stream LLM completion: {result.get('error', 'unknown error')}",
+                    status_code=response.status,
+                    response_body=json.dumps(result),
+                    operation="stream_llm_completion"
+                )
+
+            async for event_name, data in self._read_server_sent_events(response):
+                if event_name == "delta":
+                    yield data.get("content", "")
+                elif event_name == "error":
+                    raise AgentHubError(
+                        f"LLM completion failed: {data.get('error', 'unknown error')}",
+                        status_code=response.status,
+                        response_body=json.dumps(data),
+                        operation="stream_llm_completion"
+                    )
+                elif event_name == "done":
+                    return
+
     # =============================================================================
     # DEPLOYMENT MANAGEMENT (ACP Server Agents)
     # =============================================================================
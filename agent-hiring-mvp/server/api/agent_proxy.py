@@ -1,70 +1,83 @@
 """Agent proxy API endpoints for communicating with deployed ACP agents."""
 
 import json
-import io
 import logging
 import aiohttp
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.background import BackgroundTask
 
+from ..config import AGENT_PROXY_READ_TIMEOUT_SECONDS
 from ..database import get_db
 from ..models.deployment import AgentDeployment, DeploymentStatus
 from ..models.hiring import Hiring
 from ..middleware.auth import get_current_user
+from ..services.agent_proxy_pool import agent_proxy_pool, deployment_route_cache, DeploymentRoute
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/agent-proxy", tags=["agent-proxy"])
 
+# Headers that only apply to a single connection and are never forwarded
+_HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade"
+}
+
 
 async def _validate_deployment_access(
     hiring_id: int, 
     current_user, 
     db: Session
-) -> tuple[AgentDeployment, Hiring]:
-    """Validate deployment access and return deployment and hiring objects."""
-    
-    # Get the deployment for this hiring
-    deployment = db.query(AgentDeployment).filter(
-        AgentDeployment.hiring_id == hiring_id
-    ).first()
-    
-    if not deployment:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No deployment found for this hiring"
-        )
-    
-    # Get the hiring to check user ownership
-    hiring = db.query(Hiring).filter(Hiring.id == hiring_id).first()
-    if not hiring:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Hiring not found"
-        )
+) -> DeploymentRoute:
+    """Validate deployment access and return the route to the hiring's deployment."""
+    
+    route = deployment_route_cache.get(hiring_id)
+    if route is None:
+        # Get the deployment for this hiring
+        deployment = db.query(AgentDeployment).filter(
+            AgentDeployment.hiring_id == hiring_id
+        ).first()
+        
+        if not deployment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No deployment found for this hiring"
+            )
+        
+        # Get the hiring to check user ownership
+        hiring = db.query(Hiring).filter(Hiring.id == hiring_id).first()
+        if not hiring:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Hiring not found"
+            )
+        
+        route = DeploymentRoute.from_rows(deployment, hiring)
+        deployment_route_cache.put(route)
     
     # Ensure the user can only access their own hirings
-    if hiring.user_id != current_user.id:
+    if route.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied: You can only access your own hirings"
         )
     
     # Check if deployment is running
-    if deployment.status != DeploymentStatus.RUNNING.value:
+    if route.status != DeploymentStatus.RUNNING.value:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Agent deployment is not running. Status: {deployment.status}"
+            detail=f"Agent deployment is not running. Status: {route.status}"
         )
     
-    return deployment, hiring
+    return route
 
 
 async def _make_agent_request(
-    deployment: AgentDeployment,
+    deployment: DeploymentRoute,
     method: str,
     endpoint: str,
     data: Optional[Dict[str, Any]] = None,
@@ -72,34 +85,39 @@ async def _make_agent_request(
 ) -> Dict[str, Any]:
     """Make a request to the ACP agent with proper error handling."""
     
+    session = agent_proxy_pool.acquire(deployment.deployment_id)
     try:
-        async with aiohttp.ClientSession() as session:
-            agent_url = f"{deployment.proxy_endpoint}/{endpoint}"
+        agent_url = f"{deployment.proxy_endpoint}/{endpoint}"
+        
+        async with session.request(
+            method=method,
+            url=agent_url,
+            json=data,
+            # Pooled sessions pass bodies through undecoded, so ask for a plain one
+            headers={"Accept-Encoding": "identity"},
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
             
-            async with session.request(
-                method=method,
-                url=agent_url,
-                json=data,
-                timeout=aiohttp.ClientTimeout(total=timeout)
-            ) as response:
-                
-                if response.status == 200:
-                    result = await response.json()
-                    return {
-                        "response": result,
-                        "deployment_id": deployment.deployment_id,
-                        "agent_id": deployment.agent_id,
-                        "status": "success"
-                    }
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Agent returned error {response.status}: {error_text}")
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Agent returned error: {error_text}"
-                    )
+            if response.status == 200:
+                result = await response.json()
+                return {
+                    "response": result,
+                    "deployment_id": deployment.deployment_id,
+                    "agent_id": deployment.agent_id,
+                    "status": "success"
+                }
+            else:
+                error_text = await response.text()
+                logger.error(f"Agent returned error {response.status}: {error_text}")
+                raise HTTPException(
+                    status_code=response.status,
+                    detail=f"Agent returned error: {error_text}"
+                )
     
+    except HTTPException:
+        raise
     except aiohttp.ClientError as e:
+        deployment_route_cache.invalidate(deployment.hiring_id)
         logger.error(f"Failed to communicate with agent: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -111,6 +129,73 @@ async def _make_agent_request(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error: {str(e)}"
         )
+    finally:
+        agent_proxy_pool.release(deployment.deployment_id)
+
+
+async def _proxy_to_agent(deployment: DeploymentRoute, request: Request, target_url: str) -> StreamingResponse:
+    """
+    Forward a request to an agent and stream the response back.
+    
+    Request and response bodies are streamed chunk by chunk over the
+    deployment's pooled keep-alive connections, so large bodies are never
+    held in memory and server-sent events or token streams from the agent
+    reach the client as they are produced.
+    """
+    headers = {
+        key: value for key, value in request.headers.items()
+        if key.lower() not in _HOP_BY_HOP_HEADERS and key.lower() != "host"
+    }
+    # Bodies are passed through undecoded; never let the agent compress for a client that did not ask
+    headers["accept-encoding"] = request.headers.get("accept-encoding", "identity")
+    
+    body = request.stream() if request.method in ["POST", "PUT"] else None
+    
+    session = agent_proxy_pool.acquire(deployment.deployment_id)
+    try:
+        response = await session.request(
+            method=request.method,
+            url=target_url,
+            data=body,
+            headers=headers,
+            params=dict(request.query_params),
+            # No total limit so long-lived streams are not cut off; stalled agents still time out
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=AGENT_PROXY_READ_TIMEOUT_SECONDS)
+        )
+    except BaseException:
+        agent_proxy_pool.release(deployment.deployment_id)
+        raise
+    
+    released = False
+    
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            response.release()
+            agent_proxy_pool.release(deployment.deployment_id)
+    
+    async def stream_body():
+        try:
+            async for chunk in response.content.iter_any():
+                yield chunk
+        except aiohttp.ClientError as e:
+            # The agent went away mid-response; the client sees a truncated body
+            logger.warning(f"Agent {deployment.agent_id} closed the proxied response early: {e}")
+        finally:
+            release()
+    
+    return StreamingResponse(
+        stream_body(),
+        status_code=response.status,
+        media_type=response.headers.get("content-type", "application/json"),
+        headers={
+            key: value for key, value in response.headers.items()
+            if key.lower() not in _HOP_BY_HOP_HEADERS
+        },
+        # Also releases the connection if the client disconnects before the body is read
+        background=BackgroundTask(release)
+    )
 
 
 @router.post("/chat/{hiring_id}")
@@ -122,7 +207,7 @@ async def chat_with_agent(
 ):
     """Send a chat message to a deployed ACP agent."""
     
-    deployment, hiring = await _validate_deployment_access(hiring_id, current_user, db)
+    deployment = await _validate_deployment_access(hiring_id, current_user, db)
     
     # Check if agent is healthy
     if not deployment.is_healthy:
@@ -144,7 +229,7 @@ async def send_message_to_agent(
 ):
     """Send a message to a deployed ACP agent."""
     
-    deployment, hiring = await _validate_deployment_access(hiring_id, current_user, db)
+    deployment = await _validate_deployment_access(hiring_id, current_user, db)
     
     logger.info(f"User {current_user.id} sending message to agent {deployment.agent_id}")
     return await _make_agent_request(deployment, "POST", "message", message, timeout=600)  # 10 minutes for long-running agent executions
@@ -158,7 +243,7 @@ async def get_agent_info(
 ):
     """Get information about a deployed ACP agent."""
     
-    deployment, hiring = await _validate_deployment_access(hiring_id, current_user, db)
+    deployment = await _validate_deployment_access(hiring_id, current_user, db)
     
     logger.info(f"User {current_user.id} requesting info for agent {deployment.agent_id}")
     return await _make_agent_request(deployment, "GET", "info", timeout=10)
@@ -172,34 +257,35 @@ async def check_agent_health(
 ):
     """Check the health status of a deployed ACP agent."""
     
-    deployment, hiring = await _validate_deployment_access(hiring_id, current_user, db)
+    deployment = await _validate_deployment_access(hiring_id, current_user, db)
     
+    session = agent_proxy_pool.acquire(deployment.deployment_id)
     try:
-        async with aiohttp.ClientSession() as session:
-            agent_url = f"{deployment.proxy_endpoint}/health"
+        agent_url = f"{deployment.proxy_endpoint}/health"
+        
+        async with session.get(
+            agent_url,
+            headers={"Accept-Encoding": "identity"},
+            timeout=aiohttp.ClientTimeout(total=10)
+        ) as response:
             
-            async with session.get(
-                agent_url,
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                
-                if response.status == 200:
-                    health_data = await response.json()
-                    return {
-                        "deployment_id": deployment.deployment_id,
-                        "agent_id": deployment.agent_id,
-                        "status": "healthy",
-                        "health_data": health_data,
-                        "deployment_healthy": deployment.is_healthy
-                    }
-                else:
-                    return {
-                        "deployment_id": deployment.deployment_id,
-                        "agent_id": deployment.agent_id,
-                        "status": "unhealthy",
-                        "deployment_healthy": deployment.is_healthy,
-                        "error": f"Agent health check failed with status {response.status}"
-                    }
+            if response.status == 200:
+                health_data = await response.json()
+                return {
+                    "deployment_id": deployment.deployment_id,
+                    "agent_id": deployment.agent_id,
+                    "status": "healthy",
+                    "health_data": health_data,
+                    "deployment_healthy": deployment.is_healthy
+                }
+            else:
+                return {
+                    "deployment_id": deployment.deployment_id,
+                    "agent_id": deployment.agent_id,
+                    "status": "unhealthy",
+                    "deployment_healthy": deployment.is_healthy,
+                    "error": f"Agent health check failed with status {response.status}"
+                }
     
     except Exception as e:
         logger.error(f"Health check failed for agent {deployment.agent_id}: {str(e)}")
@@ -210,6 +296,8 @@ async def check_agent_health(
             "deployment_healthy": deployment.is_healthy,
             "error": f"Health check failed: {str(e)}"
         }
+    finally:
+        agent_proxy_pool.release(deployment.deployment_id)
 
 
 @router.get("/endpoint/{hiring_id}")
@@ -268,44 +356,16 @@ async def proxy_request(
     """General proxy endpoint for forwarding requests to ACP agents.
     This provides a flexible way to access any endpoint on the agent."""
     
-    deployment, hiring = await _validate_deployment_access(hiring_id, current_user, db)
+    deployment = await _validate_deployment_access(hiring_id, current_user, db)
     
     logger.info(f"User {current_user.id} proxying request to {path} on agent {deployment.agent_id}")
     
     # Proxy the request
     try:
-        async with aiohttp.ClientSession() as session:
-            # Construct the target URL with the path
-            target_url = f"{deployment.proxy_endpoint}/{path}"
-            
-            # Get request body if present
-            body = None
-            if request.method in ["POST", "PUT"]:
-                body = await request.body()
-            
-            # Forward request to agent
-            async with session.request(
-                method=request.method,
-                url=target_url,
-                data=body,
-                headers={
-                    key: value for key, value in request.headers.items()
-                    if key.lower() not in ["host", "content-length"]
-                },
-                params=dict(request.query_params),
-                timeout=aiohttp.ClientTimeout(total=60)
-            ) as response:
-                
-                # Return the response directly
-                content = await response.read()
-                
-                return StreamingResponse(
-                    io.BytesIO(content),
-                    media_type=response.headers.get("content-type", "application/json"),
-                    headers=dict(response.headers)
-                )
+        return await _proxy_to_agent(deployment, request, f"{deployment.proxy_endpoint}/{path}")
     
     except aiohttp.ClientError as e:
+        deployment_route_cache.invalidate(hiring_id)
         logger.error(f"Proxy request failed for agent {deployment.agent_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -322,41 +382,16 @@ async def acp_proxy_root(
 ):
     """ACP proxy root endpoint - forwards requests to the ACP agent container root."""
     
-    deployment, hiring = await _validate_deployment_access(hiring_id, current_user, db)
+    deployment = await _validate_deployment_access(hiring_id, current_user, db)
     
     logger.info(f"User {current_user.id} accessing ACP root on agent {deployment.agent_id}")
     
     # Proxy the request
     try:
-        async with aiohttp.ClientSession() as session:
-            # Get request body if present
-            body = None
-            if request.method in ["POST", "PUT"]:
-                body = await request.body()
-            
-            # Forward request to agent root
-            async with session.request(
-                method=request.method,
-                url=deployment.proxy_endpoint,
-                data=body,
-                headers={
-                    key: value for key, value in request.headers.items()
-                    if key.lower() not in ["host", "content-length"]
-                },
-                params=dict(request.query_params),
-                timeout=aiohttp.ClientTimeout(total=60)
-            ) as response:
-                
-                # Return the response directly
-                content = await response.read()
-                
-                return StreamingResponse(
-                    io.BytesIO(content),
-                    media_type=response.headers.get("content-type", "application/json"),
-                    headers=dict(response.headers)
-                )
+        return await _proxy_to_agent(deployment, request, deployment.proxy_endpoint)
     
     except aiohttp.ClientError as e:
+        deployment_route_cache.invalidate(hiring_id)
         logger.error(f"ACP root proxy failed for agent {deployment.agent_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -375,46 +410,18 @@ async def acp_proxy(
     """Simple ACP proxy - forwards everything directly to the ACP agent container.
     This is like a port mapping/forwarding service."""
     
-    deployment, hiring = await _validate_deployment_access(hiring_id, current_user, db)
+    deployment = await _validate_deployment_access(hiring_id, current_user, db)
     
     logger.info(f"User {current_user.id} accessing ACP path {path} on agent {deployment.agent_id}")
     
-    # Proxy the request
+    # Proxy the request (like a port mapping/forwarding service)
     try:
-        async with aiohttp.ClientSession() as session:
-            # Construct the target URL with the path
-            target_url = f"{deployment.proxy_endpoint}/{path}"
-            
-            # Get request body if present
-            body = None
-            if request.method in ["POST", "PUT"]:
-                body = await request.body()
-            
-            # Forward request to agent with minimal processing
-            async with session.request(
-                method=request.method,
-                url=target_url,
-                data=body,
-                headers={
-                    key: value for key, value in request.headers.items()
-                    if key.lower() not in ["host", "content-length"]
-                },
-                params=dict(request.query_params),
-                timeout=aiohttp.ClientTimeout(total=60)
-            ) as response:
-                
-                # Return the response directly (like a true proxy)
-                content = await response.read()
-                
-                return StreamingResponse(
-                    io.BytesIO(content),
-                    media_type=response.headers.get("content-type", "application/json"),
-                    headers=dict(response.headers)
-                )
+        return await _proxy_to_agent(deployment, request, f"{deployment.proxy_endpoint}/{path}")
     
     except aiohttp.ClientError as e:
+        deployment_route_cache.invalidate(hiring_id)
         logger.error(f"ACP proxy failed for agent {deployment.agent_id}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Failed to proxy request to agent: {str(e)}"
-        ) 
\ No newline at end of file
+        )
@@ -14,6 +14,10 @@ from pydantic import BaseModel
 
 from ..database.config import get_session_dependency
 from ..services.agent_service import AgentService, AgentCreateRequest
+from ..services.agent_search_index import agent_search_index
+from ..services.agent_manifest_cache import agent_manifest_cache
+from ..services.blob_store import blob_store
+from ..services.execution_result_cache import execution_result_cache
 from ..services.hiring_service import HiringService, HiringCreateRequest
 from ..services.deployment_service import DeploymentService
 from ..services.function_deployment_service import FunctionDeploymentService
@@ -25,67 +29,89 @@ from ..middleware.permissions import require_permission, require_agent_permissio
 from ..models.execution import Execution
 from ..models.hiring import Hiring
 from ..models.resource_usage import ExecutionResourceUsage
-from sqlalchemy import func
+from sqlalchemy import func, case
 
 logger = logging.getLogger(__name__)
 
-def calculate_agent_metrics(db: Session, agent_id: str) -> dict:
-    """Calculate real-time metrics for an agent from database data."""
-    # Get execution statistics
-    executions = db.query(Execution).filter(Execution.agent_id == agent_id)
-    total_executions = executions.count()
-    
-    if total_executions == 0:
-        return {
-            "total_executions": 0,
-            "total_hires": 0,
-            "success_rate": 0.0,
-            "average_execution_time": 0,
-            "average_cost": 0.0,
-            "total_cost": 0.0
-        }
-    
-    # Calculate success rate
-    completed_executions = executions.filter(Execution.status == "completed").count()
-    success_rate = (completed_executions / total_executions * 100) if total_executions > 0 else 0
-    
-    # Calculate average execution time (only for completed executions)
-    avg_time_result = db.query(func.avg(Execution.duration_ms)).filter(
-        Execution.agent_id == agent_id,
-        Execution.duration_ms.isnot(None)
-    ).scalar()
-    average_execution_time = int(avg_time_result) if avg_time_result else 0
-    
-    # Calculate cost metrics from resource usage
-    # Get all execution IDs for this agent
-    execution_ids = [e.id for e in executions.all()]
-    
-    if execution_ids:
-        # Calculate total and average cost from resource usage
-        cost_stats = db.query(
-            func.sum(ExecutionResourceUsage.cost).label('total_cost'),
-            func.avg(ExecutionResourceUsage.cost).label('avg_cost')
+_EMPTY_AGENT_METRICS = {
+    "total_executions": 0,
+    "total_hires": 0,
+    "success_rate": 0.0,
+    "average_execution_time": 0,
+    "average_cost": 0.0,
+    "total_cost": 0.0
+}
+
+
+def calculate_agents_metrics(db: Session, agent_ids: List[str]) -> Dict[str, dict]:
+    """
+    Calculate real-time metrics for a page of agents from database data.
+    
+    Uses one grouped query each for executions, costs and hires, so the number
+    of queries does not depend on the number of agents or their execution history.
+    """
+    agent_ids = list(set(agent_ids))
+    if not agent_ids:
+        return {}
+    
+    # Execution statistics (AVG skips executions without a duration)
+    execution_stats = db.query(
+        Execution.agent_id,
+        func.count(Execution.id).label("total_executions"),
+        func.sum(case((Execution.status == "completed", 1), else_=0)).label("completed_executions"),
+        func.avg(Execution.duration_ms).label("average_execution_time")
+    ).filter(
+        Execution.agent_id.in_(agent_ids)
+    ).group_by(Execution.agent_id).all()
+    
+    # Cost metrics from resource usage
+    cost_stats = {
+        row.agent_id: row for row in db.query(
+            Execution.agent_id,
+            func.sum(ExecutionResourceUsage.cost).label("total_cost"),
+            func.avg(ExecutionResourceUsage.cost).label("avg_cost")
+        ).join(
+            Execution, ExecutionResourceUsage.execution_id == Execution.id
         ).filter(
-            ExecutionResourceUsage.execution_id.in_(execution_ids)
-        ).first()
-        
-        total_cost = float(cost_stats.total_cost) if cost_stats.total_cost else 0.0
-        average_cost = float(cost_stats.avg_cost) if cost_stats.avg_cost else 0.0
-    else:
-        total_cost = 0.0
-        average_cost = 0.0
+            Execution.agent_id.in_(agent_ids)
+        ).group_by(Execution.agent_id).all()
+    }
     
-    # Get total hires
-    total_hires = db.query(Hiring).filter(Hiring.agent_id == agent_id).count()
+    total_hires = dict(db.query(Hiring.agent_id, func.count(Hiring.id)).filter(
+        Hiring.agent_id.in_(agent_ids)
+    ).group_by(Hiring.agent_id).all())
+    
+    metrics = {agent_id: dict(_EMPTY_AGENT_METRICS) for agent_id in agent_ids}
+    for row in execution_stats:
+        if not row.total_executions:
+            continue
+        costs = cost_stats.get(row.agent_id)
+        metrics[row.agent_id] = {
+            "total_executions": row.total_executions,
+            "total_hires": total_hires.get(row.agent_id, 0),
+            "success_rate": round((row.completed_executions or 0) / row.total_executions * 100, 1),
+            "average_execution_time": int(row.average_execution_time) if row.average_execution_time else 0,
+            "average_cost": round(float(costs.avg_cost), 4) if costs and costs.avg_cost else 0.0,
+            "total_cost": round(float(costs.total_cost), 4) if costs and costs.total_cost else 0.0
+        }
     
-    return {
-        "total_executions": total_executions,
-        "total_hires": total_hires,
-        "success_rate": round(success_rate, 1),
-        "average_execution_time": average_execution_time,
-        "average_cost": round(average_cost, 4),
-        "total_cost": round(total_cost, 4)
-    }
+    return metrics
+
+
+def calculate_agent_metrics(db: Session, agent_id: str) -> dict:
+    """Calculate real-time metrics for an agent from database data."""
+    return calculate_agents_metrics(db, [agent_id])[agent_id]
+
+def _search_agents_page(agent_service: AgentService, query: Optional[str], category: Optional[str],
+                        scope: str, user_id: Optional[int], limit: int, cursor: Optional[str],
+                        skip: int = 0) -> Dict[str, Any]:
+    """Run a ranked agent search, turning a malformed cursor into a 400."""
+    try:
+        return agent_service.search_agents_page(
+            query, category, scope=scope, user_id=user_id, skip=skip, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
@@ -217,24 +243,32 @@ async def list_agents(
     limit: int = 100,
     query: Optional[str] = None,
     category: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user: Optional[User] = Depends(get_current_user_optional),
     db: Session = Depends(get_session_dependency),
 ):
     """List available agents based on user authentication and ownership."""
     agent_service = AgentService(db)
+    search_page = None
     
-    if current_user:
+    if query or category:
+        # Logged-in user: search public agents + their own agents;
+        # non-logged-in user: search only public, approved agents
+        search_page = _search_agents_page(
+            agent_service, query, category,
+            scope="accessible" if current_user else "public",
+            user_id=current_user.id if current_user else None,
+            skip=skip, limit=limit, cursor=cursor
+        )
+        agents = search_page["agents"]
+    elif current_user:
         # Logged-in user: get public agents + their own agents
-        if query or category:
-            agents = agent_service.search_agents_for_user(current_user.id, query or "", category)
-        else:
-            agents = agent_service.get_agents_for_user(current_user.id, skip, limit)
+        agents = agent_service.get_agents_for_user(current_user.id, skip, limit)
     else:
         # Non-logged-in user: get only public, approved agents
-        if query or category:
-            agents = agent_service.search_agents(query, category)
-        else:
-            agents = agent_service.get_public_agents(skip, limit)
+        agents = agent_service.get_public_agents(skip, limit)
+    
+    agent_metrics = calculate_agents_metrics(db, [agent.id for agent in agents])
     
     return {
         "agents": [
@@ -252,7 +286,7 @@ async def list_agents(
                 "agent_type": agent.agent_type,
                 "status": agent.status,
                 "is_public": agent.is_public,
-                **calculate_agent_metrics(db, agent.id),
+                **agent_metrics[agent.id],
                 "average_rating": agent.average_rating,
                 "created_at": agent.created_at,
                 "updated_at": agent.updated_at,
@@ -260,7 +294,9 @@ async def list_agents(
             }
             for agent in agents
         ],
-        "total": len(agents),
+        "total": search_page["total"] if search_page else len(agents),
+        "next_cursor": search_page["next_cursor"] if search_page else None,
+        "facets": search_page["facets"] if search_page else None,
         "query": query,
         "category": category,
         "user_authenticated": current_user is not None,
@@ -271,18 +307,25 @@ async def list_agents(
 async def search_agents(
     query: str,
     category: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: Optional[User] = Depends(get_current_user_optional),
     db: Session = Depends(get_session_dependency),
 ):
     """Search agents based on user authentication and ownership."""
     agent_service = AgentService(db)
     
-    if current_user:
-        # Logged-in user: search public agents + their own agents
-        agents = agent_service.search_agents_for_user(current_user.id, query, category)
-    else:
-        # Non-logged-in user: search only public, approved agents
-        agents = agent_service.search_agents(query, category)
+    # Logged-in user: search public agents + their own agents;
+    # non-logged-in user: search only public, approved agents
+    search_page = _search_agents_page(
+        agent_service, query, category,
+        scope="accessible" if current_user else "public",
+        user_id=current_user.id if current_user else None,
+        limit=limit, cursor=cursor
+    )
+    agents = search_page["agents"]
+    
+    agent_metrics = calculate_agents_metrics(db, [agent.id for agent in agents])
     
     return {
         "agents": [
@@ -300,7 +343,7 @@ async def search_agents(
                 "agent_type": agent.agent_type,
                 "status": agent.status,
                 "is_public": agent.is_public,
-                **calculate_agent_metrics(db, agent.id),
+                **agent_metrics[agent.id],
                 "average_rating": agent.average_rating,
                 "created_at": agent.created_at,
                 "updated_at": agent.updated_at,
@@ -308,7 +351,9 @@ async def search_agents(
             }
             for agent in agents
         ],
-        "total": len(agents),
+        "total": search_page["total"],
+        "next_cursor": search_page["next_cursor"],
+        "facets": search_page["facets"],
         "query": query,
         "category": category,
         "user_authenticated": current_user is not None,
@@ -321,17 +366,25 @@ async def get_my_agents(
     limit: int = 100,
     query: Optional[str] = None,
     category: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_session_dependency),
 ):
     """Get agents owned by the current user."""
     agent_service = AgentService(db)
+    search_page = None
     
     if query or category:
-        agents = agent_service.search_my_agents(current_user.id, query or "", category)
+        search_page = _search_agents_page(
+            agent_service, query, category, scope="mine", user_id=current_user.id,
+            skip=skip, limit=limit, cursor=cursor
+        )
+        agents = search_page["agents"]
     else:
         agents = agent_service.get_my_agents(current_user.id, skip, limit)
     
+    agent_metrics = calculate_agents_metrics(db, [agent.id for agent in agents])
+    
     return {
         "agents": [
             {
@@ -348,7 +401,7 @@ async def get_my_agents(
                 "agent_type": agent.agent_type,
                 "status": agent.status,
                 "is_public": agent.is_public,
-                **calculate_agent_metrics(db, agent.id),
+                **agent_metrics[agent.id],
                 "average_rating": agent.average_rating,
                 "created_at": agent.created_at,
                 "updated_at": agent.updated_at,
@@ -356,7 +409,9 @@ async def get_my_agents(
             }
             for agent in agents
         ],
-        "total": len(agents),
+        "total": search_page["total"] if search_page else len(agents),
+        "next_cursor": search_page["next_cursor"] if search_page else None,
+        "facets": search_page["facets"] if search_page else None,
         "user_authenticated": current_user is not None,
     }
 
@@ -547,8 +602,12 @@ async def delete_agent(
                 detail="Cannot delete agent with active hirings"
             )
     
+    agent_search_index.remove_agent(db, agent.id)
     db.delete(agent)
     db.commit()
+    agent_manifest_cache.invalidate(agent_id)
+    execution_result_cache.invalidate(db, agent_id)
+    blob_store.collect_garbage(db)
     
     return {"message": "Agent deleted successfully"} 
 
@@ -810,6 +869,10 @@ async def build_docker_image_background(agent_id: str, user_id: int, db: Session
             if agent.docker_image:
                 logger.info(f"Agent already has pre-built image {agent.docker_image}, removing old image before building new one")
                 try:
+                    # Drop warm containers of the old image before removing it
+                    from ..services.warm_container_pool import warm_container_pool
+                    warm_container_pool.unregister_image(agent.docker_image)
+                    
                     deployment_service = DeploymentService(background_db)
                     deployment_service.remove_prebuilt_image(agent.docker_image)
                     logger.info(f"Removed old pre-built image {agent.docker_image}")
@@ -839,6 +902,10 @@ async def build_docker_image_background(agent_id: str, user_id: int, db: Session
                 agent.build_error = None
                 background_db.commit()
                 logger.info(f"Background Docker build completed successfully for agent {agent_id}: {image_name}")
+                
+                # Pre-start containers so hires of function agents skip container creation
+                if agent.agent_type == "function":
+                    FunctionDeploymentService(background_db).register_warm_pool(agent)
             else:
                 # Failure - set build status to failed
                 agent.build_status = "failed"
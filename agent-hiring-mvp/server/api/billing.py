@@ -13,13 +13,14 @@ from ..models.execution import Execution
 from ..models.hiring import Hiring
 from ..models.agent import Agent
 from ..models.resource_usage import ExecutionResourceUsage
-from ..models.container_resource_usage import ContainerResourceUsage
+from ..models.container_resource_usage import ContainerResourceUsage, UsageAggregation, HiringUsageActivity
 from ..models.deployment import AgentDeployment
 from ..models.user import User
 from ..config.payment_config import PaymentConfig
 from ..services.payment_service import PaymentService
 from ..services.invoice_service import InvoiceService
 from ..services.enhanced_billing_service import EnhancedBillingService
+from ..services.usage_rollup_service import period_bucket_start, rollup_status, sum_rollups
 from ..middleware.auth import get_current_user
 from ..middleware.permissions import require_billing_permission
 
@@ -253,6 +254,9 @@ async def get_billing_summary(
                             "note": "Agent per-use pricing"
                         })
         
+        # Container costs below are read from the usage rollups, which lag behind
+        # by up to one run of the background rollup task
+        
         # Calculate total charges for each month
         for month_data in monthly_data.values():
             # Sum execution charges
@@ -278,18 +282,13 @@ async def get_billing_summary(
                     month_start = datetime.strptime(month_data["month"], "%Y-%m").replace(tzinfo=timezone.utc)
                     month_end = datetime.now(timezone.utc)
                     
-                    # Get container usage for this specific hiring
-                    hiring_container_usage = db.query(ContainerResourceUsage).filter(
-                        and_(
-                            ContainerResourceUsage.hiring_id == hiring["id"],
-                            ContainerResourceUsage.snapshot_timestamp >= month_start,
-                            ContainerResourceUsage.snapshot_timestamp <= month_end
-                        )
-                    ).all()
-                    
-                    # Sum up container costs for this hiring
-                    for usage in hiring_container_usage:
-                        hiring_container_costs += usage.total_cost
+                    # Sum the daily rollups of this hiring; raw snapshots are only kept for a few days
+                    hiring_container_costs = sum_rollups(
+                        db, "daily",
+                        UsageAggregation.hiring_id == hiring["id"],
+                        UsageAggregation.period_start >= month_start,
+                        UsageAggregation.period_start <= month_end
+                    )["total_cost"]
                         
                 except Exception as e:
                     logger.warning(f"Failed to calculate container costs for hiring {hiring['id']}: {e}")
@@ -457,7 +456,15 @@ async def get_hiring_resources(
     user_id: int = Query(..., description="User ID to verify access"),
     db: Session = Depends(get_db)
 ):
-    """Get detailed resource usage for a specific hiring."""
+    """
+    Get detailed resource usage for a specific hiring.
+
+    ``container_resources`` is computed from the usage rollups, since raw
+    container snapshots are only kept for ``RAW_USAGE_RETENTION_DAYS``. Besides
+    ``snapshots_count`` and the first and last snapshot times, it reports
+    ``active_days`` (days with container usage) and ``usage_rollup``, how far
+    the rollups lag behind the snapshots.
+    """
     try:
         # Get hiring information
         hiring = db.query(Hiring).filter(Hiring.id == hiring_id).first()
@@ -557,55 +564,40 @@ async def get_hiring_resources(
             
             execution_charges += execution_cost
         
-        # Get container resource usage directly from database
+        # Get container resource usage from the usage rollups of this hiring
         container_resources = None
         if deployment:
-            logger.info(f"Getting container resource usage from database for deployment {deployment.deployment_id}")
+            logger.info(f"Getting container resource usage from rollups for deployment {deployment.deployment_id}")
             try:
-                # Query container resource usage directly from database
-                container_usage = db.query(ContainerResourceUsage).filter(
-                    ContainerResourceUsage.deployment_id == deployment.deployment_id
-                ).all()
+                # Hourly rollups are downsampled after a while; the daily ones are kept
+                usage_days = db.query(func.count(UsageAggregation.id)).filter(
+                    UsageAggregation.hiring_id == hiring_id,
+                    UsageAggregation.aggregation_period == "daily"
+                ).scalar() or 0
+                activity = db.query(HiringUsageActivity).filter(
+                    HiringUsageActivity.hiring_id == hiring_id
+                ).first()
                 
-                if container_usage:
-                    # Calculate totals from raw database values
-                    total_container_cost = sum(usage.total_cost for usage in container_usage)
-                    
-                    # Calculate resource usage totals from database
-                    total_cpu_percent = sum(usage.cpu_usage_percent for usage in container_usage)
-                    total_memory_bytes = sum(usage.memory_usage_bytes for usage in container_usage)
-                    total_network_rx = sum(usage.network_rx_bytes for usage in container_usage)
-                    total_network_tx = sum(usage.network_tx_bytes for usage in container_usage)
-                    total_memory_limit = sum(usage.memory_limit_bytes for usage in container_usage)
-                    
-                    # Convert to appropriate units (same as database storage)
-                    # CPU: convert percentage to hours (30-second intervals)
-                    interval_hours = 30.0 / 3600.0  # 30 seconds in hours
-                    total_cpu_hours = (total_cpu_percent / 100.0) * interval_hours
-                    
-                    # Memory: convert bytes to GB-hours
-                    total_memory_gb_hours = (total_memory_bytes / (1024**3)) * interval_hours
-                    
-                    # Network: convert bytes to GB
-                    total_network_gb = (total_network_rx + total_network_tx) / (1024**3)
-                    
-                    # Storage: convert memory limit bytes to GB-hours
-                    total_storage_gb_hours = (total_memory_limit / (1024**3)) * interval_hours
+                if usage_days and activity:
+                    totals = sum_rollups(db, "daily", UsageAggregation.hiring_id == hiring_id)
+                    total_container_cost = totals["total_cost"]
                     
                     container_resources = {
                         "deployment_id": deployment.deployment_id,
-                        "cpu_hours": round(total_cpu_hours, 4),
-                        "memory_gb_hours": round(total_memory_gb_hours, 4),
-                        "network_gb": round(total_network_gb, 4),
-                        "storage_gb_hours": round(total_storage_gb_hours, 4),
+                        "cpu_hours": round(totals["total_cpu_hours"], 4),
+                        "memory_gb_hours": round(totals["total_memory_gb_hours"], 4),
+                        "network_gb": round(totals["total_network_gb"], 4),
+                        "storage_gb_hours": round(totals["total_storage_gb_hours"], 4),
                         "container_cost": round(total_container_cost, 6),
-                        "snapshots_count": len(container_usage),
-                        "start_time": min(usage.snapshot_timestamp for usage in container_usage).isoformat(),
-                        "end_time": max(usage.snapshot_timestamp for usage in container_usage).isoformat()
+                        "snapshots_count": activity.snapshots_count,
+                        "active_days": usage_days,
+                        "start_time": activity.first_snapshot_at.isoformat(),
+                        "end_time": activity.last_snapshot_at.isoformat(),
+                        "usage_rollup": rollup_status(db)
                     }
                     
                     total_cost += total_container_cost
-                    logger.info(f"Container resources from database: {container_resources}")
+                    logger.info(f"Container resources from rollups: {container_resources}")
                 else:
                     logger.info(f"No container usage data found for deployment {deployment.deployment_id}")
                     
@@ -1077,8 +1069,6 @@ async def get_deployment_costs(
 ):
     """Get detailed cost breakdown for a specific deployment."""
     try:
-        from ..models.container_resource_usage import ContainerResourceUsage
-        
         # Get deployment info
         deployment = db.query(AgentDeployment).filter(
             AgentDeployment.deployment_id == deployment_id
@@ -1097,46 +1087,21 @@ async def get_deployment_costs(
                 detail="Access denied: You can only access your own deployments"
             )
         
-        # Get resource usage for this deployment
+        # Totals come from the daily rollups of the deployment's hiring over its
+        # lifetime, since raw snapshots are only kept for RAW_USAGE_RETENTION_DAYS
+        lifetime = [
+            UsageAggregation.hiring_id == deployment.hiring_id,
+            UsageAggregation.period_start >= period_bucket_start(deployment.created_at, "daily")
+        ]
+        if deployment.stopped_at:
+            lifetime.append(UsageAggregation.period_start <= deployment.stopped_at)
+        totals = sum_rollups(db, "daily", *lifetime)
+        
+        # Recent snapshots that are still retained
         resource_usage = db.query(ContainerResourceUsage).filter(
             ContainerResourceUsage.deployment_id == deployment_id
         ).order_by(ContainerResourceUsage.snapshot_timestamp.desc()).all()
         
-        if not resource_usage:
-            return {
-                "deployment_id": deployment_id,
-                "agent_id": deployment.agent_id,
-                "deployment_type": deployment.deployment_type,
-                "total_cost": 0.0,
-                "total_snapshots": 0,
-                "cost_breakdown": {
-                    "cpu_cost": 0.0,
-                    "memory_cost": 0.0,
-                    "network_cost": 0.0,
-                    "storage_cost": 0.0
-                },
-                "resource_usage": {
-                    "total_cpu_hours": 0.0,
-                    "total_memory_gb_hours": 0.0,
-                    "total_network_gb": 0.0
-                },
-                "snapshots": []
-            }
-        
-        # Calculate totals
-        total_cost = sum(r.total_cost for r in resource_usage)
-        total_cpu_hours = sum(r.cpu_usage_percent for r in resource_usage) / 100.0 * (30/3600)
-        total_memory_gb_hours = sum(r.memory_usage_bytes for r in resource_usage) / (1024**3) * (30/3600)
-        total_network_gb = sum(r.network_rx_bytes + r.network_tx_bytes for r in resource_usage) / (1024**3)
-        
-        # Cost breakdown
-        cost_breakdown = {
-            "cpu_cost": sum(r.cpu_cost for r in resource_usage),
-            "memory_cost": sum(r.memory_cost for r in resource_usage),
-            "network_cost": sum(r.network_cost for r in resource_usage),
-            "storage_cost": sum(r.storage_cost for r in resource_usage)
-        }
-        
         # Format snapshots
         snapshots = []
         for usage in resource_usage:
@@ -1153,20 +1118,21 @@ async def get_deployment_costs(
             "deployment_id": deployment_id,
             "agent_id": deployment.agent_id,
             "deployment_type": deployment.deployment_type,
-            "total_cost": round(total_cost, 6),
+            "total_cost": round(totals["total_cost"], 6),
             "total_snapshots": len(resource_usage),
             "cost_breakdown": {
-                "cpu_cost": round(cost_breakdown["cpu_cost"], 6),
-                "memory_cost": round(cost_breakdown["memory_cost"], 6),
-                "network_cost": round(cost_breakdown["network_cost"], 6),
-                "storage_cost": round(cost_breakdown["storage_cost"], 6)
+                "cpu_cost": round(totals["total_cpu_cost"], 6),
+                "memory_cost": round(totals["total_memory_cost"], 6),
+                "network_cost": round(totals["total_network_cost"], 6),
+                "storage_cost": round(totals["total_storage_cost"], 6)
             },
             "resource_usage": {
-                "total_cpu_hours": round(total_cpu_hours, 4),
-                "total_memory_gb_hours": round(total_memory_gb_hours, 4),
-                "total_network_gb": round(total_network_gb, 6)
+                "total_cpu_hours": round(totals["total_cpu_hours"], 4),
+                "total_memory_gb_hours": round(totals["total_memory_gb_hours"], 4),
+                "total_network_gb": round(totals["total_network_gb"], 6)
             },
-            "snapshots": snapshots
+            "snapshots": snapshots,
+            "usage_rollup": rollup_status(db)
         }
         
     except HTTPException:
@@ -10,6 +10,7 @@ logger = logging.getLogger(__name__)
 
 from ..database import get_db
 from ..services.deployment_reconciliation_service import DeploymentReconciliationService
+from ..services.container_utils import find_container_deployment
 from ..models.deployment import AgentDeployment
 from ..models.agent import Agent
 from ..models.hiring import Hiring
@@ -179,9 +180,7 @@ def get_containers_diagnostic(
         container_details = []
         for container in containers:
             # Check if container has corresponding deployment
-            deployment = db.query(AgentDeployment).filter(
-                AgentDeployment.container_name == container.name
-            ).first()
+            deployment = find_container_deployment(db, container)
             
             container_detail = {
                 "name": container.name,
@@ -1,14 +1,25 @@
 """Execution API endpoints."""
 
 import asyncio
+import json
+import time
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, status, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from datetime import datetime
 
-from ..database.config import get_session_dependency
+from ..config import (
+    EXECUTION_EVENTS_HEARTBEAT_SECONDS,
+    EXECUTION_QUEUE_ENABLED,
+    EXECUTION_WORKER_CONCURRENCY
+)
+from ..database.config import get_session_dependency, get_session
 from ..services.execution_service import ExecutionService, ExecutionCreateRequest
+from ..services.execution_events import execution_event_bus, execution_event_from
+from ..services.execution_queue import ExecutionQueue
+from ..services.execution_result_cache import served_from_cache
 from ..models.execution import Execution, ExecutionStatus
 from ..models.agent import Agent
 from ..middleware.auth import get_current_user
@@ -18,6 +29,13 @@ class ExecutionRequest(BaseModel):
     hiring_id: int
     execution_type: str = "run"  # "initialize", "run", "cleanup"
     input_data: Optional[Dict[str, Any]] = None
+    use_cache: bool = True  # False forces a fresh run for agents that use the result cache
+
+
+class ExecutionBatchRequest(BaseModel):
+    hiring_id: int
+    inputs: List[Dict[str, Any]]  # One run execution per input
+    use_cache: bool = True
 
 router = APIRouter(prefix="/execution", tags=["execution"])
 
@@ -99,7 +117,8 @@ def create_execution(
             hiring_id=execution_data.hiring_id,
             user_id=user_id,
             input_data=execution_data.input_data,
-            execution_type=execution_data.execution_type
+            execution_type=execution_data.execution_type,
+            use_cache=execution_data.use_cache
         ))
         
         return {
@@ -125,6 +144,172 @@ def create_execution(
         )
 
 
+@router.post("/batch", response_model=dict)
+def create_execution_batch(
+    batch_data: ExecutionBatchRequest,
+    background_tasks: BackgroundTasks,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_session_dependency)
+):
+    """Create and schedule one run execution per input of a hiring in a single request."""
+    execution_service = ExecutionService(db)
+    try:
+        batch = execution_service.create_execution_batch(
+            batch_data.hiring_id,
+            current_user.id,
+            batch_data.inputs,
+            enqueue=EXECUTION_QUEUE_ENABLED,
+            use_cache=batch_data.use_cache
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    execution_ids = execution_service.get_batch_execution_ids(batch.batch_id)
+    if not EXECUTION_QUEUE_ENABLED:
+        background_tasks.add_task(
+            ExecutionService().run_batch_executions, execution_ids, EXECUTION_WORKER_CONCURRENCY
+        )
+    
+    return {
+        **execution_service.get_batch_progress(batch),
+        "execution_ids": execution_ids,
+        "message": f"Batch of {batch.total_items} executions scheduled"
+    }
+
+
+def _get_owned_batch(execution_service: ExecutionService, batch_id: str, user_id: int):
+    batch = execution_service.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Batch not found"
+        )
+    if batch.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied: You can only access your own batches"
+        )
+    return batch
+
+
+@router.get("/batch/{batch_id}", response_model=dict)
+def get_execution_batch(
+    batch_id: str,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_session_dependency)
+):
+    """Get the aggregate progress of an execution batch."""
+    execution_service = ExecutionService(db)
+    batch = _get_owned_batch(execution_service, batch_id, current_user.id)
+    return execution_service.get_batch_progress(batch)
+
+
+@router.get("/batch/{batch_id}/results", response_model=dict)
+def get_execution_batch_results(
+    batch_id: str,
+    finished_only: bool = True,
+    offset: int = 0,
+    limit: int = 100,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_session_dependency)
+):
+    """Get a page of a batch's execution results in input order."""
+    execution_service = ExecutionService(db)
+    batch = _get_owned_batch(execution_service, batch_id, current_user.id)
+    limit = max(1, min(limit, 1000))
+    return {
+        "progress": execution_service.get_batch_progress(batch),
+        "results": execution_service.get_batch_results(
+            batch_id, finished_only=finished_only, offset=max(0, offset), limit=limit
+        ),
+        "offset": offset,
+        "limit": limit
+    }
+
+
+def _load_batch_update(batch_id: str, delivered: set, execution_ids: Optional[List[str]] = None):
+    # Results of newly finished executions plus the current progress. Without
+    # explicit execution IDs, every finished execution not yet delivered is loaded.
+    db = get_session()
+    try:
+        execution_service = ExecutionService(db)
+        if execution_ids is None:
+            execution_ids = execution_service.get_batch_finished_execution_ids(batch_id)
+        new_ids = [execution_id for execution_id in execution_ids if execution_id not in delivered]
+        results = execution_service.get_batch_results(batch_id, execution_ids=new_ids) if new_ids else []
+        return results, execution_service.get_batch_progress(execution_service.get_batch(batch_id))
+    finally:
+        db.close()
+
+
+@router.get("/batch/{batch_id}/events")
+async def stream_execution_batch_events(
+    batch_id: str,
+    request: Request,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_session_dependency)
+):
+    """Stream the results of a batch's executions as they finish, as server-sent events."""
+    execution_service = ExecutionService(db)
+    _get_owned_batch(execution_service, batch_id, current_user.id)
+    batch_execution_ids = set(execution_service.get_batch_execution_ids(batch_id))
+    
+    # Subscribe before the first read, so executions finishing in between are not missed
+    subscription = execution_event_bus.subscribe(current_user.id)
+    # Do not hold a pooled connection for the lifetime of the stream
+    db.close()
+    
+    async def event_stream():
+        loop = asyncio.get_event_loop()
+        delivered = set()
+        finished_ids = None  # None: re-read all finished executions from the database
+        last_progress = None
+        keep_alive_at = time.monotonic() + EXECUTION_EVENTS_HEARTBEAT_SECONDS
+        try:
+            while True:
+                results, progress = await loop.run_in_executor(
+                    None, _load_batch_update, batch_id, delivered, finished_ids
+                )
+                for result in results:
+                    delivered.add(result["execution_id"])
+                    yield _format_sse("result", result)
+                if results or progress != last_progress:
+                    last_progress = progress
+                    keep_alive_at = time.monotonic() + EXECUTION_EVENTS_HEARTBEAT_SECONDS
+                    yield _format_sse("progress", progress)
+                elif time.monotonic() >= keep_alive_at:
+                    keep_alive_at = time.monotonic() + EXECUTION_EVENTS_HEARTBEAT_SECONDS
+                    yield ": keep-alive\n\n"
+                if progress["done"]:
+                    return
+                
+                # Wait for batch executions to finish, in this process or in
+                # another one (published by the execution change poller)
+                finished_ids = None
+                while finished_ids is None:
+                    if await request.is_disconnected():
+                        return
+                    dropped = subscription.dropped
+                    execution_event = await subscription.get(timeout=EXECUTION_EVENTS_HEARTBEAT_SECONDS)
+                    if execution_event is None or subscription.dropped != dropped:
+                        # Re-read every finished execution at keep-alive time or after dropped events
+                        break
+                    if execution_event["terminal"] and execution_event["execution_id"] in batch_execution_ids:
+                        finished_ids = [execution_event["execution_id"]]
+                        # Pick up everything else that finished meanwhile in one read
+                        while not subscription.queue.empty():
+                            queued_event = subscription.queue.get_nowait()
+                            if queued_event["terminal"] and queued_event["execution_id"] in batch_execution_ids:
+                                finished_ids.append(queued_event["execution_id"])
+        finally:
+            execution_event_bus.unsubscribe(subscription)
+    
+    return _event_stream_response(event_stream())
+
+
 @router.get("/{execution_id}", response_model=dict)
 def get_execution(
     execution_id: str, 
@@ -194,6 +379,7 @@ def get_execution(
         "output_data": execution.output_data,
         "error_message": execution.error_message,
         "execution_time": execution.duration_ms / 1000.0 if execution.duration_ms else 0.0,
+        "served_from_cache": execution.execution_id in served_from_cache(db, [execution.execution_id]),
         "usage_summary": {
             "total_cost": total_cost,
             "tokens_used": total_tokens,
@@ -255,6 +441,88 @@ def get_execution_logs(
     }
 
 
+def _format_sse(event_name: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _load_execution_event(execution_id: str) -> Optional[Dict[str, Any]]:
+    db = get_session()
+    try:
+        execution = db.query(Execution).filter(Execution.execution_id == execution_id).first()
+        return execution_event_from(execution) if execution else None
+    finally:
+        db.close()
+
+
+def _event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Disable proxy buffering so events are delivered as they happen
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{execution_id}/events")
+async def stream_execution_events(
+    execution_id: str,
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_session_dependency)
+):
+    """Stream the status transitions of an execution as server-sent events until it finishes."""
+    execution_service = ExecutionService(db)
+    execution = execution_service.get_execution(execution_id)
+    
+    if not execution:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Execution not found"
+        )
+    
+    # Ensure the user can only access their own executions
+    if execution.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied: You can only access your own executions"
+        )
+    
+    # Subscribe before reading the current status, so a transition committed
+    # in between is not missed
+    subscription = execution_event_bus.subscribe(current_user.id, execution_id)
+    db.refresh(execution)
+    current_event = execution_event_from(execution)
+    # Do not hold a pooled connection for the lifetime of the stream
+    db.close()
+    
+    async def event_stream():
+        loop = asyncio.get_event_loop()
+        last_status = current_event["status"]
+        try:
+            yield _format_sse("status", current_event)
+            if current_event["terminal"]:
+                return
+            while not await request.is_disconnected():
+                dropped = subscription.dropped
+                execution_event = await subscription.get(timeout=EXECUTION_EVENTS_HEARTBEAT_SECONDS)
+                if subscription.dropped != dropped:
+                    # The subscriber queue overflowed: re-read the current status
+                    execution_event = await loop.run_in_executor(None, _load_execution_event, execution_id)
+                if execution_event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                if execution_event["status"] == last_status and not execution_event["terminal"]:
+                    continue
+                last_status = execution_event["status"]
+                yield _format_sse("status", execution_event)
+                if execution_event["terminal"]:
+                    return
+        finally:
+            execution_event_bus.unsubscribe(subscription)
+    
+    return _event_stream_response(event_stream())
+
+
 @router.post("/{execution_id}/run")
 async def run_execution(
     execution_id: str, 
@@ -288,6 +556,17 @@ async def run_execution(
                 detail="Access denied: You can only run your own executions"
             )
         
+        if EXECUTION_QUEUE_ENABLED:
+            # Hand the execution to the durable queue; a worker claims and runs it
+            job = ExecutionQueue(db).enqueue(execution)
+            return {
+                "status": "started",
+                "execution_id": execution_id,
+                "message": f"{execution.execution_type.capitalize()} execution queued",
+                "execution_type": execution.execution_type,
+                "queue_status": job.status
+            }
+        
         # Update execution status to running immediately
         execution_service.update_execution_status(execution_id, ExecutionStatus.RUNNING)
         logger.info(f"🚀 Execution {execution_id} status set to RUNNING")
@@ -398,6 +677,36 @@ async def get_user_executions(
     ]
 
 
+@router.get("/user/{user_id}/events")
+async def stream_user_execution_events(
+    user_id: int,
+    request: Request,
+    current_user = Depends(get_current_user)
+):
+    """Stream the status transitions of all executions of a user as server-sent events."""
+    # Ensure the user can only access their own executions
+    if user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied: You can only access your own executions"
+        )
+    
+    subscription = execution_event_bus.subscribe(user_id)
+    
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                execution_event = await subscription.get(timeout=EXECUTION_EVENTS_HEARTBEAT_SECONDS)
+                if execution_event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format_sse("status", execution_event)
+        finally:
+            execution_event_bus.unsubscribe(subscription)
+    
+    return _event_stream_response(event_stream())
+
+
 @router.get("/hiring/{hiring_id}", response_model=List[dict])
 async def get_hiring_executions(
     hiring_id: int,
@@ -427,6 +736,7 @@ async def get_hiring_executions(
     
     # Build complete execution responses with metadata and usage summary
     complete_executions = []
+    cached = served_from_cache(db, [execution.execution_id for execution in executions])
     
     for execution in executions:
         # Get agent information
@@ -468,6 +778,7 @@ async def get_hiring_executions(
             "output_data": execution.output_data,
             "error_message": execution.error_message,
             "execution_time": execution.duration_ms / 1000.0 if execution.duration_ms else 0.0,
+            "served_from_cache": execution.execution_id in cached,
             "usage_summary": {
                 "total_cost": total_cost,
                 "tokens_used": total_tokens,
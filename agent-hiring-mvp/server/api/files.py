@@ -1,10 +1,14 @@
 """Refactored file management API endpoints with better error handling and response models."""
 
+import asyncio
 import logging
 import os
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, status
-from fastapi.responses import FileResponse
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from ..database.config import get_session_dependency
@@ -17,6 +21,85 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/files", tags=["files"])
 
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header into an inclusive (start, end) pair.
+    
+    Returns None for headers this endpoint does not handle (other units or
+    multiple ranges), which are answered with the full file. Raises
+    ValueError for ranges that cannot be satisfied.
+    """
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0 or file_size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, file_size - length), file_size - 1
+    
+    start = int(start)
+    end = int(end) if end else file_size - 1
+    if start >= file_size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, min(end, file_size - 1)
+
+
+def _file_etag(sha256: Optional[str], file_path: Path) -> str:
+    """Strong ETag from the upload checksum, or a weak one for files uploaded before checksums."""
+    if sha256:
+        return f'"{sha256}"'
+    stat_result = os.stat(file_path)
+    return f'W/"{stat_result.st_size:x}-{int(stat_result.st_mtime):x}"'
+
+
+def _etag_matches(header_value: Optional[str], etag: str) -> bool:
+    if not header_value:
+        return False
+    if header_value.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    bare_etag = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header_value.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare_etag:
+            return True
+    return False
+
+
+def _content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+async def _iter_file_range(file_path: Path, start: int, end: int, chunk_size: int):
+    """Read an inclusive byte range of a file in a worker thread, one chunk at a time."""
+    loop = asyncio.get_event_loop()
+    handle = await loop.run_in_executor(None, open, file_path, "rb")
+    try:
+        await loop.run_in_executor(None, handle.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await loop.run_in_executor(None, handle.read, min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await loop.run_in_executor(None, handle.close)
+
 
 def get_file_storage_service(
     db: Session = Depends(get_session_dependency),
@@ -74,6 +157,7 @@ async def upload_file(
             "expires_at": temp_file.expires_at.isoformat(),
             "access_token": temp_file.access_token,
             "access_url": f"/api/v1/files/{temp_file.id}/download?token={temp_file.access_token}",
+            "sha256": await file_service.get_file_checksum(temp_file.id),
             "server_host": os.getenv("AGENTHUB_HOSTNAME", "host.docker.internal"),
             "message": "File uploaded successfully"
         }
@@ -180,14 +264,25 @@ async def get_file_info(
 @router.get("/{file_id}/download")
 async def download_file(
     file_id: str,
+    request: Request,
     token: str = Query(..., description="Access token for the file"),
     include_metadata: bool = Query(False, description="Include file metadata in response headers"),
     file_service: FileStorageService = Depends(get_file_storage_service)
 ):
-    """Download a temporary file using access token."""
+    """
+    Download a temporary file using access token.
+    
+    Supports single byte ranges (``Range: bytes=start-end``) for resumed and
+    parallel transfers, and ``If-None-Match``/``If-Range`` with the file's
+    ETag, which is its SHA-256 for files uploaded with checksums.
+    """
     
     try:
-        result = await file_service.download_file(file_id, token)
+        range_header = request.headers.get("range")
+        if_none_match = request.headers.get("if-none-match")
+        
+        # Counted below once the response is known not to be a 304 or a later range
+        result = await file_service.download_file(file_id, token, count_access=False)
         
         if not result:
             raise HTTPException(
@@ -196,13 +291,54 @@ async def download_file(
             )
         
         file_path, original_filename = result
+        sha256 = await file_service.get_file_checksum(file_id)
+        etag = _file_etag(sha256, file_path)
         
-        # Create response with file content
-        response = FileResponse(
-            path=file_path,
-            filename=original_filename,
-            media_type='application/octet-stream'
-        )
+        common_headers = {"etag": etag, "accept-ranges": "bytes"}
+        if sha256:
+            common_headers["X-File-SHA256"] = sha256
+        
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=common_headers)
+        
+        # A range is only honoured if the client still has the same version (If-Range)
+        byte_range = None
+        if_range = request.headers.get("if-range")
+        if range_header and (not if_range or (if_range.strip() == etag and not etag.startswith("W/"))):
+            file_size = file_path.stat().st_size
+            try:
+                byte_range = _parse_range(range_header, file_size)
+            except ValueError:
+                return Response(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={**common_headers, "content-range": f"bytes */{file_size}"}
+                )
+        
+        # Full downloads count, and of a ranged transfer only its first range
+        if byte_range is None or byte_range[0] == 0:
+            await file_service.record_download(file_id)
+        
+        if byte_range is not None:
+            start, end = byte_range
+            response = StreamingResponse(
+                _iter_file_range(file_path, start, end, file_service.config.stream_chunk_size),
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type='application/octet-stream',
+                headers={
+                    **common_headers,
+                    "content-range": f"bytes {start}-{end}/{file_size}",
+                    "content-length": str(end - start + 1),
+                    "content-disposition": _content_disposition(original_filename)
+                }
+            )
+        else:
+            # Create response with file content
+            response = FileResponse(
+                path=file_path,
+                filename=original_filename,
+                media_type='application/octet-stream',
+                headers=common_headers
+            )
         
         # Add metadata to response headers if requested
         if include_metadata:
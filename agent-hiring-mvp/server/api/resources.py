@@ -5,10 +5,13 @@ import logging
 import uuid
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
+from ..config import EMBEDDING_BATCH_MAX_INPUTS
 from ..database import get_db
 from ..services.resource_manager import ResourceManager
+from ..services.resources.embedding_cache import pack_vector
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/resources", tags=["resources"])
@@ -30,7 +33,13 @@ async def llm_completion(
     db: Session = Depends(get_db),
     execution_id: Optional[str] = Depends(get_execution_id_from_header)
 ):
-    """LLM completion endpoint."""
+    """
+    LLM completion endpoint.
+    
+    With ``"stream": true`` the completion is returned as server-sent events:
+    ``delta`` events with the next piece of ``content`` as it is generated,
+    then one ``done`` event, or an ``error`` event if the completion fails.
+    """
     try:
         # Extract parameters
         provider = request.get("provider", "openai")
@@ -38,6 +47,8 @@ async def llm_completion(
         messages = request.get("messages", [])
         max_tokens = request.get("max_tokens", 1000)
         temperature = request.get("temperature", 0.7)
+        cache = request.get("cache")  # "semantic" to allow similar-prompt hits, False to bypass the cache
+        stream = bool(request.get("stream", False))
         
         # Validate required fields
         if not messages:
@@ -57,13 +68,29 @@ async def llm_completion(
             temp_execution_id = generate_temp_execution_id()
             resource_proxy = resource_manager.get_proxy(temp_execution_id)
         
-        # Call LLM
+        # Call LLM (temperature 0 completions are served from the response cache when repeated)
+        options = {"cache": cache} if cache is not None else {}
+        if stream:
+            chunks = await resource_proxy.llm_stream(
+                provider=provider,
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **options
+            )
+            # Do not hold a pooled connection while the provider streams; usage
+            # is recorded on a fresh one when the stream ends
+            db.close()
+            return _llm_event_stream_response(chunks, provider, model, execution_id or temp_execution_id)
+        
         response = await resource_proxy.llm_complete(
             provider=provider,
             model=model,
             messages=messages,
             max_tokens=max_tokens,
-            temperature=temperature
+            temperature=temperature,
+            **options
         )
         
         return {
@@ -83,6 +110,126 @@ async def llm_completion(
         }
 
 
+def _format_sse(event_name: str, data: Dict[str, Any]) -> str:
+    return f"event: {event_name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _llm_event_stream_response(chunks, provider: str, model: str, execution_id: str) -> StreamingResponse:
+    async def event_stream():
+        try:
+            async for text in chunks:
+                yield _format_sse("delta", {"content": text})
+            yield _format_sse("done", {
+                "success": True,
+                "provider": provider,
+                "model": model,
+                "execution_id": execution_id
+            })
+        except Exception as e:
+            logger.error(f"LLM streaming error: {e}")
+            yield _format_sse("error", {"success": False, "error": str(e), "execution_id": execution_id})
+        finally:
+            # Records usage if the client disconnected before the end
+            await chunks.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so tokens are delivered as they are generated
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/embeddings")
+async def embeddings(
+    request: Dict[str, Any],
+    db: Session = Depends(get_db),
+    execution_id: Optional[str] = Depends(get_execution_id_from_header)
+):
+    """
+    Batch embeddings endpoint.
+    
+    Embeds a list of texts in provider-sized batches and returns one vector
+    per text, in order. With ``"format": "float32"`` the vectors are returned
+    as a little-endian float32 matrix (application/octet-stream, row-major)
+    with the shape in the X-Embedding-Count and X-Embedding-Dimensions headers.
+    """
+    try:
+        # Extract parameters
+        provider = request.get("provider", "openai")
+        model = request.get("model", "text-embedding-ada-002")
+        texts = request.get("texts", [])
+        response_format = request.get("format", "json")
+        
+        # Validate required fields
+        if not texts or not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Texts must be a non-empty list of strings"
+            )
+        if len(texts) > EMBEDDING_BATCH_MAX_INPUTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {EMBEDDING_BATCH_MAX_INPUTS} texts per request"
+            )
+        if response_format not in ("json", "float32"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Format must be 'json' or 'float32'"
+            )
+        
+        # Create resource manager
+        resource_manager = ResourceManager(db)
+        
+        # Get resource proxy for this execution
+        if execution_id:
+            resource_proxy = resource_manager.get_proxy(execution_id)
+        else:
+            # Use temporary execution ID without database record
+            temp_execution_id = generate_temp_execution_id()
+            resource_proxy = resource_manager.get_proxy(temp_execution_id)
+        
+        # Embed all texts
+        result = await resource_proxy.llm_embed_batch(
+            texts=texts,
+            provider=provider,
+            model=model
+        )
+        vectors = result["embeddings"]
+        dimensions = len(vectors[0]) if vectors else 0
+        
+        if response_format == "float32":
+            return Response(
+                content=b"".join(pack_vector(vector) for vector in vectors),
+                media_type="application/octet-stream",
+                headers={
+                    "X-Embedding-Count": str(len(vectors)),
+                    "X-Embedding-Dimensions": str(dimensions),
+                    "X-Embedding-Cached": str(result["cached"]),
+                    "X-Execution-ID": execution_id or temp_execution_id
+                }
+            )
+        
+        return {
+            "success": True,
+            "embeddings": vectors,
+            "count": len(vectors),
+            "dimensions": dimensions,
+            "cached": result["cached"],
+            "provider": provider,
+            "model": model,
+            "execution_id": execution_id or temp_execution_id
+        }
+        
+    except Exception as e:
+        logger.error(f"Embeddings error: {e}")
+        return {
+            "success": False,
+            "error": str(e),
+            "execution_id": execution_id
+        }
+
+
 @router.post("/web_search")
 async def web_search(
     request: Dict[str, Any],
@@ -286,6 +433,7 @@ async def resources_health():
         "service": "resources-api",
         "endpoints": {
             "llm": "/api/v1/resources/llm",
+            "embeddings": "/api/v1/resources/embeddings",
             "web_search": "/api/v1/resources/web_search",
             "vector_db": "/api/v1/resources/vector_db",
             "models": "/api/v1/resources/models"
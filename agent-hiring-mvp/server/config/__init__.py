@@ -50,11 +50,120 @@ MAX_CODE_SIZE = int(os.getenv("MAX_CODE_SIZE", 10 * 1024 * 1024))  # 10MB
 DOCKER_BUILD_TIMEOUT_SECONDS = int(os.getenv("DOCKER_BUILD_TIMEOUT_SECONDS", "300"))  # 5 minutes - Timeout for building Docker images during active deployments
 DOCKER_PREBUILD_TIMEOUT_SECONDS = int(os.getenv("DOCKER_PREBUILD_TIMEOUT_SECONDS", "600"))  # 10 minutes - Timeout for pre-building Docker images when publishing with --build flag
 
+# Image Build Cache
+IMAGE_BUILD_CACHE_ENABLED = os.getenv("IMAGE_BUILD_CACHE_ENABLED", "true").lower() == "true"  # Share images between deployments whose Dockerfile, requirements and agent files are identical
+IMAGE_BUILD_CACHE_MAX_IMAGES = int(os.getenv("IMAGE_BUILD_CACHE_MAX_IMAGES", "50"))  # Cached images kept before least recently used images without containers are removed
+
+# Agent Base Images
+AGENT_BASE_IMAGES_ENABLED = os.getenv("AGENT_BASE_IMAGES_ENABLED", "true").lower() == "true"  # Build agent images on managed base images with common dependencies preinstalled
+AGENT_BASE_PYTHON_IMAGE = os.getenv("AGENT_BASE_PYTHON_IMAGE", "python:3.11-slim")  # Upstream image the managed base images (and the fallback Dockerfiles) start from
+AGENT_BASE_COMMON_PACKAGES = [
+    package.strip()
+    for package in os.getenv(
+        "AGENT_BASE_COMMON_PACKAGES",
+        "openai==3.29.0,langchain==1.4.5,langchain-openai==1.7.1,langchain-community==0.4.2,faiss-cpu==1.15.1,"
+        "requests==2.34.2,aiohttp==3.14.5,python-dotenv==1.2.4,beautifulsoup4==4.15.0"
+    ).split(",")
+    if package.strip()
+]  # Dependencies shared by most agent templates, preinstalled in every base image (pinned: the image tag hashes the Dockerfile, so unpinned versions would go stale under the same tag)
+
 # Container Management Timeouts
 CONTAINER_CREATION_TIMEOUT_SECONDS = int(os.getenv("CONTAINER_CREATION_TIMEOUT_SECONDS", "600"))  # 10 minutes - Timeout for creating and starting Docker containers
 CONTAINER_STOP_TIMEOUT_SECONDS = int(os.getenv("CONTAINER_STOP_TIMEOUT_SECONDS", "30"))  # 30 seconds - Timeout for gracefully stopping Docker containers
 CONTAINER_REMOVAL_POLL_INTERVAL_SECONDS = float(os.getenv("CONTAINER_REMOVAL_POLL_INTERVAL_SECONDS", "0.5"))  # 500ms - Polling interval when waiting for container removal to complete
 
+# Persistent Agent Execution
+PERSISTENT_AGENT_EXECUTION_MODE = os.getenv("PERSISTENT_AGENT_EXECUTION_MODE", "worker")  # "worker" - resident in-container worker keeps the agent loaded, "exec" - one-shot python process per call
+PERSISTENT_AGENT_WORKER_PATH = "/app/agenthub_worker.py"  # Location of the resident worker script inside persistent agent images
+
+# Execution Concurrency
+MAX_CONCURRENT_EXECUTIONS_PER_DEPLOYMENT = int(os.getenv("MAX_CONCURRENT_EXECUTIONS_PER_DEPLOYMENT", "4"))  # Parallel executions allowed against a single deployment
+EXECUTION_SLOT_TIMEOUT_SECONDS = int(os.getenv("EXECUTION_SLOT_TIMEOUT_SECONDS", str(MAX_EXECUTION_TIME)))  # Maximum time an execution waits for a free slot on its deployment
+EXECUTION_EVENTS_HEARTBEAT_SECONDS = int(os.getenv("EXECUTION_EVENTS_HEARTBEAT_SECONDS", "15"))  # Keep-alive interval of execution event streams
+EXECUTION_EVENTS_POLL_SECONDS = float(os.getenv("EXECUTION_EVENTS_POLL_SECONDS", "1"))  # Each API process reads status changes committed by other processes at this interval, with one query for all its streams and only while it has any
+EXECUTION_EVENTS_POLL_MAX_SECONDS = float(os.getenv("EXECUTION_EVENTS_POLL_MAX_SECONDS", "5"))  # Reads that find no changes back off up to this interval
+EXECUTION_EVENTS_POLL_OVERLAP_SECONDS = float(os.getenv("EXECUTION_EVENTS_POLL_OVERLAP_SECONDS", "10"))  # Each read reaches this far behind the newest change seen, for late commits and clock differences between hosts
+EXECUTION_EVENTS_QUEUE_SIZE = int(os.getenv("EXECUTION_EVENTS_QUEUE_SIZE", "1000"))  # Buffered events per stream subscriber before events are dropped
+
+# Execution Queue
+EXECUTION_QUEUE_ENABLED = os.getenv("EXECUTION_QUEUE_ENABLED", "true").lower() == "true"  # Run executions through the durable database queue instead of in-request background tasks
+EXECUTION_QUEUE_EMBEDDED_WORKER = os.getenv("EXECUTION_QUEUE_EMBEDDED_WORKER", "true").lower() == "true"  # Also run a queue worker inside the API process; disable on API nodes when running `agenthub worker` separately
+EXECUTION_WORKER_CONCURRENCY = int(os.getenv("EXECUTION_WORKER_CONCURRENCY", "8"))  # Executions a single worker process runs at the same time
+EXECUTION_QUEUE_MAX_PER_USER = int(os.getenv("EXECUTION_QUEUE_MAX_PER_USER", "4"))  # Running executions allowed per user across all workers
+EXECUTION_QUEUE_MAX_PER_AGENT = int(os.getenv("EXECUTION_QUEUE_MAX_PER_AGENT", "16"))  # Running executions allowed per agent across all workers
+EXECUTION_QUEUE_LEASE_SECONDS = int(os.getenv("EXECUTION_QUEUE_LEASE_SECONDS", "60"))  # A claimed job is handed to another worker if its worker stops renewing the lease for this long
+EXECUTION_QUEUE_MAX_ATTEMPTS = int(os.getenv("EXECUTION_QUEUE_MAX_ATTEMPTS", "3"))  # Claims per job before it is given up and the execution marked failed
+EXECUTION_QUEUE_RETRY_DELAY_SECONDS = int(os.getenv("EXECUTION_QUEUE_RETRY_DELAY_SECONDS", "10"))  # Base delay before a failed job is retried (doubles per attempt)
+EXECUTION_QUEUE_POLL_INTERVAL_SECONDS = float(os.getenv("EXECUTION_QUEUE_POLL_INTERVAL_SECONDS", "1.0"))  # How often an idle worker checks the queue for new jobs
+EXECUTION_BATCH_MAX_SIZE = int(os.getenv("EXECUTION_BATCH_MAX_SIZE", "1000"))  # Inputs accepted by a single batch execution request
+
+# Execution Result Cache (opt-in per agent via "result_cache" in config.json)
+EXECUTION_RESULT_CACHE_ENABLED = os.getenv("EXECUTION_RESULT_CACHE_ENABLED", "true").lower() == "true"  # Platform-wide switch for serving repeated inputs of deterministic agents from cache
+EXECUTION_RESULT_CACHE_DEFAULT_TTL_SECONDS = int(os.getenv("EXECUTION_RESULT_CACHE_DEFAULT_TTL_SECONDS", "3600"))  # TTL when an agent enables the cache without a ttl_seconds
+EXECUTION_RESULT_CACHE_MAX_TTL_SECONDS = int(os.getenv("EXECUTION_RESULT_CACHE_MAX_TTL_SECONDS", str(7 * 24 * 3600)))  # Upper bound for agent-declared TTLs
+
+# Agent Manifest Cache
+AGENT_MANIFEST_CACHE_ENABLED = os.getenv("AGENT_MANIFEST_CACHE_ENABLED", "true").lower() == "true"  # Keep parsed config.json and compiled schema validators in memory per agent version
+AGENT_MANIFEST_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_MANIFEST_CACHE_MAX_ENTRIES", "1024"))  # Agents kept before the least recently used manifest is dropped
+
+# Authentication Cache
+AUTH_PRINCIPAL_CACHE_ENABLED = os.getenv("AUTH_PRINCIPAL_CACHE_ENABLED", "true").lower() == "true"  # Resolve API keys and JWT subjects from memory instead of querying on every request
+AUTH_PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SECONDS", "30"))  # Upper bound for how long another server process may keep using a deactivated key or user
+AUTH_PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))  # Users and API keys kept before the least recently used are dropped
+API_KEY_USAGE_FLUSH_INTERVAL_SECONDS = float(os.getenv("API_KEY_USAGE_FLUSH_INTERVAL_SECONDS", "5"))  # How often buffered API key usage counters are written to the database
+PERMISSION_CACHE_ENABLED = os.getenv("PERMISSION_CACHE_ENABLED", "true").lower() == "true"  # Keep each user's effective roles and permissions in memory for RBAC checks
+PERMISSION_CACHE_TTL_SECONDS = int(os.getenv("PERMISSION_CACHE_TTL_SECONDS", "30"))  # Upper bound for how long another server process may keep using changed roles
+
+# Warm Container Pool (function agents)
+WARM_POOL_ENABLED = os.getenv("WARM_POOL_ENABLED", "true").lower() == "true"  # Keep idle pre-started containers for prebuilt function agent images
+WARM_POOL_MIN_SIZE = int(os.getenv("WARM_POOL_MIN_SIZE", "1"))  # Idle containers kept per prebuilt image while the agent is in demand
+WARM_POOL_MAX_SIZE = int(os.getenv("WARM_POOL_MAX_SIZE", "3"))  # Upper bound of idle containers per prebuilt image
+WARM_POOL_IDLE_TIMEOUT_SECONDS = int(os.getenv("WARM_POOL_IDLE_TIMEOUT_SECONDS", "1800"))  # 30 minutes - Idle containers older than this are evicted, and images without hires in this window are drained
+WARM_POOL_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("WARM_POOL_MAINTENANCE_INTERVAL_SECONDS", "30"))  # How often the pool is refilled and idle containers evicted
+
+# Container Metrics Collection
+CONTAINER_METRICS_INTERVAL_SECONDS = int(os.getenv("CONTAINER_METRICS_INTERVAL_SECONDS", "30"))  # How often resource usage snapshots are written for running containers
+CONTAINER_METRICS_MAX_STREAMS = int(os.getenv("CONTAINER_METRICS_MAX_STREAMS", "1000"))  # Upper bound of concurrent Docker stats subscriptions (sizes the Docker connection pool)
+USAGE_ROLLUP_INTERVAL_SECONDS = int(os.getenv("USAGE_ROLLUP_INTERVAL_SECONDS", "300"))  # How often new usage snapshots are folded into hourly/daily aggregations
+USAGE_ROLLUP_BATCH_SIZE = int(os.getenv("USAGE_ROLLUP_BATCH_SIZE", "5000"))  # Snapshots read per rollup batch
+USAGE_ROLLUP_LAG_SECONDS = int(os.getenv("USAGE_ROLLUP_LAG_SECONDS", "60"))  # Snapshots younger than this are left for the next run so in-flight inserts are not skipped
+RAW_USAGE_RETENTION_DAYS = int(os.getenv("RAW_USAGE_RETENTION_DAYS", "7"))  # Rolled up raw snapshots older than this are deleted (0 keeps them forever)
+HOURLY_USAGE_RETENTION_DAYS = int(os.getenv("HOURLY_USAGE_RETENTION_DAYS", "90"))  # Hourly aggregations older than this are deleted; daily ones are kept (0 keeps them forever)
+
+# Agent Proxy (ACP agent endpoints)
+AGENT_PROXY_MAX_CONNECTIONS_PER_DEPLOYMENT = int(os.getenv("AGENT_PROXY_MAX_CONNECTIONS_PER_DEPLOYMENT", "32"))  # Pooled keep-alive connections to one deployment
+AGENT_PROXY_KEEPALIVE_SECONDS = int(os.getenv("AGENT_PROXY_KEEPALIVE_SECONDS", "30"))  # Idle pooled connections are closed after this long
+AGENT_PROXY_POOL_IDLE_SECONDS = int(os.getenv("AGENT_PROXY_POOL_IDLE_SECONDS", "600"))  # Connection pools of deployments without requests for this long are closed
+AGENT_PROXY_READ_TIMEOUT_SECONDS = int(os.getenv("AGENT_PROXY_READ_TIMEOUT_SECONDS", "60"))  # Proxied requests fail when the agent sends nothing for this long (streams may run longer in total)
+AGENT_PROXY_ROUTE_CACHE_TTL_SECONDS = float(os.getenv("AGENT_PROXY_ROUTE_CACHE_TTL_SECONDS", "5"))  # How long a hiring's running deployment endpoint is reused without querying
+
+# External Resource Clients (LLM, web search, vector DB)
+RESOURCE_HTTP_MAX_CONNECTIONS = int(os.getenv("RESOURCE_HTTP_MAX_CONNECTIONS", "100"))  # Pooled keep-alive connections shared by all provider calls of a process
+RESOURCE_HTTP_KEEPALIVE_SECONDS = int(os.getenv("RESOURCE_HTTP_KEEPALIVE_SECONDS", "60"))  # Idle pooled provider connections are closed after this long
+RESOURCE_HTTP_TIMEOUT_SECONDS = int(os.getenv("RESOURCE_HTTP_TIMEOUT_SECONDS", "120"))  # Upper bound for one provider request
+RESOURCE_API_KEYS_RELOAD_SECONDS = float(os.getenv("RESOURCE_API_KEYS_RELOAD_SECONDS", "5"))  # How often api_keys.txt is checked for changes
+
+# External Resource Rate Limits
+RESOURCE_RATE_LIMIT_BACKEND = os.getenv("RESOURCE_RATE_LIMIT_BACKEND", "local")  # "local" (per process) or "database" (quotas shared by all API workers)
+RESOURCE_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RESOURCE_RATE_LIMIT_MAX_WAIT_SECONDS", "30"))  # Calls over the limit wait up to this long for capacity before failing
+
+# LLM Response Cache (exact match for temperature 0; semantic match opt-in per request via "cache": "semantic")
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "true").lower() == "true"  # Platform-wide switch for serving repeated LLM completions from memory
+LLM_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("LLM_RESPONSE_CACHE_TTL_SECONDS", "3600"))  # How long a cached completion is served
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "5000"))  # Least recently used completions are evicted beyond this
+LLM_RESPONSE_CACHE_MAX_BYTES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # Approximate memory cap of the cache
+LLM_SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"  # Allows requests to opt in to similarity matching
+LLM_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95"))  # Minimum cosine similarity of prompt embeddings for a hit
+LLM_SEMANTIC_CACHE_EMBEDDING_MODEL = os.getenv("LLM_SEMANTIC_CACHE_EMBEDDING_MODEL", "text-embedding-ada-002")  # Embeds prompts, through the same provider as the completion
+
+# Batched Embeddings (/resources/embeddings)
+EMBEDDING_BATCH_MAX_INPUTS = int(os.getenv("EMBEDDING_BATCH_MAX_INPUTS", "20000"))  # Texts accepted by a single embeddings request
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))  # Texts sent to the provider in one call
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", "50000"))  # Estimated tokens sent to the provider in one call
+EMBEDDING_BATCH_CONCURRENCY = int(os.getenv("EMBEDDING_BATCH_CONCURRENCY", "4"))  # Provider calls of one request in flight at once
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"  # Reuse vectors of texts already embedded with the same provider and model
+EMBEDDING_CACHE_TTL_DAYS = int(os.getenv("EMBEDDING_CACHE_TTL_DAYS", "30"))  # Cached vectors not used for this long are deleted
+
 # =============================================================================
 # SECURITY SETTINGS
 # =============================================================================
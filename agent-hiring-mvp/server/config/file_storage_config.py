@@ -12,6 +12,7 @@ class FileStorageConfig(BaseSettings):
     # Storage paths
     upload_dir: str = "./temp_uploads"
     user_uploads_subdir: str = "users"
+    blobs_subdir: str = "blobs"  # Content-addressed store shared by uploads and agent code
     
     # File size limits
     max_file_size_mb: int = 10
@@ -37,6 +38,7 @@ class FileStorageConfig(BaseSettings):
     
     # Performance settings
     chunk_size: int = 8192  # 8KB chunks for file operations
+    stream_chunk_size: int = 1024 * 1024  # 1MB chunks for uploads and ranged downloads
     max_concurrent_uploads: int = 5
     
     @field_validator('max_file_size_bytes', mode='before')
@@ -62,6 +64,11 @@ class FileStorageConfig(BaseSettings):
         """Get the full upload path."""
         return os.path.join(self.upload_dir, self.user_uploads_subdir)
     
+    @property
+    def blob_path(self):
+        """Get the full path of the content-addressed blob store."""
+        return os.path.join(self.upload_dir, self.blobs_subdir)
+    
     class Config:
         env_prefix = "FILE_STORAGE_"
         case_sensitive = False
@@ -3,7 +3,8 @@
 import logging
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.schema import CreateIndex
 from .config import get_database_url
 from ..models.base import Base
 
@@ -45,15 +46,43 @@ def is_database_initialized() -> bool:
         return False
 
 
+def create_missing_tables(engine) -> None:
+    """Create the tables of models added since an existing database was created."""
+    try:
+        Base.metadata.create_all(bind=engine, checkfirst=True)
+    except OperationalError as e:
+        # Another process starting at the same time may create them first
+        if "already exists" not in str(e):
+            raise
+        logger.info("Missing tables were created concurrently, continuing...")
+
+
+def create_missing_indexes(engine) -> None:
+    """Create the indexes added to existing tables since the database was created."""
+    # create_all skips tables that exist, including the indexes declared on them
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as connection:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+            except DBAPIError as e:
+                # E.g. a unique index over rows that are not unique; the rest are still created
+                logger.warning(f"Could not create index {index.name} on {table.name}: {e}")
+
+
 def safe_init_database():
     """Safely initialize the database, handling concurrent calls gracefully."""
     try:
+        database_url = get_database_url()
+        
         # Check if database is already initialized
         if is_database_initialized():
+            engine = create_engine(database_url)
+            create_missing_tables(engine)
+            create_missing_indexes(engine)
             logger.info("Database already initialized, skipping...")
             return None, None
         
-        database_url = get_database_url()
         engine = create_engine(database_url)
         
         # Test database connection
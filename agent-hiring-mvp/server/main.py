@@ -29,9 +29,7 @@ except ImportError:
 
 from .database.init_db import init_database, get_current_session
 from .services.token_service import TokenService
-from .services.resource_usage_tracker import ResourceUsageTracker
-from .models.deployment import AgentDeployment
-from .models.hiring import Hiring
+from .config import CONTAINER_METRICS_INTERVAL_SECONDS
 # Import models to ensure they're registered with SQLAlchemy Base metadata
 from .models import *
 from .api import (
@@ -75,6 +73,12 @@ logging.getLogger("server.services.resource_usage_tracker").setLevel(logging.WAR
 # Global task references for monitoring
 cleanup_task = None
 metrics_task = None
+warm_pool_task = None
+usage_rollup_task = None
+api_key_usage_task = None
+execution_worker = None
+execution_worker_task = None
+execution_change_task = None
 metrics_collection_active = False
 
 
@@ -91,15 +95,15 @@ async def cleanup_tokens():
 
 
 async def cleanup_expired_files():
-    """Background task to clean up expired temporary files."""
+    """Background task to clean up expired temporary files and result cache entries."""
     while True:
         try:
             await asyncio.sleep(3600)  # Run every hour
             from .services.file_storage_service import FileStorageService
-            from .database.config import get_session_dependency
+            from .services.execution_result_cache import execution_result_cache
             
             # Get a fresh database session
-            db = get_session_dependency()
+            db = get_current_session()
             try:
                 file_service = FileStorageService(db)
                 cleaned_count = file_service.cleanup_expired_files()
@@ -109,6 +113,13 @@ async def cleanup_expired_files():
                     logger.debug("File cleanup completed: no expired files found")
             except Exception as e:
                 logger.error(f"Error during file cleanup: {e}")
+            try:
+                purged_count = execution_result_cache.purge_expired(db)
+                if purged_count > 0:
+                    logger.info(f"Result cache cleanup completed: {purged_count} expired entries removed")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error during result cache cleanup: {e}")
             finally:
                 db.close()
                 
@@ -120,85 +131,136 @@ async def cleanup_expired_files():
 
 
 
+async def maintain_warm_container_pool():
+    """Background task to seed, refill and evict the warm container pool for function agents."""
+    from .config import WARM_POOL_ENABLED, WARM_POOL_MAINTENANCE_INTERVAL_SECONDS
+    from .services.warm_container_pool import warm_container_pool
+    
+    if not WARM_POOL_ENABLED:
+        logger.info("Warm container pool disabled")
+        return
+    
+    # Wait a bit for the system to fully initialize before starting containers
+    await asyncio.sleep(10)
+    loop = asyncio.get_event_loop()
+    
+    try:
+        from .models.agent import Agent, AgentStatus, AgentType
+        from .models.deployment import AgentDeployment
+        from .services.function_deployment_service import FunctionDeploymentService
+        db = get_current_session()
+        try:
+            # Claimed pool containers still carry the pool label; keep the ones deployments use
+            assigned_container_ids = {
+                container_id for (container_id,) in db.query(AgentDeployment.container_id).filter(
+                    AgentDeployment.container_id.isnot(None)
+                )
+            }
+            await loop.run_in_executor(
+                None, warm_container_pool.remove_orphaned_containers, assigned_container_ids
+            )
+            
+            # Seed the pool with the prebuilt images of approved function agents
+            agents = db.query(Agent).filter(
+                Agent.agent_type == AgentType.FUNCTION.value,
+                Agent.status == AgentStatus.APPROVED.value,
+                Agent.docker_image.isnot(None)
+            ).all()
+            if agents:
+                deployment_service = FunctionDeploymentService(db)
+                for agent in agents:
+                    deployment_service.register_warm_pool(agent)
+                logger.info(f"Warm container pool seeded for {len(agents)} prebuilt function agents")
+        finally:
+            db.close()
+    except Exception as e:
+        logger.error(f"Error seeding warm container pool: {e}")
+    
+    while True:
+        try:
+            await asyncio.sleep(WARM_POOL_MAINTENANCE_INTERVAL_SECONDS)
+            await loop.run_in_executor(None, warm_container_pool.maintain)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error maintaining warm container pool: {e}")
+
+
 async def collect_container_metrics():
     """Background task to continuously collect container resource usage metrics."""
+    from .services.container_metrics_collector import container_metrics_collector
+    
     # Wait a bit for the system to fully initialize before starting metrics collection
     await asyncio.sleep(10)
     logger.info("Starting container metrics collection service...")
+    loop = asyncio.get_event_loop()
     
-    while True:
+    def run_collection_cycle() -> int:
+        # Get a fresh database session for this iteration
+        db = get_current_session()
         try:
-            # Get a fresh database session for this iteration
-            db = get_current_session()
+            return container_metrics_collector.collect_cycle(db)
+        finally:
+            db.close()
+    
+    try:
+        while True:
+            cycle_start = loop.time()
             try:
-                # Check if the required tables exist before querying
-                try:
-                    # Simple check if tables exist by doing a basic query
-                    db.execute(db.query(AgentDeployment).limit(1).statement)
-                    
-                    # Get all running deployments
-                    running_deployments = db.query(AgentDeployment).join(Hiring).filter(
-                        AgentDeployment.status == "running"
-                    ).all()
-                except Exception as table_error:
-                    # Tables might not be ready yet, skip this iteration
-                    logger.debug(f"Tables not ready for metrics collection: {table_error}")
-                    await asyncio.sleep(30)
-                    continue
-                
-                if running_deployments:
-                    logger.info(f"Collecting metrics for {len(running_deployments)} running deployments")
-                    
-                    # Initialize resource usage tracker
-                    tracker = ResourceUsageTracker(db)
-                    
-                    # Collect metrics for each running deployment
-                    for deployment in running_deployments:
-                        try:
-                            # Check if container still exists and is running
-                            if deployment.container_name:
-                                # Run the synchronous collect_container_metrics in a thread pool
-                                loop = asyncio.get_event_loop()
-                                resource_usage = await loop.run_in_executor(
-                                    None, 
-                                    tracker.collect_container_metrics, 
-                                    deployment.deployment_id
-                                )
-                                
-                                if not resource_usage:
-                                    logger.debug(f"No metrics collected for deployment {deployment.deployment_id} (container may not be accessible)")
-                                    
-                            else:
-                                # This deployment will be handled by the reconciliation service
-                                logger.debug(f"Deployment {deployment.deployment_id} has no container name - will be reconciled")
-                                continue
-                                
-                        except Exception as e:
-                            logger.error(f"Error collecting metrics for deployment {deployment.deployment_id}: {e}")
-                            continue
-                    
-                    logger.info(f"Completed metrics collection for {len(running_deployments)} deployments")
+                # Stats are streamed in the background, so a cycle only reads the latest
+                # samples and bulk-inserts them - run it off the event loop
+                collected = await loop.run_in_executor(None, run_collection_cycle)
+                if collected:
+                    logger.info(f"Collected metrics for {collected} running deployments "
+                                f"in {loop.time() - cycle_start:.2f}s")
                 else:
-                    logger.debug("No running deployments found for metrics collection")
-                    
+                    logger.debug("No container metrics collected in this cycle")
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
+                # Tables might not be ready yet, or the database is temporarily unavailable
                 logger.error(f"Error in container metrics collection: {e}")
-            finally:
-                db.close()
-                
-            # Wait for next collection cycle (30 seconds as configured in ResourceUsageTracker)
-            await asyncio.sleep(30)
             
+            # Keep a fixed cadence regardless of how long the cycle took
+            await asyncio.sleep(max(0.0, CONTAINER_METRICS_INTERVAL_SECONDS - (loop.time() - cycle_start)))
+    finally:
+        container_metrics_collector.shutdown()
+
+
+async def rollup_usage_aggregations():
+    """Background task to fold new usage snapshots into hourly/daily aggregations and apply retention."""
+    from .config import USAGE_ROLLUP_INTERVAL_SECONDS
+    from .services.usage_rollup_service import UsageRollupService
+    
+    # Wait a bit for the system to fully initialize before starting rollups
+    await asyncio.sleep(15)
+    loop = asyncio.get_event_loop()
+    
+    def run_rollup():
+        db = get_current_session()
+        try:
+            rollup_service = UsageRollupService(db)
+            rollup_service.run_incremental_rollup()
+            rollup_service.apply_retention()
+        finally:
+            db.close()
+    
+    while True:
+        try:
+            await loop.run_in_executor(None, run_rollup)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            logger.error(f"Fatal error in container metrics collection loop: {e}")
-            # Wait a bit longer on error before retrying
-            await asyncio.sleep(60)
+            logger.error(f"Error rolling up usage aggregations: {e}")
+        await asyncio.sleep(USAGE_ROLLUP_INTERVAL_SECONDS)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
-    global cleanup_task, metrics_task, metrics_collection_active
+    global cleanup_task, metrics_task, metrics_collection_active, warm_pool_task, usage_rollup_task
+    global api_key_usage_task, execution_change_task
+    global execution_worker, execution_worker_task
     
     # Startup
     logger.info("Starting Agent Hiring System...")
@@ -206,6 +268,19 @@ async def lifespan(app: FastAPI):
         init_database()
         logger.info("Database initialized successfully")
         
+        # Create the agent search index (and backfill it) before the first search
+        from .services.agent_search_index import agent_search_index
+        db = get_current_session()
+        try:
+            logger.info(f"Agent search index ready ({agent_search_index.ensure_index(db)})")
+        finally:
+            db.close()
+        
+        # Build missing agent base images in the background; hires don't wait for them
+        from .services.base_images import base_image_manager
+        base_image_manager.start_builds()
+        logger.info("Base image builds started")
+        
         # Start background cleanup task
         cleanup_task = asyncio.create_task(cleanup_tokens())
         logger.info("Token cleanup task started")
@@ -219,6 +294,33 @@ async def lifespan(app: FastAPI):
         metrics_collection_active = True
         logger.info("Container metrics collection task started")
         
+        # Start warm container pool maintenance task
+        warm_pool_task = asyncio.create_task(maintain_warm_container_pool())
+        logger.info("Warm container pool task started")
+        
+        # Start usage rollup task
+        usage_rollup_task = asyncio.create_task(rollup_usage_aggregations())
+        logger.info("Usage rollup task started")
+        
+        # Start the task that writes buffered API key usage counters
+        from .services.auth_cache import api_key_usage_recorder
+        api_key_usage_task = asyncio.create_task(api_key_usage_recorder.run())
+        logger.info("API key usage flush task started")
+        
+        # Start the poller that streams transitions committed by other processes
+        from .services.execution_events import execution_change_poller
+        execution_change_task = asyncio.create_task(execution_change_poller.run())
+        logger.info("Execution change poller started")
+        
+        # Start the embedded execution queue worker (API-only nodes disable it
+        # and run `agenthub worker` processes instead)
+        from .config import EXECUTION_QUEUE_ENABLED, EXECUTION_QUEUE_EMBEDDED_WORKER
+        if EXECUTION_QUEUE_ENABLED and EXECUTION_QUEUE_EMBEDDED_WORKER:
+            from .services.execution_worker import ExecutionWorker
+            execution_worker = ExecutionWorker()
+            execution_worker_task = asyncio.create_task(execution_worker.run())
+            logger.info("Embedded execution worker started")
+        
 
         
     except Exception as e:
@@ -241,6 +343,39 @@ async def lifespan(app: FastAPI):
             metrics_collection_active = False
             logger.info("Container metrics collection task stopped")
         
+        if warm_pool_task:
+            warm_pool_task.cancel()
+            logger.info("Warm container pool task stopped")
+        
+        if usage_rollup_task:
+            usage_rollup_task.cancel()
+            logger.info("Usage rollup task stopped")
+        
+        if api_key_usage_task:
+            api_key_usage_task.cancel()
+            from .services.auth_cache import api_key_usage_recorder
+            api_key_usage_recorder.flush()
+            logger.info("API key usage counters flushed")
+        
+        if execution_change_task:
+            from .services.execution_events import execution_change_poller
+            execution_change_poller.stop()
+            execution_change_task.cancel()
+            logger.info("Execution change poller stopped")
+        
+        from .services.agent_proxy_pool import agent_proxy_pool
+        await agent_proxy_pool.close_all()
+        logger.info("Agent proxy connection pools closed")
+        
+        from .services.resources.registry import resource_client_registry
+        await resource_client_registry.close_all()
+        logger.info("External resource clients closed")
+        
+        if execution_worker_task:
+            execution_worker.stop()
+            execution_worker_task.cancel()
+            logger.info("Embedded execution worker stopped")
+        
 
         
     except Exception as e:
@@ -320,7 +455,8 @@ async def health_check():
             "database": "connected",
             "token_cleanup": "active" if cleanup_task and not cleanup_task.done() else "inactive",
             "file_cleanup": "active" if 'file_cleanup_task' in globals() and file_cleanup_task and not file_cleanup_task.done() else "inactive",
-            "metrics_collection": "active" if metrics_collection_active and metrics_task and not metrics_task.done() else "inactive"
+            "metrics_collection": "active" if metrics_collection_active and metrics_task and not metrics_task.done() else "inactive",
+            "execution_worker": "active" if execution_worker_task and not execution_worker_task.done() else "inactive"
         },
         "metrics_collection": {
             "active": metrics_collection_active,
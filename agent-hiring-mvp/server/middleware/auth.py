@@ -19,6 +19,7 @@ from server.models.user import User
 from server.services.auth_service import AuthService
 from server.services.token_service import TokenService
 from server.services.api_key_service import ApiKeyService
+from server.services.auth_cache import principal_cache
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -157,7 +158,7 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = principal_cache.get_user(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -217,7 +218,7 @@ def get_current_user_optional(
                 return None
             
             try:
-                user = db.query(User).filter(User.id == user_id).first()
+                user = principal_cache.get_user(db, user_id)
                 if user and user.is_active:
                     return user
             except Exception:
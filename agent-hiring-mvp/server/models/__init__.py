@@ -4,17 +4,18 @@ from .base import Base
 from .agent import Agent, AgentStatus
 from .agent_file import AgentFile
 from .hiring import Hiring, HiringStatus
-from .execution import Execution, ExecutionStatus
+from .execution import Execution, ExecutionStatus, ExecutionJob, ExecutionJobStatus, ExecutionBatch, ExecutionBatchItem, ExecutionResultCacheEntry, ExecutionResultCacheUse
 from .user import User
-from .resource_usage import UserBudget, ExecutionResourceUsage, ResourceConfig
+from .resource_usage import UserBudget, ExecutionResourceUsage, ResourceConfig, ResourceRateLimitWindow, EmbeddingCacheEntry
 from .user_api_key import UserApiKey
 from .invoice import Invoice
 from .deployment import AgentDeployment, DeploymentStatus
-from .container_resource_usage import ContainerResourceUsage, AgentActivityLog, ResourcePricing, UsageAggregation
+from .container_resource_usage import ContainerResourceUsage, AgentActivityLog, ResourcePricing, UsageAggregation, UsageRollupWatermark, HiringUsageActivity
 from .role import Role
 from .user_role import UserRole
 from .permission import Permission
-from .temporary_file import TemporaryFile
+from .temporary_file import TemporaryFile, TemporaryFileChecksum
+from .content_blob import ContentBlob, AgentFileBlob
 
 
 __all__ = [
@@ -26,10 +27,18 @@ __all__ = [
     "HiringStatus",
     "Execution",
     "ExecutionStatus",
+    "ExecutionJob",
+    "ExecutionJobStatus",
+    "ExecutionBatch",
+    "ExecutionBatchItem",
+    "ExecutionResultCacheEntry",
+    "ExecutionResultCacheUse",
     "User",
     "UserBudget",
     "ExecutionResourceUsage",
     "ResourceConfig",
+    "ResourceRateLimitWindow",
+    "EmbeddingCacheEntry",
     "UserApiKey",
     "Invoice",
     "AgentDeployment",
@@ -38,8 +47,13 @@ __all__ = [
     "AgentActivityLog",
     "ResourcePricing",
     "UsageAggregation",
+    "UsageRollupWatermark",
+    "HiringUsageActivity",
     "Role",
     "UserRole",
     "Permission",
     "TemporaryFile",
+    "TemporaryFileChecksum",
+    "ContentBlob",
+    "AgentFileBlob",
 ] 
\ No newline at end of file
@@ -192,3 +192,30 @@ class UsageAggregation(Base):
     
     def __repr__(self) -> str:
         return f"<UsageAggregation(id={self.id}, user={self.user_id}, agent={self.agent_id}, cost=${self.total_cost:.6f})>"
+
+
+class UsageRollupWatermark(Base):
+    """Tracks how far raw usage snapshots have been folded into usage aggregations"""
+    __tablename__ = "usage_rollup_watermarks"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), nullable=False, unique=True)  # Rollup pipeline name
+    last_snapshot_id = Column(Integer, nullable=False, default=0)  # Highest rolled up ContainerResourceUsage.id
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<UsageRollupWatermark(name='{self.name}', last_snapshot_id={self.last_snapshot_id})>"
+
+
+class HiringUsageActivity(Base):
+    """Lifetime snapshot counts of a hiring, kept by the usage rollup since raw snapshots expire"""
+    __tablename__ = "hiring_usage_activity"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hiring_id = Column(Integer, nullable=False, unique=True, index=True)
+    snapshots_count = Column(Integer, nullable=False, default=0)  # Rolled up ContainerResourceUsage rows
+    first_snapshot_at = Column(DateTime(timezone=True), nullable=True)
+    last_snapshot_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<HiringUsageActivity(hiring_id={self.hiring_id}, snapshots_count={self.snapshots_count})>"
@@ -0,0 +1,31 @@
+"""Content-addressed blob models shared by uploaded files and agent code."""
+
+from sqlalchemy import Column, String, Integer, BigInteger
+
+from .base import Base
+
+
+class ContentBlob(Base):
+    """One stored file content, identified by its SHA-256."""
+
+    __tablename__ = "content_blobs"
+
+    sha256 = Column(String(64), nullable=False, unique=True, index=True)
+    size = Column(BigInteger, nullable=False, default=0)  # Size of the content in bytes
+    ref_count = Column(Integer, nullable=False, default=0, index=True)  # TemporaryFile and AgentFile rows referencing it
+
+    def __repr__(self) -> str:
+        return f"<ContentBlob(sha256='{self.sha256}', size={self.size}, ref_count={self.ref_count})>"
+
+
+class AgentFileBlob(Base):
+    """Blob holding the content of an agent file."""
+
+    __tablename__ = "agent_file_blobs"
+
+    # Not a foreign key: rows are removed in the same flush that deletes the agent file
+    agent_file_id = Column(Integer, nullable=False, unique=True, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<AgentFileBlob(agent_file_id={self.agent_file_id}, sha256='{self.sha256}')>"
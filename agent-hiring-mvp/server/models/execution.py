@@ -4,7 +4,7 @@ from enum import Enum
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Column, String, Text, Boolean, JSON, Float, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, String, Text, Boolean, JSON, Float, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -31,9 +31,11 @@ class Execution(Base):
     """Execution model for tracking agent execution logs."""
     
     __tablename__ = "executions"
+    # Read by the execution event poller for status changes committed by other processes
+    __table_args__ = (Index("ix_executions_updated_at", "updated_at"),)
     
     # Relationships
-    agent_id = Column(String(20), ForeignKey("agents.id"), nullable=False)
+    agent_id = Column(String(20), ForeignKey("agents.id"), nullable=False, index=True)
     hiring_id = Column(Integer, ForeignKey("hirings.id"), nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     
@@ -66,4 +68,102 @@ class Execution(Base):
 
     
     def __repr__(self) -> str:
-        return f"<Execution(id={self.id}, execution_id='{self.execution_id}', status='{self.status}')>" 
\ No newline at end of file
+        return f"<Execution(id={self.id}, execution_id='{self.execution_id}', status='{self.status}')>"
+
+
+class ExecutionJobStatus(str, Enum):
+    """Execution queue job status enumeration."""
+    QUEUED = "queued"
+    CLAIMED = "claimed"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ExecutionJob(Base):
+    """Durable queue entry for an execution waiting for or running on a worker."""
+    
+    __tablename__ = "execution_jobs"
+    
+    execution_id = Column(String(64), nullable=False, unique=True, index=True)  # Execution.execution_id
+    execution_type = Column(String(20), nullable=False, default="run")
+    user_id = Column(Integer, nullable=True, index=True)
+    agent_id = Column(String(20), nullable=False, index=True)
+    
+    # Queue state
+    status = Column(String(20), nullable=False, default=ExecutionJobStatus.QUEUED.value, index=True)
+    attempts = Column(Integer, nullable=False, default=0)  # Number of times the job was claimed
+    max_attempts = Column(Integer, nullable=False, default=3)
+    available_at = Column(DateTime(timezone=True), nullable=False)  # Not claimable before this time (retry backoff)
+    
+    # Lease of the worker currently running the job
+    worker_id = Column(String(128), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    
+    last_error = Column(Text, nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<ExecutionJob(execution_id='{self.execution_id}', status='{self.status}', attempts={self.attempts})>"
+
+
+class ExecutionBatch(Base):
+    """A group of executions of one hiring created in a single request."""
+    
+    __tablename__ = "execution_batches"
+    
+    batch_id = Column(String(64), nullable=False, unique=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    hiring_id = Column(Integer, nullable=False)
+    agent_id = Column(String(20), nullable=False)
+    execution_type = Column(String(20), nullable=False, default="run")
+    total_items = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self) -> str:
+        return f"<ExecutionBatch(batch_id='{self.batch_id}', total_items={self.total_items})>"
+
+
+class ExecutionBatchItem(Base):
+    """Membership of an execution in a batch, with its position in the submitted inputs."""
+    
+    __tablename__ = "execution_batch_items"
+    
+    batch_id = Column(String(64), nullable=False, index=True)
+    item_index = Column(Integer, nullable=False)  # Position of the input in the batch request
+    execution_id = Column(String(64), nullable=False, unique=True, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<ExecutionBatchItem(batch_id='{self.batch_id}', item_index={self.item_index})>"
+
+
+class ExecutionResultCacheEntry(Base):
+    """Stored output of a deterministic agent for one canonical input."""
+    
+    __tablename__ = "execution_result_cache"
+    
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)  # SHA-256 of agent, version, scope and input hash
+    agent_id = Column(String(20), nullable=False, index=True)
+    agent_version = Column(String(50), nullable=False)
+    hiring_id = Column(Integer, nullable=True)  # Set for hiring-scoped entries
+    input_hash = Column(String(64), nullable=False)
+    
+    output_data = Column(JSON, nullable=True)
+    source_execution_id = Column(String(64), nullable=True)  # Execution that produced the output
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    hit_count = Column(Integer, nullable=False, default=0)
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<ExecutionResultCacheEntry(agent_id='{self.agent_id}', cache_key='{self.cache_key[:12]}')>"
+
+
+class ExecutionResultCacheUse(Base):
+    """How one execution used the result cache, kept apart from its input and logs."""
+    
+    __tablename__ = "execution_result_cache_uses"
+    
+    execution_id = Column(String(64), nullable=False, unique=True, index=True)  # Execution.execution_id
+    bypassed = Column(Boolean, nullable=False, default=False)  # Created with use_cache=False
+    source_execution_id = Column(String(64), nullable=True)  # Execution whose cached output was served
+    
+    def __repr__(self) -> str:
+        return f"<ExecutionResultCacheUse(execution_id='{self.execution_id}', bypassed={self.bypassed})>"
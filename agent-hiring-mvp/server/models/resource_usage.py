@@ -2,7 +2,7 @@
 Database models for resource usage tracking and execution management.
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, JSON, Boolean, ForeignKey, Text, UniqueConstraint, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
@@ -13,7 +13,7 @@ class ExecutionResourceUsage(Base):
     __tablename__ = "execution_resource_usage"
     
     id = Column(Integer, primary_key=True, index=True)
-    execution_id = Column(Integer, ForeignKey("executions.id"), nullable=False)
+    execution_id = Column(Integer, ForeignKey("executions.id"), nullable=False, index=True)
     resource_type = Column(String(50), nullable=False)  # llm, vector_db, web_search
     resource_provider = Column(String(50), nullable=False)  # openai, pinecone, serper
     resource_model = Column(String(100), nullable=True)  # gpt-4, claude-3, etc.
@@ -44,6 +44,30 @@ class ResourceConfig(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class ResourceRateLimitWindow(Base):
+    """Requests and tokens used against a provider rate limit in one minute, shared by all API workers"""
+    __tablename__ = "resource_rate_limit_windows"
+    __table_args__ = (UniqueConstraint("bucket_key", "window_start", name="uq_rate_limit_bucket_window"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_key = Column(String(255), nullable=False, index=True)  # provider:model or provider:model:user:<id>
+    window_start = Column(BigInteger, nullable=False, index=True)  # Unix minute of the window
+    requests = Column(Integer, nullable=False, default=0)
+    tokens = Column(BigInteger, nullable=False, default=0)
+
+
+class EmbeddingCacheEntry(Base):
+    """Embedding vector of one text for a provider and model, shared by all executions"""
+    __tablename__ = "embedding_cache"
+    
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)  # SHA-256 of provider, model and text
+    provider = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    dimensions = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # Little-endian float32
+    last_used_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
 class UserBudget(Base):
     """User budget and spending limits"""
     __tablename__ = "user_budgets"
@@ -91,3 +91,15 @@ class TemporaryFile(Base):
         """Mark file as accessed and update counters."""
         self.download_count += 1
         self.last_accessed_at = datetime.utcnow()
+
+
+class TemporaryFileChecksum(Base):
+    """SHA-256 of a temporary file's content, computed while it was uploaded."""
+    
+    __tablename__ = "temporary_file_checksums"
+    
+    file_id = Column(String(36), ForeignKey("temporary_files.id"), nullable=False, unique=True, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    
+    def __repr__(self) -> str:
+        return f"<TemporaryFileChecksum(file_id='{self.file_id}', sha256='{self.sha256}')>"
@@ -0,0 +1,192 @@
+"""In-process cache of parsed agent manifests per agent version."""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Tuple
+
+import jsonschema
+from sqlalchemy.orm import Session
+
+from ..config import AGENT_MANIFEST_CACHE_ENABLED, AGENT_MANIFEST_CACHE_MAX_ENTRIES
+from ..models.agent import Agent
+from ..models.agent_file import AgentFile
+from .blob_store import blob_store
+from .resource_limits import ResourceLimits, get_agent_resource_limits
+
+logger = logging.getLogger(__name__)
+
+# (version, code_hash) of the agent row; a re-submitted agent gets a new stamp
+ManifestStamp = Tuple[Optional[str], Optional[str]]
+
+
+@dataclass
+class AgentManifest:
+    """
+    Parsed configuration of one agent version.
+
+    ``config`` is shared between callers and must be treated as read-only.
+    """
+    agent_id: str
+    stamp: ManifestStamp
+    config: Optional[Dict[str, Any]] = None  # None until config.json has been loaded
+    has_config_file: bool = False
+    _resource_limits: Dict[str, ResourceLimits] = field(default_factory=dict)
+    _validators: Dict[Tuple[str, str], Any] = field(default_factory=dict)
+
+    @property
+    def lifecycle(self) -> Dict[str, str]:
+        return (self.config or {}).get("lifecycle", {}) or {}
+
+    @property
+    def execute_function(self) -> str:
+        """Name of the function called for executions (lifecycle.execute)."""
+        return self.lifecycle.get("execute", "execute")
+
+    def resource_limits(self, agent_type: str) -> ResourceLimits:
+        """Resource limits of the agent for an agent type."""
+        limits = self._resource_limits.get(agent_type)
+        if limits is None:
+            limits = get_agent_resource_limits(self.config or {}, agent_type)
+            self._resource_limits[agent_type] = limits
+        return limits
+
+
+class AgentManifestCache:
+    """
+    Keeps parsed config.json files and compiled JSON Schema validators in memory.
+
+    Agent files are stored as TEXT rows, and config.json used to be fetched and
+    parsed on every execution, deployment and resource limit lookup. Entries
+    are stamped with the agent's version and code hash; a lookup whose agent
+    row carries a different stamp reloads the manifest, so other processes
+    (separate execution workers) never serve a stale manifest after a
+    re-submission. ``invalidate`` drops an agent within this process.
+    """
+
+    def __init__(self, max_entries: int = AGENT_MANIFEST_CACHE_MAX_ENTRIES,
+                 enabled: bool = AGENT_MANIFEST_CACHE_ENABLED):
+        self.enabled = enabled and max_entries > 0
+        self.max_entries = max_entries
+        self._manifests: "OrderedDict[str, AgentManifest]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, db: Session, agent: Agent) -> AgentManifest:
+        """Get the manifest of an agent, loading config.json on a miss."""
+        return self._get(db, agent.id, (agent.version, agent.code_hash))
+
+    def get_by_id(self, db: Session, agent_id: str) -> Optional[AgentManifest]:
+        """Get the manifest of an agent by id, or None if the agent does not exist."""
+        row = db.query(Agent.version, Agent.code_hash).filter(Agent.id == agent_id).first()
+        if row is None:
+            return None
+        return self._get(db, agent_id, (row.version, row.code_hash))
+
+    def get_config(self, db: Session, agent: Agent) -> Dict[str, Any]:
+        """Get the parsed config.json of an agent, or an empty dict if it has none."""
+        return self.get(db, agent).config or {}
+
+    def get_schema_validator(self, agent: Agent, kind: str, function_name: str = "execute"):
+        """
+        Get a compiled validator for an agent's input or output schema.
+
+        Args:
+            agent: The agent whose config_schema holds the schema
+            kind: "input" or "output"
+            function_name: Function of the config_schema.functions array
+
+        Returns:
+            A jsonschema validator, or None if the agent declares no such schema
+        """
+        manifest = self._entry(agent.id, (agent.version, agent.code_hash))
+        key = (kind, function_name)
+        if key in manifest._validators:
+            return manifest._validators[key]
+
+        schema = agent.get_input_schema(function_name) if kind == "input" else agent.get_output_schema(function_name)
+        validator = None
+        if schema:
+            validator_class = jsonschema.validators.validator_for(schema)
+            # Raises SchemaError for invalid schemas, as jsonschema.validate does
+            validator_class.check_schema(schema)
+            validator = validator_class(schema)
+        manifest._validators[key] = validator
+        return validator
+
+    def invalidate(self, agent_id: str) -> None:
+        """Drop the cached manifest of an agent."""
+        with self._lock:
+            self._manifests.pop(agent_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._manifests.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._manifests),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses
+            }
+
+    def _get(self, db: Session, agent_id: str, stamp: ManifestStamp) -> AgentManifest:
+        manifest = self._entry(agent_id, stamp)
+        if manifest.config is None:
+            with self._lock:
+                self._misses += 1
+            self._load_config(db, manifest)
+        else:
+            with self._lock:
+                self._hits += 1
+        return manifest
+
+    def _entry(self, agent_id: str, stamp: ManifestStamp) -> AgentManifest:
+        if not self.enabled:
+            return AgentManifest(agent_id=agent_id, stamp=stamp)
+
+        with self._lock:
+            manifest = self._manifests.get(agent_id)
+            if manifest is not None and manifest.stamp == stamp:
+                self._manifests.move_to_end(agent_id)
+                return manifest
+
+            manifest = AgentManifest(agent_id=agent_id, stamp=stamp)
+            self._manifests[agent_id] = manifest
+            self._manifests.move_to_end(agent_id)
+            while len(self._manifests) > self.max_entries:
+                self._manifests.popitem(last=False)
+            return manifest
+
+    @staticmethod
+    def _load_config(db: Session, manifest: AgentManifest) -> None:
+        # Only config.json is read; the other files of the agent are not needed here
+        config_file = db.query(AgentFile).filter(
+            AgentFile.agent_id == manifest.agent_id,
+            AgentFile.file_path == "config.json"
+        ).first()
+        config_content = blob_store.read_agent_file(db, config_file) if config_file is not None else None
+
+        config: Dict[str, Any] = {}
+        if config_content is not None:
+            try:
+                parsed = json.loads(config_content)
+                if isinstance(parsed, dict):
+                    config = parsed
+            except ValueError as e:
+                logger.error(f"Error parsing config.json of agent {manifest.agent_id}: {e}")
+        else:
+            logger.warning(f"No config.json found in agent files for agent {manifest.agent_id}")
+
+        manifest.has_config_file = config_content is not None
+        manifest.config = config
+
+
+# Global manifest cache instance
+agent_manifest_cache = AgentManifestCache()
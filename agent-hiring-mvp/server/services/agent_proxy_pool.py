@@ -0,0 +1,166 @@
+"""Pooled HTTP connections and cached routes for proxying requests to deployed ACP agents."""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+import aiohttp
+
+from ..config import (
+    AGENT_PROXY_MAX_CONNECTIONS_PER_DEPLOYMENT,
+    AGENT_PROXY_KEEPALIVE_SECONDS,
+    AGENT_PROXY_POOL_IDLE_SECONDS,
+    AGENT_PROXY_ROUTE_CACHE_TTL_SECONDS
+)
+from ..models.deployment import AgentDeployment, DeploymentStatus
+from ..models.hiring import Hiring
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DeploymentRoute:
+    """Where requests for a hiring are proxied to."""
+    hiring_id: int
+    user_id: int
+    deployment_id: str
+    agent_id: str
+    proxy_endpoint: str
+    status: str
+    is_healthy: bool
+
+    @classmethod
+    def from_rows(cls, deployment: AgentDeployment, hiring: Hiring) -> "DeploymentRoute":
+        return cls(
+            hiring_id=hiring.id,
+            user_id=hiring.user_id,
+            deployment_id=deployment.deployment_id,
+            agent_id=deployment.agent_id,
+            proxy_endpoint=deployment.proxy_endpoint,
+            status=deployment.status,
+            is_healthy=deployment.is_healthy
+        )
+
+
+class DeploymentRouteCache:
+    """
+    Short-lived cache of hiring → running deployment endpoint.
+
+    Only routes of running deployments are stored, so a missing, foreign or
+    stopped deployment is looked up again on every request and the caller
+    gets the current error. The TTL bounds how long a stopped deployment
+    keeps being addressed; connection failures drop the route immediately.
+    """
+
+    def __init__(self, ttl_seconds: float = AGENT_PROXY_ROUTE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._routes: Dict[int, Tuple[DeploymentRoute, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, hiring_id: int) -> Optional[DeploymentRoute]:
+        with self._lock:
+            cached = self._routes.get(hiring_id)
+            if cached is None:
+                return None
+            if cached[1] <= time.monotonic():
+                del self._routes[hiring_id]
+                return None
+            return cached[0]
+
+    def put(self, route: DeploymentRoute) -> None:
+        if self.ttl_seconds <= 0 or route.status != DeploymentStatus.RUNNING.value:
+            return
+        with self._lock:
+            self._routes[route.hiring_id] = (route, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, hiring_id: int) -> None:
+        with self._lock:
+            self._routes.pop(hiring_id, None)
+
+
+@dataclass
+class _DeploymentPool:
+    session: aiohttp.ClientSession
+    last_used: float
+    active: int = 0
+
+
+class AgentProxyPool:
+    """
+    One keep-alive connection pool per deployment, shared by all proxied requests.
+
+    Sessions do not decompress responses, so proxied bodies are passed
+    through byte for byte with their original Content-Encoding and
+    Content-Length. Pools of deployments that received no requests for
+    ``idle_seconds`` and have no response still streaming are closed.
+    """
+
+    def __init__(self, max_connections: int = AGENT_PROXY_MAX_CONNECTIONS_PER_DEPLOYMENT,
+                 keepalive_seconds: int = AGENT_PROXY_KEEPALIVE_SECONDS,
+                 idle_seconds: int = AGENT_PROXY_POOL_IDLE_SECONDS):
+        self.max_connections = max_connections
+        self.keepalive_seconds = keepalive_seconds
+        self.idle_seconds = idle_seconds
+        self._pools: Dict[str, _DeploymentPool] = {}
+        self._last_sweep = time.monotonic()
+
+    def acquire(self, deployment_id: str) -> aiohttp.ClientSession:
+        """
+        Get the pooled session of a deployment for one proxied request.
+
+        Must be called from the server event loop, and every call must be
+        paired with ``release`` once the response has been fully sent.
+        """
+        now = time.monotonic()
+        if now - self._last_sweep > self.idle_seconds / 2:
+            self._last_sweep = now
+            self._close_idle(now)
+
+        pool = self._pools.get(deployment_id)
+        if pool is None or pool.session.closed:
+            pool = _DeploymentPool(
+                session=aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=self.max_connections,
+                        keepalive_timeout=self.keepalive_seconds
+                    ),
+                    auto_decompress=False
+                ),
+                last_used=now
+            )
+            self._pools[deployment_id] = pool
+        pool.last_used = now
+        pool.active += 1
+        return pool.session
+
+    def release(self, deployment_id: str) -> None:
+        pool = self._pools.get(deployment_id)
+        if pool is not None:
+            pool.active = max(0, pool.active - 1)
+            pool.last_used = time.monotonic()
+
+    async def close_all(self) -> None:
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            await pool.session.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "deployments": len(self._pools),
+            "active_requests": sum(pool.active for pool in self._pools.values()),
+            "max_connections_per_deployment": self.max_connections
+        }
+
+    def _close_idle(self, now: float) -> None:
+        for deployment_id, pool in list(self._pools.items()):
+            if pool.active == 0 and now - pool.last_used > self.idle_seconds:
+                del self._pools[deployment_id]
+                asyncio.ensure_future(pool.session.close())
+
+
+# Global instances shared by the agent proxy endpoints
+agent_proxy_pool = AgentProxyPool()
+deployment_route_cache = DeploymentRouteCache()
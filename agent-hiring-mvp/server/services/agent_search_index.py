@@ -0,0 +1,389 @@
+"""Full-text search index over marketplace agents."""
+
+import base64
+import json
+import logging
+import re
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import text, func, or_, and_, String, cast
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from ..models.agent import Agent, AgentStatus
+
+logger = logging.getLogger(__name__)
+
+SEARCH_SCOPES = ("public", "mine", "accessible")
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# SQLite FTS5 table; agent_id is stored but not tokenized
+_SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS agent_search_fts USING fts5("
+    "agent_id UNINDEXED, name, description, tags, category, "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+# bm25 column weights in table column order (agent_id, name, description, tags, category);
+# bm25 is lower for better matches, so it is used as the sort key directly
+_SQLITE_MATCHES = (
+    "SELECT agent_id, bm25(agent_search_fts, 0.0, 10.0, 2.0, 5.0, 3.0) AS score "
+    "FROM agent_search_fts WHERE agent_search_fts MATCH :match"
+)
+
+_POSTGRES_CREATE = (
+    "CREATE TABLE IF NOT EXISTS agent_search_documents ("
+    "agent_id VARCHAR(20) PRIMARY KEY REFERENCES agents(id) ON DELETE CASCADE, "
+    "document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_agent_search_documents_document "
+    "ON agent_search_documents USING GIN (document)",
+)
+_POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', :name), 'A') || "
+    "setweight(to_tsvector('simple', :tags), 'B') || "
+    "setweight(to_tsvector('simple', :category), 'B') || "
+    "setweight(to_tsvector('simple', :description), 'C')"
+)
+# ts_rank_cd is higher for better matches; negate it so lower sorts first like bm25
+_POSTGRES_MATCHES = (
+    "SELECT d.agent_id, CAST(-ts_rank_cd(d.document, q) AS DOUBLE PRECISION) AS score "
+    "FROM agent_search_documents d, to_tsquery('simple', :match) q WHERE d.document @@ q"
+)
+
+
+def tokenize_query(query: Optional[str]) -> List[str]:
+    """Split a search query into lowercase word tokens."""
+    return _TOKEN_PATTERN.findall((query or "").lower())
+
+
+def encode_cursor(sort_key: Any, agent_id: str) -> str:
+    """Encode the sort position of the last returned agent as an opaque cursor."""
+    payload = json.dumps([sort_key, agent_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        sort_key, agent_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid search cursor")
+    if not isinstance(agent_id, str):
+        raise ValueError("Invalid search cursor")
+    return sort_key, agent_id
+
+
+class AgentSearchIndex:
+    """
+    Ranked, paginated search over agent name, description, tags and category.
+
+    The index lives next to the ``agents`` table in the same database: an FTS5
+    virtual table on SQLite and a ``tsvector`` table with a GIN index on
+    Postgres. Terms are matched as prefixes and all terms must match. Results
+    are ranked (bm25 / ``ts_rank_cd``) and paginated with a keyset cursor over
+    ``(score, agent_id)``, so deep pages cost the same as the first one.
+    Visibility (public/owned) is applied by joining the matches with
+    ``agents``, so approving or rejecting an agent needs no reindexing of its
+    status; only content changes and deletions must be synced.
+
+    Databases without a supported full-text engine fall back to unranked
+    ``LIKE`` matching with the same interface.
+    """
+
+    def __init__(self):
+        self._backends: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def ensure_index(self, db: Session) -> str:
+        """Create (and backfill) the index if needed and return the backend in use."""
+        return self._get_backend(db)
+
+    def index_agent(self, db: Session, agent: Agent) -> None:
+        """Add or refresh an agent in the index (joins the caller's transaction)."""
+        backend = self._get_backend(db)
+        params = self._document_params(agent)
+        if backend == "sqlite":
+            db.execute(text("DELETE FROM agent_search_fts WHERE agent_id = :agent_id"), params)
+            db.execute(text(
+                "INSERT INTO agent_search_fts (agent_id, name, description, tags, category) "
+                "VALUES (:agent_id, :name, :description, :tags, :category)"
+            ), params)
+        elif backend == "postgresql":
+            # The agent row must exist for the foreign key
+            db.flush()
+            db.execute(text(
+                f"INSERT INTO agent_search_documents (agent_id, document) VALUES (:agent_id, {_POSTGRES_DOCUMENT}) "
+                "ON CONFLICT (agent_id) DO UPDATE SET document = EXCLUDED.document"
+            ), params)
+
+    def remove_agent(self, db: Session, agent_id: str) -> None:
+        """Remove an agent from the index (joins the caller's transaction)."""
+        backend = self._get_backend(db)
+        if backend == "sqlite":
+            db.execute(text("DELETE FROM agent_search_fts WHERE agent_id = :agent_id"), {"agent_id": agent_id})
+        elif backend == "postgresql":
+            db.execute(text("DELETE FROM agent_search_documents WHERE agent_id = :agent_id"), {"agent_id": agent_id})
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Reindex every agent.
+
+        Returns:
+            Number of agents indexed
+        """
+        backend = self._get_backend(db)
+        if backend == "like":
+            return 0
+        table = "agent_search_fts" if backend == "sqlite" else "agent_search_documents"
+        db.execute(text(f"DELETE FROM {table}"))
+        agents = db.query(Agent).all()
+        for agent in agents:
+            self.index_agent(db, agent)
+        db.commit()
+        logger.info(f"Rebuilt agent search index with {len(agents)} agents")
+        return len(agents)
+
+    def search(self, db: Session, query: Optional[str], category: Optional[str] = None,
+               scope: str = "public", user_id: Optional[int] = None, limit: int = 20,
+               cursor: Optional[str] = None, offset: int = 0) -> Dict[str, Any]:
+        """
+        Search agents visible in a scope.
+
+        Args:
+            query: Free text; every term is matched as a prefix. Without terms,
+                agents are listed newest first.
+            category: Only return agents of this category
+            scope: "public" (approved public agents), "mine" (agents owned by
+                ``user_id``) or "accessible" (both)
+            user_id: Requesting user, required for "mine" and "accessible"
+            limit: Page size
+            cursor: ``next_cursor`` of the previous page
+            offset: Number of results to skip (only used without a cursor)
+
+        Returns:
+            Dict with the page of ``agents``, ``next_cursor`` (None on the last
+            page), ``total`` matches and per-category ``facets``
+
+        Raises:
+            ValueError: On an unknown scope or a malformed cursor
+        """
+        if scope not in SEARCH_SCOPES:
+            raise ValueError(f"Unknown search scope: {scope}")
+        limit = max(1, limit)
+        after = decode_cursor(cursor) if cursor else None
+        tokens = tokenize_query(query)
+        backend = self._get_backend(db)
+
+        if tokens and backend != "like":
+            agents, sort_keys, facets = self._search_index(
+                db, backend, tokens, category, scope, user_id, limit, after, offset
+            )
+        else:
+            agents, sort_keys, facets = self._search_table(
+                db, tokens, category, scope, user_id, limit, after, offset
+            )
+
+        next_cursor = None
+        if len(agents) > limit:
+            agents = agents[:limit]
+            next_cursor = encode_cursor(sort_keys[limit - 1], agents[-1].id)
+
+        total = facets.get(category, 0) if category else sum(facets.values())
+        return {
+            "agents": agents,
+            "next_cursor": next_cursor,
+            "total": total,
+            "facets": facets
+        }
+
+    def _search_index(self, db: Session, backend: str, tokens: List[str], category: Optional[str],
+                      scope: str, user_id: Optional[int], limit: int, after: Optional[Tuple[Any, str]],
+                      offset: int) -> Tuple[List[Agent], List[Any], Dict[str, int]]:
+        if backend == "sqlite":
+            matches_sql = _SQLITE_MATCHES
+            match = " ".join(f'"{token}"*' for token in tokens)
+        else:
+            matches_sql = _POSTGRES_MATCHES
+            match = " & ".join(f"{token}:*" for token in tokens)
+
+        visibility, params = self._visibility_sql(scope, user_id)
+        params["match"] = match
+        base_sql = f"WITH matches AS ({matches_sql}) SELECT {{columns}} FROM matches m JOIN agents a ON a.id = m.agent_id WHERE {visibility}"
+
+        facets = {
+            row[0] or "uncategorized": row[1]
+            for row in db.execute(text(
+                base_sql.format(columns="a.category, COUNT(*)") + " GROUP BY a.category"
+            ), params).all()
+        }
+
+        page_sql = base_sql.format(columns="m.agent_id, m.score")
+        page_params = dict(params)
+        if category:
+            page_sql += " AND a.category = :category"
+            page_params["category"] = category
+        if after:
+            page_sql += " AND (m.score > :after_score OR (m.score = :after_score AND m.agent_id > :after_id))"
+            try:
+                page_params["after_score"] = float(after[0])
+            except (TypeError, ValueError):
+                raise ValueError("Invalid search cursor")
+            page_params["after_id"] = after[1]
+        page_sql += " ORDER BY m.score, m.agent_id LIMIT :limit"
+        page_params["limit"] = limit + 1
+        if not after and offset:
+            page_sql += " OFFSET :offset"
+            page_params["offset"] = offset
+
+        rows = db.execute(text(page_sql), page_params).all()
+        agents_by_id = {
+            agent.id: agent for agent in db.query(Agent).filter(Agent.id.in_([row[0] for row in rows])).all()
+        } if rows else {}
+        agents, sort_keys = [], []
+        for agent_id, score in rows:
+            agent = agents_by_id.get(agent_id)
+            if agent is not None:
+                agents.append(agent)
+                sort_keys.append(score)
+        return agents, sort_keys, facets
+
+    def _search_table(self, db: Session, tokens: List[str], category: Optional[str], scope: str,
+                      user_id: Optional[int], limit: int, after: Optional[Tuple[Any, str]],
+                      offset: int) -> Tuple[List[Agent], List[Any], Dict[str, int]]:
+        # Listing without search terms, or matching without a full-text engine
+        agents_query = db.query(Agent).filter(self._visibility_filter(scope, user_id))
+        for token in tokens:
+            pattern = f"%{token}%"
+            agents_query = agents_query.filter(or_(
+                Agent.name.ilike(pattern),
+                Agent.description.ilike(pattern),
+                Agent.category.ilike(pattern),
+                cast(Agent.tags, String).ilike(pattern)
+            ))
+
+        facets = {
+            (row[0] or "uncategorized"): row[1]
+            for row in agents_query.with_entities(Agent.category, func.count(Agent.id)).group_by(Agent.category).all()
+        }
+
+        if category:
+            agents_query = agents_query.filter(Agent.category == category)
+        if after:
+            try:
+                after_created = datetime.fromisoformat(after[0])
+            except (TypeError, ValueError):
+                raise ValueError("Invalid search cursor")
+            agents_query = agents_query.filter(or_(
+                Agent.created_at < after_created,
+                and_(Agent.created_at == after_created, Agent.id > after[1])
+            ))
+        agents_query = agents_query.order_by(Agent.created_at.desc(), Agent.id)
+        if not after and offset:
+            agents_query = agents_query.offset(offset)
+        agents = agents_query.limit(limit + 1).all()
+        return agents, [agent.created_at.isoformat() for agent in agents], facets
+
+    @staticmethod
+    def _visibility_sql(scope: str, user_id: Optional[int]) -> Tuple[str, Dict[str, Any]]:
+        params: Dict[str, Any] = {"is_public": True, "approved": AgentStatus.APPROVED.value, "owner_id": user_id}
+        public = "(a.is_public = :is_public AND a.status = :approved)"
+        if scope == "public":
+            return public, params
+        if scope == "mine":
+            return "a.owner_id = :owner_id", params
+        return f"({public} OR a.owner_id = :owner_id)", params
+
+    @staticmethod
+    def _visibility_filter(scope: str, user_id: Optional[int]):
+        public = and_(Agent.is_public == True, Agent.status == AgentStatus.APPROVED.value)
+        if scope == "public":
+            return public
+        if scope == "mine":
+            return Agent.owner_id == user_id
+        return or_(public, Agent.owner_id == user_id)
+
+    @staticmethod
+    def _document_params(agent: Agent) -> Dict[str, Any]:
+        return {
+            "agent_id": agent.id,
+            "name": agent.name or "",
+            "description": agent.description or "",
+            "tags": " ".join(str(tag) for tag in (agent.tags or [])),
+            "category": agent.category or ""
+        }
+
+    def _get_backend(self, db: Session) -> str:
+        engine = db.get_bind()
+        key = str(engine.url)
+        with self._lock:
+            backend = self._backends.get(key)
+            if backend is None:
+                backend = self._create_index(engine)
+                self._backends[key] = backend
+        return backend
+
+    def _create_index(self, engine) -> str:
+        dialect = engine.dialect.name
+        try:
+            with engine.begin() as connection:
+                if dialect == "sqlite":
+                    created = not connection.execute(text(
+                        "SELECT name FROM sqlite_master WHERE type='table' AND name='agent_search_fts'"
+                    )).first()
+                    connection.execute(text(_SQLITE_CREATE))
+                    table = "agent_search_fts"
+                elif dialect == "postgresql":
+                    created = connection.execute(text(
+                        "SELECT to_regclass('agent_search_documents')"
+                    )).scalar() is None
+                    for statement in _POSTGRES_CREATE:
+                        connection.execute(text(statement))
+                    table = "agent_search_documents"
+                else:
+                    logger.info(f"No full-text search support for {dialect}, using LIKE matching")
+                    return "like"
+
+                if created:
+                    # Backfill a newly created index from the existing agents
+                    count = 0
+                    for agent in connection.execute(text(
+                        "SELECT id, name, description, tags, category FROM agents"
+                    )).mappings():
+                        tags = agent["tags"]
+                        if isinstance(tags, str):
+                            tags = json.loads(tags or "[]")
+                        params = {
+                            "agent_id": agent["id"],
+                            "name": agent["name"] or "",
+                            "description": agent["description"] or "",
+                            "tags": " ".join(str(tag) for tag in (tags or [])),
+                            "category": agent["category"] or ""
+                        }
+                        if dialect == "sqlite":
+                            connection.execute(text(
+                                "INSERT INTO agent_search_fts (agent_id, name, description, tags, category) "
+                                "VALUES (:agent_id, :name, :description, :tags, :category)"
+                            ), params)
+                        else:
+                            connection.execute(text(
+                                f"INSERT INTO agent_search_documents (agent_id, document) "
+                                f"VALUES (:agent_id, {_POSTGRES_DOCUMENT})"
+                            ), params)
+                        count += 1
+                    logger.info(f"Created agent search index {table} with {count} agents")
+            return dialect
+        except OperationalError as e:
+            # e.g. SQLite built without FTS5
+            logger.warning(f"Could not create agent search index, using LIKE matching: {e}")
+            return "like"
+
+
+# Global index instance used by the agent service and API
+agent_search_index = AgentSearchIndex()
@@ -15,6 +15,10 @@ from ..models.agent_file import AgentFile
 from ..models.user import User
 from ..models.hiring import Hiring
 from .json_schema_validation_service import JSONSchemaValidationService
+from .agent_search_index import agent_search_index
+from .agent_manifest_cache import agent_manifest_cache
+from .blob_store import blob_store
+from .execution_result_cache import execution_result_cache
 
 logger = logging.getLogger(__name__)
 
@@ -90,6 +94,7 @@ class AgentService:
         )
         
         self.db.add(agent)
+        agent_search_index.index_agent(self.db, agent)
         self.db.commit()
         self.db.refresh(agent)
         
@@ -139,23 +144,11 @@ class AgentService:
             .all()
         )
     
-    def search_agents(self, query: str, category: Optional[str] = None) -> List[Agent]:
-        """Search agents by name, description, or tags."""
-        agents_query = self.db.query(Agent).filter(
-            Agent.is_public == True,
-            Agent.status == AgentStatus.APPROVED.value
-        )
-        
-        if query:
-            agents_query = agents_query.filter(
-                Agent.name.ilike(f"%{query}%") |
-                Agent.description.ilike(f"%{query}%")
-            )
-        
-        if category:
-            agents_query = agents_query.filter(Agent.category == category)
-        
-        return agents_query.all()
+    def search_agents(self, query: str, category: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[Agent]:
+        """Search public, approved agents by name, description, tags, or category (ranked)."""
+        return agent_search_index.search(
+            self.db, query, category=category, scope="public", limit=limit, offset=skip
+        )["agents"]
     
     def get_my_agents(self, owner_id: int, skip: int = 0, limit: int = 100) -> List[Agent]:
         """Get all agents owned by a specific user, regardless of approval status."""
@@ -168,20 +161,12 @@ class AgentService:
             .all()
         )
     
-    def search_my_agents(self, owner_id: int, query: str, category: Optional[str] = None) -> List[Agent]:
-        """Search agents owned by a specific user by name, description, or tags."""
-        agents_query = self.db.query(Agent).filter(Agent.owner_id == owner_id)
-        
-        if query:
-            agents_query = agents_query.filter(
-                Agent.name.ilike(f"%{query}%") |
-                Agent.description.ilike(f"%{query}%")
-            )
-        
-        if category:
-            agents_query = agents_query.filter(Agent.category == category)
-        
-        return agents_query.order_by(Agent.created_at.desc()).all()
+    def search_my_agents(self, owner_id: int, query: str, category: Optional[str] = None,
+                         skip: int = 0, limit: int = 100) -> List[Agent]:
+        """Search agents owned by a specific user by name, description, tags, or category (ranked)."""
+        return agent_search_index.search(
+            self.db, query, category=category, scope="mine", user_id=owner_id, limit=limit, offset=skip
+        )["agents"]
     
     def get_agents_for_user(self, user_id: int, skip: int = 0, limit: int = 100) -> List[Agent]:
         """Get all agents accessible to a user: public approved agents + their own agents."""
@@ -207,28 +192,30 @@ class AgentService:
         # Apply pagination
         return unique_agents[skip:skip + limit]
     
-    def search_agents_for_user(self, user_id: int, query: str, category: Optional[str] = None) -> List[Agent]:
-        """Search agents accessible to a user: public approved agents + their own agents."""
-        # Search public, approved agents
-        public_agents = self.search_agents(query, category)
-        
-        # Search user's own agents
-        own_agents = self.search_my_agents(user_id, query, category)
-        
-        # Combine and deduplicate
-        all_agents = public_agents + own_agents
-        seen_ids = set()
-        unique_agents = []
-        
-        for agent in all_agents:
-            if agent.id not in seen_ids:
-                seen_ids.add(agent.id)
-                unique_agents.append(agent)
-        
-        # Sort by creation date (newest first)
-        unique_agents.sort(key=lambda x: x.created_at, reverse=True)
-        
-        return unique_agents
+    def search_agents_for_user(self, user_id: int, query: str, category: Optional[str] = None,
+                               skip: int = 0, limit: int = 100) -> List[Agent]:
+        """Search agents accessible to a user: public approved agents + their own agents (ranked)."""
+        return agent_search_index.search(
+            self.db, query, category=category, scope="accessible", user_id=user_id, limit=limit, offset=skip
+        )["agents"]
+    
+    def search_agents_page(self, query: Optional[str], category: Optional[str] = None, scope: str = "public",
+                           user_id: Optional[int] = None, skip: int = 0, limit: int = 100,
+                           cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Search agents with ranking, category facets and cursor pagination.
+        
+        Returns:
+            Dict with ``agents``, ``next_cursor``, ``total`` and ``facets``
+            (see ``AgentSearchIndex.search``)
+        
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        return agent_search_index.search(
+            self.db, query, category=category, scope=scope, user_id=user_id,
+            limit=limit, cursor=cursor, offset=skip
+        )
     
     def approve_agent(self, agent_id: str) -> Optional[Agent]:
         """Approve an agent."""
@@ -239,6 +226,7 @@ class AgentService:
         agent.status = AgentStatus.APPROVED.value
         agent.is_public = True
         agent.updated_at = datetime.utcnow()
+        agent_search_index.index_agent(self.db, agent)
         
         self.db.commit()
         self.db.refresh(agent)
@@ -285,6 +273,8 @@ class AgentService:
         
         self.db.commit()
         self.db.refresh(agent)
+        # Outputs of rejected code must not be served if the agent is approved again
+        execution_result_cache.invalidate(self.db, agent_id)
         
         logger.info(f"Rejected agent: {agent.name} (ID: {agent.id}) - Reason: {reason}")
         logger.info(f"Processed {len(all_hirings)} total hirings, suspended {active_hirings_count} active hirings for rejected agent")
@@ -536,6 +526,7 @@ class AgentService:
     
     def _create_agent_file_records(self, agent_id: str, files_data: Dict[str, Any]) -> None:
         """Create database records for all agent files."""
+        agent_files = []
         for file_data in files_data.get('files', []):
             agent_file = AgentFile(
                 agent_id=agent_id,
@@ -548,13 +539,28 @@ class AgentService:
                 is_executable=file_data['is_executable']
             )
             self.db.add(agent_file)
+            agent_files.append(agent_file)
+        
+        # Move each file's content into the blob store, from which it is read and deployed
+        self.db.flush()
+        for agent_file in agent_files:
+            try:
+                blob_store.register_agent_file(self.db, agent_file)
+            except OSError as e:
+                # Unregistered files are registered again on their first extraction
+                logger.warning(f"Failed to store agent file {agent_file.file_path} in blob store: {e}")
         
         self.db.commit()
+        # A manifest loaded before the files were written would miss config.json
+        agent_manifest_cache.invalidate(agent_id)
+        # Outputs cached under a reused agent id came from other code
+        execution_result_cache.invalidate(self.db, agent_id)
     
     def get_agent_files(self, agent_id: str) -> List[Dict[str, Any]]:
         """Get all files for an agent."""
         agent_files = self.db.query(AgentFile).filter(AgentFile.agent_id == agent_id).all()
-        return [file.to_dict() for file in agent_files]
+        contents = blob_store.read_agent_files(self.db, agent_files)
+        return [{**file.to_dict(), "file_content": contents[file.id]} for file in agent_files]
     
     def get_agent_file_content(self, agent_id: str, file_path: str) -> Optional[str]:
         """Get content of a specific file for an agent."""
@@ -562,7 +568,7 @@ class AgentService:
             AgentFile.agent_id == agent_id,
             AgentFile.file_path == file_path
         ).first()
-        return agent_file.file_content if agent_file else None
+        return blob_store.read_agent_file(self.db, agent_file) if agent_file else None
     
     def validate_agent_code(self, code_file_path: str) -> List[str]:
         """Validate agent code for security and compliance."""
@@ -9,6 +9,7 @@ from fastapi import HTTPException, status
 
 from ..models.user_api_key import UserApiKey
 from ..models.user import User
+from .auth_cache import principal_cache
 
 
 class ApiKeyService:
@@ -66,37 +67,16 @@ class ApiKeyService:
     
     @staticmethod
     def validate_api_key(db: Session, api_key: str) -> Optional[User]:
-        """Validate an API key and return the associated user."""
-        if not api_key:
-            return None
-        
-        # Hash the provided key
-        key_hash = ApiKeyService.hash_api_key(api_key)
+        """
+        Validate an API key and return the associated user.
         
-        # Find the API key in the database
-        db_api_key = db.query(UserApiKey).filter(
-            UserApiKey.key_hash == key_hash,
-            UserApiKey.is_active == True
-        ).first()
-        
-        if not db_api_key:
-            return None
-        
-        # Check if expired
-        if db_api_key.is_expired:
-            return None
-        
-        # Update usage statistics
-        db_api_key.last_used_at = datetime.now(timezone.utc)
-        db_api_key.usage_count += 1
-        db.commit()
-        
-        # Get the user
-        user = db.query(User).filter(User.id == db_api_key.user_id).first()
-        if not user or not user.is_active:
+        Keys and users are resolved through the principal cache; usage
+        statistics are buffered and written in batches.
+        """
+        if not api_key:
             return None
         
-        return user
+        return principal_cache.get_api_key_user(db, ApiKeyService.hash_api_key(api_key))
     
     @staticmethod
     def get_user_api_keys(db: Session, user_id: int) -> List[UserApiKey]:
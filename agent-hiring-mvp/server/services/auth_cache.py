@@ -0,0 +1,283 @@
+"""In-process cache of authenticated principals and buffered API key usage counters."""
+
+import asyncio
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from ..config import (
+    AUTH_PRINCIPAL_CACHE_ENABLED,
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES,
+    API_KEY_USAGE_FLUSH_INTERVAL_SECONDS
+)
+from ..models.user import User
+from ..models.user_api_key import UserApiKey
+from .commit_hooks import register_commit_hook
+
+logger = logging.getLogger(__name__)
+
+# Mutable JSON columns are copied per request so in-place edits never reach the cached snapshot
+_MUTABLE_USER_COLUMNS = ("preferences",)
+
+
+@dataclass(frozen=True)
+class _ApiKeyPrincipal:
+    key_id: int
+    user_id: int
+    expires_at: Optional[datetime]
+
+
+class _TTLCache:
+    """Thread-safe LRU mapping whose entries expire after a fixed TTL."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Any, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def remove_where(self, predicate) -> None:
+        with self._lock:
+            for key in [k for k, (value, _) in self._entries.items() if predicate(value)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PrincipalCache:
+    """
+    Resolves API keys and JWT subjects to users without querying on every request.
+
+    Cached users are detached snapshots; each request gets its own copy merged
+    into the request session without a SELECT, so endpoints can still update
+    the user or follow its relationships. Changes to users and API keys
+    committed through the ORM in this process invalidate their entries
+    immediately; changes made by other server processes are picked up when
+    the TTL expires.
+    """
+
+    def __init__(self, ttl_seconds: float = AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+                 max_entries: int = AUTH_PRINCIPAL_CACHE_MAX_ENTRIES,
+                 enabled: bool = AUTH_PRINCIPAL_CACHE_ENABLED):
+        self.enabled = enabled and ttl_seconds > 0 and max_entries > 0
+        self._users = _TTLCache(ttl_seconds, max_entries)
+        self._api_keys = _TTLCache(ttl_seconds, max_entries)
+
+    def get_user(self, db: Session, user_id) -> Optional[User]:
+        """Get a user by id, bound to ``db``. Inactive users are returned as well."""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        if self.enabled:
+            snapshot = self._users.get(user_id)
+            if snapshot is not None:
+                return self._attach(db, snapshot)
+
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None and self.enabled:
+            self._users.set(user_id, self._snapshot(user))
+        return user
+
+    def get_api_key_user(self, db: Session, key_hash: str) -> Optional[User]:
+        """
+        Get the active user of an active, unexpired API key.
+
+        Every successful lookup is counted by ``api_key_usage_recorder``.
+        """
+        principal = self._api_keys.get(key_hash) if self.enabled else None
+        if principal is None:
+            db_api_key = db.query(UserApiKey).filter(
+                UserApiKey.key_hash == key_hash,
+                UserApiKey.is_active == True
+            ).first()
+            if not db_api_key:
+                return None
+            principal = _ApiKeyPrincipal(db_api_key.id, db_api_key.user_id, db_api_key.expires_at)
+            if self.enabled:
+                self._api_keys.set(key_hash, principal)
+
+        if principal.expires_at is not None and datetime.now(timezone.utc) > _as_utc(principal.expires_at):
+            return None
+
+        user = self.get_user(db, principal.user_id)
+        if not user or not user.is_active:
+            return None
+
+        api_key_usage_recorder.record(principal.key_id)
+        return user
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop a user and every API key that resolves to it."""
+        self._users.pop(user_id)
+        self._api_keys.remove_where(lambda principal: principal.user_id == user_id)
+
+    def invalidate_api_key(self, key_hash: str) -> None:
+        self._api_keys.pop(key_hash)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._api_keys.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "users": len(self._users),
+            "api_keys": len(self._api_keys)
+        }
+
+    @staticmethod
+    def _snapshot(user: User) -> User:
+        snapshot = User(**{
+            column.key: copy.deepcopy(getattr(user, column.key)) if column.key in _MUTABLE_USER_COLUMNS
+            else getattr(user, column.key)
+            for column in User.__table__.columns
+        })
+        # Gives the snapshot its identity and resets attribute history, as if it had been loaded
+        make_transient_to_detached(snapshot)
+        return snapshot
+
+    @staticmethod
+    def _attach(db: Session, snapshot: User) -> User:
+        user = db.merge(snapshot, load=False)
+        for key in _MUTABLE_USER_COLUMNS:
+            value = getattr(snapshot, key)
+            if value is not None:
+                set_committed_value(user, key, copy.deepcopy(value))
+        return user
+
+
+class ApiKeyUsageRecorder:
+    """
+    Buffers API key usage counters and writes them in batches.
+
+    Authenticating with an API key used to update ``usage_count`` and
+    ``last_used_at`` and commit on every request, which turned every read
+    into a write transaction. Counts are now accumulated in memory and
+    written by ``flush``, which the server runs every
+    ``API_KEY_USAGE_FLUSH_INTERVAL_SECONDS`` and once more on shutdown.
+    """
+
+    def __init__(self, flush_interval: float = API_KEY_USAGE_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, Tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key_id: int) -> None:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            count, _ = self._pending.get(key_id, (0, now))
+            self._pending[key_id] = (count + 1, now)
+
+    def flush(self) -> int:
+        """Write buffered counters. Returns the number of keys updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        from ..database.config import get_session
+        try:
+            with get_session() as db:
+                for key_id, (count, last_used_at) in pending.items():
+                    db.query(UserApiKey).filter(UserApiKey.id == key_id).update({
+                        UserApiKey.usage_count: UserApiKey.usage_count + count,
+                        UserApiKey.last_used_at: last_used_at
+                    }, synchronize_session=False)
+                db.commit()
+        except Exception:
+            # Put the counts back so the next flush retries them
+            with self._lock:
+                for key_id, (count, last_used_at) in pending.items():
+                    newer_count, newer_used_at = self._pending.get(key_id, (0, last_used_at))
+                    self._pending[key_id] = (count + newer_count, max(last_used_at, newer_used_at))
+            raise
+        return len(pending)
+
+    async def run(self) -> None:
+        """Flush counters periodically until cancelled."""
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing API key usage counters: {e}")
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for timezone-aware columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+# Users and API keys are invalidated at the ORM level, so any code path that
+# commits a change (profile updates, deactivation, key updates or deletion)
+# drops the cached principal. Entries are collected at flush time and dropped
+# once the transaction commits.
+
+def _collect_principal_invalidations(session: Session):
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User):
+            yield ("user", instance.id), None
+        elif isinstance(instance, UserApiKey):
+            history = inspect(instance).attrs.key_hash.history
+            yield ("api_key", (history.deleted or [instance.key_hash])[0]), None
+
+
+def _apply_principal_invalidations(pending) -> None:
+    for kind, key in pending:
+        if kind == "user":
+            principal_cache.invalidate_user(key)
+        else:
+            principal_cache.invalidate_api_key(key)
+
+
+register_commit_hook("auth_cache", _collect_principal_invalidations, _apply_principal_invalidations)
+
+
+# Global instances shared by the auth middleware and the server lifespan
+principal_cache = PrincipalCache()
+api_key_usage_recorder = ApiKeyUsageRecorder()
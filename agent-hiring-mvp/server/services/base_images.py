@@ -0,0 +1,253 @@
+"""Managed base images with common agent dependencies preinstalled."""
+
+import asyncio
+import hashlib
+import io
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+import docker
+from docker import errors as docker_errors
+
+from ..config import (
+    AGENT_BASE_IMAGES_ENABLED,
+    AGENT_BASE_PYTHON_IMAGE,
+    AGENT_BASE_COMMON_PACKAGES,
+    DOCKER_PREBUILD_TIMEOUT_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+BASE_IMAGE_LABEL = "agenthub.base_image"
+
+# Extra packages per agent type on top of AGENT_BASE_COMMON_PACKAGES, pinned like those
+BASE_IMAGE_TYPE_PACKAGES: Dict[str, list] = {
+    "function": [],
+    "persistent": [],
+    "acp": ["acp-sdk==1.0.3"],
+}
+
+
+def generate_base_dockerfile(agent_type: str) -> str:
+    """
+    Generate the Dockerfile of the managed base image for an agent type.
+
+    The system packages and common dependencies come first and are identical
+    for every agent type, so Docker shares those layers between the base images.
+    """
+    common_packages = " ".join(AGENT_BASE_COMMON_PACKAGES)
+    type_packages = " ".join(BASE_IMAGE_TYPE_PACKAGES.get(agent_type, []))
+
+    dockerfile = f"""FROM {AGENT_BASE_PYTHON_IMAGE}
+
+WORKDIR /app
+
+# Install system dependencies including build tools for packages like faiss-cpu and fastuuid
+RUN apt-get update && apt-get install -y \\
+    curl \\
+    gcc \\
+    g++ \\
+    && rm -rf /var/lib/apt/lists/*
+
+# Dependencies shared by most agents
+RUN pip install --no-cache-dir {common_packages}
+"""
+    if type_packages:
+        dockerfile += f"""
+# Dependencies specific to {agent_type} agents
+RUN pip install --no-cache-dir {type_packages}
+"""
+    if agent_type == "persistent":
+        dockerfile += """
+# Create state directory for persistent agents
+RUN mkdir -p /app/state
+ENV STATE_DIR=/app/state
+"""
+    dockerfile += """
+ENV PYTHONPATH=/app
+ENV PYTHONUNBUFFERED=1
+"""
+    return dockerfile
+
+
+def generate_base_image_name(agent_type: str) -> str:
+    """
+    Get the image name of the managed base image for an agent type.
+
+    The tag is derived from the base Dockerfile, so changing the package set
+    produces a new base image instead of silently reusing a stale one.
+    """
+    safe_agent_type = agent_type.lower().replace('-', '_')
+    digest = hashlib.sha256(generate_base_dockerfile(agent_type).encode("utf-8")).hexdigest()
+    return f"agenthub_base_{safe_agent_type}:{digest[:16]}"
+
+
+def dockerfile_base_section(base_image: Optional[str], fallback: str) -> str:
+    """
+    Get the start of an agent Dockerfile.
+
+    Args:
+        base_image: Managed base image to build on, or None if unavailable
+        fallback: Self-contained Dockerfile start used without a base image
+
+    Returns:
+        Dockerfile lines up to (but not including) the requirements install
+    """
+    if not base_image:
+        return fallback
+    return f"""FROM {base_image}
+
+WORKDIR /app
+
+# System packages and common dependencies come from the managed base image;
+# only the agent's remaining requirements are installed below
+"""
+
+
+class BaseImageManager:
+    """Builds the managed base images in the background and hands out their names."""
+
+    def __init__(self, enabled: bool = AGENT_BASE_IMAGES_ENABLED):
+        self.enabled = enabled
+        self._locks: Dict[str, threading.Lock] = {}
+        self._ready: Dict[str, str] = {}
+        self._builds: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._docker_client = None
+
+    @property
+    def docker_client(self):
+        with self._lock:
+            if self._docker_client is None:
+                self._docker_client = docker.from_env()
+            return self._docker_client
+
+    def start_builds(self) -> None:
+        """Prepare the base images of every agent type in the background (called at startup)."""
+        for agent_type in BASE_IMAGE_TYPE_PACKAGES:
+            self.start_build(agent_type)
+
+    def start_build(self, agent_type: str) -> None:
+        """Prepare the base image for an agent type in a background thread, unless it is ready or underway."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._ready.get(agent_type) == generate_base_image_name(agent_type):
+                return
+            build = self._builds.get(agent_type)
+            if build is not None and build.is_alive():
+                return
+            build = threading.Thread(
+                target=self.ensure_base_image,
+                args=(agent_type,),
+                name=f"base-image-{agent_type}",
+                daemon=True
+            )
+            self._builds[agent_type] = build
+        build.start()
+
+    def get_base_image(self, agent_type: str) -> Optional[str]:
+        """
+        Get the base image for an agent type without waiting for it to be built.
+
+        Returns:
+            The base image name if it is ready, otherwise None (the build is started
+            in the background and the caller falls back to a self-contained Dockerfile)
+        """
+        if not self.enabled:
+            return None
+
+        image_name = generate_base_image_name(agent_type)
+        with self._lock:
+            if self._ready.get(agent_type) == image_name:
+                return image_name
+        self.start_build(agent_type)
+        return None
+
+    def ensure_base_image(self, agent_type: str) -> Optional[str]:
+        """
+        Get the base image for an agent type, building it if it does not exist.
+
+        Returns:
+            The base image name, or None if base images are disabled or the build
+            failed (callers then fall back to a self-contained Dockerfile)
+        """
+        if not self.enabled:
+            return None
+
+        image_name = generate_base_image_name(agent_type)
+        with self._lock:
+            if self._ready.get(agent_type) == image_name:
+                return image_name
+            type_lock = self._locks.setdefault(agent_type, threading.Lock())
+
+        # Only one build per agent type; concurrent callers wait for it
+        with type_lock:
+            try:
+                try:
+                    self.docker_client.images.get(image_name)
+                except docker_errors.ImageNotFound:
+                    self._build(agent_type, image_name)
+            except Exception as e:
+                logger.error(f"Failed to prepare base image {image_name}: {e}")
+                return None
+
+            with self._lock:
+                self._ready[agent_type] = image_name
+            return image_name
+
+    async def ensure_base_image_async(self, agent_type: str) -> Optional[str]:
+        """
+        Async wrapper of ``ensure_base_image`` that keeps the build off the event loop.
+
+        Only for callers that can afford to wait for a build, such as pre-building at
+        publish time; hires use ``get_base_image``.
+        """
+        if not self.enabled:
+            return None
+        loop = asyncio.get_event_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(None, self.ensure_base_image, agent_type),
+                timeout=DOCKER_PREBUILD_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out preparing base image for {agent_type} agents")
+            return None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get the base image name, readiness and build state per agent type."""
+        with self._lock:
+            ready = dict(self._ready)
+            building = {agent_type for agent_type, build in self._builds.items() if build.is_alive()}
+        return {
+            "enabled": self.enabled,
+            "images": {
+                agent_type: {
+                    "image": generate_base_image_name(agent_type),
+                    "ready": ready.get(agent_type) == generate_base_image_name(agent_type),
+                    "building": agent_type in building
+                }
+                for agent_type in BASE_IMAGE_TYPE_PACKAGES
+            }
+        }
+
+    def _build(self, agent_type: str, image_name: str) -> None:
+        logger.info(f"Building base image {image_name} for {agent_type} agents")
+        dockerfile = generate_base_dockerfile(agent_type)
+        _, logs = self.docker_client.images.build(
+            fileobj=io.BytesIO(dockerfile.encode("utf-8")),
+            tag=image_name,
+            labels={BASE_IMAGE_LABEL: agent_type},
+            rm=True,
+            forcerm=True
+        )
+        for log in logs:
+            if isinstance(log, dict) and isinstance(log.get('stream'), str):
+                logger.debug(f"Base build: {log['stream'].strip()}")
+        logger.info(f"Base image {image_name} built successfully")
+
+
+# Global manager instance shared by the deployment services
+base_image_manager = BaseImageManager()
@@ -0,0 +1,248 @@
+"""Content-addressed, reference-counted blob store for uploaded files and agent code."""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Any
+
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config.file_storage_config import FileStorageConfig
+from ..models.agent_file import AgentFile
+from ..models.content_blob import ContentBlob, AgentFileBlob
+
+logger = logging.getLogger(__name__)
+
+# Serialises "reference and place on disk" against "drop row and unlink" within this process
+_blob_lock = threading.Lock()
+
+
+class BlobStore:
+    """
+    Stores every distinct file content once, under ``<root>/<sha[:2]>/<sha256>``.
+
+    Each ``ContentBlob`` row counts the TemporaryFile and AgentFile rows that
+    reference the content. References are taken and released inside the
+    caller's transaction; blobs whose count dropped to zero are removed by
+    ``collect_garbage`` after that transaction has committed. Blob files are
+    shared between uploads and deployments and must never be written in place.
+
+    A referencing transaction updates the blob row before it looks for the
+    file, and ``collect_garbage`` unlinks a file before it commits the row's
+    deletion. The row lock (or SQLite's write lock) held by either side thus
+    keeps a file from being unlinked after another process found it.
+
+    Registered agent files are only stored here; their ``file_content``
+    column is emptied and they are read through ``read_agent_files``.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def staging_path(self) -> Path:
+        """Path for writing new content before its checksum is known."""
+        staging_dir = self.root / "staging"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        return staging_dir / uuid.uuid4().hex
+
+    def store_staged(self, db: Session, staged_path: Path, sha256: str, size: int) -> Path:
+        """
+        Reference a staged file's content, moving it into the store if it is new.
+
+        The staged file is consumed either way. Returns the blob path.
+        """
+        target = self.path_for(sha256)
+        with _blob_lock:
+            self._add_ref(db, sha256, size)
+            if target.exists():
+                staged_path.unlink()
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staged_path, target)
+        return target
+
+    def store_bytes(self, db: Session, data: bytes) -> str:
+        """Reference a content, writing it to the store if it is new. Returns its SHA-256."""
+        sha256 = hashlib.sha256(data).hexdigest()
+        target = self.path_for(sha256)
+        with _blob_lock:
+            # Reference first: the row stays locked until this transaction ends,
+            # so collect_garbage cannot unlink the file once it is found here
+            self._add_ref(db, sha256, len(data))
+            if not target.exists():
+                self._write_atomic(target, data)
+        return sha256
+
+    def release(self, db: Session, sha256: str) -> None:
+        """Drop one reference to a content."""
+        db.query(ContentBlob).filter(
+            ContentBlob.sha256 == sha256,
+            ContentBlob.ref_count > 0
+        ).update({ContentBlob.ref_count: ContentBlob.ref_count - 1}, synchronize_session=False)
+
+    def contains(self, file_path: str) -> bool:
+        """Whether a stored file path points into this store."""
+        return Path(file_path).resolve().is_relative_to(self.root.resolve())
+
+    def link_into(self, sha256: str, destination: Path) -> None:
+        """
+        Place a blob at ``destination`` without copying its content when possible.
+
+        Uses a hard link, and falls back to a copy when the destination is on
+        another filesystem.
+        """
+        source = self.path_for(sha256)
+        if destination.exists() or destination.is_symlink():
+            destination.unlink()
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
+    def copy_into(self, sha256: str, destination: Path) -> None:
+        """Place a private copy of a blob at ``destination``, for files that are rewritten later."""
+        if destination.exists() or destination.is_symlink():
+            destination.unlink()
+        shutil.copyfile(self.path_for(sha256), destination)
+
+    def collect_garbage(self, db: Session) -> int:
+        """Delete blobs that are no longer referenced. Commits. Returns the number removed."""
+        unreferenced = [row.sha256 for row in db.query(ContentBlob.sha256).filter(ContentBlob.ref_count <= 0).all()]
+
+        removed = 0
+        for sha256 in unreferenced:
+            with _blob_lock:
+                # Conditional, so a blob referenced again since the query is kept.
+                # The file goes before the commit, while the deletion still
+                # holds the row against references taken by other processes
+                try:
+                    deleted = db.query(ContentBlob).filter(
+                        ContentBlob.sha256 == sha256,
+                        ContentBlob.ref_count <= 0
+                    ).delete(synchronize_session=False)
+                    if deleted:
+                        try:
+                            self.path_for(sha256).unlink()
+                        except FileNotFoundError:
+                            pass
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                if deleted:
+                    removed += 1
+
+        if removed:
+            logger.info(f"Removed {removed} unreferenced blobs")
+        return removed
+
+    def get_stats(self, db: Session) -> Dict[str, Any]:
+        """Blob counts and sizes, read from the blob table rather than the filesystem."""
+        blob_count, stored_size, logical_size = db.query(
+            func.count(ContentBlob.id),
+            func.coalesce(func.sum(ContentBlob.size), 0),
+            func.coalesce(func.sum(ContentBlob.size * ContentBlob.ref_count), 0)
+        ).filter(ContentBlob.ref_count > 0).one()
+
+        return {
+            "blob_count": blob_count,
+            "stored_size_bytes": int(stored_size),
+            "referenced_size_bytes": int(logical_size),
+            "deduplicated_bytes": int(logical_size) - int(stored_size)
+        }
+
+    def register_agent_file(self, db: Session, agent_file: AgentFile) -> str:
+        """
+        Move an agent file's content into the store. The agent file must have been flushed.
+
+        The blob becomes the only copy: ``file_content`` is emptied (the column
+        is not nullable) and the content is read back with ``read_agent_files``.
+        """
+        sha256 = self.store_bytes(db, agent_file.file_content.encode("utf-8"))
+        db.add(AgentFileBlob(agent_file_id=agent_file.id, sha256=sha256))
+        agent_file.file_content = ""
+        return sha256
+
+    def read_agent_files(self, db: Session, agent_files) -> Dict[int, str]:
+        """Map agent file ids to their content, read from the store for registered files."""
+        file_hashes = self.get_agent_file_hashes(db, [agent_file.id for agent_file in agent_files])
+        contents = {}
+        for agent_file in agent_files:
+            sha256 = file_hashes.get(agent_file.id)
+            if sha256 is None:
+                # Submitted before the blob store and not extracted since
+                contents[agent_file.id] = agent_file.file_content
+            else:
+                contents[agent_file.id] = self.path_for(sha256).read_text(encoding="utf-8")
+        return contents
+
+    def read_agent_file(self, db: Session, agent_file: AgentFile) -> str:
+        """Get the content of one agent file."""
+        return self.read_agent_files(db, [agent_file])[agent_file.id]
+
+    def get_agent_file_hashes(self, db: Session, agent_file_ids) -> Dict[int, str]:
+        """Map agent file ids to the SHA-256 of their content, for registered files."""
+        if not agent_file_ids:
+            return {}
+        rows = db.query(AgentFileBlob.agent_file_id, AgentFileBlob.sha256).filter(
+            AgentFileBlob.agent_file_id.in_(list(agent_file_ids))
+        ).all()
+        return {row.agent_file_id: row.sha256 for row in rows}
+
+    @staticmethod
+    def _add_ref(db: Session, sha256: str, size: int) -> None:
+        updated = db.query(ContentBlob).filter(ContentBlob.sha256 == sha256).update(
+            {ContentBlob.ref_count: ContentBlob.ref_count + 1}, synchronize_session=False
+        )
+        if updated:
+            return
+        try:
+            with db.begin_nested():
+                db.add(ContentBlob(sha256=sha256, size=size, ref_count=1))
+        except IntegrityError:
+            # Another transaction inserted the same content first
+            db.query(ContentBlob).filter(ContentBlob.sha256 == sha256).update(
+                {ContentBlob.ref_count: ContentBlob.ref_count + 1}, synchronize_session=False
+            )
+
+    def _write_atomic(self, target: Path, data: bytes) -> None:
+        staged_path = self.staging_path()
+        staged_path.write_bytes(data)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged_path, target)
+
+
+# Agent file references are released at the ORM level, so deleting an agent
+# (which cascades to its files) drops the references to their contents in
+# the same transaction. Blobs are only removed by collect_garbage.
+
+@event.listens_for(Session, "after_flush")
+def _release_deleted_agent_files(session: Session, flush_context) -> None:
+    agent_file_ids = [instance.id for instance in session.deleted if isinstance(instance, AgentFile)]
+    if not agent_file_ids:
+        return
+
+    connection = session.connection()
+    mapping = AgentFileBlob.__table__
+    blobs = ContentBlob.__table__
+    rows = connection.execute(
+        select(mapping.c.sha256).where(mapping.c.agent_file_id.in_(agent_file_ids))
+    ).fetchall()
+    for (sha256,) in rows:
+        connection.execute(
+            blobs.update().where(blobs.c.sha256 == sha256, blobs.c.ref_count > 0).values(ref_count=blobs.c.ref_count - 1)
+        )
+    connection.execute(mapping.delete().where(mapping.c.agent_file_id.in_(agent_file_ids)))
+
+
+# Global blob store instance at the default file storage location
+blob_store = BlobStore(FileStorageConfig().blob_path)
@@ -0,0 +1,41 @@
+"""Side effects of ORM changes that must only happen once their transaction commits."""
+
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def register_commit_hook(name: str,
+                         collect: Callable[[Session], Iterable[Tuple[Hashable, Any]]],
+                         apply: Callable[[Dict[Hashable, Any]], None]) -> None:
+    """
+    Run ``apply`` after every commit with what ``collect`` found in its flushes.
+
+    ``collect`` is called after each flush of any session and yields
+    ``(key, value)`` pairs; the pairs of all flushes of a transaction are kept
+    in the session, a later value replacing an earlier one under the same
+    key. ``apply`` receives them once the transaction commits, and they are
+    dropped if it rolls back, so other code never acts on uncommitted changes.
+
+    Args:
+        name: Unique name of the hook, used for its entry in ``Session.info``
+        collect: Called with the session after each flush
+        apply: Called with the collected pairs after a commit, if there are any
+    """
+    pending_key = f"pending_commit_hook:{name}"
+
+    @event.listens_for(Session, "after_flush")
+    def _collect(session: Session, flush_context) -> None:
+        for key, value in collect(session):
+            session.info.setdefault(pending_key, {})[key] = value
+
+    @event.listens_for(Session, "after_commit")
+    def _apply(session: Session) -> None:
+        pending = session.info.pop(pending_key, None)
+        if pending:
+            apply(pending)
+
+    @event.listens_for(Session, "after_rollback")
+    def _discard(session: Session) -> None:
+        session.info.pop(pending_key, None)
@@ -1,9 +1,19 @@
 """Container naming utilities for deployment services."""
 
 import hashlib
-from typing import Optional
+import json
+import socket
+from typing import Optional, Dict, Any, List, Tuple
+
+from docker.utils.socket import consume_socket_output, demux_adaptor, frames_iter
 from ..models.deployment import AgentDeployment
 
+# Markers delimiting the result payload that in-container scripts print on stdout.
+# Agent code may write to stdout directly, so the payload is framed rather than
+# taken as the whole stream.
+RESULT_FRAME_START = "<<<AGENTHUB_RESULT>>>"
+RESULT_FRAME_END = "<<<END_AGENTHUB_RESULT>>>"
+
 
 def generate_container_name(deployment: AgentDeployment, agent_type: Optional[str] = None) -> str:
     """
@@ -42,6 +52,20 @@ def generate_container_name(deployment: AgentDeployment, agent_type: Optional[st
     return container_name
 
 
+def find_container_deployment(db, container) -> Optional[AgentDeployment]:
+    """
+    Find the deployment a Docker container belongs to.
+    
+    Deployments are matched by container id first: claimed warm pool containers
+    carry no deployment labels, and the id is what the deployment row records
+    for every container it owns. The name match covers rows without an id.
+    """
+    deployment = db.query(AgentDeployment).filter(AgentDeployment.container_id == container.id).first()
+    if deployment is None:
+        deployment = db.query(AgentDeployment).filter(AgentDeployment.container_name == container.name).first()
+    return deployment
+
+
 def generate_docker_image_name(agent_type: str, user_id: int, agent_id: str, hiring_id: int, deployment_uuid: str) -> str:
     """
     Generate consistent Docker image name for a deployment.
@@ -66,3 +90,88 @@ def generate_docker_image_name(agent_type: str, user_id: int, agent_id: str, hir
     image_name = f"{agent_type}_{user_id}_{safe_agent_id}:{hiring_id}_{safe_deployment_uuid}"
     
     return image_name
+
+
+def generate_cached_image_name(agent_type: str, build_digest: str) -> str:
+    """
+    Generate the Docker image name for a content-addressed cached build.
+    
+    Args:
+        agent_type: Type of agent (function, acp, persistent)
+        build_digest: SHA-256 digest of the build context
+    
+    Returns:
+        Docker image name in format: agenthub_{agent_type}_cache:{digest[:32]}
+    """
+    safe_agent_type = agent_type.lower().replace('-', '_')
+    return f"agenthub_{safe_agent_type}_cache:{build_digest[:32]}"
+
+
+def parse_framed_result(output: Optional[bytes]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Extract the framed result payload from a container exec output stream.
+    
+    Args:
+        output: Raw stdout bytes of the exec call
+    
+    Returns:
+        Tuple of (payload dict or None if no valid frame was found, remaining output text)
+    """
+    text = output.decode(errors="replace") if output else ""
+    start = text.rfind(RESULT_FRAME_START)
+    if start == -1:
+        return None, text
+    end = text.find(RESULT_FRAME_END, start)
+    if end == -1:
+        return None, text
+    
+    try:
+        payload = json.loads(text[start + len(RESULT_FRAME_START):end])
+    except json.JSONDecodeError:
+        return None, text
+    
+    remaining = (text[:start] + text[end + len(RESULT_FRAME_END):]).strip()
+    return payload, remaining
+
+
+def exec_with_stdin(container, command: List[str], stdin: bytes) -> Tuple[int, Optional[bytes], Optional[bytes]]:
+    """
+    Run a command in a container, writing ``stdin`` to its standard input.
+    
+    Unlike a command-line argument, standard input is not bounded by the
+    kernel's ARG_MAX, so it can carry arbitrarily large payloads.
+    
+    Args:
+        container: Docker container to run the command in
+        command: Command and arguments
+        stdin: Bytes written to the command's standard input before closing it
+    
+    Returns:
+        Tuple of (exit code, stdout bytes or None, stderr bytes or None)
+    """
+    api = container.client.api
+    exec_id = api.exec_create(container.id, command, stdin=True)["Id"]
+    sock = api.exec_start(exec_id, socket=True)
+    # exec_start returns the HTTP response's file object; writes and the
+    # half-close that signals end of input go to the socket underneath
+    raw_sock = getattr(sock, "_sock", sock)
+    try:
+        raw_sock.sendall(stdin)
+        raw_sock.shutdown(socket.SHUT_WR)
+        frames = (demux_adaptor(*frame) for frame in frames_iter(sock, tty=False))
+        stdout, stderr = consume_socket_output(frames, demux=True)
+    finally:
+        sock.close()
+    return api.exec_inspect(exec_id)["ExitCode"], stdout, stderr
+
+
+def format_container_logs(stdout_logs: str, stderr_logs: str, container_output: str) -> str:
+    """Combine captured agent stdout/stderr and raw container output into one log string."""
+    container_logs = ""
+    if stdout_logs:
+        container_logs += f"=== STDOUT ===\n{stdout_logs}\n"
+    if stderr_logs:
+        container_logs += f"=== STDERR ===\n{stderr_logs}\n"
+    if container_output:
+        container_logs += f"=== CONTAINER OUTPUT ===\n{container_output}\n"
+    return container_logs
@@ -9,6 +9,8 @@ from sqlalchemy.orm import Session
 
 from ..models.deployment import AgentDeployment, DeploymentStatus
 from ..models.hiring import Hiring, HiringStatus
+from .container_utils import find_container_deployment
+from .warm_container_pool import WARM_CONTAINER_NAME_PREFIX
 
 logger = logging.getLogger(__name__)
 
@@ -97,7 +99,7 @@ class DeploymentReconciliationService:
             else:
                 # Check if container exists in Docker
                 try:
-                    container = self.docker_client.containers.get(deployment.container_name)
+                    container = self.docker_client.containers.get(deployment.container_id or deployment.container_name)
                     container_status = container.status
                     
                     # Map Docker container status to deployment status
@@ -212,11 +214,11 @@ class DeploymentReconciliationService:
             
             for container in containers:
                 try:
-                    # Check if container name matches any deployment
+                    # Idle warm pool containers belong to the pool, not to a deployment
                     container_name = container.name
-                    deployment = self.db.query(AgentDeployment).filter(
-                        AgentDeployment.container_name == container_name
-                    ).first()
+                    if container_name.startswith(WARM_CONTAINER_NAME_PREFIX):
+                        continue
+                    deployment = find_container_deployment(self.db, container)
                     
                     if not deployment:
                         # This AgentHub container has no database record - log it but don't remove
@@ -22,19 +22,45 @@ from ..models.agent import Agent, AgentType
 from ..models.hiring import Hiring
 from ..models.deployment import AgentDeployment, DeploymentStatus
 from .env_service import EnvironmentService
-from .container_utils import generate_container_name, generate_docker_image_name
+from .container_utils import (
+    generate_container_name,
+    parse_framed_result,
+    format_container_logs,
+    exec_with_stdin,
+    RESULT_FRAME_START,
+    RESULT_FRAME_END
+)
 import sys
 from ..config import (
     DOCKER_BUILD_TIMEOUT_SECONDS,
     DOCKER_PREBUILD_TIMEOUT_SECONDS,
     CONTAINER_CREATION_TIMEOUT_SECONDS,
     CONTAINER_STOP_TIMEOUT_SECONDS,
-    CONTAINER_REMOVAL_POLL_INTERVAL_SECONDS
+    CONTAINER_REMOVAL_POLL_INTERVAL_SECONDS,
+    PERSISTENT_AGENT_EXECUTION_MODE,
+    PERSISTENT_AGENT_WORKER_PATH,
+    AGENT_BASE_PYTHON_IMAGE
 )
-from .resource_limits import get_agent_resource_limits, to_docker_config
+from .resource_limits import to_docker_config
+from .execution_concurrency import concurrency_controller, DeploymentBusyError
+from .image_build_cache import image_build_cache
+from .base_images import base_image_manager, dockerfile_base_section
+from .agent_manifest_cache import agent_manifest_cache
+from .blob_store import blob_store
 
 logger = logging.getLogger(__name__)
 
+# Deployment files that are rewritten in place after extraction (merged .env,
+# padded requirements.txt, SDK and worker files of persistent agents); they get
+# private copies instead of blob hard links
+_REWRITTEN_DEPLOY_FILES = {
+    ".env",
+    "requirements.txt",
+    "agenthub_sdk/__init__.py",
+    "agenthub_sdk/agent.py",
+    Path(PERSISTENT_AGENT_WORKER_PATH).name
+}
+
 
 class DeploymentService:
     """Service for managing ACP agent deployments."""
@@ -77,7 +103,7 @@ class DeploymentService:
                     agent_env_path = temp_dir / f"agent_{agent.id}_env_{uuid.uuid4().hex[:8]}.env"
                     
                     with open(agent_env_path, 'w') as f:
-                        f.write(agent_file.file_content)
+                        f.write(blob_store.read_agent_file(self.db, agent_file))
                     
                     logger.info(f"Created temporary agent .env file: {agent_env_path}")
                     return str(agent_env_path)
@@ -223,8 +249,15 @@ class DeploymentService:
             deploy_dir = self.deployment_dir / deployment_id
             deploy_dir.mkdir(exist_ok=True)
             
+            # Build on the managed base image, if it is built yet, unless a pre-built agent image will be used
+            base_image = None if agent.docker_image else base_image_manager.get_base_image(agent.agent_type)
+            
             # Extract agent code
-            self._extract_agent_code(agent, deploy_dir)
+            self._extract_agent_code(agent, deploy_dir, base_image)
+            deployment.deployment_config = {
+                **(deployment.deployment_config or {}),
+                "base_image": base_image or AGENT_BASE_PYTHON_IMAGE
+            }
             
             # Initialize image_name variable
             image_name = None
@@ -252,19 +285,18 @@ class DeploymentService:
             else:
                 logger.info(f"No docker_image field found for agent {agent.id}")
             
-            # Build new image if no pre-built image available
+            # Resolve the image from the build cache if no pre-built image available -
+            # hirings with identical build inputs share one content-addressed image
             if not image_name:
-                logger.info(f"🔨 Building new Docker image from scratch for agent {agent.id}")
-                # Build Docker image using centralized utility
-                user_id = deployment.hiring.user_id or "anon"
-                agent_type = agent.agent_type
-                hiring_id = deployment.hiring_id
-                deployment_uuid = deployment_id.split('_')[-1]  # Get the UUID part
-                image_name = generate_docker_image_name(agent_type, user_id, agent.id, hiring_id, deployment_uuid)
-                
-                logger.info(f"Building new Docker image: {image_name}")
-                # Build Docker image asynchronously
-                image = await self._build_docker_image(deploy_dir, image_name)
+                image_name, cache_hit = await image_build_cache.get_or_build(
+                    deploy_dir,
+                    agent.agent_type,
+                    lambda name, labels: self._build_docker_image(deploy_dir, name, labels)
+                )
+                if cache_hit:
+                    logger.info(f"🚀 FAST DEPLOYMENT: Reusing cached image {image_name} - skipping Docker build")
+                else:
+                    logger.info(f"🔨 Built new Docker image {image_name} for agent {agent.id}")
             else:
                 logger.info(f"🚀 FAST DEPLOYMENT: Using pre-built image {image_name} - skipping Docker build")
             
@@ -307,8 +339,8 @@ class DeploymentService:
             
             return {"error": str(e)}
     
-    def _extract_agent_code(self, agent: Agent, deploy_dir: Path):
-        """Extract agent code to deployment directory."""
+    def _extract_agent_code(self, agent: Agent, deploy_dir: Path, base_image: Optional[str] = None):
+        """Extract agent code to deployment directory, building on base_image when given."""
         if agent.code_zip_url:
             # Download and extract ZIP
             # TODO: Implement ZIP download and extraction
@@ -337,6 +369,10 @@ class DeploymentService:
         )
         logger.info(f"Created merged .env file for deployment: {merged_env_path}")
         
+        # Persistent agents ship with the resident worker script
+        if agent.agent_type == "persistent":
+            self._include_worker_file(deploy_dir)
+        
         # Create Dockerfile based on agent type
         dockerfile = deploy_dir / "Dockerfile"
         if not dockerfile.exists():
@@ -344,7 +380,7 @@ class DeploymentService:
             
             if agent_type == "function":
                 # Function agents run once and exit
-                dockerfile_content = """FROM python:3.11-slim
+                dockerfile_content = dockerfile_base_section(base_image, f"""FROM {AGENT_BASE_PYTHON_IMAGE}
 
 WORKDIR /app
 
@@ -354,7 +390,7 @@ RUN apt-get update && apt-get install -y \\
     gcc \\
     g++ \\
     && rm -rf /var/lib/apt/lists/*
-
+""") + """
 # Copy requirements and install
 COPY requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
@@ -367,7 +403,13 @@ CMD ["python", "main.py"]
 """
             elif agent_type == "persistent":
                 # Persistent agents stay running and use docker exec for operations
-                dockerfile_content = """FROM python:3.11-slim
+                if PERSISTENT_AGENT_EXECUTION_MODE == "worker":
+                    # Run the resident worker; keep the container alive if it exits
+                    # so the one-shot docker exec path can still be used
+                    persistent_cmd = f'CMD ["sh", "-c", "python {PERSISTENT_AGENT_WORKER_PATH} serve; tail -f /dev/null"]'
+                else:
+                    persistent_cmd = 'CMD ["tail", "-f", "/dev/null"]'
+                dockerfile_content = dockerfile_base_section(base_image, f"""FROM {AGENT_BASE_PYTHON_IMAGE}
 
 WORKDIR /app
 
@@ -377,7 +419,7 @@ RUN apt-get update && apt-get install -y \\
     gcc \\
     g++ \\
     && rm -rf /var/lib/apt/lists/*
-
+""") + f"""
 # Copy requirements and install
 COPY requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
@@ -394,17 +436,17 @@ ENV STATE_DIR=/app/state
 ENV PYTHONUNBUFFERED=1
 
 # Keep container running for persistent agent execution
-CMD ["tail", "-f", "/dev/null"]
+{persistent_cmd}
 """
             else:  # acp or other types
                 # ACP agents run a server
-                dockerfile_content = """FROM python:3.11-slim
+                dockerfile_content = dockerfile_base_section(base_image, f"""FROM {AGENT_BASE_PYTHON_IMAGE}
 
 WORKDIR /app
 
 # Install system dependencies
 RUN apt-get update && apt-get install -y curl && rm -rf /var/lib/apt/lists/*
-
+""") + """
 # Copy requirements and install
 COPY requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
@@ -435,17 +477,33 @@ CMD ["python", "main.py"]
         if not agent.files:
             logger.warning(f"No files found for agent {agent.id}")
             return
+        
+        file_hashes = blob_store.get_agent_file_hashes(self.db, [agent_file.id for agent_file in agent.files])
+        registered = False
             
         for agent_file in agent.files:
             # Create directory structure if needed
             file_path = deploy_dir / agent_file.file_path
             file_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Write file content
-            file_path.write_text(agent_file.file_content, encoding='utf-8')
+            # Place file content from the blob store
+            sha256 = file_hashes.get(agent_file.id)
+            if sha256 is None:
+                # Agents submitted before the blob store are moved into it on first extraction
+                try:
+                    sha256 = blob_store.register_agent_file(self.db, agent_file)
+                    registered = True
+                except OSError as e:
+                    logger.warning(f"Writing {agent_file.file_path} from the database, could not store it: {e}")
+                    file_path.write_text(agent_file.file_content, encoding='utf-8')
+                    continue
+            self._place_blob(sha256, agent_file, file_path)
             
             logger.info(f"Extracted file: {agent_file.file_path}")
         
+        if registered:
+            self.db.commit()
+        
         # For persistent agents, include the agenthub_sdk files
         if agent.agent_type == "persistent":
             self._include_sdk_files(deploy_dir)
@@ -455,13 +513,23 @@ CMD ["python", "main.py"]
         if not main_file.exists():
             # Find the main file
             main_agent_file = agent.get_main_file()
-            if main_agent_file:
-                main_file.write_text(main_agent_file.file_content, encoding='utf-8')
-            else:
+            if not main_agent_file:
                 # Fallback to first Python file
                 python_files = [f for f in agent.files if f.file_type == '.py']
-                if python_files:
-                    main_file.write_text(python_files[0].file_content, encoding='utf-8')
+                main_agent_file = python_files[0] if python_files else None
+            if main_agent_file:
+                main_file.write_text(blob_store.read_agent_file(self.db, main_agent_file), encoding='utf-8')
+    
+    def _place_blob(self, sha256: str, agent_file, file_path: Path):
+        """Hard link (or copy) an agent file's blob into a deployment directory."""
+        place = blob_store.copy_into if Path(agent_file.file_path).as_posix() in _REWRITTEN_DEPLOY_FILES else blob_store.link_into
+        place(sha256, file_path)
+    
+    def _include_worker_file(self, deploy_dir: Path):
+        """Include the resident worker script for persistent agents."""
+        worker_source = Path(__file__).parent / "persistent_agent_worker.py"
+        shutil.copyfile(worker_source, deploy_dir / Path(PERSISTENT_AGENT_WORKER_PATH).name)
+        logger.info("Included resident worker for persistent agent")
     
     def _include_sdk_files(self, deploy_dir: Path):
         """Include agenthub_sdk files for persistent agents."""
@@ -576,7 +644,7 @@ class PersistentAgent(ABC):
             logger.error(f"Failed to include SDK files: {e}")
             # Don't fail the deployment if SDK inclusion fails
     
-    async def _build_docker_image(self, deploy_dir: Path, image_name: str):
+    async def _build_docker_image(self, deploy_dir: Path, image_name: str, labels: Optional[Dict[str, str]] = None):
         """Build Docker image for the agent asynchronously."""
         logger.info(f"Building Docker image {image_name}")
         
@@ -591,6 +659,7 @@ class PersistentAgent(ABC):
                     lambda: self.docker_client.images.build(
                         path=str(deploy_dir),
                         tag=image_name,
+                        labels=labels,
                         rm=True,
                         forcerm=True
                     )
@@ -631,8 +700,9 @@ class PersistentAgent(ABC):
             temp_deploy_dir.mkdir(exist_ok=True)
             
             try:
-                # Extract agent code
-                self._extract_agent_code(agent, temp_deploy_dir)
+                # Extract agent code on top of the managed base image
+                base_image = await base_image_manager.ensure_base_image_async(agent.agent_type)
+                self._extract_agent_code(agent, temp_deploy_dir, base_image)
                 
                 # Verify files were created
                 requirements_file = temp_deploy_dir / "requirements.txt"
@@ -789,18 +859,11 @@ class PersistentAgent(ABC):
             if not agent:
                 raise Exception(f"Agent {deployment.agent_id} not found")
             
-            # Get agent configuration from files
-            try:
-                agent_config = self._get_agent_config_from_files(deployment.agent_id)
-            except Exception as e:
-                logger.warning(f"Could not get agent config from files: {e}, using empty config")
-                agent_config = {}
-            
             # Determine agent type (use deployment_type if available, otherwise agent.agent_type)
             agent_type = deployment.deployment_type or agent.agent_type or "function"
             
             # Get resource limits with proper agent config and type
-            resource_limits = get_agent_resource_limits(agent_config, agent_type)
+            resource_limits = agent_manifest_cache.get(self.db, agent).resource_limits(agent_type)
             docker_config = to_docker_config(resource_limits)
             container_config.update(docker_config)
             
@@ -981,6 +1044,7 @@ class PersistentAgent(ABC):
             deployment.status = DeploymentStatus.STOPPED.value
             deployment.stopped_at = datetime.now(timezone.utc)
             self.db.commit()
+            concurrency_controller.forget_deployment(deployment_id)
             
             return {"deployment_id": deployment_id, "status": "stopped"}
             
@@ -1229,18 +1293,10 @@ class PersistentAgent(ABC):
 
     def _get_agent_config_from_files(self, agent_id: str) -> Dict[str, Any]:
         """Get agent configuration from config.json file."""
-        from ..models.agent_file import AgentFile
-        
-        config_file = self.db.query(AgentFile).filter(
-            AgentFile.agent_id == agent_id,
-            AgentFile.file_path == 'config.json'
-        ).first()
-        
-        if not config_file:
+        manifest = agent_manifest_cache.get_by_id(self.db, agent_id)
+        if manifest is None or not manifest.has_config_file:
             raise Exception("Agent configuration file not found")
-        
-        import json
-        return json.loads(config_file.file_content)
+        return manifest.config
 
     async def execute_persistent_agent(self, deployment_id: str, input_data: Dict[str, Any], execution_id: Optional[str] = None) -> Dict[str, Any]:
         """Execute a persistent agent in its container via docker exec (non-blocking)."""
@@ -1310,14 +1366,16 @@ class PersistentAgent(ABC):
                 "operation": "execute",
                 "input": input_data,
                 "entry_point": entry_point,
-                "agent_class": agent_class
+                "agent_class": agent_class,
+                "execution_id": execution_id
             }
             
             # Run the blocking operation in a thread pool to avoid blocking the event loop
             loop = asyncio.get_event_loop()
             result = await loop.run_in_executor(
                 None, 
-                self._execute_in_container, 
+                self._execute_in_container_with_slot, 
+                deployment_id,
                 container_name, 
                 exec_input
             )
@@ -1440,14 +1498,16 @@ class PersistentAgent(ABC):
                 "operation": "initialize",
                 "input": init_config,
                 "entry_point": entry_point,
-                "agent_class": agent_class
+                "agent_class": agent_class,
+                "execution_id": execution_id
             }
             
             # Run the blocking operation in a thread pool to avoid blocking the event loop
             loop = asyncio.get_event_loop()
             result = await loop.run_in_executor(
                 None, 
-                self._execute_in_container, 
+                self._execute_in_container_with_slot, 
+                deployment_id,
                 container_name, 
                 exec_input
             )
@@ -1539,8 +1599,8 @@ class PersistentAgent(ABC):
             # Start cleanup in a separate thread to avoid blocking
             import threading
             cleanup_thread = threading.Thread(
-                target=self._execute_in_container,
-                args=(container_name, exec_input)
+                target=self._execute_in_container_with_slot,
+                args=(deployment_id, container_name, exec_input)
             )
             cleanup_thread.start()
             
@@ -1555,6 +1615,68 @@ class PersistentAgent(ABC):
             logger.error(f"Error cleaning up persistent agent: {e}")
             return {"error": str(e)}
 
+    def _execute_in_container_with_slot(self, deployment_id: str, container_name: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute in a persistent agent container while holding a deployment execution slot.
+        
+        ``execute`` calls run in parallel up to the per-deployment limit; ``initialize``
+        and ``cleanup`` replace the whole agent state and therefore run exclusively.
+        """
+        exclusive = input_data.get('operation', 'execute') != 'execute'
+        try:
+            with concurrency_controller.execution_slot(deployment_id, exclusive=exclusive):
+                return self._execute_in_container(container_name, input_data)
+        except DeploymentBusyError as e:
+            logger.warning(f"No execution slot available for deployment {deployment_id}: {e}")
+            return {"status": "error", "error": str(e)}
+
+    def _execute_via_worker(self, container, container_name: str, input_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Send an operation to the resident worker inside a persistent agent container.
+        
+        Returns:
+            The operation result, or None if the container has no reachable worker
+            and the caller should fall back to the one-shot exec path.
+        """
+        request = {
+            "operation": input_data.get('operation', 'execute'),
+            "input": input_data.get('input', {}),
+            "entry_point": input_data.get('entry_point', ''),
+            "agent_class": input_data.get('agent_class', ''),
+            "execution_id": input_data.get('execution_id')
+        }
+        # The request goes over stdin: inputs can be larger than the argv limit
+        exit_code, stdout_bytes, stderr_bytes = exec_with_stdin(
+            container,
+            ["python", PERSISTENT_AGENT_WORKER_PATH, "call"],
+            json.dumps(request).encode()
+        )
+        
+        if exit_code != 0:
+            logger.info(
+                f"Resident worker not available in {container_name} (exit code {exit_code}), "
+                f"falling back to one-shot execution"
+            )
+            return None
+        
+        try:
+            result_data = json.loads((stdout_bytes or b"").decode())
+        except json.JSONDecodeError as e:
+            logger.warning(f"Invalid response from resident worker in {container_name}: {e}")
+            return None
+        
+        result_data["container_logs"] = format_container_logs(
+            result_data.pop("stdout", ""),
+            result_data.pop("stderr", ""),
+            stderr_bytes.decode(errors="replace") if stderr_bytes else ""
+        )
+        
+        logger.info(
+            f"Resident worker completed {request['operation']} in {container_name} "
+            f"in {result_data.get('duration_seconds', 0):.2f}s"
+        )
+        return result_data
+
     def _execute_in_container(self, container_name: str, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a command in a persistent agent container via Docker exec."""
         try:
@@ -1563,6 +1685,12 @@ class PersistentAgent(ABC):
             # Determine operation type
             operation = input_data.get('operation', 'execute')
             
+            # Prefer the resident worker, which keeps the agent loaded between calls
+            if PERSISTENT_AGENT_EXECUTION_MODE == "worker":
+                worker_result = self._execute_via_worker(container, container_name, input_data)
+                if worker_result is not None:
+                    return worker_result
+            
             if operation == 'initialize':
                 # Execute initialization
                 python_script = f"""
@@ -1574,6 +1702,7 @@ import time
 from io import StringIO
 from contextlib import redirect_stdout, redirect_stderr
 
+script_start = time.time()
 print("Starting initialization script...", file=sys.stderr)
 sys.path.append('/app')
 
@@ -1620,21 +1749,27 @@ try:
 
     print("Saving agent state...", file=sys.stderr)
     # Save state to file (only essential data, not the full agent object)
+    try:
+        with open('/app/state/agent_state.json', 'r') as f:
+            previous_version = json.load(f).get('version', 0)
+    except (FileNotFoundError, ValueError):
+        previous_version = 0
     state_data = {{
         'initialized': True,
         'config': converted_input,
-        'agent_state': agent._state if hasattr(agent, '_state') else {{}}
+        'agent_state': agent._state if hasattr(agent, '_state') else {{}},
+        'version': previous_version + 1
     }}
     
-    with open('/app/state/agent_state.json', 'w') as f:
+    # Stage under a per-execution name and atomically swap in
+    execution_id = os.getenv('AGENTHUB_EXECUTION_ID') or str(os.getpid())
+    staging_path = f"/app/state/agent_state.json.{{execution_id}}.tmp"
+    with open(staging_path, 'w') as f:
         json.dump(state_data, f)
+    os.replace(staging_path, '/app/state/agent_state.json')
     print("Agent state saved", file=sys.stderr)
 
-    print("Writing result to temp file...", file=sys.stderr)
-    # Write result to temp file
-    with open('/tmp/agent_result.json', 'w') as f:
-        json.dump({{"status": "success", "result": result}}, f)
-    print("Result written to temp file", file=sys.stderr)
+    result_payload = {{"status": "success", "result": result}}
         
 except Exception as e:
     print(f"Exception during initialization: {{str(e)}}", file=sys.stderr)
@@ -1642,19 +1777,13 @@ except Exception as e:
     traceback.print_exc(file=sys.stderr)
     # Capture any exceptions in stderr
     stderr_capture.write(f"Error: {{str(e)}}\\n")
-    # Write error result to temp file
-    with open('/tmp/agent_result.json', 'w') as f:
-        json.dump({{"status": "error", "error": str(e)}}, f)
+    result_payload = {{"status": "error", "error": str(e)}}
 
-print("Writing captured output to temp files...", file=sys.stderr)
-# Write captured output to temp files
-with open('/tmp/agent_stdout.txt', 'w') as f:
-    f.write(stdout_capture.getvalue())
-
-with open('/tmp/agent_stderr.txt', 'w') as f:
-    f.write(stderr_capture.getvalue())
-
-print("Initialization script completed", file=sys.stderr)
+# Return result, captured output and timing in a single framed payload on stdout
+result_payload["stdout"] = stdout_capture.getvalue()
+result_payload["stderr"] = stderr_capture.getvalue()
+result_payload["duration_seconds"] = time.time() - script_start
+sys.stdout.write("\\n{RESULT_FRAME_START}" + json.dumps(result_payload, default=str) + "{RESULT_FRAME_END}\\n")
 """
                 exec_command = ["python", "-c", python_script]
                 
@@ -1665,22 +1794,32 @@ import json
 import sys
 import os
 import tempfile
+import time
 from io import StringIO
 from contextlib import redirect_stdout, redirect_stderr
 
+script_start = time.time()
 sys.path.append('/app')
 
+STATE_FILE = '/app/state/agent_state.json'
+EXECUTION_ID = os.getenv('AGENTHUB_EXECUTION_ID') or str(os.getpid())
+
 # Capture both stdout and stderr
 stdout_capture = StringIO()
 stderr_capture = StringIO()
 
 try:
+    # Same optimistic commit as the resident worker, which every persistent image ships
+    from {Path(PERSISTENT_AGENT_WORKER_PATH).stem} import commit_agent_state
+
     # Load state from file
     try:
-        with open('/app/state/agent_state.json', 'r') as f:
+        with open(STATE_FILE, 'r') as f:
             state_data = json.load(f)
     except FileNotFoundError:
         raise Exception("Agent not initialized. Call initialize first.")
+    base_version = state_data.get('version', 0)
+    base_agent_state = state_data.get('agent_state', {{}})
 
     # Import the agent class
     from {input_data.get('entry_point', '').replace('.py', '')} import {input_data.get('agent_class', '')}
@@ -1688,7 +1827,7 @@ try:
     # Create agent instance and restore state
     agent = {input_data.get('agent_class', '')}()
     agent._initialized = state_data.get('initialized', False)
-    agent._state = state_data.get('agent_state', {{}})
+    agent._state = json.loads(json.dumps(base_agent_state))
 
     # Convert JavaScript boolean values to Python booleans
     def convert_js_to_python(obj):
@@ -1712,28 +1851,23 @@ try:
     with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
         result = agent.execute(converted_input)
 
-    # Save updated state
-    state_data['agent_state'] = agent._state if hasattr(agent, '_state') else {{}}
-    with open('/app/state/agent_state.json', 'w') as f:
-        json.dump(state_data, f)
+    # Save updated state only if this execution changed it
+    new_agent_state = agent._state if hasattr(agent, '_state') else {{}}
+    if json.dumps(new_agent_state, sort_keys=True, default=str) != json.dumps(base_agent_state, sort_keys=True, default=str):
+        commit_agent_state(base_version, base_agent_state, new_agent_state, EXECUTION_ID)
 
-    # Write result to temp file
-    with open('/tmp/agent_result.json', 'w') as f:
-        json.dump({{"status": "success", "result": result}}, f)
+    result_payload = {{"status": "success", "result": result}}
         
 except Exception as e:
     # Capture any exceptions in stderr
     stderr_capture.write(f"Error: {{str(e)}}\\n")
-    # Write error result to temp file
-    with open('/tmp/agent_result.json', 'w') as f:
-        json.dump({{"status": "error", "error": str(e)}}, f)
+    result_payload = {{"status": "error", "error": str(e)}}
 
-# Write captured output to temp files
-with open('/tmp/agent_stdout.txt', 'w') as f:
-    f.write(stdout_capture.getvalue())
-
-with open('/tmp/agent_stderr.txt', 'w') as f:
-    f.write(stderr_capture.getvalue())
+# Return result, captured output and timing in a single framed payload on stdout
+result_payload["stdout"] = stdout_capture.getvalue()
+result_payload["stderr"] = stderr_capture.getvalue()
+result_payload["duration_seconds"] = time.time() - script_start
+sys.stdout.write("\\n{RESULT_FRAME_START}" + json.dumps(result_payload, default=str) + "{RESULT_FRAME_END}\\n")
 """
                 exec_command = ["python", "-c", python_script]
                 
@@ -1748,6 +1882,7 @@ import time
 from io import StringIO
 from contextlib import redirect_stdout, redirect_stderr
 
+script_start = time.time()
 sys.path.append('/app')
 
 # Capture both stdout and stderr
@@ -1777,50 +1912,42 @@ try:
         # Remove state file
         os.remove('/app/state/agent_state.json')
 
-    # Write result to temp file
-    with open('/tmp/agent_result.json', 'w') as f:
-        json.dump({{"status": "success", "result": result}}, f)
+    result_payload = {{"status": "success", "result": result}}
         
 except Exception as e:
     # Capture any exceptions in stderr
     stderr_capture.write(f"Error: {{str(e)}}\\n")
-    # Write error result to temp file
-    with open('/tmp/agent_result.json', 'w') as f:
-        json.dump({{"status": "error", "error": str(e)}}, f)
-
-# Write captured output to temp files
-with open('/tmp/agent_stdout.txt', 'w') as f:
-    f.write(stdout_capture.getvalue())
+    result_payload = {{"status": "error", "error": str(e)}}
 
-with open('/tmp/agent_stderr.txt', 'w') as f:
-    f.write(stderr_capture.getvalue())
+# Return result, captured output and timing in a single framed payload on stdout
+result_payload["stdout"] = stdout_capture.getvalue()
+result_payload["stderr"] = stderr_capture.getvalue()
+result_payload["duration_seconds"] = time.time() - script_start
+sys.stdout.write("\\n{RESULT_FRAME_START}" + json.dumps(result_payload, default=str) + "{RESULT_FRAME_END}\\n")
 """
                 exec_command = ["python", "-c", python_script]
             else:
                 return {"status": "error", "error": f"Unknown operation: {operation}"}
             
-            # Execute command in container
-            exec_result = container.exec_run(exec_command)
+            # Execute command in container - result, captured output and timing
+            # come back together in a framed payload on the exec's stdout
+            exec_environment = {}
+            if input_data.get('execution_id'):
+                exec_environment["AGENTHUB_EXECUTION_ID"] = input_data['execution_id']
+            exec_result = container.exec_run(exec_command, demux=True, environment=exec_environment)
+            stdout_bytes, stderr_bytes = exec_result.output or (None, None)
+            result_data, raw_stdout = parse_framed_result(stdout_bytes)
             
-            # Read captured stdout and stderr
-            stdout_result = container.exec_run(cmd=["cat", "/tmp/agent_stdout.txt"])
-            stderr_result = container.exec_run(cmd=["cat", "/tmp/agent_stderr.txt"])
+            container_output = raw_stdout
+            if stderr_bytes:
+                container_output = f"{container_output}\n{stderr_bytes.decode(errors='replace')}".strip()
             
-            # Combine logs
-            stdout_logs = stdout_result.output.decode() if stdout_result.exit_code == 0 else ""
-            stderr_logs = stderr_result.output.decode() if stderr_result.exit_code == 0 else ""
-            
-            # Create combined logs
-            container_logs = ""
-            if stdout_logs:
-                container_logs += f"=== STDOUT ===\n{stdout_logs}\n"
-            if stderr_logs:
-                container_logs += f"=== STDERR ===\n{stderr_logs}\n"
-            if exec_result.output:
-                container_logs += f"=== CONTAINER OUTPUT ===\n{exec_result.output.decode()}\n"
+            stdout_logs = result_data.pop("stdout", "") if result_data else ""
+            stderr_logs = result_data.pop("stderr", "") if result_data else ""
+            container_logs = format_container_logs(stdout_logs, stderr_logs, container_output)
             
             if exec_result.exit_code != 0:
-                error_msg = f"Container execution failed (exit code: {exec_result.exit_code}): {exec_result.output.decode()}"
+                error_msg = f"Container execution failed (exit code: {exec_result.exit_code}): {container_output}"
                 logger.error(f"Container execution failed for {container_name}: {error_msg}")
                 logger.error(f"Container logs: {container_logs}")
                 return {
@@ -1829,31 +1956,26 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
                     "container_logs": container_logs
                 }
             
-            # Read result from temp file
-            read_result = container.exec_run(cmd=["cat", "/tmp/agent_result.json"])
-            if read_result.exit_code != 0:
-                error_msg = f"Failed to read result file (exit code: {read_result.exit_code}): {read_result.output.decode()}"
-                logger.error(f"Failed to read result file from {container_name}: {error_msg}")
+            if result_data is None:
+                error_msg = f"No result payload returned by container: {container_output[:500]}"
+                logger.error(f"Failed to read result from {container_name}: {error_msg}")
                 return {
                     "status": "error", 
                     "error": error_msg,
                     "container_logs": container_logs
                 }
             
-            result_json = read_result.output.decode().strip()
-            result_data = json.loads(result_json)
-            
             # Add container logs to the result data
             result_data["container_logs"] = container_logs
             
             # Log the container logs for debugging
-            logger.info(f"Container logs captured for {container_name}: {len(container_logs)} characters")
+            logger.info(
+                f"Container logs captured for {container_name}: {len(container_logs)} characters "
+                f"(agent time {result_data.get('duration_seconds', 0):.2f}s)"
+            )
             if container_logs:
                 logger.info(f"First 200 chars of logs: {container_logs[:200]}...")
             
-            # Clean up temp files
-            container.exec_run(cmd=["rm", "-f", "/tmp/agent_result.json", "/tmp/agent_stdout.txt", "/tmp/agent_stderr.txt"])
-            
             return result_data
                 
         except Exception as e:
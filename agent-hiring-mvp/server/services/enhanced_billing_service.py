@@ -8,12 +8,12 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal, ROUND_HALF_UP
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_
 
 from .resource_usage_tracker import ResourceUsageTracker
-from ..models.container_resource_usage import ContainerResourceUsage, UsageAggregation, AgentActivityLog
+from .usage_rollup_service import period_bucket_start, rollup_status
+from ..models.container_resource_usage import UsageAggregation, AgentActivityLog
 from ..models.deployment import AgentDeployment
-from ..models.hiring import Hiring
 from ..models.user import User
 from ..models.resource_usage import UserBudget
 
@@ -95,6 +95,7 @@ class EnhancedBillingService:
                     "utilization_percent": round(budget_utilization, 2)
                 },
                 "cost_trends": await self._get_cost_trends(user_id, months),
+                "usage_rollup": rollup_status(self.db),
                 "generated_at": current_date.isoformat()
             }
             
@@ -103,75 +104,87 @@ class EnhancedBillingService:
             return {"error": f"Failed to get billing summary: {str(e)}"}
     
     async def _get_container_resource_costs(self, user_id: int, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
-        """Get container resource costs for a user in a date range."""
+        """Get container resource costs for a user in a date range from the daily usage rollups."""
         try:
-            # Get all deployments for this user in the date range
-            deployments = self.db.query(AgentDeployment).join(Hiring).filter(
-                and_(
-                    Hiring.user_id == user_id,
-                    AgentDeployment.created_at >= start_date,
-                    AgentDeployment.created_at <= end_date
-                )
+            in_range = and_(
+                UsageAggregation.user_id == user_id,
+                UsageAggregation.aggregation_period == "daily",
+                UsageAggregation.hiring_id > 0,
+                UsageAggregation.period_start >= period_bucket_start(start_date, "daily"),
+                UsageAggregation.period_start <= end_date
+            )
+            
+            # One row per hiring that used resources in the range
+            hiring_rows = self.db.query(
+                UsageAggregation.hiring_id,
+                UsageAggregation.agent_id,
+                UsageAggregation.deployment_type,
+                *[func.sum(getattr(UsageAggregation, name)).label(name) for name in (
+                    "total_cost", "total_cpu_hours", "total_memory_gb_hours", "total_network_gb",
+                    "total_cpu_cost", "total_memory_cost", "total_network_cost", "total_storage_cost"
+                )]
+            ).filter(in_range).group_by(
+                UsageAggregation.hiring_id, UsageAggregation.agent_id, UsageAggregation.deployment_type
             ).all()
             
+            # Latest deployment of each hiring
+            deployments = {}
+            requests_by_hiring = {}
+            if hiring_rows:
+                hiring_ids = [row.hiring_id for row in hiring_rows]
+                for deployment in self.db.query(AgentDeployment).filter(
+                    AgentDeployment.hiring_id.in_(hiring_ids)
+                ).order_by(AgentDeployment.created_at).all():
+                    deployments[deployment.hiring_id] = deployment
+                
+                requests_by_hiring = dict(self.db.query(
+                    AgentActivityLog.hiring_id, func.count(AgentActivityLog.id)
+                ).filter(
+                    AgentActivityLog.hiring_id.in_(hiring_ids),
+                    AgentActivityLog.activity_timestamp >= start_date,
+                    AgentActivityLog.activity_timestamp <= end_date
+                ).group_by(AgentActivityLog.hiring_id).all())
+            
             deployment_costs = []
             total_cpu_hours = 0.0
             total_memory_gb_hours = 0.0
             total_network_gb = 0.0
             total_requests = 0
             
-            for deployment in deployments:
-                # Get resource usage for this deployment
-                resource_usage = self.db.query(ContainerResourceUsage).filter(
-                    and_(
-                        ContainerResourceUsage.deployment_id == deployment.deployment_id,
-                        ContainerResourceUsage.snapshot_timestamp >= start_date,
-                        ContainerResourceUsage.snapshot_timestamp <= end_date
-                    )
-                ).all()
+            for row in hiring_rows:
+                deployment = deployments.get(row.hiring_id)
+                activity_count = requests_by_hiring.get(row.hiring_id, 0)
+                deployment_cpu_hours = float(row.total_cpu_hours or 0.0)
+                deployment_memory_gb_hours = float(row.total_memory_gb_hours or 0.0)
+                deployment_network_gb = float(row.total_network_gb or 0.0)
                 
-                if resource_usage:
-                    # Calculate totals for this deployment
-                    deployment_total_cost = sum(r.total_cost for r in resource_usage)
-                    deployment_cpu_hours = sum(r.cpu_usage_percent for r in resource_usage) / 100.0 * (30/3600)  # Convert to hours
-                    deployment_memory_gb_hours = sum(r.memory_usage_bytes for r in resource_usage) / (1024**3) * (30/3600)
-                    deployment_network_gb = sum(r.network_rx_bytes + r.network_tx_bytes for r in resource_usage) / (1024**3)
-                    
-                    # Get activity count
-                    activity_count = self.db.query(AgentActivityLog).filter(
-                        and_(
-                            AgentActivityLog.deployment_id == deployment.deployment_id,
-                            AgentActivityLog.activity_timestamp >= start_date,
-                            AgentActivityLog.activity_timestamp <= end_date
-                        )
-                    ).count()
-                    
-                    deployment_summary = {
-                        "deployment_id": deployment.deployment_id,
-                        "agent_id": deployment.agent_id,
-                        "deployment_type": deployment.deployment_type,
-                        "status": deployment.status,
-                        "created_at": deployment.created_at.isoformat(),
-                        "total_cost": round(deployment_total_cost, 6),
-                        "cpu_hours": round(deployment_cpu_hours, 4),
-                        "memory_gb_hours": round(deployment_memory_gb_hours, 4),
-                        "network_gb": round(deployment_network_gb, 4),
-                        "requests": activity_count,
-                        "cost_breakdown": {
-                            "cpu_cost": round(sum(r.cpu_cost for r in resource_usage), 6),
-                            "memory_cost": round(sum(r.memory_cost for r in resource_usage), 6),
-                            "network_cost": round(sum(r.network_cost for r in resource_usage), 6),
-                            "storage_cost": round(sum(r.storage_cost for r in resource_usage), 6)
-                        }
+                deployment_summary = {
+                    "deployment_id": deployment.deployment_id if deployment else None,
+                    "hiring_id": row.hiring_id,
+                    "agent_id": row.agent_id,
+                    "deployment_type": row.deployment_type,
+                    "status": deployment.status if deployment else None,
+                    "created_at": deployment.created_at.isoformat() if deployment else None,
+                    "total_cost": round(float(row.total_cost or 0.0), 6),
+                    "cpu_hours": round(deployment_cpu_hours, 4),
+                    "memory_gb_hours": round(deployment_memory_gb_hours, 4),
+                    "network_gb": round(deployment_network_gb, 4),
+                    "requests": activity_count,
+                    "cost_breakdown": {
+                        "cpu_cost": round(float(row.total_cpu_cost or 0.0), 6),
+                        "memory_cost": round(float(row.total_memory_cost or 0.0), 6),
+                        "network_cost": round(float(row.total_network_cost or 0.0), 6),
+                        "storage_cost": round(float(row.total_storage_cost or 0.0), 6)
                     }
-                    
-                    deployment_costs.append(deployment_summary)
-                    
-                    # Add to totals
-                    total_cpu_hours += deployment_cpu_hours
-                    total_memory_gb_hours += deployment_memory_gb_hours
-                    total_network_gb += deployment_network_gb
-                    total_requests += activity_count
+                }
+                
+                deployment_costs.append(deployment_summary)
+                
+                # Add to totals
+                total_cpu_hours += deployment_cpu_hours
+                total_memory_gb_hours += deployment_memory_gb_hours
+                total_network_gb += deployment_network_gb
+                total_requests += activity_count
             
             return {
                 "deployments": deployment_costs,
@@ -241,16 +254,18 @@ class EnhancedBillingService:
             
             # Get daily costs for trend analysis
             daily_costs = self.db.query(
-                func.date(ContainerResourceUsage.snapshot_timestamp).label('date'),
-                func.sum(ContainerResourceUsage.total_cost).label('daily_cost')
-            ).join(AgentDeployment).join(Hiring).filter(
+                UsageAggregation.period_start.label('date'),
+                func.sum(UsageAggregation.total_cost).label('daily_cost')
+            ).filter(
                 and_(
-                    Hiring.user_id == user_id,
-                    ContainerResourceUsage.snapshot_timestamp >= start_date,
-                    ContainerResourceUsage.snapshot_timestamp <= end_date
+                    UsageAggregation.user_id == user_id,
+                    UsageAggregation.aggregation_period == "daily",
+                    UsageAggregation.hiring_id > 0,
+                    UsageAggregation.period_start >= period_bucket_start(start_date, "daily"),
+                    UsageAggregation.period_start <= end_date
                 )
-            ).group_by(func.date(ContainerResourceUsage.snapshot_timestamp)).order_by(
-                func.date(ContainerResourceUsage.snapshot_timestamp)
+            ).group_by(UsageAggregation.period_start).order_by(
+                UsageAggregation.period_start
             ).all()
             
             # Calculate trends
@@ -277,7 +292,7 @@ class EnhancedBillingService:
                     "projected_monthly_cost": round(projected_monthly, 6),
                     "daily_breakdown": [
                         {
-                            "date": d.date.isoformat(),
+                            "date": d.date.date().isoformat(),
                             "cost": round(d.daily_cost or 0, 6)
                         } for d in daily_costs
                     ]
@@ -372,61 +387,49 @@ class EnhancedBillingService:
             return {"error": f"Failed to get daily usage: {str(e)}"}
     
     async def _get_hourly_breakdown(self, user_id: int, date: datetime) -> List[Dict[str, Any]]:
-        """Get hourly breakdown for a specific date."""
+        """Get hourly breakdown for a specific date from the hourly usage rollups."""
         try:
-            date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            hourly_breakdown = []
+            date_start = period_bucket_start(date, "daily")
+            date_end = date_start + timedelta(days=1)
             
+            # Rollup CPU-hours and GB-hours of a single hour equal the average
+            # CPU fraction and GB over that hour
+            hour_rows = self.db.query(
+                UsageAggregation.period_start,
+                func.sum(UsageAggregation.total_cost).label("total_cost"),
+                func.sum(UsageAggregation.total_cpu_hours).label("cpu_hours"),
+                func.sum(UsageAggregation.total_memory_gb_hours).label("memory_gb_hours")
+            ).filter(
+                and_(
+                    UsageAggregation.user_id == user_id,
+                    UsageAggregation.aggregation_period == "hourly",
+                    UsageAggregation.hiring_id > 0,
+                    UsageAggregation.period_start >= date_start,
+                    UsageAggregation.period_start < date_end
+                )
+            ).group_by(UsageAggregation.period_start).all()
+            usage_by_hour = {period_bucket_start(row.period_start, "hourly").hour: row for row in hour_rows}
+            
+            requests_by_hour = [0] * 24
+            for (activity_timestamp,) in self.db.query(AgentActivityLog.activity_timestamp).filter(
+                and_(
+                    AgentActivityLog.user_id == user_id,
+                    AgentActivityLog.activity_timestamp >= date_start,
+                    AgentActivityLog.activity_timestamp < date_end
+                )
+            ):
+                requests_by_hour[period_bucket_start(activity_timestamp, "hourly").hour] += 1
+            
+            hourly_breakdown = []
             for hour in range(24):
-                hour_start = date_start + timedelta(hours=hour)
-                hour_end = hour_start + timedelta(hours=1)
-                
-                # Get all deployments active in this hour
-                deployments = self.db.query(AgentDeployment).join(Hiring).filter(
-                    and_(
-                        Hiring.user_id == user_id,
-                        AgentDeployment.created_at <= hour_end,
-                        or_(
-                            AgentDeployment.stopped_at.is_(None),
-                            AgentDeployment.stopped_at > hour_start
-                        )
-                    )
-                ).all()
-                
-                hour_total_cost = 0.0
-                hour_total_cpu = 0.0
-                hour_total_memory = 0.0
-                hour_total_requests = 0
-                
-                for deployment in deployments:
-                    # Get hourly usage for this deployment
-                    hourly_usage = self.resource_tracker.calculate_hourly_usage(
-                        deployment.deployment_id, hour_start
-                    )
-                    
-                    if hourly_usage.get("snapshots_count", 0) > 0:
-                        hour_total_cost += hourly_usage["total_cost"]
-                        hour_total_cpu += hourly_usage["average_cpu_percent"]
-                        hour_total_memory += hourly_usage["average_memory_gb"]
-                
-                # Get activity count for this hour
-                hour_requests = self.db.query(AgentActivityLog).filter(
-                    and_(
-                        AgentActivityLog.user_id == user_id,
-                        AgentActivityLog.activity_timestamp >= hour_start,
-                        AgentActivityLog.activity_timestamp < hour_end
-                    )
-                ).count()
-                
-                hour_total_requests += hour_requests
-                
+                usage = usage_by_hour.get(hour)
                 hourly_breakdown.append({
                     "hour": hour,
                     "time_range": f"{hour:02d}:00-{(hour+1):02d}:00",
-                    "total_cost": round(hour_total_cost, 6),
-                    "avg_cpu_percent": round(hour_total_cpu, 2),
-                    "avg_memory_gb": round(hour_total_memory, 4),
-                    "requests": hour_total_requests
+                    "total_cost": round(float(usage.total_cost or 0.0), 6) if usage else 0.0,
+                    "avg_cpu_percent": round(float(usage.cpu_hours or 0.0) * 100.0, 2) if usage else 0.0,
+                    "avg_memory_gb": round(float(usage.memory_gb_hours or 0.0), 4) if usage else 0.0,
+                    "requests": requests_by_hour[hour]
                 })
             
             return hourly_breakdown
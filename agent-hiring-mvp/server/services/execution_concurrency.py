@@ -0,0 +1,140 @@
+"""Per-deployment concurrency control for container executions."""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+from ..config import MAX_CONCURRENT_EXECUTIONS_PER_DEPLOYMENT, EXECUTION_SLOT_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class DeploymentBusyError(Exception):
+    """Raised when no execution slot became available within the timeout."""
+
+
+class _DeploymentSlots:
+    """Shared/exclusive execution slots for a single deployment."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.exclusive = False
+        self.waiting_exclusive = 0
+        self.condition = threading.Condition()
+
+
+class DeploymentConcurrencyController:
+    """
+    Bounds parallel executions against a single deployment.
+
+    Stateless executions (function agents, persistent ``execute`` calls) take a
+    shared slot, so up to ``max_concurrent`` of them run in parallel. Operations
+    that replace the whole persistent state (``initialize``, ``cleanup``) take an
+    exclusive slot, which waits for in-flight executions to drain and blocks new
+    ones until it completes. Concurrent writes of ``execute`` calls to persistent
+    state are reconciled inside the container with optimistic versioning.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_EXECUTIONS_PER_DEPLOYMENT):
+        self.max_concurrent = max(1, max_concurrent)
+        self._deployments: Dict[str, _DeploymentSlots] = {}
+        self._lock = threading.Lock()
+
+    def _get_slots(self, deployment_id: str) -> _DeploymentSlots:
+        with self._lock:
+            slots = self._deployments.get(deployment_id)
+            if slots is None:
+                slots = _DeploymentSlots(self.max_concurrent)
+                self._deployments[deployment_id] = slots
+            return slots
+
+    @contextmanager
+    def execution_slot(self, deployment_id: str, exclusive: bool = False,
+                       timeout: Optional[float] = EXECUTION_SLOT_TIMEOUT_SECONDS):
+        """
+        Hold an execution slot for a deployment for the duration of the block.
+
+        Args:
+            deployment_id: Deployment the execution runs against
+            exclusive: Whether the operation must run alone (state initialize/cleanup)
+            timeout: Maximum seconds to wait for a slot
+
+        Raises:
+            DeploymentBusyError: If no slot became available within the timeout
+        """
+        slots = self._get_slots(deployment_id)
+        deadline = time.monotonic() + timeout if timeout else None
+
+        with slots.condition:
+            if exclusive:
+                slots.waiting_exclusive += 1
+                try:
+                    while slots.exclusive or slots.active > 0:
+                        if not self._wait(slots, deadline):
+                            raise DeploymentBusyError(f"Deployment {deployment_id} is busy")
+                finally:
+                    slots.waiting_exclusive -= 1
+                slots.exclusive = True
+            else:
+                # Give queued exclusive operations priority so they are not starved
+                while slots.exclusive or slots.waiting_exclusive > 0 or slots.active >= slots.limit:
+                    if not self._wait(slots, deadline):
+                        if slots.exclusive or slots.waiting_exclusive > 0:
+                            raise DeploymentBusyError(
+                                f"Deployment {deployment_id} is busy with a state initialize/cleanup operation"
+                            )
+                        raise DeploymentBusyError(
+                            f"Deployment {deployment_id} has {slots.active} executions in flight "
+                            f"(limit {slots.limit})"
+                        )
+                slots.active += 1
+
+        try:
+            yield
+        finally:
+            with slots.condition:
+                if exclusive:
+                    slots.exclusive = False
+                else:
+                    slots.active -= 1
+                slots.condition.notify_all()
+
+    @staticmethod
+    def _wait(slots: _DeploymentSlots, deadline: Optional[float]) -> bool:
+        if deadline is None:
+            slots.condition.wait()
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        slots.condition.wait(remaining)
+        return True
+
+    def forget_deployment(self, deployment_id: str) -> None:
+        """Drop the slot bookkeeping of a stopped deployment if it is idle."""
+        with self._lock:
+            slots = self._deployments.get(deployment_id)
+            if slots and slots.active == 0 and not slots.exclusive and slots.waiting_exclusive == 0:
+                del self._deployments[deployment_id]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get in-flight execution counts per deployment."""
+        with self._lock:
+            return {
+                "max_concurrent_per_deployment": self.max_concurrent,
+                "deployments": {
+                    deployment_id: {
+                        "active": slots.active,
+                        "exclusive": slots.exclusive,
+                        "waiting_exclusive": slots.waiting_exclusive
+                    }
+                    for deployment_id, slots in self._deployments.items()
+                }
+            }
+
+
+# Global controller instance shared by the deployment services
+concurrency_controller = DeploymentConcurrencyController()
@@ -0,0 +1,272 @@
+"""Push notifications of execution status transitions."""
+
+import asyncio
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Optional, Set
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from ..config import (
+    EXECUTION_EVENTS_QUEUE_SIZE,
+    EXECUTION_EVENTS_POLL_SECONDS,
+    EXECUTION_EVENTS_POLL_MAX_SECONDS,
+    EXECUTION_EVENTS_POLL_OVERLAP_SECONDS
+)
+from ..database.config import get_session
+from ..models.execution import Execution
+from .commit_hooks import register_commit_hook
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_EXECUTION_STATUSES = {"completed", "failed", "timeout", "cancelled"}
+
+# Last published status per execution, kept to publish every transition once
+_STATUS_HISTORY_SIZE = 10000
+
+
+@dataclass
+class ExecutionSubscription:
+    """A subscriber's queue of execution events, bound to the event loop it was created on."""
+    subscription_id: int
+    user_id: int
+    execution_id: Optional[str]
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    dropped: int = 0
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait for the next event; returns None if none arrived within the timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ExecutionEventBus:
+    """
+    Fans out execution status transitions to streaming subscribers.
+
+    Status changes are committed from request handlers, hiring threads with
+    their own event loops and executor threads, so ``publish`` is thread-safe
+    and hands events to each subscriber's loop with ``call_soon_threadsafe``.
+    Subscribers either follow one execution or every execution of a user.
+    A slow subscriber's queue is bounded; events that do not fit are dropped
+    and counted, and the stream re-reads the status from the database.
+
+    The bus is process-local: ``ExecutionChangePoller`` publishes the
+    transitions committed by other processes. An execution's status is only
+    published when it differs from the last one published, so a transition
+    seen both by the ORM hook and by the poller reaches subscribers once.
+    """
+
+    def __init__(self, queue_size: int = EXECUTION_EVENTS_QUEUE_SIZE):
+        self.queue_size = max(1, queue_size)
+        self._subscriptions: Dict[int, ExecutionSubscription] = {}
+        self._ids = itertools.count(1)
+        self._last_statuses: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int, execution_id: Optional[str] = None) -> ExecutionSubscription:
+        """Subscribe to the events of one execution, or of all executions of a user (call from the event loop)."""
+        subscription = ExecutionSubscription(
+            subscription_id=next(self._ids),
+            user_id=user_id,
+            execution_id=execution_id,
+            loop=asyncio.get_event_loop(),
+            queue=asyncio.Queue(maxsize=self.queue_size)
+        )
+        with self._lock:
+            self._subscriptions[subscription.subscription_id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscription: ExecutionSubscription) -> None:
+        with self._lock:
+            self._subscriptions.pop(subscription.subscription_id, None)
+
+    def publish(self, execution_event: Dict[str, Any]) -> bool:
+        """
+        Deliver an execution event to every matching subscriber (callable from any thread).
+
+        Returns:
+            False if the event repeats the last published status of its execution
+        """
+        execution_id = execution_event.get("execution_id")
+        with self._lock:
+            if self._last_statuses.get(execution_id) == execution_event.get("status"):
+                return False
+            self._last_statuses[execution_id] = execution_event.get("status")
+            self._last_statuses.move_to_end(execution_id)
+            while len(self._last_statuses) > _STATUS_HISTORY_SIZE:
+                self._last_statuses.popitem(last=False)
+            subscriptions = [
+                s for s in self._subscriptions.values()
+                if s.user_id == execution_event.get("user_id")
+                and (s.execution_id is None or s.execution_id == execution_event.get("execution_id"))
+            ]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(self._deliver, subscription, execution_event)
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(subscription)
+        return True
+
+    def subscribed_user_ids(self) -> Set[int]:
+        with self._lock:
+            return {s.user_id for s in self._subscriptions.values()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        return {
+            "subscriptions": len(subscriptions),
+            "execution_subscriptions": sum(1 for s in subscriptions if s.execution_id),
+            "user_subscriptions": sum(1 for s in subscriptions if not s.execution_id),
+            "dropped_events": sum(s.dropped for s in subscriptions)
+        }
+
+    @staticmethod
+    def _deliver(subscription: ExecutionSubscription, execution_event: Dict[str, Any]) -> None:
+        try:
+            subscription.queue.put_nowait(execution_event)
+        except asyncio.QueueFull:
+            subscription.dropped += 1
+
+
+def execution_event_from(execution: Execution) -> Dict[str, Any]:
+    """Build the event payload for the current state of an execution."""
+    status = getattr(execution.status, "value", execution.status)
+    return {
+        "execution_id": execution.execution_id,
+        "status": status,
+        "user_id": execution.user_id,
+        "agent_id": execution.agent_id,
+        "hiring_id": execution.hiring_id,
+        "execution_type": execution.execution_type,
+        "error_message": execution.error_message,
+        "terminal": status in TERMINAL_EXECUTION_STATUSES,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+# Status changes are captured at the ORM level, so every code path that
+# commits a new execution status (ExecutionService, DeploymentService and the
+# hiring threads) publishes without having to call the bus itself. Events are
+# collected at flush time and only published once the transaction commits.
+
+def _collect_execution_events(session: Session):
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, Execution) and inspect(instance).attrs.status.history.has_changes():
+            yield instance.execution_id, execution_event_from(instance)
+
+
+def _publish_execution_events(pending) -> None:
+    for execution_event in pending.values():
+        try:
+            execution_event_bus.publish(execution_event)
+        except Exception as e:
+            logger.warning(f"Failed to publish execution event for {execution_event.get('execution_id')}: {e}")
+
+
+register_commit_hook("execution_events", _collect_execution_events, _publish_execution_events)
+
+
+class ExecutionChangePoller:
+    """
+    Publishes status transitions committed by other processes to this process's bus.
+
+    Queue workers in other processes commit transitions that never reach this
+    process's ORM hook. One poller per API process reads the executions of
+    all subscribed users that changed since its last read, with a single
+    query per interval however many streams are open, and only while there
+    are subscribers. Intervals without changes back off from
+    ``poll_seconds`` to ``max_poll_seconds``; a new subscriber or a change
+    resets them. Each read reaches ``overlap_seconds`` behind the newest
+    change seen, for commits that land late or clocks that differ between
+    hosts; what is re-read is dropped by the bus as already published.
+    """
+
+    def __init__(self, bus: ExecutionEventBus,
+                 poll_seconds: float = EXECUTION_EVENTS_POLL_SECONDS,
+                 max_poll_seconds: float = EXECUTION_EVENTS_POLL_MAX_SECONDS,
+                 overlap_seconds: float = EXECUTION_EVENTS_POLL_OVERLAP_SECONDS):
+        self.bus = bus
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max(poll_seconds, max_poll_seconds)
+        self.overlap_seconds = overlap_seconds
+        self._watermark: Optional[datetime] = None
+        self._running = False
+
+    async def run(self) -> None:
+        """Poll until stopped or cancelled."""
+        loop = asyncio.get_event_loop()
+        self._running = True
+        interval = self.poll_seconds
+        subscribed = set()
+        while self._running:
+            await asyncio.sleep(interval)
+            user_ids = self.bus.subscribed_user_ids()
+            if not user_ids:
+                # Nobody is listening; start again from now once somebody is
+                self._watermark = None
+                interval = self.poll_seconds
+                subscribed = set()
+                continue
+            try:
+                published = await loop.run_in_executor(None, self.poll, user_ids)
+            except Exception as e:
+                logger.warning(f"Failed to poll execution status changes: {e}")
+                published = 0
+            if published or not user_ids <= subscribed:
+                interval = self.poll_seconds
+            else:
+                interval = min(interval * 2, self.max_poll_seconds)
+            subscribed = user_ids
+
+    def stop(self) -> None:
+        self._running = False
+
+    def poll(self, user_ids: Set[int]) -> int:
+        """Publish the changed executions of the given users. Returns the number of new transitions."""
+        now = datetime.now(timezone.utc)
+        if self._watermark is None:
+            self._watermark = now
+        since = self._watermark - timedelta(seconds=self.overlap_seconds)
+
+        db = get_session()
+        try:
+            executions = db.query(Execution).filter(
+                Execution.updated_at >= since,
+                Execution.user_id.in_(user_ids)
+            ).order_by(Execution.updated_at).all()
+            execution_events = [execution_event_from(execution) for execution in executions]
+            if executions:
+                self._watermark = max(self._watermark, _as_utc(executions[-1].updated_at))
+        finally:
+            db.close()
+
+        published = 0
+        for execution_event in execution_events:
+            if self.bus.publish(execution_event):
+                published += 1
+        return published
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for timezone-aware columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+# Global event bus instance shared by the execution API and the ORM hooks
+execution_event_bus = ExecutionEventBus()
+
+# Poller run by the server lifespan of API processes
+execution_change_poller = ExecutionChangePoller(execution_event_bus)
@@ -0,0 +1,435 @@
+"""Durable execution queue backed by the application database."""
+
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional
+
+from sqlalchemy import func, select, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from ..config import (
+    MAX_EXECUTION_TIME,
+    EXECUTION_QUEUE_LEASE_SECONDS,
+    EXECUTION_QUEUE_MAX_ATTEMPTS,
+    EXECUTION_QUEUE_MAX_PER_USER,
+    EXECUTION_QUEUE_MAX_PER_AGENT,
+    EXECUTION_QUEUE_RETRY_DELAY_SECONDS
+)
+from ..models.execution import Execution, ExecutionStatus, ExecutionJob, ExecutionJobStatus
+from .execution_events import TERMINAL_EXECUTION_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Queued jobs inspected per claim
+CLAIM_SCAN_LIMIT = 50
+
+
+def make_worker_id() -> str:
+    """Get a worker id of the form ``host:pid:suffix``."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _worker_process_alive(worker_id: Optional[str]) -> bool:
+    # Only processes on this host can be checked; others are assumed alive
+    # and are recovered once their lease expires
+    try:
+        host, pid, _ = worker_id.split(":", 2)
+        if host != socket.gethostname():
+            return True
+        os.kill(int(pid), 0)
+    except (AttributeError, ValueError):
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@dataclass
+class ClaimedJob:
+    """A job claimed by a worker, detached from the session that claimed it."""
+    job_id: int
+    execution_id: str
+    execution_type: str
+    user_id: Optional[int]
+    agent_id: str
+    attempts: int
+    worker_id: str
+
+
+class ExecutionQueue:
+    """
+    Persistent queue of executions, shared by API nodes and worker processes.
+
+    ``POST /execution/{id}/run`` only enqueues a job; workers claim jobs, run
+    them and hold a lease on each claimed job that they renew while the
+    execution runs. A job whose lease expires (the worker crashed or lost its
+    database connection) is queued again until it runs out of attempts.
+
+    Claiming is a conditional UPDATE that only succeeds while the job is still
+    queued and its user and agent are below their running-job limits, so
+    concurrent workers never claim the same job. On PostgreSQL, candidate rows
+    are read with ``FOR UPDATE SKIP LOCKED`` so workers do not queue up behind
+    each other's claims.
+    """
+
+    def __init__(self, db: Session,
+                 lease_seconds: int = EXECUTION_QUEUE_LEASE_SECONDS,
+                 max_attempts: int = EXECUTION_QUEUE_MAX_ATTEMPTS,
+                 max_per_user: int = EXECUTION_QUEUE_MAX_PER_USER,
+                 max_per_agent: int = EXECUTION_QUEUE_MAX_PER_AGENT,
+                 retry_delay: int = EXECUTION_QUEUE_RETRY_DELAY_SECONDS):
+        self.db = db
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.max_per_user = max_per_user
+        self.max_per_agent = max_per_agent
+        self.retry_delay = retry_delay
+
+    def enqueue(self, execution: Execution) -> ExecutionJob:
+        """
+        Queue an execution for a worker.
+
+        Enqueueing is idempotent: an execution that is already queued or
+        running keeps its job, and a finished job is queued again.
+        """
+        now = datetime.now(timezone.utc)
+        job = self._get_job(execution.execution_id)
+        if job is not None and job.status in (ExecutionJobStatus.QUEUED.value, ExecutionJobStatus.CLAIMED.value):
+            return job
+
+        try:
+            if job is None:
+                job = ExecutionJob(
+                    execution_id=execution.execution_id,
+                    execution_type=execution.execution_type or "run",
+                    user_id=execution.user_id,
+                    agent_id=execution.agent_id,
+                    status=ExecutionJobStatus.QUEUED.value,
+                    attempts=0,
+                    max_attempts=self.max_attempts,
+                    available_at=now
+                )
+                self.db.add(job)
+            else:
+                job.status = ExecutionJobStatus.QUEUED.value
+                job.attempts = 0
+                job.max_attempts = self.max_attempts
+                job.available_at = now
+                job.worker_id = None
+                job.lease_expires_at = None
+                job.last_error = None
+                job.finished_at = None
+            self.db.commit()
+        except IntegrityError:
+            # Enqueued concurrently by another request
+            self.db.rollback()
+            job = self._get_job(execution.execution_id)
+
+        logger.info(f"Execution {execution.execution_id} queued")
+        return job
+
+    def add_jobs(self, executions: List[Dict[str, Any]]) -> None:
+        """
+        Queue new executions without committing.
+
+        Used for batches, so the jobs are created in the same transaction as
+        their executions; the caller commits.
+
+        Args:
+            executions: Execution rows with execution_id, execution_type, user_id and agent_id
+        """
+        now = datetime.now(timezone.utc)
+        self.db.bulk_insert_mappings(ExecutionJob, [
+            {
+                "execution_id": execution["execution_id"],
+                "execution_type": execution.get("execution_type") or "run",
+                "user_id": execution.get("user_id"),
+                "agent_id": execution["agent_id"],
+                "status": ExecutionJobStatus.QUEUED.value,
+                "attempts": 0,
+                "max_attempts": self.max_attempts,
+                "available_at": now,
+                "created_at": now,
+                "updated_at": now
+            }
+            for execution in executions
+        ])
+
+    def claim(self, worker_id: str) -> Optional[ClaimedJob]:
+        """
+        Claim the oldest runnable job whose user and agent are below their limits.
+
+        Returns:
+            The claimed job, or None if no job can run right now
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            # Skip users and agents at their limit in SQL, so a large backlog of
+            # one user (e.g. a batch) does not hide other users' jobs
+            saturated_users = [
+                user_id for user_id, running in self._running_counts(ExecutionJob.user_id)
+                if user_id is not None and running >= self.max_per_user
+            ]
+            saturated_agents = [
+                agent_id for agent_id, running in self._running_counts(ExecutionJob.agent_id)
+                if running >= self.max_per_agent
+            ]
+
+            candidates = self.db.query(ExecutionJob).filter(
+                ExecutionJob.status == ExecutionJobStatus.QUEUED.value,
+                ExecutionJob.available_at <= now
+            )
+            if saturated_users:
+                candidates = candidates.filter(or_(
+                    ExecutionJob.user_id.is_(None), ExecutionJob.user_id.notin_(saturated_users)
+                ))
+            if saturated_agents:
+                candidates = candidates.filter(ExecutionJob.agent_id.notin_(saturated_agents))
+            candidates = candidates.order_by(ExecutionJob.available_at, ExecutionJob.id).limit(CLAIM_SCAN_LIMIT)
+            if self.db.get_bind().dialect.name == "postgresql":
+                candidates = candidates.with_for_update(skip_locked=True)
+
+            for candidate in candidates.all():
+                if self._try_claim(candidate, worker_id, now):
+                    claimed = ClaimedJob(
+                        job_id=candidate.id,
+                        execution_id=candidate.execution_id,
+                        execution_type=candidate.execution_type,
+                        user_id=candidate.user_id,
+                        agent_id=candidate.agent_id,
+                        attempts=candidate.attempts + 1,
+                        worker_id=worker_id
+                    )
+                    self.db.commit()
+                    logger.info(f"Worker {worker_id} claimed execution {claimed.execution_id} (attempt {claimed.attempts})")
+                    return claimed
+
+            # Release the row locks taken while scanning
+            self.db.rollback()
+            return None
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def renew_lease(self, job: ClaimedJob) -> bool:
+        """Extend the lease of a claimed job; returns False if the worker no longer holds it."""
+        updated = self.db.query(ExecutionJob).filter(
+            ExecutionJob.id == job.job_id,
+            ExecutionJob.status == ExecutionJobStatus.CLAIMED.value,
+            ExecutionJob.worker_id == job.worker_id
+        ).update({
+            ExecutionJob.lease_expires_at: datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+        }, synchronize_session=False)
+        self.db.commit()
+        return bool(updated)
+
+    def complete(self, job: ClaimedJob) -> bool:
+        """Mark a claimed job as done; returns False if the worker no longer holds it."""
+        updated = self.db.query(ExecutionJob).filter(
+            ExecutionJob.id == job.job_id,
+            ExecutionJob.status == ExecutionJobStatus.CLAIMED.value,
+            ExecutionJob.worker_id == job.worker_id
+        ).update({
+            ExecutionJob.status: ExecutionJobStatus.DONE.value,
+            ExecutionJob.lease_expires_at: None,
+            ExecutionJob.finished_at: datetime.now(timezone.utc)
+        }, synchronize_session=False)
+        self.db.commit()
+        return bool(updated)
+
+    def fail(self, job: ClaimedJob, error: str) -> bool:
+        """
+        Record a failed attempt of a claimed job.
+
+        Returns:
+            True if the job was queued again for a retry, False if it was given up
+        """
+        db_job = self.db.query(ExecutionJob).filter(
+            ExecutionJob.id == job.job_id,
+            ExecutionJob.status == ExecutionJobStatus.CLAIMED.value,
+            ExecutionJob.worker_id == job.worker_id
+        ).first()
+        if db_job is None:
+            # The lease expired and the job was taken over in the meantime
+            return False
+        return self._release(db_job, error) == "requeued"
+
+    def recover(self) -> Dict[str, int]:
+        """
+        Requeue or give up jobs of workers that went away.
+
+        A claimed job is recovered when its lease expired, or immediately when
+        it was claimed by a process on this host that no longer exists (e.g.
+        the worker is being restarted). Executions left ``running`` without a
+        job (started before the queue was enabled, or by a process that was
+        killed) are marked failed once they exceed the maximum execution time.
+        """
+        now = datetime.now(timezone.utc)
+        requeued = 0
+        given_up = 0
+        try:
+            claimed_jobs = self.db.query(ExecutionJob).filter(
+                ExecutionJob.status == ExecutionJobStatus.CLAIMED.value
+            ).all()
+            for job in claimed_jobs:
+                lease_expired = job.lease_expires_at is None or _as_utc(job.lease_expires_at) < now
+                if not lease_expired and _worker_process_alive(job.worker_id):
+                    continue
+                outcome = self._release(job, f"Worker {job.worker_id} stopped while running the execution")
+                if outcome == "requeued":
+                    requeued += 1
+                elif outcome == "given_up":
+                    given_up += 1
+
+            orphaned = self.db.query(Execution).outerjoin(
+                ExecutionJob, ExecutionJob.execution_id == Execution.execution_id
+            ).filter(
+                Execution.status == ExecutionStatus.RUNNING.value,
+                ExecutionJob.id.is_(None),
+                or_(Execution.started_at.is_(None), Execution.started_at < datetime.utcnow() - timedelta(seconds=MAX_EXECUTION_TIME))
+            ).all()
+            for execution in orphaned:
+                execution.status = ExecutionStatus.FAILED.value
+                execution.error_message = "Execution was interrupted and did not finish"
+                execution.completed_at = datetime.utcnow()
+            if orphaned:
+                self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if requeued or given_up or orphaned:
+            logger.warning(
+                f"Recovered execution queue: {requeued} jobs requeued, {given_up} given up, "
+                f"{len(orphaned)} orphaned executions failed"
+            )
+        return {"requeued": requeued, "given_up": given_up, "orphaned": len(orphaned)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of jobs per status and the age of the oldest queued job."""
+        counts = dict(
+            self.db.query(ExecutionJob.status, func.count(ExecutionJob.id)).group_by(ExecutionJob.status).all()
+        )
+        oldest = self.db.query(func.min(ExecutionJob.available_at)).filter(
+            ExecutionJob.status == ExecutionJobStatus.QUEUED.value
+        ).scalar()
+        return {
+            "jobs": {status.value: counts.get(status.value, 0) for status in ExecutionJobStatus},
+            "oldest_queued_seconds": (
+                max(0.0, (datetime.now(timezone.utc) - _as_utc(oldest)).total_seconds()) if oldest else 0.0
+            ),
+            "limits": {
+                "max_per_user": self.max_per_user,
+                "max_per_agent": self.max_per_agent,
+                "lease_seconds": self.lease_seconds,
+                "max_attempts": self.max_attempts
+            }
+        }
+
+    def _try_claim(self, candidate: ExecutionJob, worker_id: str, now: datetime) -> bool:
+        # The limits are re-checked inside the UPDATE, so jobs claimed by other
+        # workers since the counts were read are taken into account
+        running = aliased(ExecutionJob)
+        conditions = [
+            ExecutionJob.id == candidate.id,
+            ExecutionJob.status == ExecutionJobStatus.QUEUED.value,
+            select(func.count(running.id)).where(
+                running.agent_id == candidate.agent_id,
+                running.status == ExecutionJobStatus.CLAIMED.value
+            ).scalar_subquery() < self.max_per_agent
+        ]
+        if candidate.user_id is not None:
+            conditions.append(
+                select(func.count(running.id)).where(
+                    running.user_id == candidate.user_id,
+                    running.status == ExecutionJobStatus.CLAIMED.value
+                ).scalar_subquery() < self.max_per_user
+            )
+
+        updated = self.db.query(ExecutionJob).filter(*conditions).update({
+            ExecutionJob.status: ExecutionJobStatus.CLAIMED.value,
+            ExecutionJob.worker_id: worker_id,
+            ExecutionJob.attempts: ExecutionJob.attempts + 1,
+            ExecutionJob.lease_expires_at: now + timedelta(seconds=self.lease_seconds)
+        }, synchronize_session=False)
+        return bool(updated)
+
+    def _release(self, job: ExecutionJob, error: str) -> Optional[str]:
+        # Queue the job again with exponential backoff, or give it up and fail
+        # the execution once it ran out of attempts. The update only applies
+        # to the claim that was read, so two workers recovering the same job
+        # cannot undo a newer claim.
+        now = datetime.now(timezone.utc)
+        execution = self.db.query(Execution).filter(Execution.execution_id == job.execution_id).first()
+
+        if execution is not None and execution.status in TERMINAL_EXECUTION_STATUSES:
+            # The execution finished before its worker could mark the job done
+            outcome = "done"
+            values = {
+                ExecutionJob.status: ExecutionJobStatus.DONE.value,
+                ExecutionJob.finished_at: now
+            }
+        elif job.attempts < job.max_attempts:
+            outcome = "requeued"
+            values = {
+                ExecutionJob.status: ExecutionJobStatus.QUEUED.value,
+                ExecutionJob.available_at: now + timedelta(seconds=self.retry_delay * 2 ** max(0, job.attempts - 1))
+            }
+        else:
+            outcome = "given_up"
+            values = {
+                ExecutionJob.status: ExecutionJobStatus.FAILED.value,
+                ExecutionJob.finished_at: now
+            }
+        values.update({
+            ExecutionJob.worker_id: None,
+            ExecutionJob.lease_expires_at: None,
+            ExecutionJob.last_error: error
+        })
+
+        updated = self.db.query(ExecutionJob).filter(
+            ExecutionJob.id == job.id,
+            ExecutionJob.status == ExecutionJobStatus.CLAIMED.value,
+            ExecutionJob.worker_id == job.worker_id,
+            ExecutionJob.attempts == job.attempts
+        ).update(values, synchronize_session=False)
+        if not updated:
+            self.db.rollback()
+            return None
+
+        if execution is not None and outcome == "requeued":
+            execution.status = ExecutionStatus.PENDING.value
+        elif execution is not None and outcome == "given_up":
+            execution.status = ExecutionStatus.FAILED.value
+            execution.error_message = f"{error} (gave up after {job.attempts} attempts)"
+            execution.completed_at = datetime.utcnow()
+        self.db.commit()
+
+        if outcome != "done":
+            logger.warning(
+                f"Execution {job.execution_id} attempt {job.attempts} failed: {error}; "
+                f"{'retrying' if outcome == 'requeued' else 'giving up'}"
+            )
+        return outcome
+
+    def _running_counts(self, column):
+        return self.db.query(column, func.count(ExecutionJob.id)).filter(
+            ExecutionJob.status == ExecutionJobStatus.CLAIMED.value
+        ).group_by(column).all()
+
+    def _get_job(self, execution_id: str) -> Optional[ExecutionJob]:
+        return self.db.query(ExecutionJob).filter(ExecutionJob.execution_id == execution_id).first()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for timezone-aware columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
@@ -0,0 +1,238 @@
+"""Result cache for deterministic agents, keyed by agent version and canonical input."""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Iterable, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import (
+    EXECUTION_RESULT_CACHE_ENABLED,
+    EXECUTION_RESULT_CACHE_DEFAULT_TTL_SECONDS,
+    EXECUTION_RESULT_CACHE_MAX_TTL_SECONDS
+)
+from ..models.agent import Agent
+from ..models.execution import Execution, ExecutionResultCacheEntry, ExecutionResultCacheUse
+from .agent_manifest_cache import agent_manifest_cache
+
+logger = logging.getLogger(__name__)
+
+# Container log line of executions served from the cache
+RESULT_CACHE_HIT_LOG = "Served from result cache"
+
+RESULT_CACHE_SCOPES = ("hiring", "agent")
+
+
+@dataclass
+class ResultCachePolicy:
+    """Result cache settings declared by an agent."""
+    ttl_seconds: int
+    scope: str  # "hiring": per hiring, "agent": shared by all hirings of the agent version
+
+
+def canonical_input_hash(input_data: Optional[Dict[str, Any]]) -> str:
+    """Hash input data independently of key order and whitespace."""
+    canonical = json.dumps(input_data or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def served_from_cache(db: Session, execution_ids: Iterable[str]) -> Dict[str, str]:
+    """Map the given executions whose output came from the result cache to the execution that produced it."""
+    execution_ids = list(execution_ids)
+    if not execution_ids:
+        return {}
+    rows = db.query(ExecutionResultCacheUse.execution_id, ExecutionResultCacheUse.source_execution_id).filter(
+        ExecutionResultCacheUse.execution_id.in_(execution_ids),
+        ExecutionResultCacheUse.source_execution_id.isnot(None)
+    ).all()
+    return {row.execution_id: row.source_execution_id for row in rows}
+
+
+class ExecutionResultCache:
+    """
+    Serves repeated inputs of deterministic function agents from stored outputs.
+
+    Agents opt in through ``result_cache`` in their config.json, either
+    ``true`` or ``{"ttl_seconds": 3600, "scope": "hiring" | "agent"}``.
+    Entries are keyed by agent id and version plus a canonical hash of the
+    input, so publishing a new agent version never serves old outputs. The
+    default ``hiring`` scope keeps outputs private to a hiring; ``agent``
+    shares them between all hirings of the agent version.
+
+    A bypassed execution still runs and refreshes the stored output. Bypasses
+    and hits are recorded per execution in ``ExecutionResultCacheUse``, so
+    neither the input the agent sees nor the execution logs carry them.
+    """
+
+    def __init__(self, enabled: bool = EXECUTION_RESULT_CACHE_ENABLED):
+        self.enabled = enabled
+
+    def get_policy(self, db: Session, agent: Agent) -> Optional[ResultCachePolicy]:
+        """Get the cache settings of an agent, or None if it does not use the result cache."""
+        if not self.enabled or agent is None or getattr(agent, "agent_type", "function") != "function":
+            # Persistent and ACP agents keep state between calls, so their outputs are not cacheable
+            return None
+
+        settings = agent_manifest_cache.get_config(db, agent).get("result_cache")
+
+        if settings is True:
+            settings = {}
+        if not isinstance(settings, dict) or not settings.get("enabled", True):
+            return None
+
+        try:
+            ttl_seconds = int(settings.get("ttl_seconds", EXECUTION_RESULT_CACHE_DEFAULT_TTL_SECONDS))
+        except (TypeError, ValueError):
+            ttl_seconds = EXECUTION_RESULT_CACHE_DEFAULT_TTL_SECONDS
+        scope = settings.get("scope", "hiring")
+        if scope not in RESULT_CACHE_SCOPES:
+            logger.warning(f"Agent {agent.id} declares unknown result cache scope '{scope}', using 'hiring'")
+            scope = "hiring"
+        return ResultCachePolicy(
+            ttl_seconds=max(1, min(ttl_seconds, EXECUTION_RESULT_CACHE_MAX_TTL_SECONDS)),
+            scope=scope
+        )
+
+    def lookup(self, db: Session, execution: Execution, agent: Agent) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored output for an execution's input.
+
+        Returns:
+            The cached entry as ``{"output_data", "source_execution_id"}``, or
+            None on a miss, a bypass or for agents without a result cache
+        """
+        if execution.execution_type != "run":
+            return None
+        policy = self.get_policy(db, agent)
+        if policy is None:
+            return None
+
+        use = db.query(ExecutionResultCacheUse).filter(
+            ExecutionResultCacheUse.execution_id == execution.execution_id
+        ).first()
+        if use is not None and use.bypassed:
+            self._record(agent.id, hit=False, reason="bypass")
+            return None
+
+        cache_key = self._cache_key(agent, policy, execution.hiring_id, canonical_input_hash(execution.input_data))
+        entry = db.query(ExecutionResultCacheEntry).filter(ExecutionResultCacheEntry.cache_key == cache_key).first()
+        now = datetime.now(timezone.utc)
+        if entry is None:
+            self._record(agent.id, hit=False, reason="absent")
+            return None
+        if _as_utc(entry.expires_at) <= now:
+            self._record(agent.id, hit=False, reason="expired")
+            return None
+
+        cached = {"output_data": entry.output_data, "source_execution_id": entry.source_execution_id}
+        db.query(ExecutionResultCacheEntry).filter(ExecutionResultCacheEntry.id == entry.id).update({
+            ExecutionResultCacheEntry.hit_count: ExecutionResultCacheEntry.hit_count + 1,
+            ExecutionResultCacheEntry.last_hit_at: now
+        }, synchronize_session=False)
+        if use is None:
+            db.add(ExecutionResultCacheUse(
+                execution_id=execution.execution_id, source_execution_id=entry.source_execution_id
+            ))
+        else:
+            use.source_execution_id = entry.source_execution_id
+        db.commit()
+
+        self._record(agent.id, hit=True)
+        return cached
+
+    def store(self, db: Session, execution: Execution, output_data: Optional[Dict[str, Any]]) -> bool:
+        """Store the output of a completed execution if its agent uses the result cache."""
+        if execution.execution_type != "run" or output_data is None:
+            return False
+        agent = db.query(Agent).filter(Agent.id == execution.agent_id).first()
+        policy = self.get_policy(db, agent)
+        if policy is None:
+            return False
+
+        input_hash = canonical_input_hash(execution.input_data)
+        cache_key = self._cache_key(agent, policy, execution.hiring_id, input_hash)
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=policy.ttl_seconds)
+
+        try:
+            entry = db.query(ExecutionResultCacheEntry).filter(ExecutionResultCacheEntry.cache_key == cache_key).first()
+            if entry is None:
+                db.add(ExecutionResultCacheEntry(
+                    cache_key=cache_key,
+                    agent_id=agent.id,
+                    agent_version=agent.version,
+                    hiring_id=execution.hiring_id if policy.scope == "hiring" else None,
+                    input_hash=input_hash,
+                    output_data=output_data,
+                    source_execution_id=execution.execution_id,
+                    expires_at=expires_at,
+                    hit_count=0
+                ))
+            else:
+                entry.output_data = output_data
+                entry.source_execution_id = execution.execution_id
+                entry.expires_at = expires_at
+            db.commit()
+        except IntegrityError:
+            # Stored concurrently by an execution with the same input
+            db.rollback()
+            return False
+        return True
+
+    @staticmethod
+    def bypass(db: Session, execution_ids: Iterable[str]) -> None:
+        """
+        Make new executions skip the cached outputs, without committing.
+
+        Called in the transaction that creates the executions; the caller commits.
+        """
+        now = datetime.now(timezone.utc)
+        db.bulk_insert_mappings(ExecutionResultCacheUse, [
+            {"execution_id": execution_id, "bypassed": True, "created_at": now, "updated_at": now}
+            for execution_id in execution_ids
+        ])
+
+    def invalidate(self, db: Session, agent_id: str, hiring_id: Optional[int] = None) -> int:
+        """Drop the cached outputs of an agent, or only those scoped to one hiring."""
+        query = db.query(ExecutionResultCacheEntry).filter(ExecutionResultCacheEntry.agent_id == agent_id)
+        if hiring_id is not None:
+            query = query.filter(ExecutionResultCacheEntry.hiring_id == hiring_id)
+        deleted = query.delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete expired entries."""
+        deleted = db.query(ExecutionResultCacheEntry).filter(
+            ExecutionResultCacheEntry.expires_at <= datetime.now(timezone.utc)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+    @staticmethod
+    def _cache_key(agent: Agent, policy: ResultCachePolicy, hiring_id: Optional[int], input_hash: str) -> str:
+        scope = f"hiring:{hiring_id}" if policy.scope == "hiring" else "agent"
+        return hashlib.sha256(f"{agent.id}\n{agent.version}\n{scope}\n{input_hash}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _record(agent_id: str, hit: bool, reason: str = "absent") -> None:
+        try:
+            from .prometheus_metrics import metrics_service
+            metrics_service.record_result_cache_lookup(agent_id, hit, reason)
+        except Exception as e:
+            # Metrics need Docker for the service to start; never fail an execution over them
+            logger.debug(f"Result cache metrics unavailable: {e}")
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for timezone-aware columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+# Global cache instance shared by the execution service
+execution_result_cache = ExecutionResultCache()
@@ -1,15 +1,17 @@
 """Execution service for managing agent execution."""
 
+import asyncio
 import logging
 import uuid
-import json
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from ..models.execution import Execution, ExecutionStatus
+from ..config import EXECUTION_BATCH_MAX_SIZE
+from ..models.execution import Execution, ExecutionStatus, ExecutionBatch, ExecutionBatchItem
 from ..models.agent import Agent, AgentStatus
 from ..models.hiring import Hiring
 from ..models.agent_file import AgentFile
@@ -18,6 +20,10 @@ from .persistent_agent_runtime import RuntimeStatus, RuntimeResult
 from .persistent_agent_runtime import PersistentAgentRuntimeService
 from .resource_manager import ResourceManager
 from .json_schema_validation_service import JSONSchemaValidationService
+from .execution_events import TERMINAL_EXECUTION_STATUSES
+from .agent_manifest_cache import agent_manifest_cache
+from .blob_store import blob_store
+from .execution_result_cache import execution_result_cache, served_from_cache, RESULT_CACHE_HIT_LOG
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +34,7 @@ class ExecutionCreateRequest(BaseModel):
     user_id: int  # Now required - comes from authentication
     input_data: Optional[Dict[str, Any]] = None
     execution_type: str = "run"  # "initialize", "run", or "cleanup"
+    use_cache: bool = True  # False forces a fresh run for agents that use the result cache
 
 
 class ExecutionService:
@@ -94,15 +101,39 @@ class ExecutionService:
     def create_execution(self, execution_data: ExecutionCreateRequest) -> Execution:
         """Create a new execution record."""
         execution_id = str(uuid.uuid4())
+        hiring = self._validate_execution_target(
+            execution_data.hiring_id, execution_data.user_id, execution_data.execution_type
+        )
+        
+        execution = Execution(
+            agent_id=hiring.agent_id,  # Get agent_id from hiring
+            hiring_id=execution_data.hiring_id,
+            user_id=execution_data.user_id,
+            status=ExecutionStatus.PENDING.value,
+            execution_type=execution_data.execution_type,
+            input_data=execution_data.input_data or {},
+            execution_id=execution_id,
+        )
         
+        self.db.add(execution)
+        if not execution_data.use_cache:
+            execution_result_cache.bypass(self.db, [execution_id])
+        self.db.commit()
+        self.db.refresh(execution)
+        
+        logger.info(f"Created execution: {execution_id} for user: {execution_data.user_id}")
+        return execution
+    
+    def _validate_execution_target(self, hiring_id: int, user_id: int, execution_type: str) -> Hiring:
+        """Check that the user may create executions of the given type for a hiring."""
         # Validate hiring exists
-        hiring = self.db.query(Hiring).filter(Hiring.id == execution_data.hiring_id).first()
+        hiring = self.db.query(Hiring).filter(Hiring.id == hiring_id).first()
         if not hiring:
             raise ValueError("Hiring not found")
         
         # For cleanup executions, allow any hiring status
         # For other executions, require active status
-        if execution_data.execution_type != "cleanup" and hiring.status != "active":
+        if execution_type != "cleanup" and hiring.status != "active":
             raise ValueError(f"Hiring is not active (status: {hiring.status})")
         
         # Validate that the agent is approved
@@ -111,33 +142,18 @@ class ExecutionService:
             raise ValueError("Agent not found")
         
         # Ensure user_id is set - it should come from the authenticated user
-        if not execution_data.user_id:
+        if not user_id:
             raise ValueError("User ID is required for execution creation")
         
         # Validate that the user executing is the same as the hiring user
-        if execution_data.user_id != hiring.user_id:
-            raise ValueError(f"User ID {execution_data.user_id} does not match hiring user ID {hiring.user_id}")
+        if user_id != hiring.user_id:
+            raise ValueError(f"User ID {user_id} does not match hiring user ID {hiring.user_id}")
         
         # Check if agent is approved OR if the user is executing their own agent
-        if agent.status != AgentStatus.APPROVED.value and agent.owner_id != execution_data.user_id:
+        if agent.status != AgentStatus.APPROVED.value and agent.owner_id != user_id:
             raise ValueError(f"Agent is not approved (status: {agent.status}) and you don't own it")
         
-        execution = Execution(
-            agent_id=hiring.agent_id,  # Get agent_id from hiring
-            hiring_id=execution_data.hiring_id,
-            user_id=execution_data.user_id,
-            status=ExecutionStatus.PENDING.value,
-            execution_type=execution_data.execution_type,
-            input_data=execution_data.input_data or {},
-            execution_id=execution_id,
-        )
-        
-        self.db.add(execution)
-        self.db.commit()
-        self.db.refresh(execution)
-        
-        logger.info(f"Created execution: {execution_id} for user: {execution_data.user_id}")
-        return execution
+        return hiring
     
     def get_execution(self, execution_id: str) -> Optional[Execution]:
         """Get an execution by ID using the user's database session."""
@@ -150,8 +166,14 @@ class ExecutionService:
     def update_execution_status(self, execution_id: str, status: ExecutionStatus, 
                                output_data: Optional[Dict[str, Any]] = None,
                                error_message: Optional[str] = None,
-                               container_logs: Optional[str] = None) -> Optional[Execution]:
-        """Update execution status and optionally set output data or error message."""
+                               container_logs: Optional[str] = None,
+                               cache_result: bool = True) -> Optional[Execution]:
+        """
+        Update execution status and optionally set output data or error message.
+        
+        Completed outputs of agents that use the result cache are stored there
+        unless ``cache_result`` is False.
+        """
 
         # Use the main database session for all operations to ensure consistency
         execution = self.db.query(Execution).filter(Execution.execution_id == execution_id).first()
@@ -188,6 +210,13 @@ class ExecutionService:
             self.db.rollback()
             raise
         
+        if status == ExecutionStatus.COMPLETED and cache_result and output_data is not None:
+            try:
+                execution_result_cache.store(self.db, execution, output_data)
+            except Exception as e:
+                logger.warning(f"Failed to store result of execution {execution_id} in the result cache: {e}")
+                self.db.rollback()
+        
         return execution
     
     def get_agent_executions(self, agent_id: str, limit: int = 100) -> list[Execution]:
@@ -236,6 +265,11 @@ class ExecutionService:
         # Use provided user_id or fall back to execution's user_id
         current_user_id = user_id or execution.user_id or 1
 
+        # Serve repeated inputs of deterministic agents without running (or billing) a container
+        cached_result = self._serve_from_result_cache(execution)
+        if cached_result is not None:
+            return cached_result
+
         # Start resource tracking for this execution
         await self.resource_manager.start_execution(execution_id, current_user_id)
         
@@ -251,10 +285,12 @@ class ExecutionService:
             
             logger.info(f"📋 Executing agent {agent.id} (type: {agent.agent_type}) for execution {execution_id}")
             
+            input_data = execution.input_data
+            
             # Validate input data using JSON Schema if available
-            if execution.input_data and agent.has_json_schema:
+            if input_data and agent.has_json_schema:
                 try:
-                    validated_input = self.json_schema_validator.validate_input(execution.input_data, agent)
+                    validated_input = self.json_schema_validator.validate_input(input_data, agent)
                     logger.info(f"✅ Input validation passed for agent {agent.id}")
                 except ValueError as e:
                     logger.error(f"❌ Input validation failed for agent {agent.id}: {e}")
@@ -278,7 +314,7 @@ class ExecutionService:
                 logger.info(f"🌐 Executing ACP server agent {agent.id}")
                 
                 # Execute ACP server agent directly (will run in background task)
-                runtime_result = await self._execute_acp_server_agent(agent, execution.input_data or {}, execution_id)
+                runtime_result = await self._execute_acp_server_agent(agent, input_data, execution_id)
             elif agent_type == 'persistent':
                 # Handle persistent agents
                 logger.info(f"🔄 Executing persistent agent {agent.id}")
@@ -293,7 +329,7 @@ class ExecutionService:
                     import time
                     start_time = time.time()
                     
-                    result = await deployment_service.execute_persistent_agent(deployment.deployment_id, execution.input_data or {}, execution_id)
+                    result = await deployment_service.execute_persistent_agent(deployment.deployment_id, input_data, execution_id)
                     
                     # Check if execution started successfully (non-blocking mode)
                     if result.get("status") == "started":
@@ -352,7 +388,7 @@ class ExecutionService:
             else:
                 # Handle function agents (implicit initialization)
                 logger.info(f"⚙️ Executing function agent {agent.id}")
-                runtime_result = await self._execute_function_agent(agent, execution.input_data or {}, execution_id)
+                runtime_result = await self._execute_function_agent(agent, input_data, execution_id)
             
             logger.info(f"✅ Execution {execution_id} completed with status: {runtime_result.status}")
             
@@ -507,11 +543,51 @@ class ExecutionService:
                 }
             }
     
+    def _serve_from_result_cache(self, execution: Execution) -> Optional[Dict[str, Any]]:
+        """Complete an execution with a cached output if its agent uses the result cache and the input was seen before."""
+        try:
+            agent = self.db.query(Agent).filter(Agent.id == execution.agent_id).first()
+            cached = execution_result_cache.lookup(self.db, execution, agent)
+        except Exception as e:
+            logger.warning(f"Result cache lookup failed for execution {execution.execution_id}: {e}")
+            self.db.rollback()
+            return None
+        if cached is None:
+            return None
+        
+        execution_id = execution.execution_id
+        self.update_execution_status(execution_id, ExecutionStatus.RUNNING)
+        self.update_execution_status(
+            execution_id,
+            ExecutionStatus.COMPLETED,
+            cached["output_data"],
+            container_logs=f"{RESULT_CACHE_HIT_LOG} (source execution {cached['source_execution_id']})",
+            cache_result=False
+        )
+        logger.info(f"♻️ Execution {execution_id} served from result cache")
+        
+        return {
+            "status": "success",
+            "execution_id": execution_id,
+            "result": cached["output_data"],
+            "execution_time": 0.0,
+            "served_from_cache": True,
+            "metadata": {
+                "agent_id": agent.id,
+                "agent_name": agent.name,
+                "agent_type": agent.agent_type,
+                "execution_status": "completed",
+                "timestamp": datetime.utcnow().isoformat(),
+                "source_execution_id": cached["source_execution_id"]
+            }
+        }
+    
     def _get_agent_files(self, agent_id: str) -> Optional[List[Dict[str, Any]]]:
         """Get all files for an agent."""
         agent_files = self.db.query(AgentFile).filter(AgentFile.agent_id == agent_id).all()
         if agent_files:
-            return [file.to_dict() for file in agent_files]
+            contents = blob_store.read_agent_files(self.db, agent_files)
+            return [{**file.to_dict(), "file_content": contents[file.id]} for file in agent_files]
         return None
     
     async def _execute_function_agent(self, agent: Agent, input_data: Dict[str, Any], execution_id: str):
@@ -704,6 +780,184 @@ class ExecutionService:
             "success_rate": (completed_executions / total_executions * 100) if total_executions > 0 else 0,
         }
     
+    # =============================================================================
+    # BATCH EXECUTION METHODS
+    # =============================================================================
+
+    def create_execution_batch(self, hiring_id: int, user_id: int, inputs: List[Dict[str, Any]],
+                               enqueue: bool = True, use_cache: bool = True) -> ExecutionBatch:
+        """
+        Create one run execution per input in a single transaction.
+
+        Args:
+            hiring_id: Hiring to run the inputs against
+            user_id: Authenticated user, who must own the hiring
+            inputs: Input data per execution, in order
+            enqueue: Also create the execution queue jobs in the same transaction
+            use_cache: False forces fresh runs for agents that use the result cache
+
+        Returns:
+            The created batch
+        """
+        if not inputs:
+            raise ValueError("A batch needs at least one input")
+        if len(inputs) > EXECUTION_BATCH_MAX_SIZE:
+            raise ValueError(f"A batch accepts at most {EXECUTION_BATCH_MAX_SIZE} inputs")
+
+        hiring = self._validate_execution_target(hiring_id, user_id, "run")
+        queue = None
+        if enqueue:
+            from .execution_queue import ExecutionQueue
+            queue = ExecutionQueue(self.db)
+
+        now = datetime.utcnow()
+        batch = ExecutionBatch(
+            batch_id=str(uuid.uuid4()),
+            user_id=user_id,
+            hiring_id=hiring_id,
+            agent_id=hiring.agent_id,
+            execution_type="run",
+            total_items=len(inputs)
+        )
+        executions = [
+            {
+                "execution_id": str(uuid.uuid4()),
+                "agent_id": hiring.agent_id,
+                "hiring_id": hiring_id,
+                "user_id": user_id,
+                "status": ExecutionStatus.PENDING.value,
+                "execution_type": "run",
+                "input_data": input_data or {},
+                "created_at": now,
+                "updated_at": now
+            }
+            for input_data in inputs
+        ]
+
+        try:
+            self.db.add(batch)
+            self.db.bulk_insert_mappings(Execution, executions)
+            self.db.bulk_insert_mappings(ExecutionBatchItem, [
+                {
+                    "batch_id": batch.batch_id,
+                    "item_index": index,
+                    "execution_id": execution["execution_id"],
+                    "created_at": now,
+                    "updated_at": now
+                }
+                for index, execution in enumerate(executions)
+            ])
+            if not use_cache:
+                execution_result_cache.bypass(self.db, [execution["execution_id"] for execution in executions])
+            if queue is not None:
+                queue.add_jobs(executions)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        logger.info(f"Created execution batch {batch.batch_id} with {len(executions)} executions for user: {user_id}")
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[ExecutionBatch]:
+        """Get an execution batch by ID."""
+        return self.db.query(ExecutionBatch).filter(ExecutionBatch.batch_id == batch_id).first()
+
+    def get_batch_execution_ids(self, batch_id: str) -> List[str]:
+        """Get the execution IDs of a batch in input order."""
+        return [
+            execution_id for (execution_id,) in self.db.query(ExecutionBatchItem.execution_id).filter(
+                ExecutionBatchItem.batch_id == batch_id
+            ).order_by(ExecutionBatchItem.item_index).all()
+        ]
+
+    def get_batch_progress(self, batch: ExecutionBatch) -> Dict[str, Any]:
+        """Count the executions of a batch per status."""
+        counts = dict(
+            self.db.query(Execution.status, func.count(Execution.id)).join(
+                ExecutionBatchItem, ExecutionBatchItem.execution_id == Execution.execution_id
+            ).filter(ExecutionBatchItem.batch_id == batch.batch_id).group_by(Execution.status).all()
+        )
+        finished = sum(count for status, count in counts.items() if status in TERMINAL_EXECUTION_STATUSES)
+        return {
+            "batch_id": batch.batch_id,
+            "hiring_id": batch.hiring_id,
+            "agent_id": batch.agent_id,
+            "total": batch.total_items,
+            "finished": finished,
+            "completed": counts.get(ExecutionStatus.COMPLETED.value, 0),
+            "failed": finished - counts.get(ExecutionStatus.COMPLETED.value, 0),
+            "running": counts.get(ExecutionStatus.RUNNING.value, 0),
+            "pending": counts.get(ExecutionStatus.PENDING.value, 0),
+            "done": finished >= batch.total_items,
+            "created_at": batch.created_at.isoformat() if batch.created_at else None
+        }
+
+    def get_batch_results(self, batch_id: str, finished_only: bool = True,
+                          execution_ids: Optional[List[str]] = None,
+                          offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the results of a batch's executions in input order.
+
+        Args:
+            batch_id: Batch to read
+            finished_only: Only include executions that reached a terminal status
+            execution_ids: Only include these executions
+            offset: Number of results to skip
+            limit: Maximum number of results
+        """
+        query = self.db.query(ExecutionBatchItem.item_index, Execution).join(
+            Execution, Execution.execution_id == ExecutionBatchItem.execution_id
+        ).filter(ExecutionBatchItem.batch_id == batch_id)
+        if finished_only:
+            query = query.filter(Execution.status.in_(list(TERMINAL_EXECUTION_STATUSES)))
+        if execution_ids is not None:
+            query = query.filter(ExecutionBatchItem.execution_id.in_(list(execution_ids)))
+        query = query.order_by(ExecutionBatchItem.item_index).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+
+        rows = query.all()
+        cached = served_from_cache(self.db, [execution.execution_id for _, execution in rows])
+        return [
+            {
+                "index": item_index,
+                "execution_id": execution.execution_id,
+                "status": execution.status,
+                "output_data": execution.output_data,
+                "error_message": execution.error_message,
+                "duration_ms": execution.duration_ms,
+                "served_from_cache": execution.execution_id in cached,
+                "completed_at": execution.completed_at.isoformat() if execution.completed_at else None
+            }
+            for item_index, execution in rows
+        ]
+
+    def get_batch_finished_execution_ids(self, batch_id: str) -> List[str]:
+        """Get the IDs of a batch's executions that reached a terminal status."""
+        return [
+            execution_id for (execution_id,) in self.db.query(ExecutionBatchItem.execution_id).join(
+                Execution, Execution.execution_id == ExecutionBatchItem.execution_id
+            ).filter(
+                ExecutionBatchItem.batch_id == batch_id,
+                Execution.status.in_(list(TERMINAL_EXECUTION_STATUSES))
+            ).all()
+        ]
+
+    async def run_batch_executions(self, execution_ids: List[str], concurrency: int) -> None:
+        """Run batch executions in this process with bounded concurrency (used without the execution queue)."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(execution_id: str):
+            async with semaphore:
+                try:
+                    # Each execution gets its own service, so sessions are not shared between tasks
+                    await ExecutionService().execute_agent(execution_id)
+                except Exception as e:
+                    logger.error(f"Batch execution {execution_id} failed: {e}")
+
+        await asyncio.gather(*(run_one(execution_id) for execution_id in execution_ids))
+
     # =============================================================================
     # PERSISTENT AGENT METHODS
     # =============================================================================
@@ -942,22 +1196,7 @@ class ExecutionService:
     def _get_agent_config(self, agent: Agent) -> Dict[str, Any]:
         """Get agent configuration from agent files."""
         try:
-            logger.info(f"Getting agent config for agent {agent.id}")
-            agent_files = self._get_agent_files(agent.id)
-            logger.info(f"Found {len(agent_files) if agent_files else 0} agent files")
-            
-            if not agent_files:
-                logger.warning(f"No agent files found for agent {agent.id}")
-                return {}
-                
-            for file_data in agent_files:
-                logger.info(f"Checking file: {file_data.get('file_path')}")
-                if file_data.get('file_path') == 'config.json':
-                    logger.info(f"Found config.json, content length: {len(file_data.get('file_content', ''))}")
-                    return json.loads(file_data['file_content'])
-                    
-            logger.warning(f"No config.json found in agent files for agent {agent.id}")
-            return {}
+            return agent_manifest_cache.get_config(self.db, agent)
         except Exception as e:
             logger.error(f"Error getting agent config for agent {agent.id}: {e}")
             import traceback
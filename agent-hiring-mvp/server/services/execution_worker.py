@@ -0,0 +1,210 @@
+"""Worker that runs executions claimed from the durable execution queue."""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional
+
+from ..config import (
+    MAX_EXECUTION_TIME,
+    EXECUTION_WORKER_CONCURRENCY,
+    EXECUTION_QUEUE_LEASE_SECONDS,
+    EXECUTION_QUEUE_POLL_INTERVAL_SECONDS
+)
+from ..database.config import get_session
+from ..models.execution import Execution, ExecutionStatus
+from .execution_events import execution_event_bus, TERMINAL_EXECUTION_STATUSES
+from .execution_queue import ExecutionQueue, ClaimedJob, make_worker_id
+
+logger = logging.getLogger(__name__)
+
+# Interval at which an execution's status is re-read while waiting for it to finish
+STATUS_CHECK_SECONDS = 5
+
+
+class ExecutionWorker:
+    """
+    Claims queued executions and runs up to ``concurrency`` of them at once.
+
+    Function and persistent agent executions hand the container call to a
+    background thread and return while the execution is still running, so a
+    job keeps its slot (and renews its lease) until the execution reaches a
+    terminal status or exceeds the maximum execution time. Expired leases of
+    other workers are recovered on startup and then once per lease period.
+    """
+
+    def __init__(self, concurrency: int = EXECUTION_WORKER_CONCURRENCY,
+                 poll_interval: float = EXECUTION_QUEUE_POLL_INTERVAL_SECONDS,
+                 worker_id: Optional[str] = None):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or make_worker_id()
+        self._active: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+        self._processed = 0
+        self._failed = 0
+
+    async def run(self) -> None:
+        """Claim and run jobs until ``stop`` is called."""
+        loop = asyncio.get_event_loop()
+        logger.info(f"Execution worker {self.worker_id} started (concurrency {self.concurrency})")
+        last_recovery = 0.0
+
+        while not self._stopping:
+            try:
+                if time.monotonic() - last_recovery >= EXECUTION_QUEUE_LEASE_SECONDS:
+                    await loop.run_in_executor(None, self._recover)
+                    last_recovery = time.monotonic()
+
+                job = None
+                if len(self._active) < self.concurrency:
+                    job = await loop.run_in_executor(None, self._claim)
+                if job is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+
+                task = asyncio.create_task(self._run_job(job))
+                self._active[job.execution_id] = task
+                task.add_done_callback(lambda _, execution_id=job.execution_id: self._active.pop(execution_id, None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Execution worker {self.worker_id} error: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; running jobs continue."""
+        self._stopping = True
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """Stop claiming jobs and wait for running jobs, up to ``timeout`` seconds."""
+        self.stop()
+        if self._active:
+            logger.info(f"Waiting for {len(self._active)} running executions to finish")
+            await asyncio.wait(list(self._active.values()), timeout=timeout)
+        # Jobs still running keep their lease until it expires and are then
+        # recovered by another worker
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": len(self._active),
+            "processed": self._processed,
+            "failed": self._failed,
+            "stopping": self._stopping
+        }
+
+    async def _run_job(self, job: ClaimedJob) -> None:
+        loop = asyncio.get_event_loop()
+        lease_task = asyncio.create_task(self._keep_lease(job))
+        try:
+            from .execution_service import ExecutionService
+            execution_service = ExecutionService()
+            if job.execution_type == "initialize":
+                result = await execution_service.execute_initialization(job.execution_id, job.user_id)
+            else:
+                result = await execution_service.execute_agent(job.execution_id, job.user_id)
+
+            if isinstance(result, dict) and result.get("status") == "error":
+                await loop.run_in_executor(None, self._fail_unfinished_execution, job, result)
+
+            await self._wait_until_finished(job)
+            await loop.run_in_executor(None, self._complete, job)
+            self._processed += 1
+        except asyncio.CancelledError:
+            # Worker shutting down; the lease expires and another worker takes over
+            raise
+        except Exception as e:
+            logger.error(f"Execution {job.execution_id} failed on worker {self.worker_id}: {e}")
+            self._failed += 1
+            try:
+                await loop.run_in_executor(None, self._fail, job, str(e))
+            except Exception as fail_error:
+                logger.error(f"Failed to record failure of execution {job.execution_id}: {fail_error}")
+        finally:
+            lease_task.cancel()
+
+    async def _wait_until_finished(self, job: ClaimedJob) -> None:
+        """Wait for the execution to reach a terminal status, timing it out after the maximum execution time."""
+        loop = asyncio.get_event_loop()
+        deadline = time.monotonic() + MAX_EXECUTION_TIME
+        subscription = execution_event_bus.subscribe(job.user_id, job.execution_id) if job.user_id is not None else None
+        try:
+            while True:
+                status = await loop.run_in_executor(None, self._get_execution_status, job.execution_id)
+                if status is None or status in TERMINAL_EXECUTION_STATUSES:
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    await loop.run_in_executor(None, self._time_out_execution, job)
+                    return
+                # Status changes committed in this process arrive on the event
+                # bus; changes from elsewhere are picked up by the re-read
+                wait = min(STATUS_CHECK_SECONDS, remaining)
+                if subscription is not None:
+                    await subscription.get(timeout=wait)
+                else:
+                    await asyncio.sleep(wait)
+        finally:
+            if subscription is not None:
+                execution_event_bus.unsubscribe(subscription)
+
+    async def _keep_lease(self, job: ClaimedJob) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(max(1.0, EXECUTION_QUEUE_LEASE_SECONDS / 3))
+            try:
+                if not await loop.run_in_executor(None, self._renew_lease, job):
+                    logger.warning(f"Worker {self.worker_id} lost the lease of execution {job.execution_id}")
+                    return
+            except Exception as e:
+                logger.warning(f"Failed to renew lease of execution {job.execution_id}: {e}")
+
+    def _claim(self) -> Optional[ClaimedJob]:
+        with get_session() as db:
+            return ExecutionQueue(db).claim(self.worker_id)
+
+    def _recover(self) -> Dict[str, int]:
+        with get_session() as db:
+            return ExecutionQueue(db).recover()
+
+    def _renew_lease(self, job: ClaimedJob) -> bool:
+        with get_session() as db:
+            return ExecutionQueue(db).renew_lease(job)
+
+    def _complete(self, job: ClaimedJob) -> bool:
+        with get_session() as db:
+            return ExecutionQueue(db).complete(job)
+
+    def _fail(self, job: ClaimedJob, error: str) -> bool:
+        with get_session() as db:
+            return ExecutionQueue(db).fail(job, error)
+
+    @staticmethod
+    def _get_execution_status(execution_id: str) -> Optional[str]:
+        with get_session() as db:
+            return db.query(Execution.status).filter(Execution.execution_id == execution_id).scalar()
+
+    @staticmethod
+    def _fail_unfinished_execution(job: ClaimedJob, result: Dict[str, Any]) -> None:
+        # Some error paths return an error result without updating the execution
+        from .execution_service import ExecutionService
+        with get_session() as db:
+            execution = db.query(Execution).filter(Execution.execution_id == job.execution_id).first()
+            if execution is not None and execution.status not in TERMINAL_EXECUTION_STATUSES:
+                ExecutionService(db).update_execution_status(
+                    job.execution_id,
+                    ExecutionStatus.FAILED,
+                    error_message=result.get("error") or result.get("message") or "Execution failed"
+                )
+
+    @staticmethod
+    def _time_out_execution(job: ClaimedJob) -> None:
+        from .execution_service import ExecutionService
+        with get_session() as db:
+            ExecutionService(db).update_execution_status(
+                job.execution_id,
+                ExecutionStatus.TIMEOUT,
+                error_message=f"Execution did not finish within {MAX_EXECUTION_TIME} seconds"
+            )
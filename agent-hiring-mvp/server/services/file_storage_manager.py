@@ -1,14 +1,18 @@
 """File storage manager for handling file I/O operations."""
 
+import asyncio
+import hashlib
 import os
 import shutil
 import logging
 import uuid
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Tuple, BinaryIO
 from fastapi import UploadFile
+from sqlalchemy.orm import Session
 
 from ..config.file_storage_config import FileStorageConfig
+from .blob_store import BlobStore
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +27,7 @@ class FileStorageManager:
     
     def __init__(self, config: FileStorageConfig):
         self.config = config
+        self.blob_store = BlobStore(self.config.blob_path)
         self._ensure_directories()
     
     def _ensure_directories(self):
@@ -34,45 +39,45 @@ class FileStorageManager:
             # Create user uploads subdirectory
             Path(self.config.upload_path).mkdir(parents=True, exist_ok=True)
             
+            # Create content-addressed blob directory
+            Path(self.config.blob_path).mkdir(parents=True, exist_ok=True)
+            
             logger.info(f"File storage directories initialized: {self.config.upload_path}")
             
         except Exception as e:
             logger.error(f"Failed to create storage directories: {str(e)}")
             raise FileStorageError(f"Storage initialization failed: {str(e)}")
     
-    def store_file(
+    async def store_file(
         self, 
         file: UploadFile, 
         user_id: int,
-        stored_filename: str
-    ) -> Tuple[Path, int]:
+        stored_filename: str,
+        db: Session
+    ) -> Tuple[Path, int, str]:
         """
-        Store a file on the filesystem.
+        Store a file in the content-addressed blob store.
+        
+        The copy runs in a worker thread so large uploads never block the
+        event loop, and the SHA-256 is computed from the same chunks. Content
+        that is already stored is not kept twice; a reference to the blob is
+        taken in ``db`` and becomes durable when the caller commits.
         
         Returns:
-            Tuple of (file_path, file_size)
+            Tuple of (file_path, file_size, sha256)
         """
+        file_path = None
         try:
-            # Create user-specific directory
-            user_dir = Path(self.config.upload_path) / str(user_id)
-            user_dir.mkdir(exist_ok=True)
+            # Write to a staging file first; the blob name is only known once hashed
+            file_path = self.blob_store.staging_path()
             
-            # Full file path
-            file_path = user_dir / stored_filename
+            loop = asyncio.get_event_loop()
+            file_size, sha256 = await loop.run_in_executor(None, self._write_stream, file.file, file_path)
             
-            # Save file to disk using chunks for memory efficiency
-            file_size = 0
-            with open(file_path, "wb") as buffer:
-                while chunk := file.file.read(self.config.chunk_size):
-                    buffer.write(chunk)
-                    file_size += len(chunk)
+            blob_path = self.blob_store.store_staged(db, file_path, sha256, file_size)
             
-            # Verify file was written correctly
-            if not file_path.exists() or file_path.stat().st_size != file_size:
-                raise FileStorageError("File write verification failed")
-            
-            logger.debug(f"File stored successfully: {file_path} (size: {file_size} bytes)")
-            return file_path, file_size
+            logger.debug(f"File stored successfully for user {user_id}: {stored_filename} -> {blob_path} (size: {file_size} bytes)")
+            return blob_path, file_size, sha256
             
         except Exception as e:
             logger.error(f"Failed to store file {file.filename}: {str(e)}")
@@ -80,6 +85,22 @@ class FileStorageManager:
             self._cleanup_partial_file(file_path)
             raise FileStorageError(f"File storage failed: {str(e)}")
     
+    def _write_stream(self, source: BinaryIO, file_path: Path) -> Tuple[int, str]:
+        """Copy a stream to disk in chunks, returning its size and SHA-256."""
+        digest = hashlib.sha256()
+        file_size = 0
+        chunk_size = max(self.config.chunk_size, self.config.stream_chunk_size)
+        with open(file_path, "wb") as buffer:
+            while chunk := source.read(chunk_size):
+                buffer.write(chunk)
+                digest.update(chunk)
+                file_size += len(chunk)
+        
+        # Verify file was written correctly
+        if file_path.stat().st_size != file_size:
+            raise FileStorageError("File write verification failed")
+        return file_size, digest.hexdigest()
+    
     def retrieve_file(self, file_path: str) -> Optional[Path]:
         """Retrieve a file from storage."""
         try:
@@ -127,27 +148,27 @@ class FileStorageManager:
         """Get the full file path for a stored file."""
         return Path(self.config.upload_path) / str(user_id) / stored_filename
     
-    def get_storage_info(self) -> dict:
-        """Get information about the storage system."""
+    def get_storage_info(self, db: Session) -> dict:
+        """
+        Get information about the storage system.
+        
+        Usage comes from the blob reference counters instead of walking the
+        upload tree. Files uploaded before the blob store, still under
+        ``user_uploads_path``, are not included.
+        """
         try:
-            upload_path = Path(self.config.upload_path)
-            
-            # Calculate storage usage
-            total_size = 0
-            file_count = 0
-            
-            if upload_path.exists():
-                for file_path in upload_path.rglob("*"):
-                    if file_path.is_file():
-                        total_size += file_path.stat().st_size
-                        file_count += 1
+            blob_stats = self.blob_store.get_stats(db)
+            total_size = blob_stats["stored_size_bytes"]
             
             return {
                 "upload_directory": str(self.config.upload_dir),
                 "user_uploads_path": str(self.config.upload_path),
-                "total_files": file_count,
+                "blob_path": str(self.config.blob_path),
+                "total_files": blob_stats["blob_count"],
                 "total_size_bytes": total_size,
                 "total_size_mb": round(total_size / (1024 * 1024), 2),
+                "referenced_size_bytes": blob_stats["referenced_size_bytes"],
+                "deduplicated_bytes": blob_stats["deduplicated_bytes"],
                 "max_file_size_mb": self.config.max_file_size_mb,
                 "chunk_size": self.config.chunk_size
             }
@@ -206,8 +227,10 @@ class FileStorageManager:
             path = Path(file_path).resolve()
             upload_path = Path(self.config.upload_path).resolve()
             
-            # Check if the path is within the upload directory
-            return upload_path in path.parents or path == upload_path
+            # Check if the path is within the upload directory or the blob store
+            if upload_path in path.parents or path == upload_path:
+                return True
+            return self.blob_store.contains(file_path)
             
         except Exception:
             return False
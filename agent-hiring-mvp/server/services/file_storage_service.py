@@ -4,11 +4,12 @@ import logging
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Tuple
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from fastapi import UploadFile, HTTPException
 from pathlib import Path
 
-from ..models.temporary_file import TemporaryFile
+from ..models.temporary_file import TemporaryFile, TemporaryFileChecksum
 from ..config.file_storage_config import FileStorageConfig
 from .interfaces.file_storage_interface import FileStorageInterface
 from .file_validator import FileValidator, FileValidationError
@@ -57,8 +58,9 @@ class FileStorageService(FileStorageInterface):
             stored_filename = self.storage_manager.generate_stored_filename(file.filename)
             
             # Store file on filesystem
-            file_path, file_size = self.storage_manager.store_file(
-                file, user_id, stored_filename
+            # Store file in the blob store; the blob reference is committed with the record
+            file_path, file_size, sha256 = await self.storage_manager.store_file(
+                file, user_id, stored_filename, self.db
             )
             
             # Create database record
@@ -72,7 +74,8 @@ class FileStorageService(FileStorageInterface):
                 description=description,
                 tags=normalized_tags,
                 user_id=user_id,
-                expiry_hours=normalized_expiry
+                expiry_hours=normalized_expiry,
+                sha256=sha256
             )
             
             logger.info(f"File uploaded successfully: {file.filename} -> {stored_filename}")
@@ -129,19 +132,35 @@ class FileStorageService(FileStorageInterface):
         
         return query.order_by(TemporaryFile.created_at.desc()).all()
     
+    async def get_file_by_token(self, file_id: str, access_token: str) -> Optional[TemporaryFile]:
+        """Get a temporary file by ID and access token."""
+        return self.db.query(TemporaryFile).filter(
+            TemporaryFile.id == file_id,
+            TemporaryFile.access_token == access_token,
+            TemporaryFile.is_deleted == False
+        ).first()
+    
+    async def get_file_checksum(self, file_id: str) -> Optional[str]:
+        """Get the SHA-256 recorded at upload, or None for files uploaded before checksums."""
+        return self.db.query(TemporaryFileChecksum.sha256).filter(
+            TemporaryFileChecksum.file_id == file_id
+        ).scalar()
+    
     async def download_file(
         self, 
         file_id: str, 
-        access_token: str
+        access_token: str,
+        count_access: bool = True
     ) -> Optional[Tuple[Path, str]]:
-        """Download a file using access token, returns (file_path, original_filename)."""
+        """
+        Download a file using access token, returns (file_path, original_filename).
+        
+        Pass ``count_access=False`` when the caller decides later whether the
+        request counts as a download, and call ``record_download`` if it does.
+        """
         logger.debug(f"Downloading file {file_id} with access token")
         
-        temp_file = self.db.query(TemporaryFile).filter(
-            TemporaryFile.id == file_id,
-            TemporaryFile.access_token == access_token,
-            TemporaryFile.is_deleted == False
-        ).first()
+        temp_file = await self.get_file_by_token(file_id, access_token)
         
         if not temp_file:
             logger.warning(f"File {file_id} not found or access denied for download")
@@ -160,11 +179,18 @@ class FileStorageService(FileStorageInterface):
             return None
         
         # Mark as accessed
-        await self._mark_file_accessed(temp_file)
+        if count_access:
+            await self._mark_file_accessed(temp_file)
         
         logger.info(f"File {file_id} downloaded successfully: {temp_file.original_filename}")
         return file_path, temp_file.original_filename
     
+    async def record_download(self, file_id: str) -> None:
+        """Count a download of a file served by ``download_file(count_access=False)``."""
+        temp_file = self.db.query(TemporaryFile).filter(TemporaryFile.id == file_id).first()
+        if temp_file:
+            await self._mark_file_accessed(temp_file)
+    
     async def delete_file(self, file_id: str, user_id: int) -> bool:
         """Delete a file (soft delete)."""
         temp_file = await self.get_file(file_id, user_id)
@@ -173,11 +199,14 @@ class FileStorageService(FileStorageInterface):
         
         # Soft delete in database
         temp_file.is_deleted = True
-        self.db.commit()
         
         # Optionally remove from filesystem (could be configurable)
         if self.config.enable_auto_cleanup:
-            self.storage_manager.delete_file(temp_file.file_path)
+            self._release_file_content(temp_file)
+        self.db.commit()
+        
+        if self.config.enable_auto_cleanup:
+            self.storage_manager.blob_store.collect_garbage(self.db)
         
         logger.info(f"File {file_id} marked as deleted")
         return True
@@ -221,7 +250,7 @@ class FileStorageService(FileStorageInterface):
         for temp_file in expired_files:
             try:
                 # Remove from filesystem
-                self.storage_manager.delete_file(temp_file.file_path)
+                self._release_file_content(temp_file)
                 
                 # Mark as deleted in database
                 temp_file.is_deleted = True
@@ -232,6 +261,7 @@ class FileStorageService(FileStorageInterface):
         
         if cleaned_count > 0:
             self.db.commit()
+            self.storage_manager.blob_store.collect_garbage(self.db)
             logger.info(f"Successfully cleaned up {cleaned_count} expired files")
         else:
             logger.info("No expired files to cleanup")
@@ -247,7 +277,7 @@ class FileStorageService(FileStorageInterface):
         total_size = self.db.query(TemporaryFile).filter(
             TemporaryFile.is_deleted == False
         ).with_entities(
-            self.db.func.sum(TemporaryFile.file_size)
+            func.sum(TemporaryFile.file_size)
         ).scalar() or 0
         
         expired_files = self.db.query(TemporaryFile).filter(
@@ -256,7 +286,7 @@ class FileStorageService(FileStorageInterface):
         ).count()
         
         # Get filesystem stats
-        fs_stats = self.storage_manager.get_storage_info()
+        fs_stats = self.storage_manager.get_storage_info(self.db)
         
         return {
             "database_stats": {
@@ -330,7 +360,8 @@ class FileStorageService(FileStorageInterface):
         description: Optional[str],
         tags: Optional[str],
         user_id: int,
-        expiry_hours: int
+        expiry_hours: int,
+        sha256: Optional[str] = None
     ) -> TemporaryFile:
         """Create a temporary file database record."""
         temp_file = TemporaryFile.create_with_expiry(
@@ -347,6 +378,10 @@ class FileStorageService(FileStorageInterface):
         )
         
         self.db.add(temp_file)
+        if sha256:
+            # Flush first so the checksum row can reference the generated file id
+            self.db.flush()
+            self.db.add(TemporaryFileChecksum(file_id=temp_file.id, sha256=sha256))
         self.db.commit()
         
         return temp_file
@@ -371,7 +406,22 @@ class FileStorageService(FileStorageInterface):
     async def _mark_file_expired(self, temp_file: TemporaryFile):
         """Mark a file as expired."""
         temp_file.is_deleted = True
+        self._release_file_content(temp_file)
         self.db.commit()
+        self.storage_manager.blob_store.collect_garbage(self.db)
+    
+    def _release_file_content(self, temp_file: TemporaryFile):
+        """Drop a file's reference to its blob, or delete it if it predates the blob store."""
+        blob_store = self.storage_manager.blob_store
+        if not blob_store.contains(temp_file.file_path):
+            self.storage_manager.delete_file(temp_file.file_path)
+            return
+        
+        sha256 = self.db.query(TemporaryFileChecksum.sha256).filter(
+            TemporaryFileChecksum.file_id == temp_file.id
+        ).scalar()
+        if sha256:
+            blob_store.release(self.db, sha256)
     
     async def _mark_file_accessed(self, temp_file: TemporaryFile):
         """Mark a file as accessed."""
@@ -14,17 +14,31 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime, timezone
 from pathlib import Path
 import socket
+import time
 
 from .env_service import EnvironmentService
 from ..models.agent import Agent, AgentType
 from ..models.hiring import Hiring
 from ..models.deployment import AgentDeployment, DeploymentStatus
-from .container_utils import generate_container_name, generate_docker_image_name
+from .container_utils import (
+    generate_container_name,
+    parse_framed_result,
+    format_container_logs,
+    RESULT_FRAME_START,
+    RESULT_FRAME_END
+)
 from .resource_limits import get_agent_resource_limits, to_docker_config
+from .execution_concurrency import concurrency_controller, DeploymentBusyError
+from .warm_container_pool import warm_container_pool
+from .image_build_cache import image_build_cache
+from .base_images import base_image_manager, dockerfile_base_section
+from .agent_manifest_cache import agent_manifest_cache
+from .blob_store import blob_store
 from ..config import (
     DOCKER_BUILD_TIMEOUT_SECONDS,
     CONTAINER_CREATION_TIMEOUT_SECONDS,
-    CONTAINER_STOP_TIMEOUT_SECONDS
+    CONTAINER_STOP_TIMEOUT_SECONDS,
+    AGENT_BASE_PYTHON_IMAGE
 )
 
 logger = logging.getLogger(__name__)
@@ -47,25 +61,18 @@ class FunctionDeploymentService:
     
     def _get_agent_config_from_files(self, agent_id: str) -> Dict[str, Any]:
         """Get agent configuration from config.json file."""
-        from ..models.agent_file import AgentFile
-        
-        config_file = self.db.query(AgentFile).filter(
-            AgentFile.agent_id == agent_id,
-            AgentFile.file_path == 'config.json'
-        ).first()
-        
-        if not config_file:
+        manifest = agent_manifest_cache.get_by_id(self.db, agent_id)
+        if manifest is None or not manifest.has_config_file:
             raise Exception("Agent configuration file not found")
-        
-        import json
-        return json.loads(config_file.file_content)
+        return manifest.config
 
     def _get_agent_files(self, agent_id: str) -> Optional[List[Dict[str, Any]]]:
         """Get all files for an agent."""
         from ..models.agent_file import AgentFile
         agent_files = self.db.query(AgentFile).filter(AgentFile.agent_id == agent_id).all()
         if agent_files:
-            return [file.to_dict() for file in agent_files]
+            contents = blob_store.read_agent_files(self.db, agent_files)
+            return [{**file.to_dict(), "file_content": contents[file.id]} for file in agent_files]
         return None
     
     def _get_agent_env_path(self, agent: Agent) -> Optional[str]:
@@ -88,7 +95,7 @@ class FunctionDeploymentService:
                     agent_env_path = temp_dir / f"agent_{agent.id}_env_{uuid.uuid4().hex[:8]}.env"
                     
                     with open(agent_env_path, 'w') as f:
-                        f.write(agent_file.file_content)
+                        f.write(blob_store.read_agent_file(self.db, agent_file))
                     
                     logger.info(f"Created temporary agent .env file: {agent_env_path}")
                     return str(agent_env_path)
@@ -174,20 +181,55 @@ class FunctionDeploymentService:
             
             # Get agent
             agent = deployment.agent
+            # Deployment timestamps are stored as naive UTC
+            requested_at = (
+                deployment.created_at.replace(tzinfo=timezone.utc).timestamp()
+                if deployment.created_at else time.time()
+            )
+            
+            # Prebuilt agents can be served immediately from the warm container pool
+            if agent.docker_image:
+                container = warm_container_pool.claim(agent.id, agent.docker_image)
+                if container is not None:
+                    container = await self._adopt_warm_container(deployment, container, agent.docker_image)
+                if container is not None:
+                    warm_container_pool.track_first_execution(deployment_id, agent.id, "warm_pool", requested_at)
+                    
+                    logger.info(f"Assigned warm container {container.name} to function deployment {deployment_id}")
+                    
+                    return {
+                        "status": "success",
+                        "deployment_id": deployment_id,
+                        "container_id": container.id,
+                        "container_name": container.name,
+                        "image_name": agent.docker_image,
+                        "warm_pool": True
+                    }
+                
+                # Pool miss or failed adoption - make sure the next hire of this agent finds a warm container
+                self.register_warm_pool(agent)
             
             # Create deployment directory
             deploy_dir = self.deployment_dir / deployment_id
             deploy_dir.mkdir(exist_ok=True)
             
-            # Extract agent code
-            self._extract_function_agent_code(agent, deploy_dir)
+            # Extract agent code on top of the managed base image, if it is built yet
+            base_image = base_image_manager.get_base_image(AgentType.FUNCTION.value)
+            self._extract_function_agent_code(agent, deploy_dir, base_image)
+            deployment.deployment_config = {
+                **(deployment.deployment_config or {}),
+                "base_image": base_image or AGENT_BASE_PYTHON_IMAGE
+            }
             
-            # Build Docker image using centralized utility
-            user_id = deployment.hiring.user_id or "anon"
-            hiring_id = deployment.hiring_id
-            deployment_uuid = deployment_id.split('_')[-1]  # Get the UUID part
-            image_name = generate_docker_image_name("func", user_id, agent.id, hiring_id, deployment_uuid)
-            image = await self._build_function_docker_image(deploy_dir, image_name)
+            # Resolve the image from the build cache - hirings with identical
+            # build inputs share one content-addressed image
+            image_name, cache_hit = await image_build_cache.get_or_build(
+                deploy_dir,
+                "func",
+                lambda name, labels: self._build_function_docker_image(deploy_dir, name, labels)
+            )
+            if cache_hit:
+                logger.info(f"Reusing cached function image {image_name} for deployment {deployment_id}")
             
             # Update deployment with image info
             deployment.docker_image = image_name
@@ -204,6 +246,8 @@ class FunctionDeploymentService:
             deployment.started_at = datetime.now(timezone.utc)
             self.db.commit()
             
+            warm_container_pool.track_first_execution(deployment_id, agent.id, "cold_start", requested_at)
+            
             logger.info(f"Successfully deployed function agent {agent.id} in container {container.name}")
             
             return {
@@ -248,8 +292,14 @@ class FunctionDeploymentService:
             
             def execute_in_thread():
                 try:
-                    # Execute the function and get result
-                    result = self._execute_in_container_sync(container, input_data, deployment_id)
+                    # Execute the function and get result - function executions are
+                    # stateless, so they only need a shared slot on the deployment
+                    try:
+                        with concurrency_controller.execution_slot(deployment_id):
+                            warm_container_pool.record_first_execution(deployment_id)
+                            result = self._execute_in_container_sync(container, input_data, deployment_id)
+                    except DeploymentBusyError as e:
+                        result = {"status": "error", "error": str(e)}
                     
                     # Update execution status in database based on result
                     if result.get("status") == "success":
@@ -339,20 +389,16 @@ class FunctionDeploymentService:
                 if not agent:
                     return {"error": "Agent not found"}
                 
-                # Get agent files for function name detection
-                from ..models.agent_file import AgentFile
-                agent_files = db_session.query(AgentFile).filter(AgentFile.agent_id == agent.id).all()
-                
                 # Prepare input data
                 input_json = json.dumps(input_data)
                 
                 # Get execution_id from input_data if available
                 execution_id = input_data.get("execution_id")
                 
-                # Prepare environment variables
-                env_vars = {
-                    "AGENTHUB_SERVER_URL": "http://host.docker.internal:8002"
-                }
+                # Prepare environment variables - deployment variables are passed on
+                # every exec since warm pool containers are started before the hire
+                env_vars = dict(deployment.environment_vars or {})
+                env_vars["AGENTHUB_SERVER_URL"] = "http://host.docker.internal:8002"
                 
                 # Add execution_id to environment if available
                 if execution_id:
@@ -367,15 +413,7 @@ class FunctionDeploymentService:
                     file_name = entry_point
                     # Get function name from agent config file (lifecycle.execute)
                     try:
-                        # Get agent config from agent files to read lifecycle.execute
-                        function_name = 'execute'  # default fallback
-                        
-                        for file_data in agent_files:
-                            if file_data.get('file_path') == 'config.json':
-                                agent_config = json.loads(file_data['file_content'])
-                                lifecycle = agent_config.get('lifecycle', {})
-                                function_name = lifecycle.get('execute', 'execute')
-                                break
+                        function_name = agent_manifest_cache.get(db_session, agent).execute_function
                     except Exception as e:
                         logger.warning(f"Could not read agent config for function name, using default 'execute': {e}")
                         function_name = 'execute'
@@ -389,9 +427,11 @@ import json
 import sys
 import os
 import tempfile
+import time
 from io import StringIO
 from contextlib import redirect_stdout, redirect_stderr
 
+script_start = time.time()
 sys.path.append('/app')
 
 # Capture both stdout and stderr
@@ -447,53 +487,44 @@ try:
                             # Last resort: try calling with no arguments
                             result = {function_name}()
         
-        # Write result to temp file
-        with open('/tmp/agent_result.json', 'w') as f:
-            json.dump(result, f)
+        result_payload = {{"result": result}}
     else:
         raise ImportError(f"Module {{module_name}} not found")
         
 except Exception as e:
     # Capture any exceptions in stderr
     stderr_capture.write(f"Error: {{str(e)}}\\n")
-    # Write error result to temp file
-    with open('/tmp/agent_result.json', 'w') as f:
-        json.dump({{"error": str(e)}}, f)
-
-# Write captured output to temp files
-with open('/tmp/agent_stdout.txt', 'w') as f:
-    f.write(stdout_capture.getvalue())
+    result_payload = {{"result": {{"error": str(e)}}}}
 
-with open('/tmp/agent_stderr.txt', 'w') as f:
-    f.write(stderr_capture.getvalue())
+# Return result, captured output and timing in a single framed payload on stdout
+result_payload["stdout"] = stdout_capture.getvalue()
+result_payload["stderr"] = stderr_capture.getvalue()
+result_payload["duration_seconds"] = time.time() - script_start
+sys.stdout.write("\\n{RESULT_FRAME_START}" + json.dumps(result_payload, default=str) + "{RESULT_FRAME_END}\\n")
 """
             
             logger.info(f"Executing function in container {container.id} with environment: {env_vars}")
             
-            # Execute the script in the container
+            # Execute the script in the container - result, captured output and
+            # timing come back together in a framed payload on the exec's stdout
             exec_result = container.exec_run(
                 cmd=["python", "-c", python_script],
-                environment=env_vars
+                environment=env_vars,
+                demux=True
             )
             
             logger.info(f"Container execution completed with exit code: {exec_result.exit_code}")
             
-            # Read captured stdout and stderr
-            stdout_result = container.exec_run(cmd=["cat", "/tmp/agent_stdout.txt"])
-            stderr_result = container.exec_run(cmd=["cat", "/tmp/agent_stderr.txt"])
+            stdout_bytes, stderr_bytes = exec_result.output or (None, None)
+            payload, raw_stdout = parse_framed_result(stdout_bytes)
             
-            # Combine logs
-            stdout_logs = stdout_result.output.decode() if stdout_result.exit_code == 0 else ""
-            stderr_logs = stderr_result.output.decode() if stderr_result.exit_code == 0 else ""
+            container_output = raw_stdout
+            if stderr_bytes:
+                container_output = f"{container_output}\n{stderr_bytes.decode(errors='replace')}".strip()
             
-            # Create combined logs
-            container_logs = ""
-            if stdout_logs:
-                container_logs += f"=== STDOUT ===\n{stdout_logs}\n"
-            if stderr_logs:
-                container_logs += f"=== STDERR ===\n{stderr_logs}\n"
-            if exec_result.output:
-                container_logs += f"=== CONTAINER OUTPUT ===\n{exec_result.output.decode()}\n"
+            stdout_logs = payload.get("stdout", "") if payload else ""
+            stderr_logs = payload.get("stderr", "") if payload else ""
+            container_logs = format_container_logs(stdout_logs, stderr_logs, container_output)
             
             # Log detailed execution information for debugging
             logger.info(f"Function execution details for {deployment_id}:")
@@ -505,7 +536,7 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
                 logger.info(f"  Stderr content: {stderr_logs[:500]}...")
             
             if exec_result.exit_code != 0:
-                error_msg = f"Container execution failed with exit code {exec_result.exit_code}: {exec_result.output.decode()}"
+                error_msg = f"Container execution failed with exit code {exec_result.exit_code}: {container_output}"
                 logger.error(f"Function execution failed: {error_msg}")
                 return {
                     "status": "error",
@@ -513,37 +544,23 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
                     "container_logs": container_logs
                 }
             
-            # Read result from temp file
-            read_result = container.exec_run(cmd=["cat", "/tmp/agent_result.json"])
-            if read_result.exit_code != 0:
-                error_msg = f"Failed to read result file: {read_result.output.decode()}"
-                logger.error(f"Failed to read result file: {error_msg}")
-                return {
-                    "status": "error", 
-                    "error": error_msg,
-                    "container_logs": container_logs
-                }
-            
-            result_json = read_result.output.decode().strip()
-            try:
-                result_data = json.loads(result_json)
-                logger.info(f"Function execution result: {result_data}")
-            except json.JSONDecodeError as e:
-                error_msg = f"Failed to parse result JSON: {e}. Raw result: {result_json[:200]}..."
-                logger.error(f"JSON parsing error: {error_msg}")
+            if payload is None:
+                error_msg = f"No result payload returned by container. Raw output: {container_output[:200]}..."
+                logger.error(f"Failed to read function result: {error_msg}")
                 return {
                     "status": "error",
                     "error": error_msg,
                     "container_logs": container_logs
                 }
             
-            # Clean up temp files
-            container.exec_run(cmd=["rm", "-f", "/tmp/agent_result.json", "/tmp/agent_stdout.txt", "/tmp/agent_stderr.txt"])
+            result_data = payload.get("result")
+            execution_time = payload.get("duration_seconds")
+            logger.info(f"Function execution result: {result_data}")
             
             return {
                 "status": "success",
                 "output": result_data,
-                "execution_time": None,  # Could be added if needed
+                "execution_time": execution_time,
                 "container_logs": container_logs
             }
                 
@@ -680,6 +697,7 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
             deployment.status = DeploymentStatus.STOPPED.value
             deployment.stopped_at = datetime.now(timezone.utc)
             self.db.commit()
+            concurrency_controller.forget_deployment(deployment_id)
             
             return {"status": "success", "message": "Deployment stopped"}
             
@@ -687,7 +705,7 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
             logger.error(f"Failed to stop deployment: {e}")
             return {"error": str(e)}
     
-    def _extract_function_agent_code(self, agent: Agent, deploy_dir: Path):
+    def _extract_function_agent_code(self, agent: Agent, deploy_dir: Path, base_image: Optional[str] = None):
         """Extract function agent code to deployment directory."""
         try:
             # Get agent files
@@ -698,12 +716,13 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
             
             if agent_files:
                 # Multi-file approach
+                contents = blob_store.read_agent_files(self.db, agent_files)
                 for file_record in agent_files:
                     file_path = deploy_dir / file_record.file_path
                     file_path.parent.mkdir(parents=True, exist_ok=True)
                     
                     with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(file_record.file_content)
+                        f.write(contents[file_record.id])
                     
                     logger.info(f"Extracted file: {file_record.file_path}")
             else:
@@ -744,14 +763,15 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
             # Create Dockerfile for function agents
             dockerfile_path = deploy_dir / "Dockerfile"
             with open(dockerfile_path, 'w') as f:
-                f.write(self._generate_function_dockerfile())
+                f.write(self._generate_function_dockerfile(base_image))
             logger.info("Created Dockerfile for function deployment")
             
         except Exception as e:
             logger.error(f"Failed to extract agent code: {e}")
             raise
     
-    async def _build_function_docker_image(self, deploy_dir: Path, image_name: str):
+    async def _build_function_docker_image(self, deploy_dir: Path, image_name: str,
+                                           labels: Optional[Dict[str, str]] = None):
         """Build Docker image for the function agent asynchronously."""
         logger.info(f"Building function Docker image {image_name}")
         
@@ -764,6 +784,7 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
                     lambda: self.docker_client.images.build(
                         path=str(deploy_dir),
                         tag=image_name,
+                        labels=labels,
                         rm=True,
                         forcerm=True
                     )
@@ -825,22 +846,11 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
             if not agent:
                 raise Exception(f"Agent {deployment.agent_id} not found")
             
-            # Get agent configuration from files
-            try:
-                agent_config = self._get_agent_config_from_files(deployment.agent_id)
-            except Exception as e:
-                logger.warning(f"Could not get agent config from files: {e}, using empty config")
-                agent_config = {}
-            
             # Determine agent type (use deployment_type if available, otherwise agent.agent_type)
             agent_type = deployment.deployment_type or agent.agent_type or "function"
             
             # Get resource limits with proper agent config and type
-            resource_limits = get_agent_resource_limits(agent_config, agent_type)
-            docker_config = to_docker_config(resource_limits)
-            container_config.update(docker_config)
-            
-            logger.info(f"Applied resource limits for {agent_type} agent {deployment.agent_id}: {resource_limits}")
+            container_config.update(self._get_resource_docker_config(deployment.agent_id, agent_type))
             
             
             # Run container creation in a thread pool with timeout
@@ -879,9 +889,69 @@ with open('/tmp/agent_stderr.txt', 'w') as f:
             self.db.commit()
             raise
 
-    def _generate_function_dockerfile(self) -> str:
-        """Generate Dockerfile for function agents."""
-        return """FROM python:3.11-slim
+    def _get_resource_docker_config(self, agent_id: str, agent_type: str) -> Dict[str, Any]:
+        """Get Docker resource limit options for an agent from its config.json."""
+        # Get agent configuration from files
+        try:
+            manifest = agent_manifest_cache.get_by_id(self.db, agent_id)
+        except Exception as e:
+            logger.warning(f"Could not get agent config from files: {e}, using empty config")
+            manifest = None
+        
+        if manifest is not None:
+            resource_limits = manifest.resource_limits(agent_type)
+        else:
+            resource_limits = get_agent_resource_limits({}, agent_type)
+        logger.info(f"Applied resource limits for {agent_type} agent {agent_id}: {resource_limits}")
+        return to_docker_config(resource_limits)
+
+    def register_warm_pool(self, agent: Agent) -> None:
+        """Keep warm containers for a function agent's prebuilt image."""
+        if agent.agent_type != AgentType.FUNCTION.value or not agent.docker_image:
+            return
+        try:
+            container_options = self._get_resource_docker_config(agent.id, AgentType.FUNCTION.value)
+            warm_container_pool.register_image(agent.id, agent.docker_image, container_options)
+        except Exception as e:
+            logger.warning(f"Failed to register warm pool for agent {agent.id}: {e}")
+
+    async def _adopt_warm_container(self, deployment: AgentDeployment, container, image_name: str):
+        """
+        Assign a claimed warm pool container to a deployment.
+        
+        Returns:
+            The container, or None if it could not be renamed; it is then removed
+            and the deployment falls back to a cold start
+        """
+        container_name = generate_container_name(deployment, "func")
+        
+        try:
+            # Give the container the deployment's name so it is managed like a regular one
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, lambda: container.rename(container_name))
+            container.reload()
+        except Exception as e:
+            logger.warning(f"Could not rename warm container {container.name} to {container_name}, "
+                           f"falling back to a cold start: {e}")
+            await asyncio.get_event_loop().run_in_executor(None, warm_container_pool.discard, container)
+            return None
+        
+        now = datetime.now(timezone.utc)
+        deployment.docker_image = image_name
+        deployment.container_id = container.id
+        deployment.container_name = container.name
+        deployment.status = DeploymentStatus.RUNNING.value
+        deployment.started_at = now
+        deployment.is_healthy = True
+        deployment.health_check_failures = 0
+        deployment.last_health_check = now
+        self.db.commit()
+        
+        return container
+
+    def _generate_function_dockerfile(self, base_image: Optional[str] = None) -> str:
+        """Generate Dockerfile for function agents, building on base_image when given."""
+        return dockerfile_base_section(base_image, f"""FROM {AGENT_BASE_PYTHON_IMAGE}
 
 WORKDIR /app
 
@@ -891,7 +961,7 @@ RUN apt-get update && apt-get install -y \\
     gcc \\
     g++ \\
     && rm -rf /var/lib/apt/lists/*
-
+""") + """
 # Copy requirements and install Python dependencies
 COPY requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
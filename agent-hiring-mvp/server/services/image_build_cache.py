@@ -0,0 +1,220 @@
+"""Content-addressed cache of agent Docker images shared across deployments."""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Callable, Awaitable, Tuple
+
+import docker
+from docker import errors as docker_errors
+
+from .container_utils import generate_cached_image_name
+from ..config import (
+    IMAGE_BUILD_CACHE_ENABLED,
+    IMAGE_BUILD_CACHE_MAX_IMAGES,
+    DOCKER_BUILD_TIMEOUT_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Label set on every cached image so garbage collection only touches images it owns
+BUILD_CACHE_LABEL = "agenthub.build_cache"
+BUILD_DIGEST_LABEL = "agenthub.build_digest"
+
+# Build context entries that never affect the resulting image
+_IGNORED_NAMES = {"__pycache__", ".git", ".DS_Store"}
+
+
+def compute_build_digest(build_dir: Path) -> str:
+    """
+    Compute a SHA-256 digest of a Docker build context.
+
+    The digest covers the relative path and content of every file (the generated
+    Dockerfile, requirements.txt, the merged .env and the agent files), so two
+    contexts with identical inputs produce the same image.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(build_dir.rglob("*")):
+        relative = path.relative_to(build_dir)
+        if any(part in _IGNORED_NAMES for part in relative.parts) or path.suffix == ".pyc":
+            continue
+        if not path.is_file():
+            continue
+        digest.update(relative.as_posix().encode("utf-8"))
+        digest.update(b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ImageBuildCache:
+    """
+    Resolves a build context to a single shared image.
+
+    Deployments with the same build digest reuse the same image instead of
+    building a per-hiring one. Concurrent builds of one digest are serialized
+    on a per-digest lock, so only the first caller builds and the others find
+    the finished image. Builds run from different threads and event loops
+    (hiring threads create their own loops), which is why the lock is a
+    ``threading.Lock`` rather than an asyncio primitive.
+    """
+
+    def __init__(self, max_images: int = IMAGE_BUILD_CACHE_MAX_IMAGES, enabled: bool = IMAGE_BUILD_CACHE_ENABLED):
+        self.enabled = enabled
+        self.max_images = max(1, max_images)
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._docker_client = None
+
+    @property
+    def docker_client(self):
+        if self._docker_client is None:
+            self._docker_client = docker.from_env()
+        return self._docker_client
+
+    async def get_or_build(self, build_dir: Path, agent_type: str,
+                           build_image: Callable[[str, Dict[str, str]], Awaitable[Any]]) -> Tuple[str, bool]:
+        """
+        Return the cached image for a build context, building it if needed.
+
+        Args:
+            build_dir: Prepared build context (Dockerfile, requirements, agent files)
+            agent_type: Agent type, used in the image name
+            build_image: Coroutine function ``(image_name, labels)`` that builds the image
+
+        Returns:
+            Tuple of (image name, whether the image came from the cache)
+        """
+        loop = asyncio.get_event_loop()
+        build_digest = await loop.run_in_executor(None, compute_build_digest, build_dir)
+        image_name = generate_cached_image_name(agent_type, build_digest)
+        labels = {BUILD_CACHE_LABEL: "true", BUILD_DIGEST_LABEL: build_digest}
+
+        if not self.enabled:
+            await build_image(image_name, labels)
+            return image_name, False
+
+        build_lock = self._get_build_lock(build_digest)
+        acquired = await loop.run_in_executor(
+            None, lambda: build_lock.acquire(timeout=DOCKER_BUILD_TIMEOUT_SECONDS)
+        )
+        if not acquired:
+            raise Exception(f"Timed out waiting for in-flight build of {image_name}")
+
+        try:
+            if await loop.run_in_executor(None, self._image_exists, image_name):
+                self._touch(image_name)
+                self._count("hits")
+                logger.info(f"Image build cache hit for {image_name}")
+                return image_name, True
+
+            self._count("misses")
+            logger.info(f"Image build cache miss for {image_name}, building")
+            await build_image(image_name, labels)
+            self._touch(image_name)
+        finally:
+            build_lock.release()
+
+        try:
+            await loop.run_in_executor(None, self.collect_garbage)
+        except Exception as e:
+            logger.warning(f"Image build cache garbage collection failed: {e}")
+
+        return image_name, False
+
+    def collect_garbage(self) -> int:
+        """
+        Remove least recently used cached images beyond ``max_images``.
+
+        Images referenced by any container (running or stopped) are never removed.
+
+        Returns:
+            Number of images removed
+        """
+        images = self.docker_client.images.list(filters={"label": f"{BUILD_CACHE_LABEL}=true"})
+        if len(images) <= self.max_images:
+            return 0
+
+        images_in_use = {
+            container.attrs.get("Image")
+            for container in self.docker_client.containers.list(all=True)
+        }
+        candidates = []
+        for image in images:
+            if image.id in images_in_use:
+                continue
+            tag = image.tags[0] if image.tags else image.id
+            candidates.append((self._last_used_at(tag, image), tag, image))
+        candidates.sort(key=lambda candidate: candidate[0])
+
+        removed = 0
+        excess = len(images) - self.max_images
+        for _, tag, image in candidates[:excess]:
+            try:
+                self.docker_client.images.remove(image.id, force=False)
+                removed += 1
+                with self._lock:
+                    self._last_used.pop(tag, None)
+                logger.info(f"Evicted cached image {tag}")
+            except docker_errors.APIError as e:
+                logger.warning(f"Could not evict cached image {tag}: {e}")
+
+        self._count("evictions", removed)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss/eviction counts."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "max_images": self.max_images,
+                "in_flight_builds": sum(1 for build_lock in self._build_locks.values() if build_lock.locked()),
+                **self._stats
+            }
+
+    def _get_build_lock(self, build_digest: str) -> threading.Lock:
+        with self._lock:
+            build_lock = self._build_locks.get(build_digest)
+            if build_lock is None:
+                build_lock = threading.Lock()
+                self._build_locks[build_digest] = build_lock
+            return build_lock
+
+    def _image_exists(self, image_name: str) -> bool:
+        try:
+            self.docker_client.images.get(image_name)
+            return True
+        except docker_errors.ImageNotFound:
+            return False
+
+    def _touch(self, image_name: str) -> None:
+        with self._lock:
+            self._last_used[image_name] = time.time()
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    def _last_used_at(self, tag: str, image) -> float:
+        with self._lock:
+            last_used = self._last_used.get(tag)
+        if last_used is not None:
+            return last_used
+        # Images from a previous server run rank by creation time
+        created = image.attrs.get("Created", "")
+        try:
+            return datetime.fromisoformat(created[:26].rstrip("Z")).timestamp()
+        except ValueError:
+            return 0.0
+
+
+# Global cache instance shared by the deployment services
+image_build_cache = ImageBuildCache()
@@ -41,11 +41,17 @@ class FileStorageInterface(ABC):
     async def download_file(
         self, 
         file_id: str, 
-        access_token: str
+        access_token: str,
+        count_access: bool = True
     ) -> Optional[Tuple[Path, str]]:
         """Download a file using access token, returns (file_path, original_filename)."""
         pass
     
+    @abstractmethod
+    async def record_download(self, file_id: str) -> None:
+        """Count a download of a file served without counting its access."""
+        pass
+    
     @abstractmethod
     async def delete_file(self, file_id: str, user_id: int) -> bool:
         """Delete a file (soft delete)."""
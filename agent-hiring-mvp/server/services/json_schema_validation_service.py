@@ -3,6 +3,7 @@
 import jsonschema
 from typing import Dict, Any, Optional, List
 from server.models.agent import Agent
+from server.services.agent_manifest_cache import agent_manifest_cache
 
 
 class JSONSchemaValidationService:
@@ -13,27 +14,25 @@ class JSONSchemaValidationService:
     
     def validate_input(self, input_data: Dict[str, Any], agent: Agent) -> Dict[str, Any]:
         """Validate input against JSON Schema inputSchema from config_schema."""
-        input_schema = agent.get_input_schema()
-        if not input_schema:
+        validator = agent_manifest_cache.get_schema_validator(agent, "input")
+        if validator is None:
             raise ValueError(f"No input schema found for agent {agent.name}")
         
-        try:
-            jsonschema.validate(input_data, input_schema)
-            return input_data
-        except jsonschema.ValidationError as e:
-            raise ValueError(f"Input validation failed: {e.message}")
+        error = jsonschema.exceptions.best_match(validator.iter_errors(input_data))
+        if error is not None:
+            raise ValueError(f"Input validation failed: {error.message}")
+        return input_data
     
     def validate_output(self, output_data: Dict[str, Any], agent: Agent) -> Dict[str, Any]:
         """Validate output against JSON Schema outputSchema from config_schema."""
-        output_schema = agent.get_output_schema()
-        if not output_schema:
+        validator = agent_manifest_cache.get_schema_validator(agent, "output")
+        if validator is None:
             raise ValueError(f"No output schema found for agent {agent.name}")
         
-        try:
-            jsonschema.validate(output_data, output_schema)
-            return output_data
-        except jsonschema.ValidationError as e:
-            raise ValueError(f"Output validation failed: {e.message}")
+        error = jsonschema.exceptions.best_match(validator.iter_errors(output_data))
+        if error is not None:
+            raise ValueError(f"Output validation failed: {error.message}")
+        return output_data
     
     def get_validation_errors(self, data: Dict[str, Any], schema: Dict[str, Any]) -> List[str]:
         """Get detailed validation errors for debugging."""
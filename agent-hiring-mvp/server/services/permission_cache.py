@@ -0,0 +1,152 @@
+"""In-process cache of each user's effective roles and permissions."""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, FrozenSet, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from ..config import PERMISSION_CACHE_ENABLED, PERMISSION_CACHE_TTL_SECONDS
+from ..models.permission import Permission
+from ..models.role import Role
+from ..models.user_role import UserRole
+from .commit_hooks import register_commit_hook
+
+logger = logging.getLogger(__name__)
+
+# Bump key for changes that can affect every user (roles and permissions)
+_ALL_USERS = None
+
+
+@dataclass(frozen=True)
+class EffectivePermissions:
+    """Compiled roles and permissions of a user."""
+    user_id: int
+    roles: FrozenSet[str]
+    permissions: FrozenSet[str]
+    version: Tuple[int, int]  # (global version, user version) at compile time
+    valid_until: float  # time.monotonic() deadline: TTL or the earliest role expiry
+
+    def has_permission(self, permission: str) -> bool:
+        return "*:*" in self.permissions or permission in self.permissions
+
+
+class PermissionCache:
+    """
+    Compiles a user's active roles into one permission set and keeps it in memory.
+
+    Every entry is stamped with a global version, bumped when any role or
+    permission changes, and a per-user version, bumped when the user's role
+    assignments change. Bumps happen on ORM commits (``assign_role_to_user``,
+    ``remove_role_from_user`` and the admin role and permission endpoints), so
+    an entry compiled before a change is never served after it. Changes made
+    by other server processes are picked up when the TTL expires.
+    """
+
+    def __init__(self, ttl_seconds: int = PERMISSION_CACHE_TTL_SECONDS, enabled: bool = PERMISSION_CACHE_ENABLED):
+        self.enabled = enabled and ttl_seconds > 0
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, EffectivePermissions] = {}
+        self._global_version = 0
+        self._user_versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, user_id: int) -> EffectivePermissions:
+        """Get the effective roles and permissions of a user."""
+        with self._lock:
+            version = (self._global_version, self._user_versions.get(user_id, 0))
+            entry = self._entries.get(user_id) if self.enabled else None
+        if entry is not None and entry.version == version and entry.valid_until > time.monotonic():
+            return entry
+
+        # Stamped with the versions read before the queries, so a change
+        # committed while compiling makes the new entry stale right away
+        entry = self._compile(db, user_id, version)
+        if self.enabled:
+            with self._lock:
+                self._entries[user_id] = entry
+        return entry
+
+    def bump_user(self, user_id: int) -> None:
+        """Invalidate the compiled permissions of one user."""
+        with self._lock:
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+
+    def bump_all(self) -> None:
+        """Invalidate the compiled permissions of every user."""
+        with self._lock:
+            self._global_version += 1
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "global_version": self._global_version
+            }
+
+    def _compile(self, db: Session, user_id: int, version: Tuple[int, int]) -> EffectivePermissions:
+        rows = db.query(UserRole.expires_at, Role.name, Role.permissions).join(
+            Role, UserRole.role_id == Role.id
+        ).filter(
+            and_(
+                UserRole.user_id == user_id,
+                UserRole.is_active == True,
+                Role.is_active == True
+            )
+        ).all()
+
+        now = datetime.utcnow()
+        roles = set()
+        permissions = set()
+        expires_in: Optional[float] = None
+        for expires_at, role_name, role_permissions in rows:
+            if expires_at is not None:
+                if now > expires_at:
+                    continue
+                remaining = (expires_at - now).total_seconds()
+                expires_in = remaining if expires_in is None else min(expires_in, remaining)
+            roles.add(role_name)
+            permissions.update(role_permissions or [])
+
+        ttl = self.ttl_seconds if expires_in is None else min(self.ttl_seconds, expires_in)
+        return EffectivePermissions(
+            user_id=user_id,
+            roles=frozenset(roles),
+            permissions=frozenset(permissions),
+            version=version,
+            valid_until=time.monotonic() + ttl
+        )
+
+
+# Role assignments, roles and permissions are tracked at the ORM level, so
+# every code path that commits a change bumps the affected versions. Bumps
+# are collected at flush time and applied once the transaction commits.
+
+def _collect_permission_bumps(session: Session):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, UserRole):
+            yield instance.user_id, None
+        elif isinstance(instance, (Role, Permission)):
+            yield _ALL_USERS, None
+
+
+def _apply_permission_bumps(pending) -> None:
+    if _ALL_USERS in pending:
+        permission_cache.bump_all()
+        return
+    for user_id in pending:
+        permission_cache.bump_user(user_id)
+
+
+register_commit_hook("permission_cache", _collect_permission_bumps, _apply_permission_bumps)
+
+
+# Global permission cache instance shared by PermissionService and the permission decorators
+permission_cache = PermissionCache()
@@ -8,6 +8,7 @@ from ..models.user import User
 from ..models.role import Role
 from ..models.user_role import UserRole
 from ..models.permission import Permission
+from .permission_cache import permission_cache
 
 
 class PermissionService:
@@ -18,6 +19,9 @@ class PermissionService:
         """
         Get all permissions for a user based on their active roles.
         
+        The permission set is compiled once per user and served from the
+        permission cache until the user's roles or any role change.
+        
         Args:
             db: Database session
             user_id: ID of the user
@@ -26,33 +30,7 @@ class PermissionService:
             Set of permission strings (e.g., {"agent:create", "billing:view"})
         """
         try:
-            # Get all active user roles
-            user_roles = db.query(UserRole).filter(
-                and_(
-                    UserRole.user_id == user_id,
-                    UserRole.is_active == True
-                )
-            ).all()
-            
-            permissions = set()
-            
-            for user_role in user_roles:
-                # Check if role is expired
-                if user_role.is_expired():
-                    continue
-                
-                # Get the role and its permissions
-                role = db.query(Role).filter(
-                    and_(
-                        Role.id == user_role.role_id,
-                        Role.is_active == True
-                    )
-                ).first()
-                
-                if role and role.permissions:
-                    permissions.update(role.permissions)
-            
-            return permissions
+            return set(permission_cache.get(db, user_id).permissions)
             
         except Exception as e:
             # Log error and return empty set
@@ -73,19 +51,7 @@ class PermissionService:
             True if user has the permission, False otherwise
         """
         try:
-            user_permissions = PermissionService.get_user_permissions(db, user_id)
-            
-            # Check for wildcard permission (*:*)
-            if "*:*" in user_permissions:
-                print(f"DEBUG: User {user_id} has wildcard permission *:*")
-                return True
-            
-            # Check for specific permission
-            has_perm = permission in user_permissions
-            print(f"DEBUG: User {user_id} permission check for '{permission}': {has_perm}")
-            print(f"DEBUG: User {user_id} has permissions: {user_permissions}")
-            
-            return has_perm
+            return permission_cache.get(db, user_id).has_permission(permission)
             
         except Exception as e:
             print(f"Error checking permission: {e}")
@@ -105,7 +71,7 @@ class PermissionService:
             True if user has at least one of the permissions, False otherwise
         """
         try:
-            user_permissions = PermissionService.get_user_permissions(db, user_id)
+            user_permissions = permission_cache.get(db, user_id).permissions
             return any(permission in user_permissions for permission in permissions)
             
         except Exception as e:
@@ -126,7 +92,7 @@ class PermissionService:
             True if user has all permissions, False otherwise
         """
         try:
-            user_permissions = PermissionService.get_user_permissions(db, user_id)
+            user_permissions = permission_cache.get(db, user_id).permissions
             return all(permission in user_permissions for permission in permissions)
             
         except Exception as e:
@@ -147,24 +113,7 @@ class PermissionService:
             True if user has the role, False otherwise
         """
         try:
-            # Get user's active roles with explicit join
-            user_roles = db.query(UserRole).join(
-                Role, UserRole.role_id == Role.id
-            ).filter(
-                and_(
-                    UserRole.user_id == user_id,
-                    UserRole.is_active == True,
-                    Role.name == role_name,
-                    Role.is_active == True
-                )
-            ).all()
-            
-            # Check if any valid roles exist
-            for user_role in user_roles:
-                if user_role.is_valid():
-                    return True
-            
-            return False
+            return role_name in permission_cache.get(db, user_id).roles
             
         except Exception as e:
             print(f"Error checking role: {e}")
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Resident worker for persistent agent containers.
+
+This file is copied into persistent agent images as ``/app/agenthub_worker.py``
+and runs inside the container, so it must only depend on the standard library.
+
+``serve`` is used as the container CMD. It keeps the agent module imported and
+the agent instance (with its ``_state``) in memory, and accepts
+initialize/execute/cleanup requests over a Unix socket. State is persisted to
+``/app/state/agent_state.json`` after every successful initialize/execute so the
+legacy ``docker exec`` path and container restarts see the same state.
+
+Execute requests run in parallel, each on its own copy of the agent state, and
+are committed with the same optimistic, versioned merge as the ``docker exec``
+path. Initialize and cleanup replace the whole state and run exclusively.
+
+``call`` is the thin client used by the server through ``docker exec``: it
+forwards one JSON request to the worker and prints the JSON response.
+"""
+
+import copy
+import fcntl
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from io import StringIO
+
+WORKER_SOCKET_PATH = os.getenv("AGENTHUB_WORKER_SOCKET", "/tmp/agenthub_worker.sock")
+STATE_DIR = os.getenv("STATE_DIR", "/app/state")
+STATE_FILE = os.path.join(STATE_DIR, "agent_state.json")
+
+# Exit code used by the client when the worker is not reachable, so the server
+# can fall back to the one-shot ``python -c`` execution path.
+WORKER_UNAVAILABLE_EXIT_CODE = 3
+
+
+def convert_js_to_python(obj):
+    """Convert JavaScript-style string literals to Python values."""
+    if isinstance(obj, dict):
+        return {key: convert_js_to_python(value) for key, value in obj.items()}
+    elif isinstance(obj, list):
+        return [convert_js_to_python(item) for item in obj]
+    elif obj == "true":
+        return True
+    elif obj == "false":
+        return False
+    elif obj == "null":
+        return None
+    return obj
+
+
+def commit_agent_state(base_version, base_agent_state, new_agent_state, execution_id):
+    """Write agent state if no concurrent execution committed since it was read.
+
+    On a version mismatch the changes are merged key by key; only keys that both
+    executions changed to different values are treated as a conflict.
+
+    Returns:
+        Tuple of the committed version and agent state
+    """
+    missing = object()
+    with open(f"{STATE_FILE}.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        with open(STATE_FILE, "r") as f:
+            current = json.load(f)
+        if current.get("version", 0) != base_version:
+            current_agent_state = current.get("agent_state", {})
+            merged = dict(current_agent_state)
+            for key in set(base_agent_state) | set(new_agent_state):
+                ours = new_agent_state.get(key, missing)
+                base = base_agent_state.get(key, missing)
+                if ours == base:
+                    continue
+                theirs = current_agent_state.get(key, missing)
+                if theirs != base and theirs != ours:
+                    raise Exception(f"Agent state conflict on key '{key}': modified by a concurrent execution")
+                if ours is missing:
+                    merged.pop(key, None)
+                else:
+                    merged[key] = ours
+            new_agent_state = merged
+        current["agent_state"] = new_agent_state
+        current["version"] = current.get("version", 0) + 1
+        staging_path = f"{STATE_FILE}.{execution_id}.tmp"
+        with open(staging_path, "w") as f:
+            json.dump(current, f)
+        os.replace(staging_path, STATE_FILE)
+        return current["version"], new_agent_state
+
+
+class _ThreadLocalStream:
+    """Stream that writes to a per-thread capture buffer when one is installed."""
+
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def set_target(self, target):
+        self._local.target = target
+
+    def write(self, data):
+        return (getattr(self._local, "target", None) or self._fallback).write(data)
+
+    def flush(self):
+        (getattr(self._local, "target", None) or self._fallback).flush()
+
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+
+
+class _SharedExclusiveLock:
+    """Lets execute requests run together while initialize/cleanup run alone."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._shared = 0
+        self._exclusive = False
+
+    @contextmanager
+    def shared(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._exclusive)
+            self._shared += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._shared -= 1
+                self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._exclusive)
+            self._exclusive = True
+            self._condition.wait_for(lambda: self._shared == 0)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+
+class ResidentAgentWorker:
+    """Holds a single agent instance and runs requests against copies of its state."""
+
+    def __init__(self):
+        # Guards the resident instance only; requests never hold it while the agent runs
+        self._lock = threading.Lock()
+        self._gate = _SharedExclusiveLock()
+        self._agent = None
+        self._agent_key = None
+        self._config = {}
+        self._version = None
+        self._stdout = _ThreadLocalStream(sys.stdout)
+        self._stderr = _ThreadLocalStream(sys.stderr)
+        sys.stdout = self._stdout
+        sys.stderr = self._stderr
+
+    @contextmanager
+    def _capture_output(self, stdout_capture, stderr_capture):
+        """Capture print output of the current request without touching other threads."""
+        self._stdout.set_target(stdout_capture)
+        self._stderr.set_target(stderr_capture)
+        try:
+            yield
+        finally:
+            self._stdout.set_target(None)
+            self._stderr.set_target(None)
+
+    def _load_class(self, entry_point: str, agent_class: str):
+        if "/app" not in sys.path:
+            sys.path.append("/app")
+        module_name = entry_point.replace(".py", "")
+        module = __import__(module_name, fromlist=[agent_class])
+        return getattr(module, agent_class)
+
+    def _read_state_file(self):
+        try:
+            with open(STATE_FILE, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_initial_state(self, execution_id: str):
+        """Replace the persisted state with the state of a freshly initialized agent."""
+        os.makedirs(STATE_DIR, exist_ok=True)
+        # Share the state lock with one-shot exec processes that may run alongside
+        with open(f"{STATE_FILE}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            previous = self._read_state_file() or {}
+            state_data = {
+                "initialized": getattr(self._agent, "_initialized", True),
+                "config": self._config,
+                "agent_state": getattr(self._agent, "_state", {}),
+                "version": previous.get("version", 0) + 1,
+            }
+            staging_path = f"{STATE_FILE}.{execution_id}.tmp"
+            with open(staging_path, "w") as f:
+                json.dump(state_data, f)
+            os.replace(staging_path, STATE_FILE)
+        self._version = state_data["version"]
+
+    def _checkout(self, entry_point: str, agent_class: str):
+        """
+        Return a per-request copy of the resident agent and the state it starts from.
+
+        The copy shares everything the agent set up in ``initialize`` (clients,
+        loaded models) but gets its own ``_state``, so parallel executions do not
+        see each other's uncommitted changes.
+
+        Returns:
+            Tuple of (agent copy, base version, base agent state), or None if the
+            agent was never initialized
+        """
+        state_data = self._read_state_file()
+        if state_data is None:
+            return None
+        base_version = state_data.get("version", 0)
+        base_agent_state = state_data.get("agent_state", {})
+
+        key = (entry_point, agent_class)
+        with self._lock:
+            if self._agent is None or self._agent_key != key:
+                self._agent = self._load_class(entry_point, agent_class)()
+                self._agent._initialized = state_data.get("initialized", False)
+                self._agent_key = key
+                self._config = state_data.get("config", {})
+            # Picks up commits of other requests and of one-shot exec processes
+            if self._version is None or base_version > self._version:
+                self._agent._state = json.loads(json.dumps(base_agent_state))
+                self._version = base_version
+            agent = copy.copy(self._agent)
+
+        agent._state = json.loads(json.dumps(base_agent_state))
+        return agent, base_version, base_agent_state
+
+    def _commit(self, base_version, base_agent_state, new_agent_state, execution_id: str):
+        """Commit an execution's state changes and refresh the resident copy."""
+        if (json.dumps(new_agent_state, sort_keys=True, default=str)
+                == json.dumps(base_agent_state, sort_keys=True, default=str)):
+            return
+        version, committed = commit_agent_state(base_version, base_agent_state, new_agent_state, execution_id)
+        with self._lock:
+            if self._agent is not None and (self._version is None or version > self._version):
+                self._agent._state = committed
+                self._version = version
+
+    def _reset(self):
+        with self._lock:
+            self._agent = None
+            self._agent_key = None
+            self._config = {}
+            self._version = None
+
+    def handle(self, request):
+        operation = request.get("operation", "execute")
+        if operation == "ping":
+            return {"status": "success", "result": {"pong": True, "loaded": self._agent is not None}}
+
+        entry_point = request.get("entry_point", "")
+        agent_class = request.get("agent_class", "")
+        input_data = convert_js_to_python(request.get("input", {}))
+        execution_id = request.get("execution_id") or f"{os.getpid()}_{threading.get_ident()}"
+
+        stdout_capture = StringIO()
+        stderr_capture = StringIO()
+        start_time = time.time()
+
+        try:
+            if operation == "initialize":
+                with self._gate.exclusive():
+                    # Always start from a fresh instance on (re-)initialization
+                    self._reset()
+                    agent = self._load_class(entry_point, agent_class)()
+                    with self._capture_output(stdout_capture, stderr_capture):
+                        result = agent.initialize(input_data)
+                    with self._lock:
+                        self._agent = agent
+                        self._agent_key = (entry_point, agent_class)
+                        self._config = input_data
+                    self._write_initial_state(execution_id)
+            elif operation == "execute":
+                with self._gate.shared():
+                    checkout = self._checkout(entry_point, agent_class)
+                    if checkout is None:
+                        raise Exception("Agent not initialized. Call initialize first.")
+                    agent, base_version, base_agent_state = checkout
+                    with self._capture_output(stdout_capture, stderr_capture):
+                        result = agent.execute(input_data)
+                    self._commit(base_version, base_agent_state, getattr(agent, "_state", {}), execution_id)
+            elif operation == "cleanup":
+                with self._gate.exclusive():
+                    checkout = self._checkout(entry_point, agent_class)
+                    if checkout is None:
+                        result = {"status": "cleaned_up", "message": "No agent state to cleanup"}
+                    else:
+                        with self._capture_output(stdout_capture, stderr_capture):
+                            result = checkout[0].cleanup()
+                        if os.path.exists(STATE_FILE):
+                            os.remove(STATE_FILE)
+                    self._reset()
+            else:
+                return {"status": "error", "error": f"Unknown operation: {operation}"}
+
+            response = {"status": "success", "result": result}
+        except Exception as e:
+            traceback.print_exc(file=stderr_capture)
+            stderr_capture.write(f"Error: {str(e)}\n")
+            response = {"status": "error", "error": str(e)}
+
+        response["stdout"] = stdout_capture.getvalue()
+        response["stderr"] = stderr_capture.getvalue()
+        response["duration_seconds"] = time.time() - start_time
+        return response
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.read().decode("utf-8") or "{}")
+            response = self.server.worker.handle(request)
+        except Exception as e:
+            response = {"status": "error", "error": f"Worker failed to handle request: {e}"}
+        self.wfile.write(json.dumps(response, default=str).encode("utf-8"))
+
+
+class _WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve():
+    """Run the resident worker until the container stops."""
+    if os.path.exists(WORKER_SOCKET_PATH):
+        os.remove(WORKER_SOCKET_PATH)
+    server = _WorkerServer(WORKER_SOCKET_PATH, _RequestHandler)
+    server.worker = ResidentAgentWorker()
+    print(f"AgentHub worker listening on {WORKER_SOCKET_PATH}", file=sys.stderr, flush=True)
+    server.serve_forever()
+
+
+def call(payload: str) -> int:
+    """Forward one JSON request to the resident worker and print its response."""
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(WORKER_SOCKET_PATH)
+    except OSError as e:
+        print(f"AgentHub worker unavailable: {e}", file=sys.stderr)
+        return WORKER_UNAVAILABLE_EXIT_CODE
+
+    with client:
+        client.sendall(payload.encode("utf-8"))
+        client.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    sys.stdout.write(b"".join(chunks).decode("utf-8"))
+    sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "serve"
+    if command == "serve":
+        serve()
+    elif command == "call":
+        sys.exit(call(sys.argv[2] if len(sys.argv) > 2 else sys.stdin.read()))
+    else:
+        print(f"Unknown command: {command}", file=sys.stderr)
+        sys.exit(2)
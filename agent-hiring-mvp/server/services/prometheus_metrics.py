@@ -156,6 +156,73 @@ class PrometheusMetricsService:
             ['agent_id', 'deployment_type'],
             registry=self.registry
         )
+        
+        # Warm container pool metrics
+        self.warm_pool_hits = Counter(
+            'warm_pool_hits_total',
+            'Hires served with a pre-warmed container',
+            ['agent_id'],
+            registry=self.registry
+        )
+        
+        self.warm_pool_misses = Counter(
+            'warm_pool_misses_total',
+            'Hires that needed a cold container start',
+            ['agent_id', 'reason'],
+            registry=self.registry
+        )
+        
+        self.warm_pool_size = Gauge(
+            'warm_pool_idle_containers',
+            'Idle pre-warmed containers per agent',
+            ['agent_id'],
+            registry=self.registry
+        )
+        
+        # Execution result cache metrics
+        self.result_cache_hits = Counter(
+            'execution_result_cache_hits_total',
+            'Executions served from the result cache',
+            ['agent_id'],
+            registry=self.registry
+        )
+        
+        self.result_cache_misses = Counter(
+            'execution_result_cache_misses_total',
+            'Executions of cache-enabled agents that ran a container',
+            ['agent_id', 'reason'],
+            registry=self.registry
+        )
+        
+        # LLM response cache metrics
+        self.llm_cache_hits = Counter(
+            'llm_response_cache_hits_total',
+            'LLM completions served from the response cache',
+            ['provider', 'mode'],
+            registry=self.registry
+        )
+        
+        self.llm_cache_misses = Counter(
+            'llm_response_cache_misses_total',
+            'Cacheable LLM completions that called the provider',
+            ['provider', 'mode'],
+            registry=self.registry
+        )
+        
+        self.llm_cache_latency_saved = Counter(
+            'llm_response_cache_latency_saved_seconds_total',
+            'Provider latency avoided by serving completions from the response cache',
+            ['provider', 'mode'],
+            registry=self.registry
+        )
+        
+        self.time_to_first_execution = Histogram(
+            'agent_time_to_first_execution_seconds',
+            'Time from deployment creation (hire) to the first execution',
+            ['agent_id', 'source'],
+            buckets=[0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0],
+            registry=self.registry
+        )
     
     def collect_container_metrics(self, deployment_info: Dict[str, Any]):
         """Collect metrics for a specific container deployment."""
@@ -369,6 +436,51 @@ class PrometheusMetricsService:
         except Exception as e:
             logger.error(f"Error recording execution metrics: {e}")
     
+    def record_warm_pool_claim(self, agent_id: str, hit: bool, reason: str = "empty"):
+        """Record whether a hire was served from the warm container pool."""
+        try:
+            if hit:
+                self.warm_pool_hits.labels(agent_id=agent_id).inc()
+            else:
+                self.warm_pool_misses.labels(agent_id=agent_id, reason=reason).inc()
+        except Exception as e:
+            logger.error(f"Error recording warm pool metrics: {e}")
+    
+    def set_warm_pool_size(self, agent_id: str, size: int):
+        """Update the number of idle warm containers for an agent."""
+        try:
+            self.warm_pool_size.labels(agent_id=agent_id).set(size)
+        except Exception as e:
+            logger.error(f"Error recording warm pool size: {e}")
+    
+    def record_result_cache_lookup(self, agent_id: str, hit: bool, reason: str = "absent"):
+        """Record whether an execution was served from the result cache."""
+        try:
+            if hit:
+                self.result_cache_hits.labels(agent_id=agent_id).inc()
+            else:
+                self.result_cache_misses.labels(agent_id=agent_id, reason=reason).inc()
+        except Exception as e:
+            logger.error(f"Error recording result cache metrics: {e}")
+    
+    def record_llm_cache_lookup(self, provider: str, mode: str, hit: bool, latency_saved_ms: int = 0):
+        """Record whether an LLM completion was served from the response cache."""
+        try:
+            if hit:
+                self.llm_cache_hits.labels(provider=provider, mode=mode).inc()
+                self.llm_cache_latency_saved.labels(provider=provider, mode=mode).inc(latency_saved_ms / 1000.0)
+            else:
+                self.llm_cache_misses.labels(provider=provider, mode=mode).inc()
+        except Exception as e:
+            logger.error(f"Error recording LLM response cache metrics: {e}")
+    
+    def record_time_to_first_execution(self, agent_id: str, source: str, seconds: float):
+        """Record the time from hire to the first execution of a deployment."""
+        try:
+            self.time_to_first_execution.labels(agent_id=agent_id, source=source).observe(seconds)
+        except Exception as e:
+            logger.error(f"Error recording time to first execution: {e}")
+    
     def get_metrics(self) -> str:
         """Get metrics in Prometheus format."""
         try:
@@ -2,7 +2,7 @@
 Resource Manager - Orchestrates external resources and execution tracking.
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, AsyncIterator, Optional, List
 from datetime import datetime
 import asyncio
 
@@ -11,9 +11,55 @@ from .resources.llm import OpenAIResource, AnthropicResource, LiteLLMResource
 from .resources.vector_db import PineconeResource, ChromaResource
 from .resources.web_search import SerperResource, SerpapiResource, DuckDuckGoResource
 
+# Resource configurations
+RESOURCE_CONFIGS = {
+    'openai': {
+        'rates': {
+            'gpt-3.5-turbo': {'input': 0.0015, 'output': 0.002},
+            'gpt-4': {'input': 0.03, 'output': 0.06},
+            'text-embedding-ada-002': {'input': 0.0001}
+        },
+        'rate_limits': {'requests_per_minute': 60, 'tokens_per_minute': 90000}
+    },
+    'anthropic': {
+        'rates': {
+            'claude-3-sonnet': {'input': 0.015, 'output': 0.075},
+            'claude-3-haiku': {'input': 0.00025, 'output': 0.00125}
+        },
+        'rate_limits': {'requests_per_minute': 50, 'tokens_per_minute': 40000}
+    },
+    'litellm': {
+        'rates': {
+            # Dynamic rates based on actual model costs from LiteLLM
+            'default': {'input': 0.0015, 'output': 0.002}
+        },
+        'rate_limits': {'requests_per_minute': 100, 'tokens_per_minute': 200000}
+    },
+    'pinecone': {
+        'rates': {'upsert': 0.0001, 'query': 0.0, 'delete': 0.0},
+        'rate_limits': {'requests_per_minute': 100}
+    },
+    'serper': {
+        'rates': {'search': 0.001},
+        'rate_limits': {'requests_per_minute': 100}
+    },
+    'serpapi': {
+        'rates': {'search': 0.005},
+        'rate_limits': {'requests_per_minute': 50}
+    }
+}
+
 
 class ResourceManager:
-    """Manages all external resources for agent executions"""
+    """
+    Manages all external resources for agent executions.
+    
+    A ResourceManager holds the state of one request or execution (the
+    database session, execution_id and user). Provider clients, pooled
+    connections and parsed API keys live in the process-wide
+    ``resources.registry`` and are shared between managers, so creating one
+    per request does no file I/O.
+    """
     
     def __init__(self, db_session):
         self.db = db_session
@@ -24,42 +70,7 @@ class ResourceManager:
         self.user_id: Optional[int] = None
         
         # Resource configurations
-        self.resource_configs = {
-            'openai': {
-                'rates': {
-                    'gpt-3.5-turbo': {'input': 0.0015, 'output': 0.002},
-                    'gpt-4': {'input': 0.03, 'output': 0.06},
-                    'text-embedding-ada-002': {'input': 0.0001}
-                },
-                'rate_limits': {'requests_per_minute': 60}
-            },
-            'anthropic': {
-                'rates': {
-                    'claude-3-sonnet': {'input': 0.015, 'output': 0.075},
-                    'claude-3-haiku': {'input': 0.00025, 'output': 0.00125}
-                },
-                'rate_limits': {'requests_per_minute': 50}
-            },
-            'litellm': {
-                'rates': {
-                    # Dynamic rates based on actual model costs from LiteLLM
-                    'default': {'input': 0.0015, 'output': 0.002}
-                },
-                'rate_limits': {'requests_per_minute': 100}
-            },
-            'pinecone': {
-                'rates': {'upsert': 0.0001, 'query': 0.0, 'delete': 0.0},
-                'rate_limits': {'requests_per_minute': 100}
-            },
-            'serper': {
-                'rates': {'search': 0.001},
-                'rate_limits': {'requests_per_minute': 100}
-            },
-            'serpapi': {
-                'rates': {'search': 0.005},
-                'rate_limits': {'requests_per_minute': 50}
-            }
-        }
+        self.resource_configs = RESOURCE_CONFIGS
     
     async def start_execution(self, execution_id: str, user_id: int) -> None:
         """Start tracking a new execution"""
@@ -124,6 +135,7 @@ class ResourceManager:
                 raise ValueError(f"Unsupported LLM provider: {provider}")
             
             await resource.initialize(self.user_id)
+            resource.user_id = self.user_id
             self.resources[resource_key] = resource
         
         return self.resources[resource_key]
@@ -150,6 +162,7 @@ class ResourceManager:
                 raise ValueError(f"Unsupported vector DB provider: {provider}")
             
             await resource.initialize(self.user_id)
+            resource.user_id = self.user_id
             self.resources[resource_key] = resource
         
         return self.resources[resource_key]
@@ -178,6 +191,7 @@ class ResourceManager:
                 raise ValueError(f"Unsupported web search provider: {provider}")
             
             await resource.initialize(self.user_id)
+            resource.user_id = self.user_id
             self.resources[resource_key] = resource
         
         return self.resources[resource_key]
@@ -202,6 +216,25 @@ class ResourceManager:
             **kwargs
         )
     
+    async def stream_llm_completion(self,
+                                    provider: str,
+                                    model: str,
+                                    messages: List[Dict[str, str]],
+                                    **kwargs) -> AsyncIterator[str]:
+        """Start a streamed LLM completion with tracking; the resource is ready before the first chunk"""
+        # If no active execution, create a temporary one for direct API calls
+        if self.execution_id is None:
+            self.execution_id = "temp_direct_api"
+            self.user_id = 0
+            
+        llm = await self.get_llm(provider, model)
+        return llm.stream_completion(
+            execution_id=self.execution_id,
+            model=model,
+            messages=messages,
+            **kwargs
+        )
+    
     async def execute_llm_embedding(self,
                                   provider: str,
                                   model: str,
@@ -220,6 +253,19 @@ class ResourceManager:
             input=input_text
         )
     
+    async def execute_llm_embedding_batch(self,
+                                        provider: str,
+                                        model: str,
+                                        texts: List[str]) -> Dict[str, Any]:
+        """Embed many texts in provider-sized batches with tracking"""
+        # If no active execution, create a temporary one for direct API calls
+        if self.execution_id is None:
+            self.execution_id = "temp_direct_api"
+            self.user_id = 0
+            
+        llm = await self.get_llm(provider, model)
+        return await llm.embed_batch(self.execution_id, model, texts)
+    
     async def execute_vector_search(self,
                                   provider: str,
                                   query_vector: List[float],
@@ -297,6 +343,18 @@ class ResourceManager:
         if execution_id:
             # Set execution ID if provided
             self.execution_id = execution_id
+            if self.user_id is None:
+                # Calls of a known execution are tracked against it and its user
+                # (per-user rate limits and response cache entries)
+                try:
+                    from ..models.execution import Execution
+                    execution = self.db.query(Execution.user_id).filter(
+                        Execution.execution_id == str(execution_id)
+                    ).first()
+                    if execution and execution.user_id is not None:
+                        self.user_id = execution.user_id
+                except Exception:
+                    self.db.rollback()
         return AgentResourceProxy(self)
 
 
@@ -324,6 +382,22 @@ class AgentResourceProxy:
         
         return response.get("content", "")
     
+    async def llm_stream(self,
+                        provider: str = "openai",
+                        model: str = "gpt-3.5-turbo",
+                        messages: Optional[List[Dict[str, str]]] = None,
+                        **kwargs) -> AsyncIterator[str]:
+        """Complete text using LLM, yielding the text as it is generated"""
+        if messages is None:
+            messages = []
+        
+        return await self.rm.stream_llm_completion(
+            provider=provider,
+            model=model,
+            messages=messages,
+            **kwargs
+        )
+    
     async def llm_embed(self,
                        text: str,
                        provider: str = "openai",
@@ -337,6 +411,17 @@ class AgentResourceProxy:
         
         return response.get("embeddings", [])
     
+    async def llm_embed_batch(self,
+                             texts: List[str],
+                             provider: str = "openai",
+                             model: str = "text-embedding-ada-002") -> Dict[str, Any]:
+        """Generate embeddings for many texts, in input order"""
+        return await self.rm.execute_llm_embedding_batch(
+            provider=provider,
+            model=model,
+            texts=texts
+        )
+    
     async def vector_search(self,
                            query_vector: List[float],
                            provider: str = "pinecone",
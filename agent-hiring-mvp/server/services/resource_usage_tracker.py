@@ -10,7 +10,7 @@ from datetime import datetime, timezone, timedelta
 from decimal import Decimal, ROUND_HALF_UP
 import docker
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case
 
 from ..models.container_resource_usage import ContainerResourceUsage, ResourcePricing, UsageAggregation, AgentActivityLog
 from ..models.deployment import AgentDeployment
@@ -19,6 +19,7 @@ from ..models.hiring import Hiring
 from ..models.user import User
 from ..models.execution import Execution
 from ..models.resource_usage import ExecutionResourceUsage
+from .usage_rollup_service import period_bucket_start, sum_rollups
 
 logger = logging.getLogger(__name__)
 
@@ -79,7 +80,7 @@ class ResourceUsageTracker:
             
             # Get container stats from Docker
             try:
-                container = self.docker_client.containers.get(deployment.container_name)
+                container = self.docker_client.containers.get(deployment.container_id or deployment.container_name)
                 stats = container.stats(stream=False)
                 
                 # Validate that we have the required stats structure
@@ -98,142 +99,8 @@ class ResourceUsageTracker:
                 logger.error(f"Error getting stats for container {deployment.container_name}: {e}")
                 return None
             
-            # Calculate CPU usage percentage
-            # NOTE: The 'system_cpu_usage' field is not always available in Docker container stats,
-            # especially on macOS or with certain container runtimes. This implementation provides
-            # a fallback calculation method to handle missing fields gracefully.
-            try:
-                # Check if we have the required CPU stats fields
-                if ('cpu_stats' in stats and 'precpu_stats' in stats and 
-                    'cpu_usage' in stats['cpu_stats'] and 'cpu_usage' in stats['precpu_stats']):
-                    
-                    cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - stats['precpu_stats']['cpu_usage']['total_usage']
-                    
-                    # Try to get system CPU usage - this field might not exist on all platforms
-                    system_delta = 0
-                    if ('system_cpu_usage' in stats['cpu_stats'] and 
-                        'system_cpu_usage' in stats['precpu_stats']):
-                        system_delta = stats['cpu_stats']['system_cpu_usage'] - stats['precpu_stats']['system_cpu_usage']
-                    else:
-                        # Fallback: use online_cpus if available, or estimate from other sources
-                        try:
-                            # Try to get CPU count from various sources
-                            cpu_count = 1
-                            if 'online_cpus' in stats['cpu_stats']:
-                                cpu_count = stats['cpu_stats']['online_cpus']
-                            elif 'cpu_usage' in stats['cpu_stats'] and 'percpu_usage' in stats['cpu_stats']['cpu_usage']:
-                                cpu_count = len(stats['cpu_stats']['cpu_usage']['percpu_usage'])
-                            
-                            # If we can't get system CPU usage, estimate CPU usage from container CPU delta
-                            # This is a fallback method that's less accurate but more reliable
-                            if cpu_delta > 0:
-                                # Estimate CPU usage based on container CPU time delta
-                                # This assumes the container is using a reasonable amount of CPU
-                                # and provides a conservative estimate
-                                cpu_usage_percent = min(cpu_delta / 1000000.0, 100.0)  # Conservative estimate
-                            else:
-                                cpu_usage_percent = 0.0
-                            
-                            logger.debug(f"Using fallback CPU calculation for {deployment.container_name}: "
-                                       f"cpu_delta={cpu_delta}, estimated_usage={cpu_usage_percent:.2f}%")
-                            
-                        except (KeyError, TypeError) as e:
-                            logger.debug(f"Fallback CPU calculation failed for {deployment.container_name}: {e}")
-                            cpu_usage_percent = 0.0
-                    
-                    # If we have system_delta, use the standard calculation
-                    if system_delta > 0:
-                        # Get CPU count - handle cases where percpu_usage might not exist
-                        try:
-                            cpu_count = len(stats['cpu_stats']['cpu_usage']['percpu_usage'])
-                        except (KeyError, TypeError):
-                            # Fallback: try to get CPU count from other sources
-                            try:
-                                cpu_count = stats['cpu_stats'].get('online_cpus', 1)
-                            except (KeyError, TypeError):
-                                cpu_count = 1  # Default to 1 CPU if we can't determine
-                        
-                        cpu_usage_percent = (cpu_delta / system_delta) * cpu_count * 100.0
-                    elif system_delta == 0 and 'cpu_usage_percent' not in locals():
-                        # Container is idle or stats are not yet available
-                        cpu_usage_percent = 0.0
-                        
-                else:
-                    logger.debug(f"Missing required CPU stats fields for {deployment.container_name}")
-                    cpu_usage_percent = 0.0
-                    
-            except (KeyError, TypeError) as e:
-                logger.warning(f"Error calculating CPU usage for {deployment.container_name}: {e}")
-                cpu_usage_percent = 0.0
-            except Exception as e:
-                logger.error(f"Unexpected error calculating CPU usage for {deployment.container_name}: {e}")
-                cpu_usage_percent = 0.0
-            
-            # Memory usage
-            try:
-                memory_usage = stats['memory_stats'].get('usage', 0)
-                memory_limit = stats['memory_stats'].get('limit', 0)
-                
-                # Ensure we have valid memory values
-                if memory_usage is None or memory_limit is None:
-                    logger.warning(f"Container {deployment.container_name} has invalid memory stats")
-                    memory_usage = 0
-                    memory_limit = 0
-                    
-            except (KeyError, TypeError) as e:
-                logger.warning(f"Error getting memory stats for {deployment.container_name}: {e}")
-                memory_usage = 0
-                memory_limit = 0
-            
-            # Network stats
-            try:
-                network_stats = stats.get('networks', {})
-                rx_bytes = sum(net.get('rx_bytes', 0) for net in network_stats.values()) if network_stats else 0
-                tx_bytes = sum(net.get('tx_bytes', 0) for net in network_stats.values()) if network_stats else 0
-            except (KeyError, TypeError) as e:
-                logger.warning(f"Error getting network stats for {deployment.container_name}: {e}")
-                rx_bytes = 0
-                tx_bytes = 0
-            
-            # Block I/O stats
-            try:
-                block_stats = stats.get('blkio_stats', {}).get('io_service_bytes', [])
-                read_bytes = sum(stat.get('value', 0) for stat in block_stats if stat.get('op') == 'Read')
-                write_bytes = sum(stat.get('value', 0) for stat in block_stats if stat.get('op') == 'Write')
-            except (KeyError, TypeError) as e:
-                logger.warning(f"Error getting block I/O stats for {deployment.container_name}: {e}")
-                read_bytes = 0
-                write_bytes = 0
-            
-            # Get pricing for this resource type (agent-type independent)
+            metrics = self.compute_container_metrics(stats, deployment.container_name)
             deployment_type = deployment.deployment_type or "function"
-            cpu_cost_per_hour = self.pricing.get("cpu", 4.16)
-            memory_cost_per_gb_hour = self.pricing.get("memory", 0.56)
-            network_cost_per_gb = self.pricing.get("network", 9.00)
-            storage_cost_per_gb_hour = self.pricing.get("storage", 10.00) / 730  # Convert monthly to hourly
-            
-            # Calculate costs for this snapshot (30-second interval)
-            interval_hours = self.collection_interval / 3600.0
-            
-            # CPU cost: proportional to usage percentage
-            cpu_cost = (cpu_usage_percent / 100.0) * cpu_cost_per_hour * interval_hours
-            
-            # Memory cost: based on actual usage
-            memory_gb = memory_usage / (1024**3)
-            memory_cost = memory_gb * memory_cost_per_gb_hour * interval_hours
-            
-            # Network cost: based on data transfer
-            network_gb = (rx_bytes + tx_bytes) / (1024**3)
-            network_cost = network_gb * network_cost_per_gb
-            
-            # Storage cost: based on memory limit (storage allocation)
-            storage_gb = memory_limit / (1024**3)
-            storage_cost = storage_gb * storage_cost_per_gb_hour * interval_hours
-            
-            # Total cost for this snapshot
-            total_cost = cpu_cost + memory_cost + network_cost + storage_cost
-            
-
             
             # Create resource usage record
             resource_usage = ContainerResourceUsage(
@@ -245,30 +112,14 @@ class ResourceUsageTracker:
                 user_id=deployment.hiring.user_id,
                 
                 # Resource metrics
-                cpu_usage_percent=cpu_usage_percent,
-                memory_usage_bytes=memory_usage,
-                memory_limit_bytes=memory_limit,
-                network_rx_bytes=rx_bytes,
-                network_tx_bytes=tx_bytes,
-                block_read_bytes=read_bytes,
-                block_write_bytes=write_bytes,
+                **metrics,
                 
                 # Container status
                 container_status=getattr(container, 'status', 'unknown'),
                 is_healthy=getattr(deployment, 'is_healthy', False),
                 
-                # Pricing configuration
-                cpu_cost_per_hour=cpu_cost_per_hour,
-                memory_cost_per_gb_hour=memory_cost_per_gb_hour,
-                network_cost_per_gb=network_cost_per_gb,
-                storage_cost_per_gb_hour=storage_cost_per_gb_hour,
-                
-                # Calculated costs
-                cpu_cost=cpu_cost,
-                memory_cost=memory_cost,
-                network_cost=network_cost,
-                storage_cost=storage_cost,
-                total_cost=total_cost,
+                # Pricing configuration and calculated costs
+                **self.compute_snapshot_costs(metrics),
                 
                 # Time tracking
                 snapshot_timestamp=datetime.now(timezone.utc),
@@ -284,11 +135,6 @@ class ResourceUsageTracker:
             self.db.add(resource_usage)
             self.db.commit()
             
-            # Calculate memory in GB for logging
-            memory_gb = memory_usage / (1024**3) if memory_usage else 0
-            
-
-            
             return resource_usage
             
         except Exception as e:
@@ -296,58 +142,203 @@ class ResourceUsageTracker:
             self.db.rollback()
             return None
     
+    def compute_container_metrics(self, stats: Dict[str, Any], container_name: str) -> Dict[str, Any]:
+        """Extract CPU, memory, network and block I/O metrics from a Docker stats sample."""
+        # Calculate CPU usage percentage
+        # NOTE: The 'system_cpu_usage' field is not always available in Docker container stats,
+        # especially on macOS or with certain container runtimes. This implementation provides
+        # a fallback calculation method to handle missing fields gracefully.
+        cpu_usage_percent = 0.0
+        try:
+            # Check if we have the required CPU stats fields
+            if ('cpu_stats' in stats and 'precpu_stats' in stats and 
+                'cpu_usage' in stats['cpu_stats'] and 'cpu_usage' in stats['precpu_stats']):
+                
+                cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - stats['precpu_stats']['cpu_usage']['total_usage']
+                
+                # Try to get system CPU usage - this field might not exist on all platforms
+                system_delta = 0
+                if ('system_cpu_usage' in stats['cpu_stats'] and 
+                    'system_cpu_usage' in stats['precpu_stats']):
+                    system_delta = stats['cpu_stats']['system_cpu_usage'] - stats['precpu_stats']['system_cpu_usage']
+                
+                if system_delta > 0:
+                    # Get CPU count - handle cases where percpu_usage might not exist
+                    try:
+                        cpu_count = len(stats['cpu_stats']['cpu_usage']['percpu_usage'])
+                    except (KeyError, TypeError):
+                        cpu_count = stats['cpu_stats'].get('online_cpus', 1) or 1
+                    
+                    cpu_usage_percent = (cpu_delta / system_delta) * cpu_count * 100.0
+                elif cpu_delta > 0:
+                    # If we can't get system CPU usage, estimate CPU usage from container CPU delta
+                    # This is a fallback method that's less accurate but more reliable
+                    cpu_usage_percent = min(cpu_delta / 1000000.0, 100.0)  # Conservative estimate
+                    logger.debug(f"Using fallback CPU calculation for {container_name}: "
+                               f"cpu_delta={cpu_delta}, estimated_usage={cpu_usage_percent:.2f}%")
+            else:
+                logger.debug(f"Missing required CPU stats fields for {container_name}")
+                
+        except (KeyError, TypeError) as e:
+            logger.warning(f"Error calculating CPU usage for {container_name}: {e}")
+            cpu_usage_percent = 0.0
+        except Exception as e:
+            logger.error(f"Unexpected error calculating CPU usage for {container_name}: {e}")
+            cpu_usage_percent = 0.0
+        
+        # Memory usage
+        try:
+            memory_usage = stats['memory_stats'].get('usage', 0)
+            memory_limit = stats['memory_stats'].get('limit', 0)
+            
+            # Ensure we have valid memory values
+            if memory_usage is None or memory_limit is None:
+                logger.warning(f"Container {container_name} has invalid memory stats")
+                memory_usage = 0
+                memory_limit = 0
+                
+        except (KeyError, TypeError) as e:
+            logger.warning(f"Error getting memory stats for {container_name}: {e}")
+            memory_usage = 0
+            memory_limit = 0
+        
+        # Network stats
+        try:
+            network_stats = stats.get('networks', {})
+            rx_bytes = sum(net.get('rx_bytes', 0) for net in network_stats.values()) if network_stats else 0
+            tx_bytes = sum(net.get('tx_bytes', 0) for net in network_stats.values()) if network_stats else 0
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Error getting network stats for {container_name}: {e}")
+            rx_bytes = 0
+            tx_bytes = 0
+        
+        # Block I/O stats
+        try:
+            block_stats = (stats.get('blkio_stats') or {}).get('io_service_bytes') or []
+            read_bytes = sum(stat.get('value', 0) for stat in block_stats if stat.get('op') in ('Read', 'read'))
+            write_bytes = sum(stat.get('value', 0) for stat in block_stats if stat.get('op') in ('Write', 'write'))
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Error getting block I/O stats for {container_name}: {e}")
+            read_bytes = 0
+            write_bytes = 0
+        
+        return {
+            "cpu_usage_percent": cpu_usage_percent,
+            "memory_usage_bytes": memory_usage,
+            "memory_limit_bytes": memory_limit,
+            "network_rx_bytes": rx_bytes,
+            "network_tx_bytes": tx_bytes,
+            "block_read_bytes": read_bytes,
+            "block_write_bytes": write_bytes
+        }
+    
+    def compute_snapshot_costs(self, metrics: Dict[str, Any]) -> Dict[str, float]:
+        """Calculate the pricing and costs of one collection-interval snapshot."""
+        # Get pricing for this resource type (agent-type independent)
+        cpu_cost_per_hour = self.pricing.get("cpu", 4.16)
+        memory_cost_per_gb_hour = self.pricing.get("memory", 0.56)
+        network_cost_per_gb = self.pricing.get("network", 9.00)
+        storage_cost_per_gb_hour = self.pricing.get("storage", 10.00) / 730  # Convert monthly to hourly
+        
+        # Calculate costs for this snapshot (30-second interval)
+        interval_hours = self.collection_interval / 3600.0
+        
+        # CPU cost: proportional to usage percentage
+        cpu_cost = (metrics["cpu_usage_percent"] / 100.0) * cpu_cost_per_hour * interval_hours
+        
+        # Memory cost: based on actual usage
+        memory_gb = metrics["memory_usage_bytes"] / (1024**3)
+        memory_cost = memory_gb * memory_cost_per_gb_hour * interval_hours
+        
+        # Network cost: based on data transfer
+        network_gb = (metrics["network_rx_bytes"] + metrics["network_tx_bytes"]) / (1024**3)
+        network_cost = network_gb * network_cost_per_gb
+        
+        # Storage cost: based on memory limit (storage allocation)
+        storage_gb = metrics["memory_limit_bytes"] / (1024**3)
+        storage_cost = storage_gb * storage_cost_per_gb_hour * interval_hours
+        
+        return {
+            "cpu_cost_per_hour": cpu_cost_per_hour,
+            "memory_cost_per_gb_hour": memory_cost_per_gb_hour,
+            "network_cost_per_gb": network_cost_per_gb,
+            "storage_cost_per_gb_hour": storage_cost_per_gb_hour,
+            "cpu_cost": cpu_cost,
+            "memory_cost": memory_cost,
+            "network_cost": network_cost,
+            "storage_cost": storage_cost,
+            # Total cost for this snapshot
+            "total_cost": cpu_cost + memory_cost + network_cost + storage_cost
+        }
+    
     def calculate_hourly_usage(self, deployment_id: str, hour_start: datetime) -> Dict[str, Any]:
-        """Calculate hourly usage and costs for a specific deployment."""
+        """
+        Calculate hourly usage and costs for a specific deployment.
+
+        Usage and costs come from the "hourly" usage aggregation of the
+        deployment's hiring, which outlives the raw snapshots. The running
+        percentage needs raw snapshots and is only reported while they are
+        retained (``RAW_USAGE_RETENTION_DAYS``).
+        """
         try:
+            hour_start = period_bucket_start(hour_start, "hourly")
             hour_end = hour_start + timedelta(hours=1)
+            no_data = {
+                "deployment_id": deployment_id,
+                "hour_start": hour_start,
+                "hour_end": hour_end,
+                "snapshots_count": 0,
+                "total_cost": 0.0,
+                "average_cpu_percent": 0.0,
+                "average_memory_gb": 0.0,
+                "total_network_gb": 0.0,
+                "status": "no_data"
+            }
+            
+            deployment = self.db.query(AgentDeployment.hiring_id).filter(
+                AgentDeployment.deployment_id == deployment_id
+            ).first()
+            if deployment is None:
+                return no_data
             
-            # Get all snapshots for this hour
-            snapshots = self.db.query(ContainerResourceUsage).filter(
+            in_hour = and_(
+                UsageAggregation.hiring_id == deployment.hiring_id,
+                UsageAggregation.period_start == hour_start
+            )
+            if not self.db.query(func.count(UsageAggregation.id)).filter(
+                UsageAggregation.aggregation_period == "hourly", in_hour
+            ).scalar():
+                return no_data
+            totals = sum_rollups(self.db, "hourly", in_hour)
+            
+            row = self.db.query(
+                func.count(ContainerResourceUsage.id).label("snapshots_count"),
+                func.sum(case((ContainerResourceUsage.container_status == "running", 1), else_=0)).label("running_snapshots")
+            ).filter(
                 and_(
                     ContainerResourceUsage.deployment_id == deployment_id,
                     ContainerResourceUsage.snapshot_timestamp >= hour_start,
                     ContainerResourceUsage.snapshot_timestamp < hour_end
                 )
-            ).order_by(ContainerResourceUsage.snapshot_timestamp).all()
-            
-            if not snapshots:
-                return {
-                    "deployment_id": deployment_id,
-                    "hour_start": hour_start,
-                    "hour_end": hour_end,
-                    "snapshots_count": 0,
-                    "total_cost": 0.0,
-                    "average_cpu_percent": 0.0,
-                    "average_memory_gb": 0.0,
-                    "total_network_gb": 0.0,
-                    "status": "no_data"
-                }
-            
-            # Calculate averages and totals
-            total_cost = sum(s.total_cost for s in snapshots)
-            average_cpu = sum(s.cpu_usage_percent for s in snapshots) / len(snapshots)
-            average_memory = sum(s.memory_usage_bytes for s in snapshots) / len(snapshots) / (1024**3)
-            
-            # Network usage (cumulative)
-            total_network_rx = sum(s.network_rx_bytes for s in snapshots)
-            total_network_tx = sum(s.network_tx_bytes for s in snapshots)
-            total_network_gb = (total_network_rx + total_network_tx) / (1024**3)
+            ).one()
             
             # Determine if container was running the full hour
-            running_snapshots = [s for s in snapshots if s.container_status == "running"]
-            running_percentage = len(running_snapshots) / len(snapshots) if snapshots else 0
+            running_percentage = None
+            if row.snapshots_count:
+                running_percentage = (row.running_snapshots or 0) / row.snapshots_count
             
+            # CPU-hours and GB-hours of a single hour equal the average CPU fraction and GB over it
             return {
                 "deployment_id": deployment_id,
                 "hour_start": hour_start,
                 "hour_end": hour_end,
-                "snapshots_count": len(snapshots),
+                "snapshots_count": row.snapshots_count,
                 "running_percentage": running_percentage,
-                "total_cost": total_cost,
-                "average_cpu_percent": average_cpu,
-                "average_memory_gb": average_memory,
-                "total_network_gb": total_network_gb,
-                "status": "active" if running_percentage > 0.5 else "inactive"
+                "total_cost": totals["total_cost"],
+                "average_cpu_percent": totals["total_cpu_hours"] * 100.0,
+                "average_memory_gb": totals["total_memory_gb_hours"],
+                "total_network_gb": totals["total_network_gb"],
+                "status": "active" if running_percentage is None or running_percentage > 0.5 else "inactive"
             }
             
         except Exception as e:
@@ -355,20 +346,47 @@ class ResourceUsageTracker:
             return {}
     
     def aggregate_daily_usage(self, user_id: int, date: datetime) -> Dict[str, Any]:
-        """Aggregate daily usage for a user."""
+        """Aggregate daily usage for a user from the daily usage rollups."""
         try:
-            date_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+            date_start = period_bucket_start(date, "daily")
             date_end = date_start + timedelta(days=1)
             
-            # Get all deployments for this user on this date
-            deployments = self.db.query(AgentDeployment).join(Hiring).filter(
+            # One row per hiring that used resources on this date
+            hiring_rows = self.db.query(
+                UsageAggregation.hiring_id,
+                UsageAggregation.agent_id,
+                UsageAggregation.deployment_type,
+                func.sum(UsageAggregation.total_cost).label("total_cost"),
+                func.sum(UsageAggregation.total_cpu_hours).label("cpu_hours"),
+                func.sum(UsageAggregation.total_memory_gb_hours).label("memory_gb_hours"),
+                func.sum(UsageAggregation.total_network_gb).label("network_gb")
+            ).filter(
                 and_(
-                    Hiring.user_id == user_id,
-                    AgentDeployment.created_at >= date_start,
-                    AgentDeployment.created_at < date_end
+                    UsageAggregation.user_id == user_id,
+                    UsageAggregation.aggregation_period == "daily",
+                    UsageAggregation.hiring_id > 0,
+                    UsageAggregation.period_start == date_start
                 )
+            ).group_by(
+                UsageAggregation.hiring_id, UsageAggregation.agent_id, UsageAggregation.deployment_type
             ).all()
             
+            # Latest deployment of each hiring
+            deployments = {}
+            if hiring_rows:
+                for deployment in self.db.query(AgentDeployment).filter(
+                    AgentDeployment.hiring_id.in_([row.hiring_id for row in hiring_rows])
+                ).order_by(AgentDeployment.created_at).all():
+                    deployments[deployment.hiring_id] = deployment
+            
+            requests_by_hiring = dict(self.db.query(
+                AgentActivityLog.hiring_id, func.count(AgentActivityLog.id)
+            ).filter(
+                AgentActivityLog.user_id == user_id,
+                AgentActivityLog.activity_timestamp >= date_start,
+                AgentActivityLog.activity_timestamp < date_end
+            ).group_by(AgentActivityLog.hiring_id).all())
+            
             daily_summary = {
                 "user_id": user_id,
                 "date": date_start.date().isoformat(),
@@ -377,44 +395,22 @@ class ResourceUsageTracker:
                 "total_cpu_hours": 0.0,
                 "total_memory_gb_hours": 0.0,
                 "total_network_gb": 0.0,
-                "total_requests": 0
+                "total_requests": sum(requests_by_hiring.values())
             }
             
-            for deployment in deployments:
-                # Calculate hourly usage for this deployment
-                deployment_costs = []
-                deployment_cpu_hours = 0.0
-                deployment_memory_gb_hours = 0.0
-                deployment_network_gb = 0.0
-                
-                # Check each hour of the day
-                for hour in range(24):
-                    hour_start = date_start + timedelta(hours=hour)
-                    hourly_usage = self.calculate_hourly_usage(deployment.deployment_id, hour_start)
-                    
-                    if hourly_usage.get("snapshots_count", 0) > 0:
-                        deployment_costs.append(hourly_usage["total_cost"])
-                        deployment_cpu_hours += hourly_usage["average_cpu_percent"] / 100.0  # Convert to CPU-hours
-                        deployment_memory_gb_hours += hourly_usage["average_memory_gb"]
-                        deployment_network_gb += hourly_usage["total_network_gb"]
-                
-                # Get activity count for this deployment
-                activity_count = self.db.query(AgentActivityLog).filter(
-                    AgentActivityLog.deployment_id == deployment.deployment_id,
-                    AgentActivityLog.activity_timestamp >= date_start,
-                    AgentActivityLog.activity_timestamp < date_end
-                ).count()
-                
+            for row in hiring_rows:
+                deployment = deployments.get(row.hiring_id)
                 deployment_summary = {
-                    "deployment_id": deployment.deployment_id,
-                    "agent_id": deployment.agent_id,
-                    "deployment_type": deployment.deployment_type,
-                    "total_cost": sum(deployment_costs),
-                    "cpu_hours": deployment_cpu_hours,
-                    "memory_gb_hours": deployment_memory_gb_hours,
-                    "network_gb": deployment_network_gb,
-                    "requests": activity_count,
-                    "status": deployment.status
+                    "deployment_id": deployment.deployment_id if deployment else None,
+                    "hiring_id": row.hiring_id,
+                    "agent_id": row.agent_id,
+                    "deployment_type": row.deployment_type,
+                    "total_cost": float(row.total_cost or 0.0),
+                    "cpu_hours": float(row.cpu_hours or 0.0),
+                    "memory_gb_hours": float(row.memory_gb_hours or 0.0),
+                    "network_gb": float(row.network_gb or 0.0),
+                    "requests": requests_by_hiring.get(row.hiring_id, 0),
+                    "status": deployment.status if deployment else None
                 }
                 
                 daily_summary["deployments"].append(deployment_summary)
@@ -422,10 +418,6 @@ class ResourceUsageTracker:
                 daily_summary["total_cpu_hours"] += deployment_summary["cpu_hours"]
                 daily_summary["total_memory_gb_hours"] += deployment_summary["memory_gb_hours"]
                 daily_summary["total_network_gb"] += deployment_summary["network_gb"]
-                daily_summary["total_requests"] += deployment_summary["requests"]
-            
-            # Save daily aggregation
-            self._save_daily_aggregation(user_id, date_start, daily_summary)
             
             return daily_summary
             
@@ -433,49 +425,6 @@ class ResourceUsageTracker:
             logger.error(f"Error aggregating daily usage for user {user_id}: {e}")
             return {}
     
-    def _save_daily_aggregation(self, user_id: int, date: datetime, summary: Dict[str, Any]):
-        """Save daily usage aggregation to database."""
-        try:
-            # Check if aggregation already exists
-            existing = self.db.query(UsageAggregation).filter(
-                and_(
-                    UsageAggregation.user_id == user_id,
-                    UsageAggregation.aggregation_period == "daily",
-                    UsageAggregation.period_start == date
-                )
-            ).first()
-            
-            if existing:
-                # Update existing
-                existing.total_cpu_hours = summary["total_cpu_hours"]
-                existing.total_memory_gb_hours = summary["total_memory_gb_hours"]
-                existing.total_network_gb = summary["total_network_gb"]
-                existing.total_requests = summary["total_requests"]
-                existing.total_cost = summary["total_cost"]
-            else:
-                # Create new aggregation
-                aggregation = UsageAggregation(
-                    user_id=user_id,
-                    agent_id="",  # Will be updated with specific agent data
-                    hiring_id=0,   # Will be updated with specific hiring data
-                    aggregation_period="daily",
-                    period_start=date,
-                    period_end=date + timedelta(days=1),
-                    total_cpu_hours=summary["total_cpu_hours"],
-                    total_memory_gb_hours=summary["total_memory_gb_hours"],
-                    total_network_gb=summary["total_network_gb"],
-                    total_requests=summary["total_requests"],
-                    total_cost=summary["total_cost"],
-                    deployment_type="mixed"  # Will be updated with specific type
-                )
-                self.db.add(aggregation)
-            
-            self.db.commit()
-            
-        except Exception as e:
-            logger.error(f"Error saving daily aggregation: {e}")
-            self.db.rollback()
-    
     def create_hiring_aggregation(self, hiring_id: int) -> Dict[str, Any]:
         """Create hiring-level resource usage aggregation for billing."""
         try:
@@ -485,47 +434,20 @@ class ResourceUsageTracker:
                 logger.error(f"Hiring {hiring_id} not found")
                 return {}
             
-            # Get all container usage for this hiring
-            container_usage = self.db.query(ContainerResourceUsage).filter(
-                ContainerResourceUsage.hiring_id == hiring_id
-            ).all()
+            # Sum the daily rollups of this hiring
+            usage_days = self.db.query(func.count(UsageAggregation.id)).filter(
+                UsageAggregation.hiring_id == hiring_id,
+                UsageAggregation.aggregation_period == "daily"
+            ).scalar() or 0
             
-            if not container_usage:
+            if not usage_days:
                 logger.info(f"No container usage found for hiring {hiring_id}")
                 return {}
             
-            # Calculate totals
-            total_cpu_hours = 0.0
-            total_memory_gb_hours = 0.0
-            total_network_gb = 0.0
-            total_storage_gb_hours = 0.0
-            total_cost = 0.0
-            total_snapshots = len(container_usage)
-            
-            for usage in container_usage:
-                # Convert snapshot costs to hourly rates
-                interval_hours = usage.collection_interval_seconds / 3600.0
-                
-                # CPU: convert percentage to hours
-                cpu_hours = (usage.cpu_usage_percent / 100.0) * interval_hours
-                total_cpu_hours += cpu_hours
-                
-                # Memory: convert bytes to GB-hours
-                memory_gb = usage.memory_usage_bytes / (1024**3)
-                memory_hours = memory_gb * interval_hours
-                total_memory_gb_hours += memory_hours
-                
-                # Network: convert bytes to GB
-                network_gb = (usage.network_rx_bytes + usage.network_tx_bytes) / (1024**3)
-                total_network_gb += network_gb
-                
-                # Storage: based on memory limit
-                storage_gb = usage.memory_limit_bytes / (1024**3)
-                storage_hours = storage_gb * interval_hours
-                total_storage_gb_hours += storage_hours
-                
-                # Total cost
-                total_cost += usage.total_cost
+            totals = sum_rollups(self.db, "daily", UsageAggregation.hiring_id == hiring_id)
+            total_requests = self.db.query(func.count(AgentActivityLog.id)).filter(
+                AgentActivityLog.hiring_id == hiring_id
+            ).scalar() or 0
             
             # Create or update hiring aggregation
             existing = self.db.query(UsageAggregation).filter(
@@ -535,14 +457,13 @@ class ResourceUsageTracker:
                 )
             ).first()
             
+            hiring_end = datetime.now(timezone.utc)
             if existing:
                 # Update existing
-                existing.total_cpu_hours = total_cpu_hours
-                existing.total_memory_gb_hours = total_memory_gb_hours
-                existing.total_network_gb = total_network_gb
-                existing.total_storage_gb_hours = total_storage_gb_hours
-                existing.total_cost = total_cost
-                existing.period_end = datetime.now(timezone.utc)
+                for name, value in totals.items():
+                    setattr(existing, name, value)
+                existing.total_requests = total_requests
+                existing.period_end = hiring_end
             else:
                 # Create new hiring aggregation
                 aggregation = UsageAggregation(
@@ -551,14 +472,10 @@ class ResourceUsageTracker:
                     hiring_id=hiring_id,
                     aggregation_period="hiring",
                     period_start=hiring.hired_at,
-                    period_end=datetime.now(timezone.utc),
-                    total_cpu_hours=total_cpu_hours,
-                    total_memory_gb_hours=total_memory_gb_hours,
-                    total_network_gb=total_network_gb,
-                    total_storage_gb_hours=total_storage_gb_hours,
-                    total_cost=total_cost,
-                    total_requests=total_snapshots,
-                    deployment_type="acp"  # Default, will be updated
+                    period_end=hiring_end,
+                    total_requests=total_requests,
+                    deployment_type="acp",  # Default, will be updated
+                    **totals
                 )
                 self.db.add(aggregation)
             
@@ -568,17 +485,18 @@ class ResourceUsageTracker:
                 "hiring_id": hiring_id,
                 "agent_id": hiring.agent_id,
                 "user_id": hiring.user_id,
-                "total_cpu_hours": total_cpu_hours,
-                "total_memory_gb_hours": total_memory_gb_hours,
-                "total_network_gb": total_network_gb,
-                "total_storage_gb_hours": total_storage_gb_hours,
-                "total_cost": total_cost,
-                "total_snapshots": total_snapshots,
+                "total_cpu_hours": totals["total_cpu_hours"],
+                "total_memory_gb_hours": totals["total_memory_gb_hours"],
+                "total_network_gb": totals["total_network_gb"],
+                "total_storage_gb_hours": totals["total_storage_gb_hours"],
+                "total_cost": totals["total_cost"],
+                "total_requests": total_requests,
+                "usage_days": usage_days,
                 "hiring_start": hiring.hired_at,
-                "hiring_end": datetime.now(timezone.utc)
+                "hiring_end": hiring_end
             }
             
-            logger.info(f"Created hiring aggregation for hiring {hiring_id}: ${total_cost:.6f}")
+            logger.info(f"Created hiring aggregation for hiring {hiring_id}: ${totals['total_cost']:.6f}")
             return hiring_summary
             
         except Exception as e:
@@ -595,15 +513,33 @@ class ResourceUsageTracker:
             else:
                 month_end = datetime(year, month + 1, 1, tzinfo=timezone.utc)
             
-            # Get daily aggregations for the month
-            daily_aggregations = self.db.query(UsageAggregation).filter(
-                and_(
-                    UsageAggregation.user_id == user_id,
-                    UsageAggregation.aggregation_period == "daily",
-                    UsageAggregation.period_start >= month_start,
-                    UsageAggregation.period_start < month_end
-                )
-            ).all()
+            in_month = and_(
+                UsageAggregation.user_id == user_id,
+                UsageAggregation.hiring_id > 0,
+                UsageAggregation.period_start >= month_start,
+                UsageAggregation.period_start < month_end
+            )
+            
+            # Daily totals across all hirings of the user
+            daily_rows = self.db.query(
+                UsageAggregation.period_start,
+                func.sum(UsageAggregation.total_cost).label("total_cost"),
+                func.sum(UsageAggregation.total_cpu_hours).label("cpu_hours"),
+                func.sum(UsageAggregation.total_memory_gb_hours).label("memory_gb_hours"),
+                func.sum(UsageAggregation.total_network_gb).label("network_gb")
+            ).filter(
+                in_month, UsageAggregation.aggregation_period == "daily"
+            ).group_by(UsageAggregation.period_start).order_by(UsageAggregation.period_start).all()
+            
+            requests_by_date = {
+                str(day): count for day, count in self.db.query(
+                    func.date(AgentActivityLog.activity_timestamp), func.count(AgentActivityLog.id)
+                ).filter(
+                    AgentActivityLog.user_id == user_id,
+                    AgentActivityLog.activity_timestamp >= month_start,
+                    AgentActivityLog.activity_timestamp < month_end
+                ).group_by(func.date(AgentActivityLog.activity_timestamp)).all()
+            }
             
             monthly_summary = {
                 "user_id": user_id,
@@ -613,66 +549,49 @@ class ResourceUsageTracker:
                 "total_cpu_hours": 0.0,
                 "total_memory_gb_hours": 0.0,
                 "total_network_gb": 0.0,
-                "total_requests": 0,
+                "total_requests": sum(requests_by_date.values()),
                 "daily_breakdown": [],
                 "deployment_breakdown": {}
             }
             
-            for daily in daily_aggregations:
-                monthly_summary["total_cost"] += daily.total_cost
-                monthly_summary["total_cpu_hours"] += daily.total_cpu_hours
-                monthly_summary["total_memory_gb_hours"] += daily.total_memory_gb_hours
-                monthly_summary["total_network_gb"] += daily.total_network_gb
-                monthly_summary["total_requests"] += daily.total_requests
+            for daily in daily_rows:
+                date = daily.period_start.date().isoformat()
+                monthly_summary["total_cost"] += float(daily.total_cost or 0.0)
+                monthly_summary["total_cpu_hours"] += float(daily.cpu_hours or 0.0)
+                monthly_summary["total_memory_gb_hours"] += float(daily.memory_gb_hours or 0.0)
+                monthly_summary["total_network_gb"] += float(daily.network_gb or 0.0)
                 
                 monthly_summary["daily_breakdown"].append({
-                    "date": daily.period_start.date().isoformat(),
-                    "cost": daily.total_cost,
-                    "cpu_hours": daily.total_cpu_hours,
-                    "memory_gb_hours": daily.total_memory_gb_hours,
-                    "requests": daily.total_requests
+                    "date": date,
+                    "cost": float(daily.total_cost or 0.0),
+                    "cpu_hours": float(daily.cpu_hours or 0.0),
+                    "memory_gb_hours": float(daily.memory_gb_hours or 0.0),
+                    "requests": requests_by_date.get(date, 0)
                 })
             
-            # Get deployment breakdown
-            deployments = self.db.query(AgentDeployment).join(Hiring).filter(
-                and_(
-                    Hiring.user_id == user_id,
-                    AgentDeployment.created_at >= month_start,
-                    AgentDeployment.created_at < month_end
-                )
-            ).all()
-            
-            for deployment in deployments:
-                deployment_type = deployment.deployment_type or "unknown"
-                if deployment_type not in monthly_summary["deployment_breakdown"]:
-                    monthly_summary["deployment_breakdown"][deployment_type] = {
-                        "count": 0,
-                        "total_cost": 0.0,
-                        "total_hours": 0.0
-                    }
-                
-                monthly_summary["deployment_breakdown"][deployment_type]["count"] += 1
-                
-                # Calculate deployment costs for the month
-                deployment_costs = self.db.query(func.sum(ContainerResourceUsage.total_cost)).filter(
-                    ContainerResourceUsage.deployment_id == deployment.deployment_id,
-                    ContainerResourceUsage.snapshot_timestamp >= month_start,
-                    ContainerResourceUsage.snapshot_timestamp < month_end
-                ).scalar() or 0.0
-                
-                monthly_summary["deployment_breakdown"][deployment_type]["total_cost"] += deployment_costs
-                
-                # Calculate total running hours
-                running_hours = self.db.query(func.count(ContainerResourceUsage.id)).filter(
-                    and_(
-                        ContainerResourceUsage.deployment_id == deployment.deployment_id,
-                        ContainerResourceUsage.snapshot_timestamp >= month_start,
-                        ContainerResourceUsage.snapshot_timestamp < month_end,
-                        ContainerResourceUsage.container_status == "running"
-                    )
-                ).scalar() or 0
-                
-                monthly_summary["deployment_breakdown"][deployment_type]["total_hours"] += running_hours * (self.collection_interval / 3600.0)
+            # Deployment breakdown: hirings and cost per deployment type from the daily
+            # rollups, running hours from the number of hourly rollups
+            type_rows = self.db.query(
+                UsageAggregation.deployment_type,
+                func.count(func.distinct(UsageAggregation.hiring_id)).label("count"),
+                func.sum(UsageAggregation.total_cost).label("total_cost")
+            ).filter(
+                in_month, UsageAggregation.aggregation_period == "daily"
+            ).group_by(UsageAggregation.deployment_type).all()
+            
+            hours_by_type = dict(self.db.query(
+                UsageAggregation.deployment_type, func.count(UsageAggregation.id)
+            ).filter(
+                in_month, UsageAggregation.aggregation_period == "hourly"
+            ).group_by(UsageAggregation.deployment_type).all())
+            
+            for row in type_rows:
+                deployment_type = row.deployment_type or "unknown"
+                monthly_summary["deployment_breakdown"][deployment_type] = {
+                    "count": row.count,
+                    "total_cost": float(row.total_cost or 0.0),
+                    "total_hours": float(hours_by_type.get(row.deployment_type, 0))
+                }
             
             return monthly_summary
             
@@ -11,6 +11,9 @@ import time
 import json
 from datetime import datetime
 
+from .registry import api_key_file
+from .rate_limiter import provider_rate_limiter, RateLimitGrant
+
 
 @dataclass
 class ResourceUsage:
@@ -43,6 +46,7 @@ class BaseResource(ABC):
         self.usage_tracker = usage_tracker
         self.rate_limiter = RateLimiter(provider, config.get('rate_limits', {}))
         self.client = None
+        self.user_id: Optional[int] = None  # Set by ResourceManager; used for per-user rate limits
     
     @abstractmethod
     async def initialize(self, user_id: int) -> None:
@@ -98,6 +102,10 @@ class BaseResource(ABC):
         """Return the resource type (llm, vector_db, web_search)"""
         pass
     
+    def estimate_tokens(self, operation_type: str, **kwargs) -> int:
+        """Estimate the tokens an operation will use, for rate limiting before the call"""
+        return 0
+    
     async def _execute_with_tracking(self,
                                    execution_id: int,
                                    operation_type: str,
@@ -105,8 +113,14 @@ class BaseResource(ABC):
         """Execute operation with usage tracking"""
         start_time = time.time()
         
-        # Check rate limits
-        await self.rate_limiter.check_rate_limit(execution_id)
+        # Wait for rate limit capacity
+        estimated_tokens = self.estimate_tokens(operation_type, **kwargs)
+        grant = await self.rate_limiter.check_rate_limit(
+            execution_id,
+            model=kwargs.get('model'),
+            estimated_tokens=estimated_tokens,
+            user_id=self.user_id
+        )
         
         # Calculate estimated cost
         estimated_cost = self.calculate_cost(operation_type, **kwargs)
@@ -119,6 +133,9 @@ class BaseResource(ABC):
             actual_cost = self.calculate_cost(operation_type, response=response, **kwargs)
             metrics = self.extract_usage_metrics(response, kwargs)
             
+            if metrics.get('total_tokens'):
+                await self.rate_limiter.settle(grant, actual_tokens=metrics['total_tokens'])
+            
             # Record usage
             duration_ms = int((time.time() - start_time) * 1000)
             await self._record_usage(
@@ -152,28 +169,24 @@ class BaseResource(ABC):
 
 
 class RateLimiter:
-    """Simple rate limiter for resources"""
+    """Rate limits of one provider, enforced by the process-wide ProviderRateLimiter"""
     
     def __init__(self, provider: str, rate_limits: Dict[str, Any]):
         self.provider = provider
         self.rate_limits = rate_limits
-        self.request_counts = {}  # In production, use Redis
     
-    async def check_rate_limit(self, execution_id: int):
-        """Check if rate limit is exceeded"""
-        # Simple implementation - in production, use Redis with proper rate limiting
-        current_time = int(time.time() / 60)  # 1-minute windows
-        key = f"{self.provider}:{current_time}"
-        
-        if key not in self.request_counts:
-            self.request_counts[key] = 0
-        
-        max_requests = self.rate_limits.get('requests_per_minute', 100)
-        
-        if self.request_counts[key] >= max_requests:
-            raise Exception(f"Rate limit exceeded for {self.provider}")
-        
-        self.request_counts[key] += 1
+    async def check_rate_limit(self,
+                               execution_id: int,
+                               model: Optional[str] = None,
+                               estimated_tokens: int = 0,
+                               user_id: Optional[int] = None) -> Optional[RateLimitGrant]:
+        """Wait until the call fits the provider's request and token limits"""
+        limits = provider_rate_limiter.limits_for(self.provider, model, self.rate_limits, user_id)
+        return await provider_rate_limiter.acquire(limits, estimated_tokens)
+    
+    async def settle(self, grant: Optional[RateLimitGrant], actual_tokens: int):
+        """Correct the token estimate of an admitted call with its actual usage"""
+        await provider_rate_limiter.settle(grant, actual_tokens)
 
 
 class KeyManager:
@@ -181,48 +194,16 @@ class KeyManager:
     
     def __init__(self, db_session):
         self.db = db_session
-        self._api_keys = None
-        self._load_api_keys()
+        # Keys stored for this manager only; api_keys.txt is parsed once per process
+        self._overrides: Dict[str, str] = {}
     
-    def _load_api_keys(self):
-        """Load API keys from api_keys.txt file"""
-        import os
-        from pathlib import Path
-        
-        # Find the api_keys.txt file relative to the server directory
-        server_dir = Path(__file__).parent.parent.parent
-        api_keys_file = server_dir / "api_keys.txt"
-        
-        self._api_keys = {}
-        
-        if api_keys_file.exists():
-            with open(api_keys_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    # Skip comments and empty lines
-                    if line.startswith('#') or not line or '=' not in line:
-                        continue
-                    
-                    # Parse key=value format
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        
-                        # Remove quotes if present
-                        if value.startswith('"') and value.endswith('"'):
-                            value = value[1:-1]
-                        elif value.startswith("'") and value.endswith("'"):
-                            value = value[1:-1]
-                        
-                        self._api_keys[key] = value
-        
-        # Also check environment variables as fallback
-        for key in self._api_keys:
-            if not self._api_keys[key] or self._api_keys[key].startswith('your-'):
-                env_value = os.getenv(key)
-                if env_value:
-                    self._api_keys[key] = env_value
+    @property
+    def _api_keys(self) -> Dict[str, str]:
+        """Keys from api_keys.txt, reloaded when the file changes, plus stored keys"""
+        api_keys = api_key_file.get_keys()
+        if self._overrides:
+            api_keys = {**api_keys, **self._overrides}
+        return api_keys
     
     async def get_key(self, user_id: int, service: str) -> str:
         """Get API key for a service"""
@@ -247,9 +228,10 @@ class KeyManager:
         }
         
         key_name = key_mapping.get(service.lower(), f"{service.upper()}_API_KEY")
+        api_keys = self._api_keys
         
-        if key_name in self._api_keys and self._api_keys[key_name]:
-            key_value = self._api_keys[key_name]
+        if key_name in api_keys and api_keys[key_name]:
+            key_value = api_keys[key_name]
             # Skip placeholder values
             if not key_value.startswith('your-'):
                 return key_value
@@ -267,7 +249,7 @@ class KeyManager:
         # In production, implement proper key encryption and database storage
         # For now, just update the in-memory cache
         key_name = f"{service.upper()}_API_KEY"
-        self._api_keys[key_name] = key
+        self._overrides[key_name] = key
 
 
 class UsageTracker:
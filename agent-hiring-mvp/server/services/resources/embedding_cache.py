@@ -0,0 +1,160 @@
+"""
+Persistent cache of embedding vectors, keyed by the content of the embedded text.
+"""
+
+import asyncio
+import hashlib
+import logging
+import struct
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List
+
+from ...config import EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_TTL_DAYS
+
+logger = logging.getLogger(__name__)
+
+# Keys per IN (...) query, well below the bind parameter limits of SQLite and PostgreSQL
+_QUERY_CHUNK = 500
+
+# Expired entries are deleted at most this often
+_PRUNE_INTERVAL_SECONDS = 3600
+
+
+class EmbeddingCache:
+    """
+    Embedding vectors stored by SHA-256 of provider, model and text.
+
+    An embedding only depends on the model and the text, so re-indexing an
+    unchanged chunk is served from the database instead of the provider.
+    Entries are shared by all users; a key can only be derived by someone
+    who already has the text. Entries not used for ``ttl_days`` are deleted.
+    """
+
+    def __init__(self, enabled: bool = EMBEDDING_CACHE_ENABLED, ttl_days: int = EMBEDDING_CACHE_TTL_DAYS):
+        self.enabled = enabled
+        self.ttl_days = ttl_days
+        self._last_prune = 0.0
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def key(provider: str, model: str, text: str) -> str:
+        return hashlib.sha256(f"{provider}\n{model}\n{text}".encode("utf-8")).hexdigest()
+
+    async def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Cached vectors of the given keys; missing keys are left out."""
+        if not self.enabled or not keys:
+            return {}
+        try:
+            found = await asyncio.get_event_loop().run_in_executor(None, self._get_many, keys)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            found = {}
+        self._hits += len(found)
+        self._misses += len(keys) - len(found)
+        return found
+
+    async def put_many(self, provider: str, model: str, vectors: Dict[str, List[float]]) -> None:
+        """Store new vectors by key. Failures are logged, never raised."""
+        if not self.enabled or not vectors:
+            return
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self._put_many, provider, model, vectors)
+        except Exception as e:
+            logger.warning(f"Embedding cache store failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_ratio": self._hits / lookups if lookups else 0.0
+        }
+
+    def _get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        from ...database.config import get_session
+        from ...models.resource_usage import EmbeddingCacheEntry
+
+        now = datetime.now(timezone.utc)
+        found = {}
+        with get_session() as db:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), _QUERY_CHUNK):
+                chunk = unique_keys[start:start + _QUERY_CHUNK]
+                rows = db.query(
+                    EmbeddingCacheEntry.cache_key, EmbeddingCacheEntry.dimensions, EmbeddingCacheEntry.vector
+                ).filter(EmbeddingCacheEntry.cache_key.in_(chunk)).all()
+                for row in rows:
+                    found[row.cache_key] = unpack_vector(row.vector, row.dimensions)
+
+                # Refresh the TTL of used entries, at most once a day each
+                hit_keys = [row.cache_key for row in rows]
+                if hit_keys:
+                    db.query(EmbeddingCacheEntry).filter(
+                        EmbeddingCacheEntry.cache_key.in_(hit_keys),
+                        EmbeddingCacheEntry.last_used_at < now - timedelta(days=1)
+                    ).update({EmbeddingCacheEntry.last_used_at: now}, synchronize_session=False)
+            db.commit()
+        return found
+
+    def _put_many(self, provider: str, model: str, vectors: Dict[str, List[float]]) -> None:
+        from sqlalchemy.exc import IntegrityError
+        from ...database.config import get_session
+        from ...models.resource_usage import EmbeddingCacheEntry
+
+        now = datetime.now(timezone.utc)
+        with get_session() as db:
+            keys = list(vectors)
+            for start in range(0, len(keys), _QUERY_CHUNK):
+                chunk = keys[start:start + _QUERY_CHUNK]
+                existing = {row.cache_key for row in db.query(EmbeddingCacheEntry.cache_key).filter(
+                    EmbeddingCacheEntry.cache_key.in_(chunk)
+                ).all()}
+                values = [
+                    dict(
+                        cache_key=key,
+                        provider=provider,
+                        model=model,
+                        dimensions=len(vectors[key]),
+                        vector=pack_vector(vectors[key]),
+                        last_used_at=now
+                    )
+                    for key in chunk if key not in existing
+                ]
+                try:
+                    db.add_all([EmbeddingCacheEntry(**row) for row in values])
+                    db.commit()
+                except IntegrityError:
+                    # Another request stored some of the same texts first; keep the rest
+                    db.rollback()
+                    for row in values:
+                        try:
+                            with db.begin_nested():
+                                db.add(EmbeddingCacheEntry(**row))
+                        except IntegrityError:
+                            pass
+                    db.commit()
+
+            if time.monotonic() - self._last_prune > _PRUNE_INTERVAL_SECONDS:
+                self._last_prune = time.monotonic()
+                deleted = db.query(EmbeddingCacheEntry).filter(
+                    EmbeddingCacheEntry.last_used_at < now - timedelta(days=self.ttl_days)
+                ).delete(synchronize_session=False)
+                db.commit()
+                if deleted:
+                    logger.info(f"Removed {deleted} expired embedding cache entries")
+
+
+def pack_vector(vector: List[float]) -> bytes:
+    """Little-endian float32 bytes of a vector."""
+    return struct.pack(f"<{len(vector)}f", *vector)
+
+
+def unpack_vector(data: bytes, dimensions: int) -> List[float]:
+    return list(struct.unpack(f"<{dimensions}f", data))
+
+
+# Global embedding cache instance shared by all LLM resources of this process
+embedding_cache = EmbeddingCache()
@@ -2,33 +2,338 @@
 LLM resource implementations for OpenAI and Anthropic.
 """
 
+import asyncio
+import time
 from abc import abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
+from ...config import (
+    LLM_SEMANTIC_CACHE_EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    EMBEDDING_BATCH_CONCURRENCY
+)
 from .base import BaseResource
+from .registry import resource_client_registry
+from .response_cache import llm_response_cache, prompt_text, CacheHit, EXACT, SEMANTIC
+from .embedding_cache import embedding_cache
 
 
 class LLMResource(BaseResource):
     """Base class for LLM resources"""
     
+    # Whether the provider can embed prompts for semantic cache lookups
+    supports_embeddings = True
+    
     def get_resource_type(self) -> str:
         return "llm"
     
     async def initialize(self, user_id: int) -> None:
         """Initialize LLM client with API key"""
         api_key = await self.key_manager.get_key(user_id, self.provider)
-        self.client = await self._create_client(api_key)
+        # Clients are shared by all requests using the same key
+        self.client = await resource_client_registry.get_client(self.provider, api_key, self._create_client)
     
     @abstractmethod
     async def _create_client(self, api_key: str):
-        """Create the specific LLM client"""
+        """Create the specific LLM client (shared across requests, so it must not hold request state)"""
         pass
     
     async def execute(self, 
                      execution_id: int,
                      operation_type: str,
                      **kwargs) -> Dict[str, Any]:
-        """Execute LLM operation with usage tracking"""
-        return await self._execute_with_tracking(execution_id, operation_type, **kwargs)
+        """Execute LLM operation with usage tracking, serving repeated completions from cache"""
+        # "semantic" opts a request in to similarity matching; False or "off" bypasses the cache
+        cache_mode = kwargs.pop('cache', None)
+        if operation_type != "completion" or cache_mode in (False, "off"):
+            return await self._execute_with_tracking(execution_id, operation_type, **kwargs)
+        return await self._execute_cached_completion(execution_id, cache_mode, **kwargs)
+    
+    async def _execute_cached_completion(self,
+                                         execution_id: int,
+                                         cache_mode: Optional[str],
+                                         **kwargs) -> Dict[str, Any]:
+        """Look a completion up in the response cache, calling the provider on a miss"""
+        cache = llm_response_cache
+        scope = cache.scope(self.user_id, self.provider, kwargs.get('model'))
+        
+        key = cache.exact_key(self.user_id, self.provider, **kwargs)
+        if key is not None:
+            hit = cache.get(key)
+            cache.record_lookup(self.provider, EXACT, hit)
+            if hit is not None:
+                return await self._serve_cached(execution_id, hit, **kwargs)
+        
+        embedding = None
+        if cache_mode == SEMANTIC and cache.semantic_enabled and self.supports_embeddings:
+            embedding = await self._embed_prompt(execution_id, kwargs.get('messages'))
+            if embedding:
+                hit = cache.get_similar(scope, embedding)
+                cache.record_lookup(self.provider, SEMANTIC, hit)
+                if hit is not None:
+                    return await self._serve_cached(execution_id, hit, **kwargs)
+        
+        start_time = time.time()
+        response = await self._execute_with_tracking(execution_id, "completion", **kwargs)
+        duration_ms = int((time.time() - start_time) * 1000)
+        
+        if key is not None:
+            cache.put(key, scope, response, duration_ms)
+        if embedding:
+            cache.put_similar(scope, embedding, response, duration_ms)
+        return response
+    
+    async def stream_completion(self, execution_id: int, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream the text of a completion as the provider generates it.
+        
+        Rate limiting and usage tracking match ``execute``: usage and cost are
+        recorded once the stream ends, also for streams that fail or that the
+        client abandons, with what was generated until then. Repeated
+        temperature 0 requests are answered from the exact response cache in
+        one chunk; otherwise the text is passed through without being kept.
+        """
+        cache_mode = kwargs.pop('cache', None)
+        cache = llm_response_cache
+        key = None if cache_mode in (False, "off") else cache.exact_key(self.user_id, self.provider, **kwargs)
+        if key is not None:
+            hit = cache.get(key)
+            cache.record_lookup(self.provider, EXACT, hit)
+            if hit is not None:
+                response = await self._serve_cached(execution_id, hit, **kwargs)
+                if response.get('content'):
+                    yield response['content']
+                return
+        
+        start_time = time.time()
+        model = kwargs.get('model')
+        estimated_tokens = self.estimate_tokens("completion", **kwargs)
+        grant = await self.rate_limiter.check_rate_limit(
+            execution_id,
+            model=model,
+            estimated_tokens=estimated_tokens,
+            user_id=self.user_id
+        )
+        
+        response: Dict[str, Any] = {"usage": {}, "model": model}
+        parts: List[str] = []  # Only kept when the completion will be cached
+        content_chars = 0
+        first_token_ms = None
+        stream_status, error = "cancelled", None
+        try:
+            async for event in self._stream_operation(**kwargs):
+                if event.get('usage'):
+                    response['usage'] = event['usage']
+                if event.get('cost') is not None:
+                    response['cost'] = event['cost']
+                if event.get('model'):
+                    response['model'] = event['model']
+                text = event.get('content')
+                if text:
+                    if first_token_ms is None:
+                        first_token_ms = int((time.time() - start_time) * 1000)
+                    content_chars += len(text)
+                    if key is not None:
+                        parts.append(text)
+                    yield text
+            stream_status = "completed"
+        except Exception as e:
+            stream_status, error = "failed", str(e)
+            raise
+        finally:
+            # Runs on completion, on errors and when the consumer closes the stream early
+            duration_ms = int((time.time() - start_time) * 1000)
+            if not response['usage']:
+                # No usage reported (e.g. the stream was cut short); estimate it
+                prompt_tokens = self.estimate_tokens("completion", **{**kwargs, 'max_tokens': 0})
+                response['usage'] = self._usage_from_counts(prompt_tokens, content_chars // 4)
+            
+            actual_cost = self.calculate_cost("completion", response=response, **kwargs)
+            metrics = self.extract_usage_metrics(response, kwargs)
+            if metrics.get('total_tokens'):
+                await self.rate_limiter.settle(grant, actual_tokens=metrics['total_tokens'])
+            
+            response_metadata = {
+                "model": response['model'],
+                "usage": response['usage'],
+                "streamed": True,
+                "stream_status": stream_status,
+                "content_chars": content_chars,
+                "first_token_ms": first_token_ms
+            }
+            if error:
+                response_metadata["error"] = error
+            await self._record_usage(
+                execution_id=execution_id,
+                operation_type="completion",
+                cost=actual_cost,
+                request_metadata=kwargs,
+                response_metadata=response_metadata,
+                duration_ms=duration_ms,
+                **metrics
+            )
+            
+            if key is not None and stream_status == "completed":
+                cache.put(key, cache.scope(self.user_id, self.provider, model), {
+                    "content": "".join(parts),
+                    "usage": response['usage'],
+                    "model": response['model']
+                }, duration_ms)
+    
+    async def _stream_operation(self, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a completion from the provider.
+        
+        Yields events with any of: ``content`` (a text delta), ``usage`` (the
+        provider's usage so far, in the format of its non-streaming response),
+        ``cost`` (the provider's cost of that usage, if it reports one) and
+        ``model``.
+        """
+        raise ValueError(f"Streaming is not supported by provider {self.provider}")
+        yield  # Unreachable; makes this method an async generator like its overrides
+    
+    def _usage_from_counts(self, prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+        """Usage in the provider's response format, for streams that reported none"""
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    
+    async def _embed_prompt(self, execution_id: int, messages: Optional[List[Dict[str, Any]]]) -> Optional[List[float]]:
+        """Embed a conversation for semantic lookups; the embedding call is tracked like any other"""
+        try:
+            response = await self._execute_with_tracking(
+                execution_id,
+                "embedding",
+                model=LLM_SEMANTIC_CACHE_EMBEDDING_MODEL,
+                input=prompt_text(messages)
+            )
+            return response.get('embeddings') or None
+        except Exception:
+            # Without an embedding the request simply skips the semantic cache
+            return None
+    
+    async def _serve_cached(self, execution_id: int, hit: CacheHit, **kwargs) -> Dict[str, Any]:
+        """Record a cache hit as a zero-cost usage and return the cached response"""
+        response_metadata = {
+            **hit.response,
+            "cache_hit": hit.mode,
+            "latency_saved_ms": hit.latency_saved_ms
+        }
+        if hit.similarity is not None:
+            response_metadata["similarity"] = round(hit.similarity, 4)
+        
+        await self._record_usage(
+            execution_id=execution_id,
+            operation_type="completion",
+            cost=0.0,
+            request_metadata=kwargs,
+            response_metadata=response_metadata,
+            input_tokens=0,
+            output_tokens=0,
+            total_tokens=0
+        )
+        return hit.response
+    
+    async def embed_batch(self, execution_id: int, model: str, texts: List[str]) -> Dict[str, Any]:
+        """
+        Embed many texts, returning their vectors in input order.
+        
+        Texts already embedded with the same provider and model come from the
+        embedding cache. The rest are deduplicated, packed into batches of at
+        most EMBEDDING_BATCH_SIZE texts and EMBEDDING_BATCH_MAX_TOKENS
+        estimated tokens, and sent with bounded concurrency; each batch is
+        rate limited and tracked as one embedding operation.
+        """
+        if not self.supports_embeddings:
+            raise ValueError(f"Provider {self.provider} does not support embeddings")
+        
+        keys = [embedding_cache.key(self.provider, model, text) for text in texts]
+        vectors = await embedding_cache.get_many(keys)
+        cached_count = sum(1 for key in keys if key in vectors)
+        
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in pending:
+                pending[key] = text
+        
+        semaphore = asyncio.Semaphore(max(1, EMBEDDING_BATCH_CONCURRENCY))
+        
+        async def embed(batch_keys: List[str]) -> Dict[str, List[float]]:
+            async with semaphore:
+                response = await self._execute_with_tracking(
+                    execution_id,
+                    "embedding",
+                    model=model,
+                    input=[pending[key] for key in batch_keys]
+                )
+            embeddings = response.get('embeddings') or []
+            if len(embeddings) != len(batch_keys):
+                raise Exception(f"Provider returned {len(embeddings)} embeddings for {len(batch_keys)} inputs")
+            return dict(zip(batch_keys, embeddings))
+        
+        computed: Dict[str, List[float]] = {}
+        for result in await asyncio.gather(*(embed(batch) for batch in _embedding_batches(pending))):
+            computed.update(result)
+        
+        await embedding_cache.put_many(self.provider, model, computed)
+        vectors.update(computed)
+        
+        if cached_count:
+            # One zero-cost record per request keeps cached inputs visible in usage
+            await self._record_usage(
+                execution_id=execution_id,
+                operation_type="embedding",
+                cost=0.0,
+                request_metadata={"model": model, "input_count": cached_count},
+                response_metadata={"cache_hit": "embedding", "cached_inputs": cached_count},
+                input_tokens=0,
+                output_tokens=0,
+                total_tokens=0
+            )
+        
+        return {
+            "embeddings": [vectors[key] for key in keys],
+            "model": model,
+            "cached": cached_count
+        }
+    
+    async def _record_usage(self,
+                            execution_id: int,
+                            operation_type: str,
+                            cost: float,
+                            request_metadata: Dict[str, Any],
+                            response_metadata: Dict[str, Any],
+                            **metrics) -> None:
+        """Record usage, summarising batched embeddings instead of storing every input and vector"""
+        if operation_type == "embedding" and isinstance(request_metadata.get('input'), list):
+            inputs = request_metadata['input']
+            request_metadata = {
+                **{key: value for key, value in request_metadata.items() if key != 'input'},
+                "input_count": len(inputs),
+                "input_chars": sum(len(str(text)) for text in inputs)
+            }
+            embeddings = response_metadata.get('embeddings')
+            if isinstance(embeddings, list):
+                response_metadata = {
+                    **{key: value for key, value in response_metadata.items() if key != 'embeddings'},
+                    "embedding_count": len(embeddings),
+                    "dimensions": len(embeddings[0]) if embeddings else 0
+                }
+        await super()._record_usage(execution_id, operation_type, cost, request_metadata, response_metadata, **metrics)
+    
+    def estimate_tokens(self, operation_type: str, **kwargs) -> int:
+        """Estimate tokens as prompt characters / 4 plus the requested completion length"""
+        if operation_type == "completion":
+            prompt_chars = sum(len(str(message.get('content') or '')) for message in kwargs.get('messages') or [])
+            return prompt_chars // 4 + (kwargs.get('max_tokens') or 0)
+        elif operation_type == "embedding":
+            text = kwargs.get('input') or ''
+            if isinstance(text, list):
+                return sum(len(str(item)) for item in text) // 4
+            return len(str(text)) // 4
+        return 0
 
 
 class OpenAIResource(LLMResource):
@@ -37,7 +342,7 @@ class OpenAIResource(LLMResource):
     async def _create_client(self, api_key: str):
         try:
             from openai import AsyncOpenAI
-            return AsyncOpenAI(api_key=api_key)
+            return AsyncOpenAI(api_key=api_key, http_client=resource_client_registry.httpx_client())
         except ImportError:
             raise Exception("OpenAI library not installed. Install with: pip install openai")
     
@@ -60,13 +365,30 @@ class OpenAIResource(LLMResource):
                 input=kwargs['input']
             )
             return {
-                "embeddings": response.data[0].embedding,
+                # A list input returns one vector per input, in input order
+                "embeddings": _embedding_vectors(response.data) if isinstance(kwargs['input'], list) else response.data[0].embedding,
                 "usage": response.usage.model_dump(),
                 "model": response.model
             }
         else:
             raise ValueError(f"Unsupported operation type: {operation_type}")
     
+    async def _stream_operation(self, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        stream = await self.client.chat.completions.create(
+            model=kwargs['model'],
+            messages=kwargs['messages'],
+            max_tokens=kwargs.get('max_tokens'),
+            temperature=kwargs.get('temperature', 0),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield {"content": chunk.choices[0].delta.content, "model": chunk.model}
+            if chunk.usage:
+                # Sent in a final chunk without choices
+                yield {"usage": chunk.usage.model_dump(), "model": chunk.model}
+    
     def calculate_cost(self, operation_type: str, **kwargs) -> float:
         """Calculate OpenAI API cost"""
         rates = self.config.get('rates', {})
@@ -106,10 +428,12 @@ class OpenAIResource(LLMResource):
 class AnthropicResource(LLMResource):
     """Anthropic LLM resource implementation"""
     
+    supports_embeddings = False
+    
     async def _create_client(self, api_key: str):
         try:
             import anthropic
-            return anthropic.AsyncAnthropic(api_key=api_key)
+            return anthropic.AsyncAnthropic(api_key=api_key, http_client=resource_client_registry.httpx_client())
         except ImportError:
             raise Exception("Anthropic library not installed. Install with: pip install anthropic")
     
@@ -132,6 +456,27 @@ class AnthropicResource(LLMResource):
         else:
             raise ValueError(f"Unsupported operation type: {operation_type}")
     
+    async def _stream_operation(self, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        stream = await self.client.messages.create(
+            model=kwargs['model'],
+            messages=kwargs['messages'],
+            max_tokens=kwargs.get('max_tokens'),
+            temperature=kwargs.get('temperature', 0),
+            stream=True
+        )
+        input_tokens = 0
+        async for event in stream:
+            if event.type == "message_start":
+                input_tokens = event.message.usage.input_tokens
+                yield {"usage": self._usage_from_counts(input_tokens, 0), "model": event.message.model}
+            elif event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                yield {"content": event.delta.text}
+            elif event.type == "message_delta" and getattr(event, "usage", None):
+                yield {"usage": self._usage_from_counts(input_tokens, event.usage.output_tokens)}
+    
+    def _usage_from_counts(self, prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens}
+    
     def calculate_cost(self, operation_type: str, **kwargs) -> float:
         """Calculate Anthropic API cost"""
         rates = self.config.get('rates', {})
@@ -163,21 +508,26 @@ class AnthropicResource(LLMResource):
 class LiteLLMResource(LLMResource):
     """LiteLLM resource implementation for unified LLM access"""
     
+    async def initialize(self, user_id: int) -> None:
+        """Initialize LiteLLM with the API key and proxy URL of this request"""
+        import os
+        
+        await super().initialize(user_id)
+        
+        # Kept on the resource rather than the shared client
+        self.api_key = await self.key_manager.get_key(user_id, self.provider)
+        self.base_url = os.getenv("LITELLM_BASE_URL", "http://theagenthub.cloud:4000")
+    
     async def _create_client(self, api_key: str):
         try:
             import litellm
-            import os
             
             # Configure LiteLLM to use proxy
             litellm.use_litellm_proxy = True
             
-            # Get base URL from environment
-            base_url = os.getenv("LITELLM_BASE_URL", "http://theagenthub.cloud:4000")
-            
-            # Store configuration for later use
-            self.base_url = base_url
-            self.api_key = api_key
-            
+            # LiteLLM keeps its own pooled clients. The registry's httpx client is
+            # bound to one event loop and closed by close_all, so it must not
+            # become LiteLLM's process-global aclient_session.
             return litellm
         except ImportError:
             raise Exception("LiteLLM library not installed. Install with: pip install litellm")
@@ -221,8 +571,9 @@ class LiteLLMResource(LLMResource):
                     base_url=self.base_url
                 )
                 
+                data = response.data
                 return {
-                    "embeddings": response.data[0].embedding,
+                    "embeddings": _embedding_vectors(data) if isinstance(kwargs['input'], list) else _embedding_vectors(data[:1])[0],
                     "usage": {
                         "prompt_tokens": response.usage.prompt_tokens if response.usage else 0,
                         "total_tokens": response.usage.total_tokens if response.usage else 0
@@ -234,12 +585,45 @@ class LiteLLMResource(LLMResource):
         else:
             raise ValueError(f"Unsupported operation type: {operation_type}")
     
+    async def _stream_operation(self, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            stream = await self.client.acompletion(
+                api_key=self.api_key,
+                model=kwargs['model'],
+                messages=kwargs['messages'],
+                max_tokens=kwargs.get('max_tokens'),
+                temperature=kwargs.get('temperature', 0),
+                base_url=self.base_url,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                choices = getattr(chunk, 'choices', None)
+                if choices and getattr(choices[0].delta, 'content', None):
+                    yield {"content": choices[0].delta.content, "model": getattr(chunk, 'model', None)}
+                usage = getattr(chunk, 'usage', None)
+                if usage:
+                    prompt_tokens = usage.prompt_tokens or 0
+                    completion_tokens = usage.completion_tokens or 0
+                    yield {
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": usage.total_tokens or 0
+                        },
+                        # Stream chunks carry no response_cost; price the final usage like LiteLLM does
+                        "cost": self._token_cost(getattr(chunk, 'model', None) or kwargs['model'],
+                                                 prompt_tokens, completion_tokens)
+                    }
+        except Exception as e:
+            raise Exception(f"LiteLLM streaming completion failed: {str(e)}")
+    
     def calculate_cost(self, operation_type: str, **kwargs) -> float:
         """Calculate LiteLLM API cost - use actual cost from response if available"""
         response = kwargs.get('response', {})
         
         # If we have actual cost from LiteLLM response, use it
-        if 'cost' in response and response['cost'] > 0:
+        if response.get('cost') and response['cost'] > 0:
             return response['cost']
         
         # Fallback to estimated cost based on usage
@@ -249,6 +633,11 @@ class LiteLLMResource(LLMResource):
             input_tokens = usage.get('prompt_tokens', 0)
             output_tokens = usage.get('completion_tokens', 0)
             
+            # Price estimated usage (e.g. of streams cut short) at the model's LiteLLM rates when known
+            cost = self._token_cost(response.get('model') or kwargs.get('model'), input_tokens, output_tokens)
+            if cost is not None:
+                return cost
+            
             # Use conservative estimates for unknown models
             input_rate = 0.0015 / 1000  # $0.0015 per 1K tokens
             output_rate = 0.002 / 1000  # $0.002 per 1K tokens
@@ -262,6 +651,20 @@ class LiteLLMResource(LLMResource):
         
         return 0.0
     
+    def _token_cost(self, model: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+        """Cost of token counts from LiteLLM's model prices, or None for models it does not price"""
+        if not model or self.client is None:
+            return None
+        try:
+            prompt_cost, completion_cost = self.client.cost_per_token(
+                model=model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens
+            )
+        except Exception:
+            return None
+        return prompt_cost + completion_cost
+    
     def extract_usage_metrics(self, response: Dict[str, Any], request_metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Extract usage metrics from LiteLLM response"""
         usage = response.get('usage', {})
@@ -269,4 +672,28 @@ class LiteLLMResource(LLMResource):
             'input_tokens': usage.get('prompt_tokens', 0),
             'output_tokens': usage.get('completion_tokens', 0),
             'total_tokens': usage.get('total_tokens', 0)
-        } 
\ No newline at end of file
+        }
+
+
+def _embedding_vectors(data) -> List[List[float]]:
+    """Vectors of an embeddings response in input order (items may be objects or dicts)"""
+    items = [item if isinstance(item, dict) else {"index": getattr(item, "index", None), "embedding": item.embedding}
+             for item in data]
+    if all(item.get("index") is not None for item in items):
+        items.sort(key=lambda item: item["index"])
+    return [item["embedding"] for item in items]
+
+
+def _embedding_batches(texts: Dict[str, str]):
+    """Split texts (by key) into provider calls bounded by count and estimated tokens"""
+    batch: List[str] = []
+    batch_tokens = 0
+    for key, text in texts.items():
+        tokens = len(text) // 4 + 1
+        if batch and (len(batch) >= EMBEDDING_BATCH_SIZE or batch_tokens + tokens > EMBEDDING_BATCH_MAX_TOKENS):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(key)
+        batch_tokens += tokens
+    if batch:
+        yield batch
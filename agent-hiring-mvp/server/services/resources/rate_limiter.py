@@ -0,0 +1,338 @@
+"""
+Shared request and token rate limiting for external resource providers.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+from ...config import RESOURCE_RATE_LIMIT_BACKEND, RESOURCE_RATE_LIMIT_MAX_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Idle local buckets are dropped after this long; a full bucket holds no state worth keeping
+_BUCKET_IDLE_SECONDS = 300
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call could not get rate limit capacity within the maximum wait."""
+    pass
+
+
+@dataclass(frozen=True)
+class BucketLimit:
+    """Per-minute limits of one rate limit bucket (None means unlimited)."""
+    key: str
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class RateLimitGrant:
+    """Capacity taken by one admitted call, kept so ``settle`` corrects exactly what was charged."""
+    limits: List[BucketLimit]
+    estimated_tokens: int
+    window_start: Optional[int] = None  # Shared window the call was counted in, if any
+
+    def charged(self, tokens: int) -> Dict[str, int]:
+        """Tokens each bucket charges for a call of ``tokens``."""
+        return {limit.key: _cap(tokens, limit) for limit in self.limits}
+
+
+class _TokenBucket:
+    """Request and token allowance that refills continuously up to one minute's worth."""
+
+    def __init__(self, limit: BucketLimit, now: float):
+        self.limit = limit
+        self.requests = float(limit.requests_per_minute or 0)
+        self.tokens = float(limit.tokens_per_minute or 0)
+        self.updated_at = now
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.updated_at = now
+        if self.limit.requests_per_minute:
+            rpm = self.limit.requests_per_minute
+            self.requests = min(float(rpm), self.requests + elapsed * rpm / 60)
+        if self.limit.tokens_per_minute:
+            tpm = self.limit.tokens_per_minute
+            self.tokens = min(float(tpm), self.tokens + elapsed * tpm / 60)
+
+    def wait_time(self, tokens: int) -> float:
+        """Seconds until one request of ``tokens`` fits, 0 if it fits now."""
+        wait = 0.0
+        if self.limit.requests_per_minute and self.requests < 1:
+            wait = max(wait, (1 - self.requests) * 60 / self.limit.requests_per_minute)
+        if self.limit.tokens_per_minute and self.tokens < tokens:
+            wait = max(wait, (tokens - self.tokens) * 60 / self.limit.tokens_per_minute)
+        return wait
+
+    def take(self, tokens: int) -> None:
+        if self.limit.requests_per_minute:
+            self.requests -= 1
+        if self.limit.tokens_per_minute:
+            self.tokens -= tokens
+
+
+class LocalRateLimitBackend:
+    """Token buckets in process memory; the fast path in front of any shared backend."""
+
+    def __init__(self):
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def try_acquire(self, limits: List[BucketLimit], tokens: int) -> float:
+        """Take one request and ``tokens`` from every bucket, or none. Returns 0 or the seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_prune > _BUCKET_IDLE_SECONDS:
+                self._prune(now)
+
+            buckets = []
+            for limit in limits:
+                bucket = self._buckets.get(limit.key)
+                if bucket is None or bucket.limit != limit:
+                    bucket = _TokenBucket(limit, now)
+                    self._buckets[limit.key] = bucket
+                bucket.refill(now)
+                buckets.append(bucket)
+
+            wait = max((bucket.wait_time(_cap(tokens, bucket.limit)) for bucket in buckets), default=0.0)
+            if wait > 0:
+                return wait
+            for bucket in buckets:
+                bucket.take(_cap(tokens, bucket.limit))
+            return 0.0
+
+    def adjust(self, limits: List[BucketLimit], requests: int, tokens: Dict[str, int]) -> None:
+        """Give back (positive) or take (negative) capacity after the fact; ``tokens`` is per bucket key."""
+        with self._lock:
+            for limit in limits:
+                bucket = self._buckets.get(limit.key)
+                if bucket is None:
+                    continue
+                if limit.requests_per_minute:
+                    bucket.requests = min(float(limit.requests_per_minute), bucket.requests + requests)
+                if limit.tokens_per_minute:
+                    bucket.tokens = min(float(limit.tokens_per_minute), bucket.tokens + tokens.get(limit.key, 0))
+
+    def _prune(self, now: float) -> None:
+        self._last_prune = now
+        for key, bucket in list(self._buckets.items()):
+            if now - bucket.updated_at > _BUCKET_IDLE_SECONDS:
+                del self._buckets[key]
+
+
+class DatabaseRateLimitBackend:
+    """
+    One-minute windows of request and token counts in the database, shared by all workers.
+
+    Each acquisition is a conditional increment, so workers never exceed a
+    limit together. The same operations map onto Redis (INCRBY with an
+    expiring key per window) if the server ever gets one.
+    """
+
+    def try_acquire(self, limits: List[BucketLimit], tokens: int) -> Tuple[float, int]:
+        """Count one request of ``tokens`` in every bucket's current window, or none.
+
+        Returns 0 or the seconds to wait, and the window the request was counted in.
+        """
+        from sqlalchemy import and_
+        from sqlalchemy.exc import IntegrityError
+        from ...database.config import get_session
+        from ...models.resource_usage import ResourceRateLimitWindow
+
+        now = time.time()
+        window_start = int(now // 60)
+        with get_session() as db:
+            for limit in limits:
+                cost = _cap(tokens, limit)
+                conditions = [
+                    ResourceRateLimitWindow.bucket_key == limit.key,
+                    ResourceRateLimitWindow.window_start == window_start
+                ]
+                if limit.requests_per_minute:
+                    conditions.append(ResourceRateLimitWindow.requests + 1 <= limit.requests_per_minute)
+                if limit.tokens_per_minute:
+                    conditions.append(ResourceRateLimitWindow.tokens + cost <= limit.tokens_per_minute)
+
+                updated = db.query(ResourceRateLimitWindow).filter(and_(*conditions)).update({
+                    ResourceRateLimitWindow.requests: ResourceRateLimitWindow.requests + 1,
+                    ResourceRateLimitWindow.tokens: ResourceRateLimitWindow.tokens + cost
+                }, synchronize_session=False)
+                if updated:
+                    continue
+
+                exists = db.query(ResourceRateLimitWindow.id).filter(
+                    ResourceRateLimitWindow.bucket_key == limit.key,
+                    ResourceRateLimitWindow.window_start == window_start
+                ).first()
+                if exists:
+                    # Full for this window; nothing taken from any bucket is kept
+                    db.rollback()
+                    return (window_start + 1) * 60 - now, window_start
+
+                try:
+                    with db.begin_nested():
+                        db.add(ResourceRateLimitWindow(
+                            bucket_key=limit.key,
+                            window_start=window_start,
+                            requests=1,
+                            tokens=cost
+                        ))
+                except IntegrityError:
+                    # Another worker opened the window first; retry shortly
+                    db.rollback()
+                    return 0.05, window_start
+
+            # Windows older than a few minutes are no longer read
+            db.query(ResourceRateLimitWindow).filter(
+                ResourceRateLimitWindow.window_start < window_start - 5
+            ).delete(synchronize_session=False)
+            db.commit()
+        return 0.0, window_start
+
+    def adjust(self, limits: List[BucketLimit], requests: int, tokens: Dict[str, int], window_start: int) -> None:
+        """Give back (positive) or take (negative) capacity in the window a call was counted in."""
+        from sqlalchemy import case
+        from ...database.config import get_session
+        from ...models.resource_usage import ResourceRateLimitWindow
+
+        def released(column, amount):
+            # Counts never go below zero, whatever the correction
+            remaining = column - amount
+            return case((remaining < 0, 0), else_=remaining)
+
+        with get_session() as db:
+            for limit in limits:
+                db.query(ResourceRateLimitWindow).filter(
+                    ResourceRateLimitWindow.bucket_key == limit.key,
+                    ResourceRateLimitWindow.window_start == window_start
+                ).update({
+                    ResourceRateLimitWindow.requests: released(ResourceRateLimitWindow.requests, requests),
+                    ResourceRateLimitWindow.tokens: released(ResourceRateLimitWindow.tokens, tokens.get(limit.key, 0))
+                }, synchronize_session=False)
+            db.commit()
+
+
+class ProviderRateLimiter:
+    """
+    Rate limits provider calls by requests and tokens per minute.
+
+    Buckets are keyed by provider and model, and optionally by user. Calls
+    over a limit wait with jittered backoff until capacity frees up, so
+    bursts from parallel agents are spread out instead of failing; only a
+    call that waits longer than ``max_wait_seconds`` raises
+    ``RateLimitExceeded``. Token costs are estimated up front and corrected
+    with the actual usage by passing the grant of ``acquire`` to ``settle``.
+
+    The in-process buckets are always checked first. With the "database"
+    backend, calls that pass locally are also counted in shared one-minute
+    windows so several API workers share a provider's quota.
+    """
+
+    def __init__(self, backend: str = RESOURCE_RATE_LIMIT_BACKEND,
+                 max_wait_seconds: float = RESOURCE_RATE_LIMIT_MAX_WAIT_SECONDS):
+        self.max_wait_seconds = max_wait_seconds
+        self.local = LocalRateLimitBackend()
+        self.shared = DatabaseRateLimitBackend() if backend == "database" else None
+        self._waits = 0
+        self._rejections = 0
+
+    @staticmethod
+    def limits_for(provider: str, model: Optional[str], rate_limits: Dict[str, Any],
+                   user_id: Optional[int] = None) -> List[BucketLimit]:
+        """
+        Build the buckets of a call from a provider's ``rate_limits`` config.
+
+        Recognised keys: requests_per_minute, tokens_per_minute, and the
+        per-user variants user_requests_per_minute and user_tokens_per_minute.
+        """
+        base_key = f"{provider}:{model or '*'}"
+        limits = []
+        if rate_limits.get('requests_per_minute') or rate_limits.get('tokens_per_minute'):
+            limits.append(BucketLimit(
+                key=base_key,
+                requests_per_minute=rate_limits.get('requests_per_minute'),
+                tokens_per_minute=rate_limits.get('tokens_per_minute')
+            ))
+        if user_id and (rate_limits.get('user_requests_per_minute') or rate_limits.get('user_tokens_per_minute')):
+            limits.append(BucketLimit(
+                key=f"{base_key}:user:{user_id}",
+                requests_per_minute=rate_limits.get('user_requests_per_minute'),
+                tokens_per_minute=rate_limits.get('user_tokens_per_minute')
+            ))
+        return limits
+
+    async def acquire(self, limits: List[BucketLimit], tokens: int = 0) -> Optional[RateLimitGrant]:
+        """Wait until one request of ``tokens`` estimated tokens fits in every bucket."""
+        if not limits:
+            return None
+
+        loop = asyncio.get_event_loop()
+        deadline = time.monotonic() + self.max_wait_seconds
+        attempt = 0
+        charged = RateLimitGrant(limits, tokens).charged(tokens)
+        while True:
+            wait = self.local.try_acquire(limits, tokens)
+            window_start = None
+            if wait == 0 and self.shared is not None:
+                wait, window_start = await loop.run_in_executor(None, self.shared.try_acquire, limits, tokens)
+                if wait > 0:
+                    # Not admitted by the shared quota; return the local allowance
+                    self.local.adjust(limits, 1, charged)
+            if wait == 0:
+                return RateLimitGrant(limits, tokens, window_start)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._rejections += 1
+                raise RateLimitExceeded(f"Rate limit exceeded for {limits[0].key}")
+
+            # Jitter keeps waiting callers from retrying in lockstep
+            attempt += 1
+            self._waits += 1
+            delay = min(remaining, wait * (1 + random.uniform(0, 0.25)) + min(0.05 * attempt, 1.0) * random.random())
+            await asyncio.sleep(delay)
+
+    async def settle(self, grant: Optional[RateLimitGrant], actual_tokens: int) -> None:
+        """Correct the token count of an admitted call once its actual usage is known."""
+        if grant is None:
+            return
+        charged = grant.charged(grant.estimated_tokens)
+        used = grant.charged(actual_tokens)
+        delta = {key: charged[key] - used[key] for key in charged if charged[key] != used[key]}
+        if not delta:
+            return
+        self.local.adjust(grant.limits, 0, delta)
+        if self.shared is not None and grant.window_start is not None:
+            try:
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self.shared.adjust, grant.limits, 0, delta, grant.window_start
+                )
+            except Exception as e:
+                logger.warning(f"Failed to settle shared rate limit usage: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "database" if self.shared is not None else "local",
+            "max_wait_seconds": self.max_wait_seconds,
+            "waits": self._waits,
+            "rejections": self._rejections
+        }
+
+
+def _cap(tokens: int, limit: BucketLimit) -> int:
+    # A request larger than a whole minute's allowance could never be admitted
+    if limit.tokens_per_minute:
+        return min(tokens, limit.tokens_per_minute)
+    return tokens
+
+
+# Global rate limiter instance shared by all resources of this process
+provider_rate_limiter = ProviderRateLimiter()
@@ -0,0 +1,225 @@
+"""
+Process-wide registry of provider clients and API keys shared by all resource calls.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import types
+import weakref
+from pathlib import Path
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+import aiohttp
+
+from ...config import (
+    RESOURCE_HTTP_MAX_CONNECTIONS,
+    RESOURCE_HTTP_KEEPALIVE_SECONDS,
+    RESOURCE_HTTP_TIMEOUT_SECONDS,
+    RESOURCE_API_KEYS_RELOAD_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+API_KEYS_FILE = Path(__file__).parent.parent.parent / "api_keys.txt"
+
+
+class ApiKeyFile:
+    """
+    Parsed contents of ``api_keys.txt``, shared by every KeyManager.
+
+    The file is parsed once and re-parsed only when its modification time or
+    size changes, checked at most every ``reload_seconds``.
+    """
+
+    def __init__(self, path: Path = API_KEYS_FILE, reload_seconds: float = RESOURCE_API_KEYS_RELOAD_SECONDS):
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self._keys: Dict[str, str] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_keys(self) -> Dict[str, str]:
+        """Get the current keys. The returned dict must be treated as read-only."""
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked_at < self.reload_seconds:
+            return self._keys
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                stat_result = self.path.stat()
+                signature = (stat_result.st_mtime_ns, stat_result.st_size)
+            except FileNotFoundError:
+                signature = (0, 0)
+            if signature != self._signature:
+                self._keys = self._parse() if signature != (0, 0) else {}
+                if self._signature is not None:
+                    logger.info(f"Reloaded API keys from {self.path}")
+                self._signature = signature
+            return self._keys
+
+    def _parse(self) -> Dict[str, str]:
+        api_keys = {}
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                # Skip comments and empty lines
+                if line.startswith('#') or not line or '=' not in line:
+                    continue
+
+                # Parse key=value format
+                key, value = line.split('=', 1)
+                key = key.strip()
+                value = value.strip()
+
+                # Remove quotes if present
+                if value.startswith('"') and value.endswith('"'):
+                    value = value[1:-1]
+                elif value.startswith("'") and value.endswith("'"):
+                    value = value[1:-1]
+
+                api_keys[key] = value
+
+        # Also check environment variables as fallback
+        for key in api_keys:
+            if not api_keys[key] or api_keys[key].startswith('your-'):
+                env_value = os.getenv(key)
+                if env_value:
+                    api_keys[key] = env_value
+        return api_keys
+
+
+class ResourceClientRegistry:
+    """
+    Long-lived provider clients shared by all resource calls of this process.
+
+    Provider SDK clients are created once per provider and API key, and web
+    search providers share one pooled keep-alive ``aiohttp`` session, so a
+    resource call reuses warm connections instead of paying a TLS handshake.
+    Clients are bound to the event loop that created them and are kept per
+    loop. They hold no per-request state; the execution and user of a call
+    stay on the ``BaseResource`` instance.
+    """
+
+    def __init__(self, max_connections: int = RESOURCE_HTTP_MAX_CONNECTIONS,
+                 keepalive_seconds: int = RESOURCE_HTTP_KEEPALIVE_SECONDS,
+                 timeout_seconds: int = RESOURCE_HTTP_TIMEOUT_SECONDS):
+        self.max_connections = max_connections
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout_seconds = timeout_seconds
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Any, Any]]" = weakref.WeakKeyDictionary()
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+    def http_session(self) -> aiohttp.ClientSession:
+        """Get the pooled HTTP session of the running event loop."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=self.keepalive_seconds
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds)
+            )
+            self._sessions[loop] = session
+        return session
+
+    def httpx_client(self):
+        """
+        Get a pooled httpx client for provider SDKs, or None if httpx is not installed.
+
+        HTTP/2 is used when the ``h2`` package is available.
+        """
+        try:
+            import httpx
+        except ImportError:
+            return None
+
+        return self._get_or_create(("httpx",), lambda: httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_seconds
+            ),
+            timeout=httpx.Timeout(self.timeout_seconds)
+        ))
+
+    async def get_client(self, provider: str, api_key: str,
+                         factory: Callable[[str], Awaitable[Any]]) -> Any:
+        """Get the shared client of a provider and API key, creating it with ``factory`` on first use."""
+        key = ("client", provider, hashlib.sha256((api_key or "").encode()).hexdigest())
+        clients = self._loop_clients()
+        client = clients.get(key)
+        if client is None:
+            client = await factory(api_key)
+            clients[key] = client
+        return client
+
+    async def close_all(self) -> None:
+        """Close the clients and sessions of the running event loop."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+
+        for client in (self._clients.pop(loop, None) or {}).values():
+            if isinstance(client, types.ModuleType):
+                # Module-level clients (litellm, pinecone) are not owned by the registry
+                continue
+            close = getattr(client, "aclose", None) or getattr(client, "close", None)
+            if close is None or not callable(close):
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"Error closing resource client: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return {"clients": 0, "http_session_open": False}
+        session = self._sessions.get(loop)
+        return {
+            "clients": len(self._clients.get(loop) or {}),
+            "http_session_open": session is not None and not session.closed,
+            "http2": _http2_available()
+        }
+
+    def _loop_clients(self) -> Dict[Any, Any]:
+        loop = asyncio.get_running_loop()
+        clients = self._clients.get(loop)
+        if clients is None:
+            clients = {}
+            self._clients[loop] = clients
+        return clients
+
+    def _get_or_create(self, key, create: Callable[[], Any]) -> Any:
+        clients = self._loop_clients()
+        client = clients.get(key)
+        if client is None:
+            client = create()
+            clients[key] = client
+        return client
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+# Global instances shared by every ResourceManager
+api_key_file = ApiKeyFile()
+resource_client_registry = ResourceClientRegistry()
@@ -0,0 +1,245 @@
+"""
+In-memory cache of LLM completions shared by all resource calls of this process.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Set
+
+from ...config import (
+    LLM_RESPONSE_CACHE_ENABLED,
+    LLM_RESPONSE_CACHE_TTL_SECONDS,
+    LLM_RESPONSE_CACHE_MAX_ENTRIES,
+    LLM_RESPONSE_CACHE_MAX_BYTES,
+    LLM_SEMANTIC_CACHE_ENABLED,
+    LLM_SEMANTIC_CACHE_THRESHOLD
+)
+
+logger = logging.getLogger(__name__)
+
+EXACT = "exact"
+SEMANTIC = "semantic"
+
+
+@dataclass
+class CachedCompletion:
+    """A cached provider response and what it cost to produce."""
+    response: Dict[str, Any]
+    duration_ms: int
+    expires_at: float
+    size: int
+    scope: str
+    embedding: Optional[List[float]] = None
+    norm: float = 0.0
+
+
+@dataclass
+class CacheHit:
+    """A cache lookup result handed back to the resource."""
+    mode: str
+    response: Dict[str, Any]
+    latency_saved_ms: int
+    similarity: Optional[float] = None
+
+
+class LLMResponseCache:
+    """
+    LRU cache of LLM completions with a TTL and entry and size caps.
+
+    Two lookup modes share the same storage and eviction:
+
+    - exact: keyed by user, provider, model, messages and max_tokens.
+      Only deterministic requests (temperature 0) are cached, because
+      anything else is expected to vary between calls.
+    - semantic: requests that opt in are matched against earlier prompts
+      of the same user, provider and model by cosine similarity of their
+      embeddings, and served when the similarity reaches ``threshold``.
+
+    Every entry belongs to one user, so a completion is never served to
+    another user. Cached responses are copied on the way in and out.
+    """
+
+    def __init__(self,
+                 enabled: bool = LLM_RESPONSE_CACHE_ENABLED,
+                 ttl_seconds: int = LLM_RESPONSE_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = LLM_RESPONSE_CACHE_MAX_BYTES,
+                 semantic_enabled: bool = LLM_SEMANTIC_CACHE_ENABLED,
+                 semantic_threshold: float = LLM_SEMANTIC_CACHE_THRESHOLD):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.semantic_enabled = enabled and semantic_enabled
+        self.semantic_threshold = semantic_threshold
+        self._entries: "OrderedDict[str, CachedCompletion]" = OrderedDict()
+        self._semantic_index: Dict[str, Set[str]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._hits = {EXACT: 0, SEMANTIC: 0}
+        self._misses = {EXACT: 0, SEMANTIC: 0}
+        self._latency_saved_ms = 0
+
+    @staticmethod
+    def scope(user_id: Optional[int], provider: str, model: Optional[str]) -> str:
+        return f"{user_id or 0}:{provider}:{model or ''}"
+
+    def exact_key(self, user_id: Optional[int], provider: str, **kwargs) -> Optional[str]:
+        """Key of a completion request, or None if it must not be served from cache."""
+        if not self.enabled or (kwargs.get('temperature', 0) or 0) != 0:
+            return None
+        try:
+            payload = json.dumps({
+                "scope": self.scope(user_id, provider, kwargs.get('model')),
+                "messages": kwargs.get('messages') or [],
+                "max_tokens": kwargs.get('max_tokens')
+            }, sort_keys=True, separators=(",", ":"))
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheHit]:
+        with self._lock:
+            entry = self._get_live(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return CacheHit(EXACT, copy.deepcopy(entry.response), entry.duration_ms)
+
+    def put(self, key: str, scope: str, response: Dict[str, Any], duration_ms: int) -> None:
+        self._store(key, CachedCompletion(
+            response=copy.deepcopy(response),
+            duration_ms=duration_ms,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            size=_estimate_size(response),
+            scope=scope
+        ))
+
+    def get_similar(self, scope: str, embedding: List[float]) -> Optional[CacheHit]:
+        """Most similar cached prompt of a scope at or above the threshold."""
+        norm = _norm(embedding)
+        if not norm:
+            return None
+        with self._lock:
+            best_key, best_similarity = None, self.semantic_threshold
+            for key in list(self._semantic_index.get(scope, ())):
+                entry = self._get_live(key)
+                if entry is None or len(entry.embedding) != len(embedding):
+                    continue
+                similarity = sum(a * b for a, b in zip(entry.embedding, embedding)) / (entry.norm * norm)
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            entry = self._entries[best_key]
+            return CacheHit(SEMANTIC, copy.deepcopy(entry.response), entry.duration_ms, best_similarity)
+
+    def put_similar(self, scope: str, embedding: List[float], response: Dict[str, Any], duration_ms: int) -> None:
+        norm = _norm(embedding)
+        if not norm:
+            return
+        self._store(f"semantic:{uuid.uuid4().hex}", CachedCompletion(
+            response=copy.deepcopy(response),
+            duration_ms=duration_ms,
+            expires_at=time.monotonic() + self.ttl_seconds,
+            # Floats in a list take roughly 32 bytes each
+            size=_estimate_size(response) + 32 * len(embedding),
+            scope=scope,
+            embedding=list(embedding),
+            norm=norm
+        ))
+
+    def record_lookup(self, provider: str, mode: str, hit: Optional[CacheHit]) -> None:
+        with self._lock:
+            if hit is not None:
+                self._hits[mode] += 1
+                self._latency_saved_ms += hit.latency_saved_ms
+            else:
+                self._misses[mode] += 1
+        try:
+            from ..prometheus_metrics import metrics_service
+            metrics_service.record_llm_cache_lookup(provider, mode, hit is not None,
+                                                    hit.latency_saved_ms if hit is not None else 0)
+        except Exception as e:
+            # Metrics need Docker for the service to start; never fail a completion over them
+            logger.debug(f"LLM cache metrics unavailable: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._semantic_index.clear()
+            self._size = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = sum(self._hits.values()) + sum(self._misses.values())
+            return {
+                "enabled": self.enabled,
+                "semantic_enabled": self.semantic_enabled,
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "hits": dict(self._hits),
+                "misses": dict(self._misses),
+                "hit_ratio": sum(self._hits.values()) / lookups if lookups else 0.0,
+                "latency_saved_ms": self._latency_saved_ms
+            }
+
+    def _store(self, key: str, entry: CachedCompletion) -> None:
+        if not self.enabled or entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._size += entry.size
+            if entry.embedding is not None:
+                self._semantic_index.setdefault(entry.scope, set()).add(key)
+            while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _get_live(self, key: str) -> Optional[CachedCompletion]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= entry.size
+        if entry.embedding is not None:
+            keys = self._semantic_index.get(entry.scope)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._semantic_index[entry.scope]
+
+
+def prompt_text(messages: List[Dict[str, Any]]) -> str:
+    """The text of a conversation that is embedded for semantic lookups."""
+    return "\n".join(f"{message.get('role', '')}: {message.get('content') or ''}" for message in messages or [])
+
+
+def _norm(vector: List[float]) -> float:
+    return math.sqrt(sum(value * value for value in vector)) if vector else 0.0
+
+
+def _estimate_size(response: Dict[str, Any]) -> int:
+    try:
+        return len(json.dumps(response, default=str))
+    except (TypeError, ValueError):
+        return len(str(response))
+
+
+# Global response cache instance shared by all LLM resources of this process
+llm_response_cache = LLMResponseCache()
@@ -5,6 +5,7 @@ Vector database resource implementations.
 from abc import abstractmethod
 from typing import Dict, Any, List, Optional
 from .base import BaseResource
+from .registry import resource_client_registry
 
 
 class VectorDBResource(BaseResource):
@@ -16,7 +17,8 @@ class VectorDBResource(BaseResource):
     async def initialize(self, user_id: int) -> None:
         """Initialize vector database client with API key"""
         api_key = await self.key_manager.get_key(user_id, self.provider)
-        self.client = await self._create_client(api_key)
+        # Clients are shared by all requests using the same key
+        self.client = await resource_client_registry.get_client(self.provider, api_key, self._create_client)
     
     @abstractmethod
     async def _create_client(self, api_key: str):
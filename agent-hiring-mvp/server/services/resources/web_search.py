@@ -4,8 +4,8 @@ Web search resource implementations.
 
 from abc import abstractmethod
 from typing import Dict, Any, List, Optional
-import aiohttp
 from .base import BaseResource
+from .registry import resource_client_registry
 
 
 class WebSearchResource(BaseResource):
@@ -18,6 +18,8 @@ class WebSearchResource(BaseResource):
         """Initialize web search client with API key"""
         api_key = await self.key_manager.get_key(user_id, self.provider)
         self.client = await self._create_client(api_key)
+        # Searches go through the process-wide pooled keep-alive session
+        self.session = resource_client_registry.http_session()
     
     @abstractmethod
     async def _create_client(self, api_key: str):
@@ -57,20 +59,19 @@ class SerperResource(WebSearchResource):
                 'num': num_results
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.client['base_url']}/search",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    data = await response.json()
+            async with self.session.post(
+                f"{self.client['base_url']}/search",
+                headers=headers,
+                json=payload
+            ) as response:
+                data = await response.json()
                     
-                    return {
-                        "results": data.get('organic', []),
-                        "total_results": len(data.get('organic', [])),
-                        "query": query,
-                        "operation": "search"
-                    }
+                return {
+                    "results": data.get('organic', []),
+                    "total_results": len(data.get('organic', [])),
+                    "query": query,
+                    "operation": "search"
+                }
         else:
             raise ValueError(f"Unsupported operation type: {operation_type}")
     
@@ -114,19 +115,18 @@ class SerpapiResource(WebSearchResource):
                 'engine': 'google'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.client['base_url']}/search",
-                    params=params
-                ) as response:
-                    data = await response.json()
+            async with self.session.get(
+                f"{self.client['base_url']}/search",
+                params=params
+            ) as response:
+                data = await response.json()
                     
-                    return {
-                        "results": data.get('organic_results', []),
-                        "total_results": len(data.get('organic_results', [])),
-                        "query": query,
-                        "operation": "search"
-                    }
+                return {
+                    "results": data.get('organic_results', []),
+                    "total_results": len(data.get('organic_results', [])),
+                    "query": query,
+                    "operation": "search"
+                }
         else:
             raise ValueError(f"Unsupported operation type: {operation_type}")
     
@@ -168,36 +168,35 @@ class DuckDuckGoResource(WebSearchResource):
                 'skip_disambig': '1'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.client['base_url']}/",
-                    params=params
-                ) as response:
-                    data = await response.json()
+            async with self.session.get(
+                f"{self.client['base_url']}/",
+                params=params
+            ) as response:
+                data = await response.json()
                     
-                    # Transform DuckDuckGo results to standard format
-                    results = []
-                    if data.get('Abstract'):
+                # Transform DuckDuckGo results to standard format
+                results = []
+                if data.get('Abstract'):
+                    results.append({
+                        'title': data.get('AbstractSource', ''),
+                        'snippet': data.get('Abstract', ''),
+                        'link': data.get('AbstractURL', '')
+                    })
+                    
+                for result in data.get('RelatedTopics', []):
+                    if isinstance(result, dict) and result.get('Text'):
                         results.append({
-                            'title': data.get('AbstractSource', ''),
-                            'snippet': data.get('Abstract', ''),
-                            'link': data.get('AbstractURL', '')
+                            'title': result.get('FirstURL', ''),
+                            'snippet': result.get('Text', ''),
+                            'link': result.get('FirstURL', '')
                         })
                     
-                    for result in data.get('RelatedTopics', []):
-                        if isinstance(result, dict) and result.get('Text'):
-                            results.append({
-                                'title': result.get('FirstURL', ''),
-                                'snippet': result.get('Text', ''),
-                                'link': result.get('FirstURL', '')
-                            })
-                    
-                    return {
-                        "results": results,
-                        "total_results": len(results),
-                        "query": query,
-                        "operation": "search"
-                    }
+                return {
+                    "results": results,
+                    "total_results": len(results),
+                    "query": query,
+                    "operation": "search"
+                }
         else:
             raise ValueError(f"Unsupported operation type: {operation_type}")
     
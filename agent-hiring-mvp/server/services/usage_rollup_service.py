@@ -0,0 +1,360 @@
+"""Incremental rollup of container usage snapshots into hourly and daily aggregations."""
+
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Tuple
+
+from sqlalchemy import func, and_
+from sqlalchemy.orm import Session
+
+from ..config import (
+    USAGE_ROLLUP_BATCH_SIZE,
+    USAGE_ROLLUP_LAG_SECONDS,
+    RAW_USAGE_RETENTION_DAYS,
+    HOURLY_USAGE_RETENTION_DAYS
+)
+from ..models.container_resource_usage import (
+    ContainerResourceUsage,
+    UsageAggregation,
+    UsageRollupWatermark,
+    HiringUsageActivity
+)
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_NAME = "container_usage"
+
+# Aggregation periods maintained by the rollup, with their bucket length
+ROLLUP_PERIODS = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+}
+
+# UsageAggregation columns accumulated from snapshots
+_ROLLUP_FIELDS = (
+    "total_cpu_hours",
+    "total_memory_gb_hours",
+    "total_network_gb",
+    "total_storage_gb_hours",
+    "total_cpu_cost",
+    "total_memory_cost",
+    "total_network_cost",
+    "total_storage_cost",
+    "total_cost",
+)
+
+_GB = 1024 ** 3
+
+# Rollups must not interleave within one process; across processes the
+# watermark update is a compare-and-set
+_rollup_lock = threading.Lock()
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes for timezone-aware columns
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def period_bucket_start(timestamp: datetime, period: str) -> datetime:
+    """Get the start of the hourly or daily bucket a timestamp falls into (UTC)."""
+    timestamp = _as_utc(timestamp)
+    if period == "daily":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+class UsageRollupService:
+    """
+    Folds raw container usage snapshots into ``UsageAggregation`` rows.
+
+    Billing used to recompute usage from raw snapshots on every read, issuing
+    24 queries per deployment per day. Instead, snapshots are rolled up as they
+    arrive: each run reads only the snapshots above a stored watermark (the
+    highest snapshot id already rolled up), adds their usage to one "hourly"
+    and one "daily" aggregation per hiring, and advances the watermark in the
+    same transaction. Billing reads then ``SUM`` a handful of aggregation rows.
+    The number of snapshots of each hiring and their first and last timestamps
+    are kept in ``HiringUsageActivity`` the same way.
+
+    Rollups only run in the background task, never on a billing read, so reads
+    lag behind by up to ``USAGE_ROLLUP_INTERVAL_SECONDS`` plus ``lag_seconds``;
+    ``rollup_status`` reports how far.
+
+    Snapshots younger than ``lag_seconds`` are left for the next run so a
+    snapshot inserted by a transaction that commits late is not skipped.
+    Rolled up raw snapshots are deleted after ``RAW_USAGE_RETENTION_DAYS`` and
+    hourly aggregations are downsampled to the daily ones after
+    ``HOURLY_USAGE_RETENTION_DAYS``.
+    """
+
+    def __init__(self, db_session: Session, batch_size: int = USAGE_ROLLUP_BATCH_SIZE,
+                 lag_seconds: int = USAGE_ROLLUP_LAG_SECONDS):
+        self.db = db_session
+        self.batch_size = max(1, batch_size)
+        self.lag_seconds = max(0, lag_seconds)
+
+    def run_incremental_rollup(self, max_batches: int = 100) -> int:
+        """
+        Roll up all snapshots that arrived since the last run.
+
+        Returns:
+            Number of snapshots rolled up
+        """
+        with _rollup_lock:
+            total = 0
+            for _ in range(max_batches):
+                rolled_up = self._rollup_batch()
+                total += rolled_up
+                if rolled_up < self.batch_size:
+                    break
+            if total:
+                logger.info(f"Rolled up {total} container usage snapshots")
+            return total
+
+    def apply_retention(self, raw_retention_days: int = RAW_USAGE_RETENTION_DAYS,
+                        hourly_retention_days: int = HOURLY_USAGE_RETENTION_DAYS) -> Dict[str, int]:
+        """
+        Delete raw snapshots and hourly aggregations that are past their retention.
+
+        Only snapshots below the watermark are deleted, so usage that has not
+        been rolled up yet is never lost.
+
+        Returns:
+            Number of deleted snapshots and hourly aggregations
+        """
+        deleted = {"snapshots": 0, "hourly_aggregations": 0}
+        now = datetime.now(timezone.utc)
+        try:
+            if raw_retention_days > 0:
+                watermark = self._get_watermark()
+                deleted["snapshots"] = self.db.query(ContainerResourceUsage).filter(
+                    ContainerResourceUsage.id <= watermark.last_snapshot_id,
+                    ContainerResourceUsage.snapshot_timestamp < now - timedelta(days=raw_retention_days)
+                ).delete(synchronize_session=False)
+
+            if hourly_retention_days > 0:
+                deleted["hourly_aggregations"] = self.db.query(UsageAggregation).filter(
+                    UsageAggregation.aggregation_period == "hourly",
+                    UsageAggregation.period_start < now - timedelta(days=hourly_retention_days)
+                ).delete(synchronize_session=False)
+
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        if deleted["snapshots"] or deleted["hourly_aggregations"]:
+            logger.info(
+                f"Usage retention removed {deleted['snapshots']} raw snapshots and "
+                f"{deleted['hourly_aggregations']} hourly aggregations"
+            )
+        return deleted
+
+    def _rollup_batch(self) -> int:
+        watermark = self._get_watermark()
+        last_snapshot_id = watermark.last_snapshot_id
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.lag_seconds)
+
+        # Stop before the first snapshot that is still too fresh, so the
+        # watermark never moves past a snapshot that has not been rolled up
+        first_fresh_id = self.db.query(func.min(ContainerResourceUsage.id)).filter(
+            ContainerResourceUsage.id > last_snapshot_id,
+            ContainerResourceUsage.snapshot_timestamp > cutoff
+        ).scalar()
+
+        query = self.db.query(
+            ContainerResourceUsage.id,
+            ContainerResourceUsage.user_id,
+            ContainerResourceUsage.agent_id,
+            ContainerResourceUsage.hiring_id,
+            ContainerResourceUsage.deployment_type,
+            ContainerResourceUsage.snapshot_timestamp,
+            ContainerResourceUsage.collection_interval_seconds,
+            ContainerResourceUsage.cpu_usage_percent,
+            ContainerResourceUsage.memory_usage_bytes,
+            ContainerResourceUsage.memory_limit_bytes,
+            ContainerResourceUsage.network_rx_bytes,
+            ContainerResourceUsage.network_tx_bytes,
+            ContainerResourceUsage.cpu_cost,
+            ContainerResourceUsage.memory_cost,
+            ContainerResourceUsage.network_cost,
+            ContainerResourceUsage.storage_cost,
+            ContainerResourceUsage.total_cost
+        ).filter(ContainerResourceUsage.id > last_snapshot_id)
+        if first_fresh_id is not None:
+            query = query.filter(ContainerResourceUsage.id < first_fresh_id)
+        snapshots = query.order_by(ContainerResourceUsage.id).limit(self.batch_size).all()
+
+        if not snapshots:
+            return 0
+
+        buckets: Dict[Tuple[str, int, datetime], Dict[str, Any]] = {}
+        activity: Dict[int, Dict[str, Any]] = {}
+        for snapshot in snapshots:
+            timestamp = _as_utc(snapshot.snapshot_timestamp)
+            hiring_activity = activity.setdefault(snapshot.hiring_id, {
+                "snapshots_count": 0, "first_snapshot_at": timestamp, "last_snapshot_at": timestamp
+            })
+            hiring_activity["snapshots_count"] += 1
+            hiring_activity["first_snapshot_at"] = min(hiring_activity["first_snapshot_at"], timestamp)
+            hiring_activity["last_snapshot_at"] = max(hiring_activity["last_snapshot_at"], timestamp)
+
+            interval_hours = (snapshot.collection_interval_seconds or 0) / 3600.0
+            deltas = {
+                "total_cpu_hours": (snapshot.cpu_usage_percent or 0.0) / 100.0 * interval_hours,
+                "total_memory_gb_hours": (snapshot.memory_usage_bytes or 0) / _GB * interval_hours,
+                "total_network_gb": ((snapshot.network_rx_bytes or 0) + (snapshot.network_tx_bytes or 0)) / _GB,
+                # Storage is billed on the memory limit, like the per-snapshot storage cost
+                "total_storage_gb_hours": (snapshot.memory_limit_bytes or 0) / _GB * interval_hours,
+                "total_cpu_cost": snapshot.cpu_cost or 0.0,
+                "total_memory_cost": snapshot.memory_cost or 0.0,
+                "total_network_cost": snapshot.network_cost or 0.0,
+                "total_storage_cost": snapshot.storage_cost or 0.0,
+                "total_cost": snapshot.total_cost or 0.0,
+            }
+            for period in ROLLUP_PERIODS:
+                key = (period, snapshot.hiring_id, period_bucket_start(snapshot.snapshot_timestamp, period))
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = {
+                        "user_id": snapshot.user_id,
+                        "agent_id": snapshot.agent_id,
+                        "deployment_type": snapshot.deployment_type,
+                        **{name: 0.0 for name in _ROLLUP_FIELDS}
+                    }
+                for name, value in deltas.items():
+                    bucket[name] += value
+
+        new_watermark = snapshots[-1].id
+        try:
+            self._apply_buckets(buckets)
+            self._apply_activity(activity)
+
+            # Compare-and-set: if another process rolled up the same snapshots
+            # first, discard this batch instead of counting it twice
+            updated = self.db.query(UsageRollupWatermark).filter(
+                UsageRollupWatermark.name == WATERMARK_NAME,
+                UsageRollupWatermark.last_snapshot_id == last_snapshot_id
+            ).update({
+                UsageRollupWatermark.last_snapshot_id: new_watermark,
+                UsageRollupWatermark.last_run_at: datetime.now(timezone.utc)
+            }, synchronize_session=False)
+            if not updated:
+                self.db.rollback()
+                logger.info("Usage rollup batch already applied by another worker, skipping")
+                return 0
+
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        # The watermark row was updated behind the session's back
+        self.db.expire(watermark)
+        return len(snapshots)
+
+    def _apply_buckets(self, buckets: Dict[Tuple[str, int, datetime], Dict[str, Any]]) -> None:
+        for period, length in ROLLUP_PERIODS.items():
+            keys = [key for key in buckets if key[0] == period]
+            if not keys:
+                continue
+
+            existing_rows = self.db.query(UsageAggregation).filter(
+                UsageAggregation.aggregation_period == period,
+                UsageAggregation.hiring_id.in_(list({key[1] for key in keys})),
+                UsageAggregation.period_start.in_(list({key[2] for key in keys}))
+            ).all()
+            existing = {(row.hiring_id, _as_utc(row.period_start)): row for row in existing_rows}
+
+            for key in keys:
+                _, hiring_id, period_start = key
+                bucket = buckets[key]
+                row = existing.get((hiring_id, period_start))
+                if row is None:
+                    row = UsageAggregation(
+                        user_id=bucket["user_id"],
+                        agent_id=bucket["agent_id"],
+                        hiring_id=hiring_id,
+                        aggregation_period=period,
+                        period_start=period_start,
+                        period_end=period_start + length,
+                        deployment_type=bucket["deployment_type"],
+                        **{name: 0.0 for name in _ROLLUP_FIELDS}
+                    )
+                    self.db.add(row)
+                for name in _ROLLUP_FIELDS:
+                    setattr(row, name, (getattr(row, name) or 0.0) + bucket[name])
+
+    def _apply_activity(self, activity: Dict[int, Dict[str, Any]]) -> None:
+        existing = {
+            row.hiring_id: row for row in self.db.query(HiringUsageActivity).filter(
+                HiringUsageActivity.hiring_id.in_(list(activity))
+            ).all()
+        }
+        for hiring_id, counts in activity.items():
+            row = existing.get(hiring_id)
+            if row is None:
+                self.db.add(HiringUsageActivity(hiring_id=hiring_id, **counts))
+                continue
+            row.snapshots_count = (row.snapshots_count or 0) + counts["snapshots_count"]
+            if row.first_snapshot_at is None or counts["first_snapshot_at"] < _as_utc(row.first_snapshot_at):
+                row.first_snapshot_at = counts["first_snapshot_at"]
+            if row.last_snapshot_at is None or counts["last_snapshot_at"] > _as_utc(row.last_snapshot_at):
+                row.last_snapshot_at = counts["last_snapshot_at"]
+
+    def _get_watermark(self) -> UsageRollupWatermark:
+        watermark = self.db.query(UsageRollupWatermark).filter(
+            UsageRollupWatermark.name == WATERMARK_NAME
+        ).first()
+        if watermark is None:
+            watermark = UsageRollupWatermark(name=WATERMARK_NAME, last_snapshot_id=0)
+            self.db.add(watermark)
+            try:
+                self.db.commit()
+            except Exception:
+                # Created concurrently by another worker
+                self.db.rollback()
+                watermark = self.db.query(UsageRollupWatermark).filter(
+                    UsageRollupWatermark.name == WATERMARK_NAME
+                ).one()
+        return watermark
+
+
+def sum_rollups(db: Session, period: str, *criteria) -> Dict[str, float]:
+    """
+    Sum usage aggregation rows of one period with SQL ``SUM``.
+
+    Only rollup rows (``hiring_id > 0``) are included; legacy per-user daily
+    summaries were written with ``hiring_id = 0``.
+    """
+    row = db.query(
+        *[func.coalesce(func.sum(getattr(UsageAggregation, name)), 0.0).label(name) for name in _ROLLUP_FIELDS]
+    ).filter(
+        and_(
+            UsageAggregation.aggregation_period == period,
+            UsageAggregation.hiring_id > 0,
+            *criteria
+        )
+    ).one()
+    return {name: float(getattr(row, name) or 0.0) for name in _ROLLUP_FIELDS}
+
+
+def rollup_status(db: Session) -> Dict[str, Any]:
+    """
+    Report how far the usage rollups lag behind the raw snapshots, without rolling up.
+
+    Returns:
+        ``rolled_up_at``, the time of the last rollup (ISO format, None before
+        the first one), and ``pending_snapshots``, the snapshots not rolled up yet
+    """
+    watermark = db.query(UsageRollupWatermark).filter(UsageRollupWatermark.name == WATERMARK_NAME).first()
+    pending = db.query(func.count(ContainerResourceUsage.id)).filter(
+        ContainerResourceUsage.id > (watermark.last_snapshot_id if watermark else 0)
+    ).scalar() or 0
+    return {
+        "rolled_up_at": _as_utc(watermark.last_run_at).isoformat() if watermark and watermark.last_run_at else None,
+        "pending_snapshots": pending
+    }
@@ -0,0 +1,388 @@
+"""Pool of pre-started idle containers for prebuilt function agent images."""
+
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, Deque, List, Set
+
+import docker
+from docker import errors as docker_errors
+
+from ..config import (
+    WARM_POOL_ENABLED,
+    WARM_POOL_MIN_SIZE,
+    WARM_POOL_MAX_SIZE,
+    WARM_POOL_IDLE_TIMEOUT_SECONDS,
+    CONTAINER_STOP_TIMEOUT_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# Label used to find pool containers, including ones left over by a previous server run
+WARM_POOL_LABEL = "warm_pool"
+# Docker labels are immutable, so claimed containers keep the label; an unclaimed
+# container is recognised by still carrying its pool name
+WARM_CONTAINER_NAME_PREFIX = "aghub-func-warm-"
+
+
+@dataclass
+class _WarmContainer:
+    container_id: str
+    container_name: str
+    created_at: float
+
+
+@dataclass
+class _ImagePool:
+    agent_id: str
+    image_name: str
+    container_options: Dict[str, Any]
+    idle: Deque[_WarmContainer] = field(default_factory=deque)
+    starting: int = 0
+    claim_times: Deque[float] = field(default_factory=deque)
+    last_activity: float = field(default_factory=time.monotonic)
+
+
+class WarmContainerPool:
+    """
+    Keeps idle, already running containers for prebuilt function agent images.
+
+    Function agent images are prebuilt when an agent is published with
+    ``--build`` (``DeploymentService.pre_build_agent_image``). For those images
+    the pool starts containers ahead of time, so a new hire only has to rename
+    a running container instead of waiting for it to be created. Per-hiring
+    environment variables are passed on every ``docker exec`` call, which makes
+    warm containers interchangeable until they are claimed.
+
+    The target size of each pool follows demand: it is the number of hires seen
+    within the idle window, bounded by ``min_size`` and ``max_size``. Idle
+    containers older than the idle timeout are replaced, and images that were
+    not hired within that window are drained completely.
+    """
+
+    def __init__(self, min_size: int = WARM_POOL_MIN_SIZE, max_size: int = WARM_POOL_MAX_SIZE,
+                 idle_timeout: int = WARM_POOL_IDLE_TIMEOUT_SECONDS, enabled: bool = WARM_POOL_ENABLED):
+        self.enabled = enabled and max_size > 0
+        self.min_size = max(0, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.idle_timeout = idle_timeout
+        self._pools: Dict[str, _ImagePool] = {}
+        self._pending_first_execution: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._docker_client = None
+
+    @property
+    def docker_client(self):
+        if self._docker_client is None:
+            self._docker_client = docker.from_env()
+        return self._docker_client
+
+    def register_image(self, agent_id: str, image_name: str, container_options: Optional[Dict[str, Any]] = None,
+                       refill: bool = True) -> None:
+        """
+        Start keeping warm containers for a prebuilt function agent image.
+
+        Args:
+            agent_id: Agent the image belongs to
+            image_name: Prebuilt image name (``agent.docker_image``)
+            container_options: Extra ``containers.run`` options such as resource limits
+            refill: Whether to start the initial containers in the background
+        """
+        if not self.enabled or not image_name:
+            return
+
+        stale_pools = []
+        with self._lock:
+            pool = self._pools.get(image_name)
+            if pool is None:
+                # An agent only has one current prebuilt image; drop pools of older ones
+                stale_pools = [p for p in self._pools.values() if p.agent_id == agent_id]
+                for stale in stale_pools:
+                    del self._pools[stale.image_name]
+                pool = _ImagePool(agent_id=agent_id, image_name=image_name,
+                                  container_options=container_options or {})
+                self._pools[image_name] = pool
+                logger.info(f"Registered warm pool for agent {agent_id} image {image_name}")
+            else:
+                if container_options is not None:
+                    pool.container_options = container_options
+                pool.last_activity = time.monotonic()
+
+        for stale in stale_pools:
+            self._remove_containers(list(stale.idle))
+
+        if refill:
+            self._refill_in_background(image_name)
+
+    def unregister_image(self, image_name: str) -> None:
+        """Stop pooling an image and remove its idle containers (e.g. before the image is removed)."""
+        with self._lock:
+            pool = self._pools.pop(image_name, None)
+        if pool:
+            self._remove_containers(list(pool.idle))
+            self._report_size(pool.agent_id, 0)
+            logger.info(f"Drained warm pool for image {image_name}")
+
+    def claim(self, agent_id: str, image_name: str):
+        """
+        Take a running idle container for an image, if one is available.
+
+        Returns:
+            The docker container, or None on a pool miss
+        """
+        if not self.enabled or not image_name:
+            return None
+
+        with self._lock:
+            pool = self._pools.get(image_name)
+            if pool is not None:
+                now = time.monotonic()
+                pool.claim_times.append(now)
+                pool.last_activity = now
+
+        if pool is None:
+            self._record_claim(agent_id, hit=False, reason="not_registered")
+            return None
+
+        container = None
+        while container is None:
+            with self._lock:
+                warm = pool.idle.popleft() if pool.idle else None
+                idle_count = len(pool.idle)
+            if warm is None:
+                break
+            try:
+                candidate = self.docker_client.containers.get(warm.container_id)
+                if candidate.status == "running":
+                    container = candidate
+                else:
+                    self._remove_containers([warm])
+            except docker_errors.NotFound:
+                logger.debug(f"Warm container {warm.container_name} disappeared")
+            except Exception as e:
+                logger.warning(f"Could not claim warm container {warm.container_name}: {e}")
+            self._report_size(agent_id, idle_count)
+
+        self._record_claim(agent_id, hit=container is not None, reason="empty")
+        self._refill_in_background(image_name)
+        return container
+
+    def discard(self, container) -> None:
+        """Remove a claimed container that could not be assigned to a deployment."""
+        self._remove_containers([_WarmContainer(container_id=container.id, container_name=container.name,
+                                                created_at=time.monotonic())])
+
+    def maintain(self) -> None:
+        """Evict expired idle containers, drain unused images and refill the rest."""
+        if not self.enabled:
+            return
+
+        now = time.monotonic()
+        expired: List[_WarmContainer] = []
+        drained: List[_ImagePool] = []
+        with self._lock:
+            for image_name, pool in list(self._pools.items()):
+                while pool.claim_times and now - pool.claim_times[0] > self.idle_timeout:
+                    pool.claim_times.popleft()
+                if now - pool.last_activity > self.idle_timeout:
+                    del self._pools[image_name]
+                    drained.append(pool)
+                    continue
+                fresh = deque()
+                for warm in pool.idle:
+                    if now - warm.created_at > self.idle_timeout:
+                        expired.append(warm)
+                    else:
+                        fresh.append(warm)
+                pool.idle = fresh
+            image_names = list(self._pools.keys())
+
+        for pool in drained:
+            logger.info(f"Draining warm pool for image {pool.image_name} (no hires within {self.idle_timeout}s)")
+            self._remove_containers(list(pool.idle))
+            self._report_size(pool.agent_id, 0)
+        if expired:
+            logger.info(f"Evicting {len(expired)} idle warm containers")
+            self._remove_containers(expired)
+
+        for image_name in image_names:
+            self.refill(image_name)
+
+    def refill(self, image_name: str) -> int:
+        """
+        Start containers until the pool of an image reaches its target size.
+
+        Returns:
+            Number of containers started
+        """
+        started = 0
+        while True:
+            with self._lock:
+                pool = self._pools.get(image_name)
+                if pool is None or len(pool.idle) + pool.starting >= self._target_size(pool):
+                    break
+                pool.starting += 1
+            try:
+                warm = self._start_container(pool)
+            except Exception as e:
+                logger.error(f"Failed to start warm container for image {image_name}: {e}")
+                warm = None
+            with self._lock:
+                pool.starting -= 1
+                # The image may have been unregistered while the container was starting
+                if warm is not None and self._pools.get(image_name) is pool:
+                    pool.idle.append(warm)
+                    idle_count = len(pool.idle)
+                    warm = None
+                else:
+                    idle_count = None
+            if warm is not None:
+                self._remove_containers([warm])
+            if idle_count is None:
+                break
+            started += 1
+            self._report_size(pool.agent_id, idle_count)
+        return started
+
+    def remove_orphaned_containers(self, assigned_container_ids: Optional[Set[str]] = None) -> int:
+        """
+        Remove idle pool containers left behind by a previous server process.
+
+        Containers that were claimed by a deployment are kept: they were renamed
+        to the deployment's container name and are referenced by its container_id.
+        Claimed containers keep the pool label, so deployments are only ever
+        matched to containers through those database columns.
+
+        Args:
+            assigned_container_ids: Container ids currently referenced by deployments
+
+        Returns:
+            Number of containers removed
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            known = {warm.container_id for pool in self._pools.values() for warm in pool.idle}
+        known |= assigned_container_ids or set()
+        removed = 0
+        try:
+            containers = self.docker_client.containers.list(
+                all=True, filters={"label": f"{WARM_POOL_LABEL}=true"}
+            )
+        except Exception as e:
+            logger.warning(f"Could not list warm pool containers: {e}")
+            return 0
+        for container in containers:
+            if container.id in known or not container.name.startswith(WARM_CONTAINER_NAME_PREFIX):
+                continue
+            try:
+                container.remove(force=True)
+                removed += 1
+            except Exception as e:
+                logger.warning(f"Failed to remove orphaned warm container {container.name}: {e}")
+        if removed:
+            logger.info(f"Removed {removed} orphaned warm pool containers")
+        return removed
+
+    def track_first_execution(self, deployment_id: str, agent_id: str, source: str, requested_at: float) -> None:
+        """Remember when a deployment was requested so its first execution can be timed."""
+        with self._lock:
+            self._pending_first_execution[deployment_id] = {
+                "agent_id": agent_id,
+                "source": source,
+                "requested_at": requested_at
+            }
+
+    def record_first_execution(self, deployment_id: str) -> None:
+        """Record time-to-first-execution if this is the first execution of a tracked deployment."""
+        with self._lock:
+            pending = self._pending_first_execution.pop(deployment_id, None)
+        if pending:
+            from .prometheus_metrics import metrics_service
+            metrics_service.record_time_to_first_execution(
+                pending["agent_id"], pending["source"], max(0.0, time.time() - pending["requested_at"])
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool sizes per image."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "idle_timeout_seconds": self.idle_timeout,
+                "images": {
+                    image_name: {
+                        "agent_id": pool.agent_id,
+                        "idle": len(pool.idle),
+                        "starting": pool.starting,
+                        "target": self._target_size(pool),
+                        "recent_hires": len(pool.claim_times)
+                    }
+                    for image_name, pool in self._pools.items()
+                }
+            }
+
+    def _target_size(self, pool: _ImagePool) -> int:
+        return min(self.max_size, max(self.min_size, len(pool.claim_times)))
+
+    def _start_container(self, pool: _ImagePool) -> _WarmContainer:
+        safe_agent_id = pool.agent_id.lower().replace('-', '_')[:8]
+        container_name = f"{WARM_CONTAINER_NAME_PREFIX}{safe_agent_id}-{uuid.uuid4().hex[:8]}"
+        container_config = {
+            "image": pool.image_name,
+            # Prebuilt function images run main.py by default; keep the container idle instead
+            "command": ["tail", "-f", "/dev/null"],
+            "name": container_name,
+            "environment": {"AGENT_ID": pool.agent_id, "AGENT_TYPE": "function"},
+            "detach": True,
+            "restart_policy": {"Name": "unless-stopped"},
+            "working_dir": "/app",
+            # The labels of a cold function container that do not depend on the hire;
+            # deployment, hiring and user are only known from the deployment row
+            "labels": {
+                "monitoring": "true",
+                "agent_type": "function",
+                "agent_id": str(pool.agent_id),
+                "service": "agenthub-agent",
+                WARM_POOL_LABEL: "true",
+                "warm_pool_image": pool.image_name
+            }
+        }
+        container_config.update(pool.container_options)
+        container = self.docker_client.containers.run(**container_config)
+        logger.info(f"Started warm container {container_name} for image {pool.image_name}")
+        return _WarmContainer(container_id=container.id, container_name=container_name,
+                              created_at=time.monotonic())
+
+    def _remove_containers(self, containers: List[_WarmContainer]) -> None:
+        for warm in containers:
+            try:
+                container = self.docker_client.containers.get(warm.container_id)
+                container.stop(timeout=CONTAINER_STOP_TIMEOUT_SECONDS)
+                container.remove()
+            except docker_errors.NotFound:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to remove warm container {warm.container_name}: {e}")
+
+    def _refill_in_background(self, image_name: str) -> None:
+        thread = threading.Thread(target=self.refill, args=(image_name,), daemon=True)
+        thread.start()
+
+    @staticmethod
+    def _record_claim(agent_id: str, hit: bool, reason: str) -> None:
+        from .prometheus_metrics import metrics_service
+        metrics_service.record_warm_pool_claim(agent_id, hit, reason)
+
+    @staticmethod
+    def _report_size(agent_id: str, size: int) -> None:
+        from .prometheus_metrics import metrics_service
+        metrics_service.set_warm_pool_size(agent_id, size)
+
+
+# Global pool instance shared by the function deployment service and the maintenance task
+warm_container_pool = WarmContainerPool()
@@ -0,0 +1,95 @@
+"""Standalone execution queue worker for the Agent Hiring System."""
+
+import argparse
+import asyncio
+import logging
+import signal
+from pathlib import Path
+
+try:
+    from dotenv import load_dotenv
+    env_path = Path(__file__).parent.parent / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+except ImportError:
+    pass
+
+from .config import EXECUTION_WORKER_CONCURRENCY, EXECUTION_QUEUE_POLL_INTERVAL_SECONDS
+from .database.init_db import init_database
+# Import models to ensure they're registered with SQLAlchemy Base metadata
+from . import models  # noqa: F401
+from .services.execution_worker import ExecutionWorker
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+logging.getLogger("urllib3").setLevel(logging.WARNING)
+logging.getLogger("docker").setLevel(logging.WARNING)
+
+
+async def run_worker(concurrency: int = EXECUTION_WORKER_CONCURRENCY,
+                     poll_interval: float = EXECUTION_QUEUE_POLL_INTERVAL_SECONDS,
+                     shutdown_timeout: float = 60.0) -> None:
+    """Run an execution worker until SIGINT/SIGTERM, then let running executions finish."""
+    init_database()
+    worker = ExecutionWorker(concurrency=concurrency, poll_interval=poll_interval)
+
+    loop = asyncio.get_event_loop()
+    stop_event = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Windows event loops do not support signal handlers
+            pass
+
+    worker_task = asyncio.create_task(worker.run())
+    stop_task = asyncio.create_task(stop_event.wait())
+    await asyncio.wait([worker_task, stop_task], return_when=asyncio.FIRST_COMPLETED)
+
+    logger.info(f"Stopping execution worker {worker.worker_id}")
+    await worker.shutdown(timeout=shutdown_timeout)
+    worker_task.cancel()
+    stop_task.cancel()
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Agent Hiring System execution worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=EXECUTION_WORKER_CONCURRENCY,
+        help=f"Executions to run at the same time (default: {EXECUTION_WORKER_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=EXECUTION_QUEUE_POLL_INTERVAL_SECONDS,
+        help=f"Seconds between queue checks when idle (default: {EXECUTION_QUEUE_POLL_INTERVAL_SECONDS})"
+    )
+    parser.add_argument(
+        "--shutdown-timeout",
+        type=float,
+        default=60.0,
+        help="Seconds to wait for running executions on shutdown (default: 60)"
+    )
+    parser.add_argument(
+        "--dev",
+        action="store_true",
+        help="Enable development mode"
+    )
+
+    args = parser.parse_args()
+
+    if args.dev:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    asyncio.run(run_worker(args.concurrency, args.poll_interval, args.shutdown_timeout))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Tests for proxying requests to ACP agents over pooled connections and cached routes."""
+
+import asyncio
+import types
+
+import aiohttp
+import docker
+import pytest
+from aiohttp import web
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from server.models.deployment import AgentDeployment, DeploymentStatus
+from server.models.hiring import Hiring
+from server.services.agent_proxy_pool import AgentProxyPool, DeploymentRoute, DeploymentRouteCache
+
+CHUNKS = [b"data: one\n\n", b"data: two\n\n", b"data: three\n\n"]
+
+
+@pytest.fixture
+def proxy_api(monkeypatch):
+    # The API package creates the Prometheus metrics service, which connects to Docker on import
+    monkeypatch.setattr(docker, "from_env", lambda: None)
+    from server.api import agent_proxy as proxy_api
+
+    monkeypatch.setattr(proxy_api, "agent_proxy_pool", AgentProxyPool())
+    monkeypatch.setattr(proxy_api, "deployment_route_cache", DeploymentRouteCache(ttl_seconds=60))
+    return proxy_api
+
+
+async def stream_events(request):
+    response = web.StreamResponse(headers={"content-type": "text/event-stream"})
+    await response.prepare(request)
+    for chunk in CHUNKS:
+        await response.write(chunk)
+        await asyncio.sleep(0.01)
+    return response
+
+
+async def drop_mid_stream(request):
+    response = web.StreamResponse(headers={"content-type": "text/event-stream", "content-length": "1000"})
+    await response.prepare(request)
+    await response.write(CHUNKS[0])
+    request.transport.close()
+    return response
+
+
+async def with_agent(scenario):
+    app = web.Application()
+    app.router.add_get("/events", stream_events)
+    app.router.add_get("/broken", drop_mid_stream)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await scenario(f"http://127.0.0.1:{port}")
+    finally:
+        await runner.cleanup()
+
+
+def route(endpoint="http://127.0.0.1:9", user_id=1, status=DeploymentStatus.RUNNING.value):
+    return DeploymentRoute(hiring_id=1, user_id=user_id, deployment_id="deployment-1", agent_id="agent-1",
+                           proxy_endpoint=endpoint, status=status, is_healthy=True)
+
+
+def client_request():
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []})
+
+
+def active_requests(proxy_api):
+    return proxy_api.agent_proxy_pool.get_stats()["active_requests"]
+
+
+def test_streamed_response_releases_the_pool_when_finished(proxy_api):
+    async def scenario(endpoint):
+        response = await proxy_api._proxy_to_agent(route(endpoint), client_request(), f"{endpoint}/events")
+        during = active_requests(proxy_api)
+        body = [chunk async for chunk in response.body_iterator]
+        await response.background()
+        return during, body
+
+    during, body = asyncio.run(with_agent(scenario))
+
+    assert during == 1
+    assert b"".join(body) == b"".join(CHUNKS)
+    assert active_requests(proxy_api) == 0
+
+
+def test_client_disconnect_releases_the_pool(proxy_api):
+    async def scenario(endpoint):
+        response = await proxy_api._proxy_to_agent(route(endpoint), client_request(), f"{endpoint}/events")
+        first = await response.body_iterator.__anext__()
+        # What the server does with the body of a response whose client went away
+        await response.body_iterator.aclose()
+        return first
+
+    assert asyncio.run(with_agent(scenario)) == CHUNKS[0]
+    assert active_requests(proxy_api) == 0
+
+
+def test_agent_dropping_the_response_releases_the_pool(proxy_api):
+    async def scenario(endpoint):
+        response = await proxy_api._proxy_to_agent(route(endpoint), client_request(), f"{endpoint}/broken")
+        return [chunk async for chunk in response.body_iterator]
+
+    assert b"".join(asyncio.run(with_agent(scenario))) == CHUNKS[0]
+    assert active_requests(proxy_api) == 0
+
+
+def test_unreachable_agent_releases_the_pool(proxy_api):
+    async def scenario():
+        # Nothing listens on the discard port
+        return await proxy_api._proxy_to_agent(route(), client_request(), "http://127.0.0.1:9/events")
+
+    with pytest.raises(aiohttp.ClientError):
+        asyncio.run(scenario())
+    assert active_requests(proxy_api) == 0
+
+
+def test_cached_route_still_checks_the_hiring_owner(db_session, proxy_api):
+    db_session.add(Hiring(id=1, agent_id="agent-1", user_id=1, status="active"))
+    db_session.add(AgentDeployment(
+        agent_id="agent-1", hiring_id=1, deployment_id="deployment-1", deployment_type="acp",
+        proxy_endpoint="http://agent", status=DeploymentStatus.RUNNING.value, is_healthy=True
+    ))
+    db_session.commit()
+    owner, other = types.SimpleNamespace(id=1), types.SimpleNamespace(id=2)
+
+    assert asyncio.run(proxy_api._validate_deployment_access(1, owner, db_session)).deployment_id == "deployment-1"
+
+    # The route now comes from the cache, without a database lookup
+    with pytest.raises(HTTPException) as denied:
+        asyncio.run(proxy_api._validate_deployment_access(1, other, None))
+    assert denied.value.status_code == 403
+    assert asyncio.run(proxy_api._validate_deployment_access(1, owner, None)).proxy_endpoint == "http://agent"
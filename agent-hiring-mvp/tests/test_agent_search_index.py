@@ -0,0 +1,149 @@
+"""Tests for ranked, cursor-paginated agent search and keeping its index in sync."""
+
+import asyncio
+import types
+import zipfile
+from datetime import datetime, timedelta
+
+import docker
+import pytest
+from sqlalchemy import text
+
+from server.models.agent import Agent, AgentStatus
+from server.services import agent_search_index as search_module
+from server.services import agent_service as agent_service_module
+from server.services.agent_search_index import AgentSearchIndex
+from server.services.agent_service import AgentCreateRequest, AgentService
+from server.services.blob_store import BlobStore
+
+CREATED_AT = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def index(monkeypatch):
+    # Backends are cached per database URL, and every test has a new in-memory database
+    index = AgentSearchIndex()
+    monkeypatch.setattr(agent_service_module, "agent_search_index", index)
+    return index
+
+
+@pytest.fixture
+def like_index(index, monkeypatch):
+    # As on a SQLite build without FTS5
+    monkeypatch.setattr(search_module, "_SQLITE_CREATE", "CREATE VIRTUAL TABLE agent_search_fts USING missing_fts5(x)")
+    return index
+
+
+def add_agent(db, index, agent_id, name, description="", tags=None, category="general",
+              public=True, owner_id=1, created_at=CREATED_AT):
+    agent = Agent(
+        id=agent_id, name=name, description=description, version="1.0.0", author="Test",
+        email="test@example.com", owner_id=owner_id, agent_type="function", entry_point="main.py:main",
+        tags=tags or [], category=category, is_public=public, created_at=created_at,
+        status=AgentStatus.APPROVED.value if public else AgentStatus.SUBMITTED.value,
+    )
+    db.add(agent)
+    index.index_agent(db, agent)
+    db.commit()
+    return agent
+
+
+def ids(page):
+    return [agent.id for agent in page["agents"]]
+
+
+def all_pages(db, index, query, limit, **kwargs):
+    seen, cursor = [], None
+    while True:
+        page = index.search(db, query, limit=limit, cursor=cursor, **kwargs)
+        seen.extend(ids(page))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen, page["total"]
+
+
+def test_fts_ranks_name_matches_above_description_matches(db_session, index):
+    assert index.ensure_index(db_session) == "sqlite"
+    add_agent(db_session, index, "desc", "Helper", description="Summarizes a weather report")
+    add_agent(db_session, index, "name", "Weather Reporter", description="Forecasts")
+    add_agent(db_session, index, "tag", "Helper Two", tags=["weather"])
+
+    page = index.search(db_session, "weath")
+
+    assert ids(page) == ["name", "tag", "desc"]
+    assert page["total"] == 3 and page["facets"] == {"general": 3}
+
+
+def test_fts_requires_every_term_and_hides_unapproved_agents(db_session, index):
+    add_agent(db_session, index, "both", "Invoice Parser", description="Reads PDF invoices")
+    add_agent(db_session, index, "one", "Invoice Sender")
+    add_agent(db_session, index, "draft", "Invoice PDF Draft", public=False, owner_id=2)
+
+    assert ids(index.search(db_session, "invoice pdf")) == ["both"]
+    assert set(ids(index.search(db_session, "invoice pdf", scope="accessible", user_id=2))) == {"both", "draft"}
+    assert ids(index.search(db_session, "invoice", scope="mine", user_id=2)) == ["draft"]
+
+
+def test_like_fallback_matches_substrings_newest_first(db_session, like_index):
+    assert like_index.ensure_index(db_session) == "like"
+    add_agent(db_session, like_index, "old", "Weather Bot", created_at=CREATED_AT)
+    add_agent(db_session, like_index, "new", "Bot", description="weather alerts",
+              created_at=CREATED_AT + timedelta(days=1))
+    add_agent(db_session, like_index, "other", "Translator")
+
+    page = like_index.search(db_session, "weather")
+
+    assert ids(page) == ["new", "old"]
+    assert page["total"] == 2
+
+
+@pytest.mark.parametrize("fixture", ["index", "like_index"])
+def test_cursor_pages_continue_without_duplicates(db_session, fixture, request):
+    index = request.getfixturevalue(fixture)
+    # Equal descriptions tie on score or creation time, so the agent id breaks ties
+    for number in range(7):
+        add_agent(db_session, index, f"agent-{number}", f"Report Bot {number}", description="report")
+    add_agent(db_session, index, "unrelated", "Translator")
+
+    seen, total = all_pages(db_session, index, "report", limit=3)
+
+    assert len(seen) == len(set(seen)) == total == 7
+    assert set(seen) == {f"agent-{number}" for number in range(7)}
+
+
+def test_malformed_cursor_is_rejected(db_session, index):
+    with pytest.raises(ValueError):
+        index.search(db_session, "report", cursor="not-a-cursor")
+
+
+def make_agent_zip(path):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("main.py", "def main(input_data, context):\n    return input_data\n")
+    return str(path)
+
+
+def test_submit_approve_and_delete_keep_the_index_in_sync(db_session, index, tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_service_module, "blob_store", BlobStore(str(tmp_path / "blobs")))
+    service = AgentService(db_session)
+
+    agent = service.create_agent(AgentCreateRequest(
+        name="Glacier Tracker", description="Tracks glaciers", author="Test", email="test@example.com",
+        entry_point="main.py:main", category="science",
+    ), make_agent_zip(tmp_path / "agent.zip"), owner_id=1)
+
+    assert ids(index.search(db_session, "glacier")) == []
+    assert ids(index.search(db_session, "glacier", scope="mine", user_id=1)) == [agent.id]
+
+    service.approve_agent(agent.id)
+    assert ids(index.search(db_session, "glacier")) == [agent.id]
+
+    monkeypatch.setattr(docker, "from_env", lambda: None)
+    from server.api import agents as agents_api
+    monkeypatch.setattr(agents_api, "agent_search_index", index)
+    monkeypatch.setattr(agents_api, "blob_store", BlobStore(str(tmp_path / "blobs")))
+    asyncio.run(agents_api.delete_agent.__wrapped__(
+        agent.id, current_user=types.SimpleNamespace(id=1), db=db_session
+    ))
+
+    assert ids(index.search(db_session, "glacier", scope="mine", user_id=1)) == []
+    assert db_session.execute(text("SELECT COUNT(*) FROM agent_search_fts")).scalar() == 0
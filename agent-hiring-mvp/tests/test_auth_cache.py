@@ -0,0 +1,81 @@
+"""Tests for the principal cache and its invalidation on commits."""
+
+import pytest
+from sqlalchemy import text
+
+from server.models.user import User
+from server.models.user_api_key import UserApiKey
+from server.services.auth_cache import api_key_usage_recorder, principal_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(principal_cache, "enabled", True)
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+    api_key_usage_recorder._pending.clear()
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(email="ada@example.com", password="hashed", full_name="Ada", preferences={"theme": "dark"})
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def rename_behind_orm(db, user_id, full_name):
+    db.execute(text("UPDATE users SET full_name = :name WHERE id = :id"), {"name": full_name, "id": user_id})
+    db.commit()
+    db.expire_all()
+
+
+def test_cached_user_is_served_without_query(db_session, user):
+    assert principal_cache.get_user(db_session, user.id).full_name == "Ada"
+    rename_behind_orm(db_session, user.id, "Changed elsewhere")
+
+    assert principal_cache.get_user(db_session, str(user.id)).full_name == "Ada"
+
+
+def test_cached_copies_do_not_share_mutable_columns(db_session, user):
+    principal_cache.get_user(db_session, user.id)
+    db_session.expunge_all()
+
+    first = principal_cache.get_user(db_session, user.id)
+    first.preferences["theme"] = "light"
+    db_session.expunge_all()
+
+    assert principal_cache.get_user(db_session, user.id).preferences == {"theme": "dark"}
+
+
+def test_committed_user_change_invalidates_entry(db_session, user):
+    principal_cache.get_user(db_session, user.id)
+    user.full_name = "Ada Lovelace"
+    db_session.commit()
+    rename_behind_orm(db_session, user.id, "Reloaded")
+
+    assert principal_cache.get_user(db_session, user.id).full_name == "Reloaded"
+
+
+def test_rolled_back_change_keeps_entry(db_session, user):
+    principal_cache.get_user(db_session, user.id)
+    user.full_name = "Never committed"
+    db_session.flush()
+    db_session.rollback()
+
+    assert principal_cache.get_stats()["users"] == 1
+
+
+def test_deactivated_api_key_stops_resolving(db_session, user):
+    api_key = UserApiKey(user_id=user.id, name="ci", key_hash="hash-1", key_prefix="ahub_abc")
+    db_session.add(api_key)
+    db_session.commit()
+
+    assert principal_cache.get_api_key_user(db_session, "hash-1").id == user.id
+    assert api_key_usage_recorder._pending[api_key.id][0] == 1
+
+    api_key.is_active = False
+    db_session.commit()
+
+    assert principal_cache.get_api_key_user(db_session, "hash-1") is None
@@ -0,0 +1,99 @@
+"""Tests for building the managed agent base images in the background."""
+
+import threading
+
+from docker import errors as docker_errors
+
+from server.config import AGENT_BASE_COMMON_PACKAGES
+from server.services.base_images import (
+    BASE_IMAGE_TYPE_PACKAGES,
+    BaseImageManager,
+    generate_base_image_name,
+)
+
+
+class FakeImages:
+    """Docker's image API; builds wait until the test releases them."""
+
+    def __init__(self):
+        self.built = set()
+        self.builds = []
+        self.release = threading.Event()
+
+    def get(self, name):
+        if name not in self.built:
+            raise docker_errors.ImageNotFound(name)
+        return name
+
+    def build(self, tag, **options):
+        self.builds.append(tag)
+        assert self.release.wait(5)
+        self.built.add(tag)
+        return None, []
+
+
+def manager_with(images):
+    manager = BaseImageManager(enabled=True)
+    manager._docker_client = type("FakeDockerClient", (), {"images": images})()
+    return manager
+
+
+def wait_for_builds(manager):
+    for build in list(manager._builds.values()):
+        build.join(5)
+
+
+def test_common_packages_are_pinned():
+    packages = AGENT_BASE_COMMON_PACKAGES + [p for ps in BASE_IMAGE_TYPE_PACKAGES.values() for p in ps]
+    assert all("==" in package for package in packages)
+
+
+def test_hire_does_not_wait_for_a_build_in_progress():
+    images = FakeImages()
+    manager = manager_with(images)
+
+    manager.start_builds()
+    assert manager.get_base_image("function") is None
+    assert manager.get_status()["images"]["function"]["building"]
+
+    images.release.set()
+    wait_for_builds(manager)
+
+    assert manager.get_base_image("function") == generate_base_image_name("function")
+    # One build per agent type, however often the image was asked for
+    assert sorted(images.builds) == sorted(generate_base_image_name(t) for t in BASE_IMAGE_TYPE_PACKAGES)
+
+
+def test_missing_image_is_built_on_first_request():
+    images = FakeImages()
+    images.release.set()
+    manager = manager_with(images)
+
+    assert manager.get_base_image("acp") is None
+    wait_for_builds(manager)
+
+    assert manager.get_base_image("acp") == generate_base_image_name("acp")
+    assert images.builds == [generate_base_image_name("acp")]
+
+
+def test_existing_image_is_not_rebuilt():
+    images = FakeImages()
+    images.built.add(generate_base_image_name("persistent"))
+    manager = manager_with(images)
+
+    manager.start_build("persistent")
+    wait_for_builds(manager)
+
+    assert manager.get_base_image("persistent") == generate_base_image_name("persistent")
+    assert images.builds == []
+
+
+def test_disabled_manager_builds_nothing():
+    images = FakeImages()
+    manager = manager_with(images)
+    manager.enabled = False
+
+    manager.start_builds()
+
+    assert manager.get_base_image("function") is None
+    assert images.builds == []
@@ -0,0 +1,116 @@
+"""Tests for the reference-counted blob store and agent file contents kept in it."""
+
+import hashlib
+import json
+
+import pytest
+
+from server.models.agent import Agent
+from server.models.agent_file import AgentFile
+from server.models.content_blob import AgentFileBlob, ContentBlob
+from server.services.agent_manifest_cache import AgentManifestCache
+from server.services.blob_store import BlobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BlobStore(str(tmp_path / "blobs"))
+
+
+def ref_count(db, data):
+    blob = db.query(ContentBlob).filter(ContentBlob.sha256 == hashlib.sha256(data).hexdigest()).first()
+    return blob.ref_count if blob else None
+
+
+def add_agent(db, store, agent_id, files):
+    agent = Agent(
+        id=agent_id, name="Echo", description="Echoes input", version="1.0.0",
+        author="Test", email="test@example.com", owner_id=1, agent_type="function",
+        entry_point="main.py:main",
+    )
+    agent_files = [
+        AgentFile(agent_id=agent_id, file_path=path, file_name=path, file_content=content)
+        for path, content in files.items()
+    ]
+    db.add(agent)
+    db.add_all(agent_files)
+    db.flush()
+    for agent_file in agent_files:
+        store.register_agent_file(db, agent_file)
+    db.commit()
+    return agent
+
+
+def test_same_content_is_stored_once_and_counted(db_session, store):
+    sha256 = store.store_bytes(db_session, b"hello")
+    assert store.store_bytes(db_session, b"hello") == sha256
+    db_session.commit()
+
+    assert ref_count(db_session, b"hello") == 2
+    assert store.path_for(sha256).read_bytes() == b"hello"
+    assert store.get_stats(db_session)["deduplicated_bytes"] == 5
+
+
+def test_garbage_collection_only_removes_unreferenced_blobs(db_session, store):
+    kept = store.store_bytes(db_session, b"kept")
+    dropped = store.store_bytes(db_session, b"dropped")
+    db_session.commit()
+    store.release(db_session, dropped)
+    db_session.commit()
+
+    assert store.collect_garbage(db_session) == 1
+
+    assert store.path_for(kept).exists()
+    assert not store.path_for(dropped).exists()
+    assert ref_count(db_session, b"dropped") is None
+
+
+def test_store_rewrites_a_file_unlinked_by_a_pending_collection(db_session, store):
+    # Another process's collection unlinked the file but its row deletion did not commit
+    db_session.add(ContentBlob(sha256=hashlib.sha256(b"data").hexdigest(), size=4, ref_count=0))
+    db_session.commit()
+
+    sha256 = store.store_bytes(db_session, b"data")
+    db_session.commit()
+
+    assert store.path_for(sha256).read_bytes() == b"data"
+    assert ref_count(db_session, b"data") == 1
+    assert store.collect_garbage(db_session) == 0
+
+
+def test_registered_agent_files_are_only_kept_in_the_store(db_session, store):
+    add_agent(db_session, store, "agent-1", {"main.py": "print('hi')", "config.json": "{}"})
+    legacy = AgentFile(agent_id="agent-1", file_path="old.py", file_name="old.py", file_content="legacy")
+    db_session.add(legacy)
+    db_session.commit()
+
+    files = db_session.query(AgentFile).filter(AgentFile.agent_id == "agent-1").all()
+    contents = store.read_agent_files(db_session, files)
+
+    assert {f.file_path: f.file_content for f in files} == {"main.py": "", "config.json": "", "old.py": "legacy"}
+    assert {f.file_path: contents[f.id] for f in files} == {"main.py": "print('hi')", "config.json": "{}", "old.py": "legacy"}
+
+
+def test_deleting_an_agent_releases_its_files(db_session, store):
+    agent = add_agent(db_session, store, "agent-1", {"main.py": "shared", "config.json": "{}"})
+    add_agent(db_session, store, "agent-2", {"main.py": "shared"})
+
+    db_session.delete(agent)
+    db_session.commit()
+
+    assert ref_count(db_session, b"shared") == 1
+    assert ref_count(db_session, b"{}") == 0
+    assert db_session.query(AgentFileBlob).count() == 1
+    assert store.collect_garbage(db_session) == 1
+
+
+def test_manifest_config_is_read_through_the_store(db_session, store, monkeypatch):
+    from server.services import agent_manifest_cache
+
+    monkeypatch.setattr(agent_manifest_cache, "blob_store", store)
+    agent = add_agent(db_session, store, "agent-1", {"config.json": json.dumps({"result_cache": {"ttl_seconds": 60}})})
+
+    manifest = AgentManifestCache(enabled=True).get(db_session, agent)
+
+    assert manifest.has_config_file
+    assert manifest.config == {"result_cache": {"ttl_seconds": 60}}
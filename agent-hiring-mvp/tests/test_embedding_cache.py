@@ -0,0 +1,34 @@
+"""Tests for the persistent embedding cache."""
+
+import asyncio
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import server.database.config as database_config
+from server.models.resource_usage import EmbeddingCacheEntry
+from server.services.resources.embedding_cache import EmbeddingCache, pack_vector, unpack_vector
+
+
+@pytest.fixture
+def embedding_cache(db_engine, monkeypatch):
+    monkeypatch.setattr(database_config, "get_session",
+                        sessionmaker(autocommit=False, autoflush=False, bind=db_engine))
+    return EmbeddingCache(enabled=True, ttl_days=30)
+
+
+def test_vectors_round_trip_as_float32():
+    assert unpack_vector(pack_vector([0.5, -1.25, 3.0]), 3) == [0.5, -1.25, 3.0]
+
+
+def test_embedding_cache_serves_stored_vectors(embedding_cache, db_session):
+    hello = EmbeddingCache.key("openai", "text-embedding-3-small", "hello")
+    world = EmbeddingCache.key("openai", "text-embedding-3-small", "world")
+
+    asyncio.run(embedding_cache.put_many("openai", "text-embedding-3-small", {hello: [0.5, 0.25]}))
+    asyncio.run(embedding_cache.put_many("openai", "text-embedding-3-small", {hello: [0.5, 0.25], world: [1.0, 0.0]}))
+    found = asyncio.run(embedding_cache.get_many([hello, world, "missing"]))
+
+    assert found == {hello: [0.5, 0.25], world: [1.0, 0.0]}
+    assert db_session.query(EmbeddingCacheEntry).count() == 2
+    assert embedding_cache.get_stats()["misses"] == 1
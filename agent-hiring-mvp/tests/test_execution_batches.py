@@ -0,0 +1,214 @@
+"""Tests for execution batches: creation, progress, ordered results and result streaming."""
+
+import asyncio
+import importlib
+import json
+import sys
+import types
+from pathlib import Path
+
+import docker
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from server.models.agent import Agent
+from server.models.execution import (
+    Execution,
+    ExecutionBatch,
+    ExecutionBatchItem,
+    ExecutionJob,
+    ExecutionStatus,
+)
+from server.models.hiring import Hiring
+from server.services import execution_events
+from server.services.execution_events import ExecutionEventBus
+from server.services.execution_service import ExecutionService
+
+SDK_DIR = Path(__file__).resolve().parent.parent / "agenthub-sdk"
+
+
+class BatchService(ExecutionService):
+    """The batch methods only use the request session; skip the runtime and resource setup."""
+
+    def __init__(self, db=None):
+        self.db = db
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+@pytest.fixture
+def hiring(db_session):
+    db_session.add(Agent(
+        id="agent-1", name="Echo", description="Echoes input", version="1.0.0",
+        author="Test", email="test@example.com", owner_id=1, agent_type="function",
+        entry_point="main.py:main", status="approved",
+    ))
+    hiring = Hiring(agent_id="agent-1", user_id=1, status="active")
+    db_session.add(hiring)
+    db_session.commit()
+    return hiring
+
+
+@pytest.fixture
+def service(db_session):
+    return BatchService(db_session)
+
+
+def finish(db, execution_id, status=ExecutionStatus.COMPLETED, output=None):
+    execution = db.query(Execution).filter(Execution.execution_id == execution_id).one()
+    execution.status = status.value
+    execution.output_data = output
+    db.commit()
+
+
+def test_batch_creates_executions_items_and_jobs_in_input_order(db_session, service, hiring):
+    batch = service.create_execution_batch(hiring.id, 1, [{"n": 0}, {"n": 1}, {"n": 2}])
+
+    execution_ids = service.get_batch_execution_ids(batch.batch_id)
+    inputs = dict(db_session.query(Execution.execution_id, Execution.input_data))
+    assert [inputs[execution_id] for execution_id in execution_ids] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    assert {job.execution_id for job in db_session.query(ExecutionJob)} == set(execution_ids)
+
+
+def test_batch_creation_is_all_or_nothing(db_session, service, hiring, monkeypatch):
+    from server.services import execution_queue
+
+    def failing_add_jobs(self, executions):
+        raise RuntimeError("queue unavailable")
+
+    monkeypatch.setattr(execution_queue.ExecutionQueue, "add_jobs", failing_add_jobs)
+
+    with pytest.raises(RuntimeError):
+        service.create_execution_batch(hiring.id, 1, [{"n": 0}, {"n": 1}])
+
+    for model in (ExecutionBatch, ExecutionBatchItem, Execution, ExecutionJob):
+        assert db_session.query(model).count() == 0
+
+
+def test_batch_rejects_another_users_hiring(service, hiring):
+    with pytest.raises(ValueError):
+        service.create_execution_batch(hiring.id, 2, [{"n": 0}])
+
+
+def test_progress_counts_executions_per_status(db_session, service, hiring):
+    batch = service.create_execution_batch(hiring.id, 1, [{"n": n} for n in range(4)], enqueue=False)
+    first, second, third, _ = service.get_batch_execution_ids(batch.batch_id)
+    finish(db_session, first)
+    finish(db_session, second, ExecutionStatus.FAILED)
+    finish(db_session, third, ExecutionStatus.RUNNING)
+
+    progress = service.get_batch_progress(batch)
+
+    assert {key: progress[key] for key in ("total", "finished", "completed", "failed", "running", "pending")} == {
+        "total": 4, "finished": 2, "completed": 1, "failed": 1, "running": 1, "pending": 1,
+    }
+    assert not progress["done"]
+
+
+def test_results_are_paged_in_input_order(db_session, service, hiring):
+    batch = service.create_execution_batch(hiring.id, 1, [{"n": n} for n in range(5)], enqueue=False)
+    execution_ids = service.get_batch_execution_ids(batch.batch_id)
+    # Finish in reverse, so completion order differs from input order
+    for index in (4, 3, 1, 0):
+        finish(db_session, execution_ids[index], output={"n": index})
+
+    first_page = service.get_batch_results(batch.batch_id, offset=0, limit=2)
+    second_page = service.get_batch_results(batch.batch_id, offset=2, limit=2)
+    everything = service.get_batch_results(batch.batch_id, finished_only=False)
+
+    assert [r["index"] for r in first_page] == [0, 1]
+    assert [r["index"] for r in second_page] == [3, 4]
+    assert [r["output_data"] for r in second_page] == [{"n": 3}, {"n": 4}]
+    assert [r["index"] for r in everything] == [0, 1, 2, 3, 4]
+
+
+def test_event_stream_delivers_each_result_once_until_done(db_session, db_engine, service, hiring, monkeypatch):
+    monkeypatch.setattr(docker, "from_env", lambda: None)
+    from server.api import execution as execution_api
+
+    bus = ExecutionEventBus()
+    monkeypatch.setattr(execution_events, "execution_event_bus", bus)
+    monkeypatch.setattr(execution_api, "execution_event_bus", bus)
+    monkeypatch.setattr(execution_api, "get_session", sessionmaker(bind=db_engine))
+    monkeypatch.setattr(execution_api, "ExecutionService", BatchService)
+
+    batch = service.create_execution_batch(hiring.id, 1, [{"n": 0}, {"n": 1}], enqueue=False)
+    first, second = service.get_batch_execution_ids(batch.batch_id)
+    finish(db_session, first)
+
+    async def scenario():
+        response = await execution_api.stream_execution_batch_events(
+            batch.batch_id, ConnectedRequest(), current_user=types.SimpleNamespace(id=1),
+            db=sessionmaker(bind=db_engine)()
+        )
+        events = []
+        async for chunk in response.body_iterator:
+            name = chunk.split("\n", 1)[0].split(": ", 1)[1]
+            events.append((name, json.loads(chunk.split("data: ", 1)[1])))
+            if len(events) == 2:
+                # Another execution finishes while the client is connected
+                with sessionmaker(bind=db_engine)() as other:
+                    finish(other, second)
+        return events
+
+    events = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+    results = [data for name, data in events if name == "result"]
+    assert [(r["index"], r["execution_id"]) for r in results] == [(0, first), (1, second)]
+    assert events[-1][0] == "progress" and events[-1][1]["done"]
+
+
+@pytest.fixture
+def sdk_client(monkeypatch):
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("aiofiles")
+    # The SDK is installed as agenthub_sdk from the agenthub-sdk directory
+    package = types.ModuleType("agenthub_sdk")
+    package.__path__ = [str(SDK_DIR)]
+    monkeypatch.setitem(sys.modules, "agenthub_sdk", package)
+    monkeypatch.delitem(sys.modules, "agenthub_sdk.client", raising=False)
+    return importlib.import_module("agenthub_sdk.client")
+
+
+class FakeBatchServer:
+    """Finishes each input once the caller has seen every earlier result."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batches = {}
+
+    async def create_execution_batch(self, hiring_id, inputs, use_cache=True):
+        batch_id = f"batch-{len(self.batches)}"
+        self.batches[batch_id] = inputs
+        self.in_flight += len(inputs)
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return {"batch_id": batch_id, "total": len(inputs)}
+
+    async def stream_execution_batch(self, batch_id):
+        # Batch results arrive in reverse input order
+        for index in reversed(range(len(self.batches[batch_id]))):
+            await asyncio.sleep(0)
+            self.in_flight -= 1
+            yield {"index": index, "execution_id": f"{batch_id}-{index}",
+                   "output_data": self.batches[batch_id][index]}
+
+
+def test_run_many_bounds_in_flight_inputs_and_maps_indexes(sdk_client):
+    server = FakeBatchServer()
+    client = sdk_client.AgentHubClient.__new__(sdk_client.AgentHubClient)
+    client.create_execution_batch = server.create_execution_batch
+    client.stream_execution_batch = server.stream_execution_batch
+    inputs = [{"n": n} for n in range(10)]
+
+    async def scenario():
+        return [result async for result in client.run_many(1, inputs, chunk_size=3, max_in_flight=4)]
+
+    results = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+    assert server.max_in_flight <= 4
+    assert sorted(result["index"] for result in results) == list(range(10))
+    assert all(result["output_data"] == inputs[result["index"]] for result in results)
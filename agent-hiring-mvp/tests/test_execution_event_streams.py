@@ -0,0 +1,163 @@
+"""Tests for execution event streams picking up transitions from other processes."""
+
+import asyncio
+import json
+import types
+from datetime import datetime, timezone
+
+import docker
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from server.models.execution import Execution
+from server.services import execution_events
+from server.services.execution_events import ExecutionChangePoller, ExecutionEventBus
+
+
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+
+@pytest.fixture
+def bus(db_engine, monkeypatch):
+    monkeypatch.setattr(execution_events, "get_session", sessionmaker(bind=db_engine))
+    bus = ExecutionEventBus()
+    monkeypatch.setattr(execution_events, "execution_event_bus", bus)
+    return bus
+
+
+@pytest.fixture
+def execution_api(bus, monkeypatch):
+    # The API package creates the Prometheus metrics service, which connects to Docker on import
+    monkeypatch.setattr(docker, "from_env", lambda: None)
+    from server.api import execution as execution_api
+
+    monkeypatch.setattr(execution_api, "execution_event_bus", bus)
+    return execution_api
+
+
+def commit_elsewhere(db_engine, statement):
+    # Raw SQL bypasses the ORM hooks, like a commit made by a worker in another process
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+    with db_engine.begin() as connection:
+        connection.exec_driver_sql(statement, {"now": now})
+
+
+async def next_event(events):
+    chunk = await asyncio.wait_for(events.__anext__(), 2)
+    return json.loads(chunk.split("data: ", 1)[1])
+
+
+async def with_poller(bus, scenario):
+    poller = ExecutionChangePoller(bus, poll_seconds=0.01, max_poll_seconds=0.05)
+    task = asyncio.create_task(poller.run())
+    try:
+        return await scenario()
+    finally:
+        poller.stop()
+        task.cancel()
+
+
+def test_execution_stream_sees_status_committed_by_another_process(db_session, db_engine, bus, execution_api):
+    db_session.add(Execution(execution_id="exec-1", agent_id="agent-1", user_id=1, status="running"))
+    db_session.commit()
+
+    async def scenario():
+        response = await execution_api.stream_execution_events(
+            "exec-1", ConnectedRequest(), current_user=types.SimpleNamespace(id=1), db=db_session
+        )
+        events = response.body_iterator
+        first = await next_event(events)
+        commit_elsewhere(
+            db_engine, "UPDATE executions SET status = 'completed', updated_at = :now WHERE execution_id = 'exec-1'"
+        )
+        return first, await next_event(events)
+
+    first, second = asyncio.run(with_poller(bus, scenario))
+
+    assert first["status"] == "running"
+    assert second["status"] == "completed" and second["terminal"]
+
+
+def test_user_stream_sees_transitions_and_new_executions_from_another_process(db_session, db_engine, bus,
+                                                                              execution_api):
+    db_session.add(Execution(execution_id="exec-1", agent_id="agent-1", user_id=1, status="running"))
+    db_session.add(Execution(execution_id="other-user", agent_id="agent-1", user_id=2, status="running"))
+    db_session.commit()
+
+    async def scenario():
+        response = await execution_api.stream_user_execution_events(
+            1, ConnectedRequest(), current_user=types.SimpleNamespace(id=1)
+        )
+        events = response.body_iterator
+        first = asyncio.ensure_future(next_event(events))
+        await asyncio.sleep(0.05)
+        commit_elsewhere(db_engine, "UPDATE executions SET status = 'completed', updated_at = :now")
+        received = [await first]
+        commit_elsewhere(
+            db_engine,
+            "INSERT INTO executions (execution_id, agent_id, user_id, status, execution_type, created_at, updated_at) "
+            "VALUES ('exec-2', 'agent-1', 1, 'pending', 'run', :now, :now)"
+        )
+        return received + [await next_event(events)]
+
+    received = asyncio.run(with_poller(bus, scenario))
+
+    assert [(e["execution_id"], e["status"]) for e in received] == [("exec-1", "completed"), ("exec-2", "pending")]
+
+
+def test_poller_reads_once_for_all_subscribers_and_publishes_each_transition_once(db_engine, bus):
+    commit_elsewhere(
+        db_engine,
+        "INSERT INTO executions (execution_id, agent_id, user_id, status, execution_type, created_at, updated_at) "
+        "VALUES ('exec-1', 'agent-1', 1, 'running', 'run', :now, :now), "
+        "('exec-2', 'agent-1', 2, 'running', 'run', :now, :now)"
+    )
+    poller = ExecutionChangePoller(bus, overlap_seconds=60)
+    queries = []
+    original_get_session = execution_events.get_session
+
+    def counting_get_session():
+        queries.append(1)
+        return original_get_session()
+
+    async def scenario():
+        subscriptions = [bus.subscribe(1), bus.subscribe(1, "exec-1"), bus.subscribe(2)]
+        execution_events.get_session = counting_get_session
+        try:
+            published = [poller.poll(bus.subscribed_user_ids()), poller.poll(bus.subscribed_user_ids())]
+        finally:
+            execution_events.get_session = original_get_session
+        await asyncio.sleep(0)
+        return published, [s.queue.qsize() for s in subscriptions]
+
+    published, queued = asyncio.run(scenario())
+
+    assert published == [2, 0]
+    assert len(queries) == 2
+    assert queued == [1, 1, 1]
+
+
+def test_poller_skips_query_without_subscribers(bus, monkeypatch):
+    def no_session():
+        raise AssertionError("queried without subscribers")
+
+    monkeypatch.setattr(execution_events, "get_session", no_session)
+    poller = ExecutionChangePoller(bus, poll_seconds=0.01)
+
+    async def scenario():
+        task = asyncio.create_task(poller.run())
+        await asyncio.sleep(0.05)
+        poller.stop()
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(scenario())
+
+
+def test_bus_drops_repeated_statuses_from_hook_and_poller(bus):
+    event = {"execution_id": "exec-1", "status": "completed", "user_id": 1}
+
+    assert bus.publish(event)
+    assert not bus.publish(dict(event))
+    assert bus.publish({**event, "status": "running"})
@@ -0,0 +1,135 @@
+"""Tests for claiming, leases and recovery of the durable execution queue."""
+
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server.models.execution import Execution, ExecutionJob, ExecutionJobStatus, ExecutionStatus
+from server.services.execution_queue import ClaimedJob, ExecutionQueue
+
+
+def add_execution(db, execution_id, user_id=1, agent_id="agent-1"):
+    execution = Execution(execution_id=execution_id, agent_id=agent_id, user_id=user_id,
+                          status=ExecutionStatus.PENDING.value)
+    db.add(execution)
+    db.commit()
+    return execution
+
+
+def job_of(db, execution_id):
+    db.expire_all()
+    return db.query(ExecutionJob).filter(ExecutionJob.execution_id == execution_id).one()
+
+
+def claimed_job(db, execution_id):
+    job = job_of(db, execution_id)
+    return ClaimedJob(job_id=job.id, execution_id=job.execution_id, execution_type=job.execution_type,
+                      user_id=job.user_id, agent_id=job.agent_id, attempts=job.attempts, worker_id=job.worker_id)
+
+
+@pytest.fixture
+def queue(db_session):
+    return ExecutionQueue(db_session, lease_seconds=60, max_attempts=2, max_per_user=1,
+                          max_per_agent=10, retry_delay=0)
+
+
+def test_enqueue_is_idempotent(db_session, queue):
+    execution = add_execution(db_session, "exec-1")
+
+    first = queue.enqueue(execution)
+    second = queue.enqueue(execution)
+
+    assert first.id == second.id
+    assert db_session.query(ExecutionJob).count() == 1
+
+
+def test_claim_takes_oldest_job_once(db_session, queue):
+    queue.enqueue(add_execution(db_session, "exec-1", user_id=1))
+    queue.enqueue(add_execution(db_session, "exec-2", user_id=2))
+
+    first = queue.claim("worker-a")
+    second = queue.claim("worker-b")
+
+    assert (first.execution_id, second.execution_id) == ("exec-1", "exec-2")
+    assert first.attempts == 1
+    assert queue.claim("worker-c") is None
+    assert job_of(db_session, "exec-1").worker_id == "worker-a"
+
+
+def test_claim_respects_per_user_limit(db_session, queue):
+    queue.enqueue(add_execution(db_session, "exec-1", user_id=1))
+    queue.enqueue(add_execution(db_session, "exec-2", user_id=1))
+    queue.enqueue(add_execution(db_session, "exec-3", user_id=2))
+
+    claimed = [queue.claim("worker-a").execution_id, queue.claim("worker-a").execution_id]
+
+    # The second job of user 1 waits while the first one runs
+    assert claimed == ["exec-1", "exec-3"]
+    assert queue.claim("worker-a") is None
+
+    queue.complete(claimed_job(db_session, "exec-1"))
+    assert queue.claim("worker-a").execution_id == "exec-2"
+
+
+def test_complete_requires_holding_the_claim(db_session, queue):
+    queue.enqueue(add_execution(db_session, "exec-1"))
+    claimed = queue.claim("worker-a")
+
+    assert queue.renew_lease(claimed)
+    assert queue.complete(claimed)
+    assert not queue.complete(claimed)
+    assert job_of(db_session, "exec-1").status == ExecutionJobStatus.DONE.value
+
+
+def test_fail_retries_then_gives_up(db_session, queue):
+    queue.enqueue(add_execution(db_session, "exec-1"))
+
+    assert queue.fail(queue.claim("worker-a"), "boom") is True
+    assert db_session.query(Execution).one().status == ExecutionStatus.PENDING.value
+
+    assert queue.fail(queue.claim("worker-a"), "boom again") is False
+    job = job_of(db_session, "exec-1")
+    assert job.status == ExecutionJobStatus.FAILED.value
+    execution = db_session.query(Execution).one()
+    assert execution.status == ExecutionStatus.FAILED.value
+    assert "gave up after 2 attempts" in execution.error_message
+
+
+def test_recover_requeues_expired_lease(db_session, queue):
+    queue.enqueue(add_execution(db_session, "exec-1"))
+    claimed = queue.claim("remote-host:1234:abcdef")
+    job = job_of(db_session, "exec-1")
+    job.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+
+    assert queue.recover() == {"requeued": 1, "given_up": 0, "orphaned": 0}
+    # The stale worker can no longer complete the job
+    assert not queue.complete(claimed)
+    assert queue.claim("worker-b").attempts == 2
+
+
+def test_recover_keeps_live_leases(db_session, queue):
+    queue.enqueue(add_execution(db_session, "exec-1"))
+    queue.claim("remote-host:1234:abcdef")
+
+    assert queue.recover() == {"requeued": 0, "given_up": 0, "orphaned": 0}
+    assert job_of(db_session, "exec-1").status == ExecutionJobStatus.CLAIMED.value
+
+
+def test_recover_requeues_job_of_dead_local_worker(db_session, queue):
+    queue.enqueue(add_execution(db_session, "exec-1"))
+    # No process has pid 2**22 + 1 on Linux (pid_max is at most 2**22)
+    queue.claim(f"{socket.gethostname()}:{2 ** 22 + 1}:abcdef")
+
+    assert queue.recover()["requeued"] == 1
+
+
+def test_recover_fails_orphaned_running_executions(db_session, queue):
+    execution = add_execution(db_session, "exec-1")
+    execution.status = ExecutionStatus.RUNNING.value
+    execution.started_at = datetime.utcnow() - timedelta(days=1)
+    db_session.commit()
+
+    assert queue.recover()["orphaned"] == 1
+    assert db_session.query(Execution).one().status == ExecutionStatus.FAILED.value
@@ -0,0 +1,108 @@
+"""Tests for the execution result cache of deterministic function agents."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from server.models.agent import Agent
+from server.models.execution import Execution, ExecutionResultCacheEntry
+from server.services.agent_manifest_cache import agent_manifest_cache
+from server.services.execution_result_cache import (
+    ExecutionResultCache,
+    canonical_input_hash,
+    served_from_cache,
+)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(
+        agent_manifest_cache, "get_config",
+        lambda db, agent: {"result_cache": {"ttl_seconds": 60, "scope": "hiring"}},
+    )
+    monkeypatch.setattr(ExecutionResultCache, "_record", staticmethod(lambda *args, **kwargs: None))
+    return ExecutionResultCache(enabled=True)
+
+
+@pytest.fixture
+def agent(db_session):
+    agent = Agent(
+        id="agent-1", name="Echo", description="Echoes input", version="1.0.0",
+        author="Test", email="test@example.com", owner_id=1, agent_type="function",
+        entry_point="main.py:main",
+    )
+    db_session.add(agent)
+    db_session.commit()
+    return agent
+
+
+def make_execution(db, execution_id, input_data, hiring_id=1):
+    execution = Execution(
+        execution_id=execution_id, agent_id="agent-1", hiring_id=hiring_id,
+        execution_type="run", input_data=input_data,
+    )
+    db.add(execution)
+    db.commit()
+    return execution
+
+
+def test_canonical_input_hash_ignores_key_order():
+    assert canonical_input_hash({"a": 1, "b": 2}) == canonical_input_hash({"b": 2, "a": 1})
+    assert canonical_input_hash(None) == canonical_input_hash({})
+
+
+def test_store_then_lookup_serves_same_input(db_session, cache, agent):
+    source = make_execution(db_session, "exec-1", {"x": 1, "y": 2})
+    assert cache.store(db_session, source, {"result": 3})
+
+    repeat = make_execution(db_session, "exec-2", {"y": 2, "x": 1})
+    assert cache.lookup(db_session, repeat, agent) == {
+        "output_data": {"result": 3}, "source_execution_id": "exec-1",
+    }
+    assert db_session.query(ExecutionResultCacheEntry).one().hit_count == 1
+    assert served_from_cache(db_session, ["exec-1", "exec-2"]) == {"exec-2": "exec-1"}
+
+
+def test_lookup_is_scoped_to_hiring_and_honours_bypass(db_session, cache, agent):
+    cache.store(db_session, make_execution(db_session, "exec-1", {"x": 1}), {"result": 1})
+
+    other_hiring = make_execution(db_session, "exec-2", {"x": 1}, hiring_id=2)
+    assert cache.lookup(db_session, other_hiring, agent) is None
+
+    bypassed = make_execution(db_session, "exec-3", {"x": 1})
+    ExecutionResultCache.bypass(db_session, ["exec-3"])
+    db_session.commit()
+    assert cache.lookup(db_session, bypassed, agent) is None
+    assert bypassed.input_data == {"x": 1}
+    assert served_from_cache(db_session, ["exec-2", "exec-3"]) == {}
+
+
+def test_new_agent_version_misses(db_session, cache, agent):
+    cache.store(db_session, make_execution(db_session, "exec-1", {"x": 1}), {"result": 1})
+
+    agent.version = "1.1.0"
+    db_session.commit()
+    assert cache.lookup(db_session, make_execution(db_session, "exec-2", {"x": 1}), agent) is None
+
+
+def test_expired_entries_miss_and_are_purged(db_session, cache, agent):
+    cache.store(db_session, make_execution(db_session, "exec-1", {"x": 1}), {"result": 1})
+    cache.store(db_session, make_execution(db_session, "exec-2", {"x": 2}), {"result": 2})
+    expired = db_session.query(ExecutionResultCacheEntry).filter(
+        ExecutionResultCacheEntry.source_execution_id == "exec-1"
+    ).one()
+    expired.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db_session.commit()
+
+    assert cache.lookup(db_session, make_execution(db_session, "exec-3", {"x": 1}), agent) is None
+    assert cache.purge_expired(db_session) == 1
+    assert [entry.source_execution_id for entry in db_session.query(ExecutionResultCacheEntry)] == ["exec-2"]
+
+
+def test_invalidate_drops_agent_or_hiring_entries(db_session, cache, agent):
+    cache.store(db_session, make_execution(db_session, "exec-1", {"x": 1}), {"result": 1})
+    cache.store(db_session, make_execution(db_session, "exec-2", {"x": 1}, hiring_id=2), {"result": 1})
+
+    assert cache.invalidate(db_session, "agent-1", hiring_id=2) == 1
+    assert cache.invalidate(db_session, "agent-1") == 1
+    assert db_session.query(ExecutionResultCacheEntry).count() == 0
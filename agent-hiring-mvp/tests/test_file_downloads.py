@@ -0,0 +1,147 @@
+"""Tests for ranged and conditional file downloads."""
+
+import asyncio
+import types
+
+import docker
+import pytest
+from starlette.requests import Request
+
+CONTENT = b"0123456789"
+SHA256 = "abc123"
+
+
+@pytest.fixture
+def files_api(monkeypatch):
+    # The API package creates the Prometheus metrics service, which connects to Docker on import
+    monkeypatch.setattr(docker, "from_env", lambda: None)
+    from server.api import files as files_api
+    return files_api
+
+
+class FakeFileService:
+    """The parts of FileStorageService used by the download endpoint, backed by one file."""
+
+    def __init__(self, path, sha256=SHA256):
+        self.path = path
+        self.sha256 = sha256
+        self.downloads = 0
+        self.config = types.SimpleNamespace(stream_chunk_size=4)
+
+    async def download_file(self, file_id, token, count_access=True):
+        return self.path, "report.bin"
+
+    async def get_file_checksum(self, file_id):
+        return self.sha256
+
+    async def record_download(self, file_id):
+        self.downloads += 1
+
+
+@pytest.fixture
+def service(tmp_path):
+    path = tmp_path / "report.bin"
+    path.write_bytes(CONTENT)
+    return FakeFileService(path)
+
+
+def download(files_api, service, **headers):
+    request = Request({
+        "type": "http", "method": "GET", "path": "/files/f/download", "query_string": b"",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+    async def run():
+        response = await files_api.download_file("f", request, token="t", include_metadata=False,
+                                                 file_service=service)
+        body = b""
+        if hasattr(response, "body_iterator"):
+            body = b"".join([chunk async for chunk in response.body_iterator])
+        return response, body
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-3", (0, 3)),
+    ("bytes=5-", (5, 9)),
+    ("bytes=-4", (6, 9)),
+    ("bytes=-20", (0, 9)),
+    ("bytes=8-100", (8, 9)),
+    ("bytes=0-1,4-5", None),
+    ("items=0-1", None),
+    ("bytes=-", None),
+])
+def test_parse_range(files_api, header, expected):
+    assert files_api._parse_range(header, len(CONTENT)) == expected
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=10-", 10),
+    ("bytes=5-2", 10),
+    ("bytes=-0", 10),
+    ("bytes=-5", 0),
+])
+def test_parse_range_rejects_unsatisfiable_ranges(files_api, header, size):
+    with pytest.raises(ValueError):
+        files_api._parse_range(header, size)
+
+
+def test_etag_matches_uses_weak_comparison(files_api):
+    assert files_api._etag_matches('"other", W/"abc"', '"abc"')
+    assert files_api._etag_matches('"abc"', 'W/"abc"')
+    assert files_api._etag_matches("*", '"abc"')
+    assert not files_api._etag_matches('"other"', '"abc"')
+    assert not files_api._etag_matches(None, '"abc"')
+
+
+def test_full_download_is_counted(files_api, service):
+    response, _ = download(files_api, service)
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{SHA256}"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert service.downloads == 1
+
+
+def test_ranges_return_partial_content_and_only_the_first_is_counted(files_api, service):
+    first, first_body = download(files_api, service, range="bytes=0-3")
+    rest, rest_body = download(files_api, service, range="bytes=4-")
+
+    assert (first.status_code, rest.status_code) == (206, 206)
+    assert first.headers["content-range"] == "bytes 0-3/10"
+    assert rest.headers["content-length"] == "6"
+    assert first_body + rest_body == CONTENT
+    assert service.downloads == 1
+
+
+def test_matching_if_none_match_is_not_modified_and_not_counted(files_api, service):
+    response, _ = download(files_api, service, if_none_match=f'"{SHA256}"')
+
+    assert response.status_code == 304
+    assert service.downloads == 0
+
+
+def test_unsatisfiable_range_reports_the_file_size(files_api, service):
+    response, _ = download(files_api, service, range="bytes=20-")
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+    assert service.downloads == 0
+
+
+def test_range_of_a_changed_file_returns_the_whole_file(files_api, service):
+    response, _ = download(files_api, service, range="bytes=4-", if_range='"previous-version"')
+
+    assert response.status_code == 200
+    assert service.downloads == 1
+
+
+def test_weak_etag_never_satisfies_if_range(files_api, service):
+    service.sha256 = None
+    etag = download(files_api, service)[0].headers["etag"]
+
+    response, _ = download(files_api, service, range="bytes=4-", if_range=etag)
+
+    assert etag.startswith("W/")
+    assert response.status_code == 200
@@ -0,0 +1,31 @@
+"""Tests for bringing the schema of existing databases up to date at startup."""
+
+from sqlalchemy import inspect, text
+
+from server.database.init_db import create_missing_indexes, create_missing_tables
+
+
+def test_create_missing_tables_adds_new_tables_and_keeps_data(db_engine):
+    with db_engine.begin() as connection:
+        connection.execute(text("DROP TABLE execution_jobs"))
+        connection.execute(text("INSERT INTO content_blobs (sha256, size, ref_count, created_at, updated_at) VALUES ('abc', 1, 1, '2026-01-01', '2026-01-01')"))
+
+    create_missing_tables(db_engine)
+    create_missing_tables(db_engine)
+
+    assert "execution_jobs" in inspect(db_engine).get_table_names()
+    with db_engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM content_blobs")).scalar() == 1
+
+
+def test_create_missing_indexes_adds_indexes_to_existing_tables(db_engine):
+    with db_engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_executions_agent_id"))
+        connection.execute(text("DROP INDEX ix_hirings_agent_id"))
+
+    create_missing_indexes(db_engine)
+    create_missing_indexes(db_engine)
+
+    indexes = inspect(db_engine)
+    assert "ix_executions_agent_id" in {index["name"] for index in indexes.get_indexes("executions")}
+    assert "ix_hirings_agent_id" in {index["name"] for index in indexes.get_indexes("hirings")}
@@ -0,0 +1,107 @@
+"""Tests for the cost of LiteLLM completions and its client setup."""
+
+import asyncio
+import sys
+from types import ModuleType, SimpleNamespace
+
+import pytest
+
+from server.services.resources.llm import LiteLLMResource
+from server.services.resources.registry import ResourceClientRegistry
+
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+class RecordingTracker:
+    def __init__(self):
+        self.usages = []
+
+    async def record_usage(self, usage):
+        self.usages.append(usage)
+
+
+class FakeLiteLLM:
+    """Streams two text chunks and a final usage chunk, pricing only gpt-4o."""
+
+    def __init__(self, include_usage=True):
+        self.include_usage = include_usage
+
+    async def acompletion(self, **kwargs):
+        return self._stream()
+
+    async def _stream(self):
+        for text in ("Hel", "lo"):
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], model="gpt-4o", usage=None
+            )
+        if self.include_usage:
+            yield SimpleNamespace(choices=[], model="gpt-4o", usage=SimpleNamespace(
+                prompt_tokens=100, completion_tokens=20, total_tokens=120
+            ))
+
+    def cost_per_token(self, model, prompt_tokens, completion_tokens):
+        if model != "gpt-4o":
+            raise Exception(f"This model isn't mapped yet. model={model}")
+        return prompt_tokens * 2.5e-6, completion_tokens * 1e-5
+
+
+def make_resource(client):
+    tracker = RecordingTracker()
+    resource = LiteLLMResource("litellm", {}, None, tracker)
+    resource.client = client
+    resource.api_key = "test-key"
+    resource.base_url = "http://litellm.test"
+    return resource, tracker
+
+
+def stream(resource, model="gpt-4o"):
+    async def collect():
+        return [text async for text in resource.stream_completion(1, model=model, messages=MESSAGES, cache=False)]
+    return asyncio.run(collect())
+
+
+def test_stream_cost_comes_from_final_usage_chunk():
+    resource, tracker = make_resource(FakeLiteLLM())
+
+    assert stream(resource) == ["Hel", "lo"]
+
+    usage = tracker.usages[0]
+    assert usage.total_tokens == 120
+    assert usage.cost == pytest.approx(100 * 2.5e-6 + 20 * 1e-5)
+
+
+def test_stream_without_usage_prices_estimate_at_model_rates():
+    resource, tracker = make_resource(FakeLiteLLM(include_usage=False))
+
+    stream(resource)
+
+    usage = tracker.usages[0]
+    assert usage.cost == pytest.approx(usage.input_tokens * 2.5e-6 + usage.output_tokens * 1e-5)
+
+
+def test_unpriced_model_falls_back_to_generic_rates():
+    resource, _ = make_resource(FakeLiteLLM())
+
+    cost = resource.calculate_cost("completion", model="custom/unknown", response={
+        "usage": {"prompt_tokens": 1000, "completion_tokens": 1000}, "model": "custom/unknown"
+    })
+
+    assert cost == pytest.approx(0.0015 + 0.002)
+
+
+def test_litellm_keeps_its_own_http_client_across_registry_close(monkeypatch):
+    litellm = ModuleType("litellm")
+    litellm.aclient_session = None
+    monkeypatch.setitem(sys.modules, "litellm", litellm)
+    registry = ResourceClientRegistry()
+    resource, _ = make_resource(None)
+
+    async def scenario():
+        client = await registry.get_client("litellm", "test-key", resource._create_client)
+        registry.httpx_client()
+        await registry.close_all()
+        return client
+
+    assert asyncio.run(scenario()) is litellm
+    assert litellm.use_litellm_proxy
+    assert litellm.aclient_session is None
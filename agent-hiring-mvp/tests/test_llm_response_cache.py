@@ -0,0 +1,63 @@
+"""Tests for the exact and semantic LLM response cache."""
+
+import pytest
+
+from server.services.resources.response_cache import EXACT, SEMANTIC, LLMResponseCache
+
+MESSAGES = [{"role": "user", "content": "What is 2 + 2?"}]
+
+
+def make_cache(**kwargs):
+    options = dict(enabled=True, ttl_seconds=60, max_entries=10, max_bytes=10_000,
+                   semantic_enabled=True, semantic_threshold=0.9)
+    options.update(kwargs)
+    return LLMResponseCache(**options)
+
+
+def test_exact_key_only_for_deterministic_requests():
+    cache = make_cache()
+
+    key = cache.exact_key(1, "openai", model="gpt-4o", messages=MESSAGES, temperature=0)
+    assert key == cache.exact_key(1, "openai", model="gpt-4o", messages=MESSAGES)
+    assert key != cache.exact_key(2, "openai", model="gpt-4o", messages=MESSAGES)
+    assert cache.exact_key(1, "openai", model="gpt-4o", messages=MESSAGES, temperature=0.7) is None
+
+
+def test_exact_hits_are_copies():
+    cache = make_cache()
+    key = cache.exact_key(1, "openai", model="gpt-4o", messages=MESSAGES)
+    cache.put(key, cache.scope(1, "openai", "gpt-4o"), {"content": "4", "usage": {"total_tokens": 9}}, 250)
+
+    hit = cache.get(key)
+    hit.response["content"] = "changed"
+
+    again = cache.get(key)
+    assert again.mode == EXACT
+    assert again.response["content"] == "4"
+    assert again.latency_saved_ms == 250
+
+
+def test_expired_and_evicted_entries_miss():
+    cache = make_cache(max_entries=2)
+    scope = cache.scope(1, "openai", "gpt-4o")
+    for key in ("a", "b", "c"):
+        cache.put(key, scope, {"content": key}, 10)
+    assert cache.get("a") is None
+    assert cache.get("c").response == {"content": "c"}
+
+    cache.ttl_seconds = 0
+    cache.put("d", scope, {"content": "d"}, 10)
+    assert cache.get("d") is None
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_semantic_lookup_stays_in_scope():
+    cache = make_cache()
+    scope = cache.scope(1, "openai", "gpt-4o")
+    cache.put_similar(scope, [1.0, 0.0], {"content": "4"}, 100)
+
+    hit = cache.get_similar(scope, [0.99, 0.05])
+    assert hit.mode == SEMANTIC
+    assert hit.similarity == pytest.approx(0.9987, abs=1e-3)
+    assert cache.get_similar(scope, [0.0, 1.0]) is None
+    assert cache.get_similar(cache.scope(2, "openai", "gpt-4o"), [1.0, 0.0]) is None
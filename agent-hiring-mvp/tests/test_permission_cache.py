@@ -0,0 +1,81 @@
+"""Tests for compiled user permissions and their invalidation on commits."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from server.models.role import Role
+from server.models.user import User
+from server.models.user_role import UserRole
+from server.services.permission_cache import permission_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(permission_cache, "enabled", True)
+    permission_cache.bump_all()
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(email="ada@example.com", password="hashed")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def add_role(db, name, permissions):
+    role = Role(name=name, permissions=permissions)
+    db.add(role)
+    db.commit()
+    return role
+
+
+def test_permissions_are_compiled_from_active_roles(db_session, user):
+    creator = add_role(db_session, "agent_creator", ["agent:create"])
+    reviewer = add_role(db_session, "reviewer", ["agent:approve"])
+    db_session.add_all([
+        UserRole(user_id=user.id, role_id=creator.id),
+        UserRole(user_id=user.id, role_id=reviewer.id, expires_at=datetime.utcnow() - timedelta(days=1)),
+    ])
+    db_session.commit()
+
+    effective = permission_cache.get(db_session, user.id)
+
+    assert effective.roles == {"agent_creator"}
+    assert effective.has_permission("agent:create")
+    assert not effective.has_permission("agent:approve")
+
+
+def test_role_assignment_bumps_user(db_session, user):
+    admin = add_role(db_session, "admin", ["*:*"])
+    assert not permission_cache.get(db_session, user.id).has_permission("billing:view")
+
+    db_session.add(UserRole(user_id=user.id, role_id=admin.id))
+    db_session.commit()
+
+    assert permission_cache.get(db_session, user.id).has_permission("billing:view")
+
+
+def test_role_change_bumps_every_user(db_session, user):
+    role = add_role(db_session, "user", ["agent:read"])
+    db_session.add(UserRole(user_id=user.id, role_id=role.id))
+    db_session.commit()
+    first = permission_cache.get(db_session, user.id)
+    assert permission_cache.get(db_session, user.id) is first
+
+    role.permissions = ["agent:read", "agent:hire"]
+    db_session.commit()
+
+    assert permission_cache.get(db_session, user.id).has_permission("agent:hire")
+
+
+def test_rolled_back_assignment_keeps_entry(db_session, user):
+    role = add_role(db_session, "user", ["agent:read"])
+    first = permission_cache.get(db_session, user.id)
+
+    db_session.add(UserRole(user_id=user.id, role_id=role.id))
+    db_session.flush()
+    db_session.rollback()
+
+    assert permission_cache.get(db_session, user.id) is first
@@ -0,0 +1,198 @@
+"""Tests for concurrent requests against the resident persistent agent worker."""
+
+import importlib
+import json
+import socket
+import struct
+import sys
+import threading
+import types
+
+import pytest
+
+from server.config import PERSISTENT_AGENT_WORKER_PATH
+from server.services import persistent_agent_worker
+from server.services.deployment_service import DeploymentService
+from server.services.persistent_agent_worker import ResidentAgentWorker
+
+AGENT_SOURCE = '''
+# Barriers set by the tests; executes waiting on one only pass it together
+BARRIERS = {}
+
+
+class CounterAgent:
+    def initialize(self, config):
+        self._state = {"initialized_with": config}
+        return {"status": "ready"}
+
+    def execute(self, input_data):
+        print(f"executing {input_data['key']}")
+        if "barrier" in input_data:
+            BARRIERS[input_data["barrier"]].wait()
+        self._state[input_data["key"]] = input_data.get("value", input_data["key"])
+        return {"key": input_data["key"]}
+
+    def cleanup(self):
+        return {"status": "cleaned_up"}
+'''
+
+
+@pytest.fixture
+def worker_factory(tmp_path, monkeypatch):
+    (tmp_path / "counter_agent.py").write_text(AGENT_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "counter_agent", raising=False)
+    monkeypatch.setattr(persistent_agent_worker, "STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(persistent_agent_worker, "STATE_FILE", str(tmp_path / "state" / "agent_state.json"))
+    # The worker installs per-thread stdout/stderr capture; restore the originals afterwards
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+    monkeypatch.setattr(sys, "stderr", sys.stderr)
+    # Created inside the test so pytest's own stdout capture is already installed
+    return ResidentAgentWorker
+
+
+def request(operation, **input_data):
+    return {
+        "operation": operation,
+        "entry_point": "counter_agent.py",
+        "agent_class": "CounterAgent",
+        "input": input_data,
+        "execution_id": f"{operation}-{input_data.get('key', '')}",
+    }
+
+
+def barrier(name, parties):
+    """Make executes with ``barrier=name`` wait for each other, failing if they run one at a time."""
+    importlib.import_module("counter_agent").BARRIERS[name] = threading.Barrier(parties, timeout=5)
+    return name
+
+
+def read_state():
+    with open(persistent_agent_worker.STATE_FILE) as f:
+        return json.load(f)
+
+
+def test_execute_requires_initialize(worker_factory):
+    worker = worker_factory()
+    response = worker.handle(request("execute", key="a"))
+
+    assert response["status"] == "error"
+    assert "not initialized" in response["error"]
+
+
+def test_parallel_executes_merge_state(worker_factory):
+    worker = worker_factory()
+    assert worker.handle(request("initialize", model="x"))["status"] == "success"
+
+    # The executions only get past the barrier if they overlap
+    together = barrier("together", 4)
+    responses = {}
+    threads = [
+        threading.Thread(target=lambda key=key: responses.update({
+            key: worker.handle(request("execute", key=key, barrier=together))
+        }))
+        for key in "abcd"
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(response["status"] == "success" for response in responses.values())
+    assert {key: response["stdout"] for key, response in responses.items()} == {
+        key: f"executing {key}\n" for key in "abcd"
+    }
+    state = read_state()
+    assert state["version"] == 5
+    assert state["agent_state"] == {"initialized_with": {"model": "x"}, "a": "a", "b": "b", "c": "c", "d": "d"}
+
+
+def test_conflicting_concurrent_updates_fail(worker_factory):
+    worker = worker_factory()
+    worker.handle(request("initialize"))
+
+    # Both executions read the state before either commits
+    together = barrier("together", 2)
+    responses = []
+    threads = [
+        threading.Thread(target=lambda value=value: responses.append(
+            worker.handle(request("execute", key="shared", value=value, barrier=together))
+        ))
+        for value in ("first", "second")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    statuses = sorted(response["status"] for response in responses)
+    assert statuses == ["error", "success"]
+    assert "conflict" in next(r["error"] for r in responses if r["status"] == "error")
+    assert read_state()["agent_state"]["shared"] in ("first", "second")
+
+
+def test_state_committed_elsewhere_is_picked_up(worker_factory):
+    worker = worker_factory()
+    worker.handle(request("initialize"))
+    # A one-shot docker exec execution commits next to the resident worker
+    persistent_agent_worker.commit_agent_state(1, {"initialized_with": {}}, {"initialized_with": {}, "external": 1}, "exec")
+
+    worker.handle(request("execute", key="a"))
+
+    assert read_state()["agent_state"] == {"initialized_with": {}, "external": 1, "a": "a"}
+
+
+def test_cleanup_removes_state(worker_factory):
+    worker = worker_factory()
+    worker.handle(request("initialize"))
+
+    response = worker.handle(request("cleanup"))
+
+    assert response["result"] == {"status": "cleaned_up"}
+    assert worker.handle(request("execute", key="a"))["status"] == "error"
+
+
+class FakeExecAPI:
+    """Docker's exec API over a socket pair; the command reads its stdin and echoes it back in a frame."""
+
+    def __init__(self):
+        self.commands = []
+        self.received = None
+
+    def exec_create(self, container_id, command, stdin=False):
+        self.commands.append(command)
+        return {"Id": "exec-1"}
+
+    def exec_start(self, exec_id, **options):
+        ours, theirs = socket.socketpair()
+        threading.Thread(target=self._run, args=(theirs,)).start()
+        return ours
+
+    def _run(self, sock):
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+        self.received = b"".join(chunks)
+        request = json.loads(self.received)
+        response = json.dumps({"status": "success", "result": {"size": len(request["input"]["text"])},
+                               "stdout": "", "stderr": ""}).encode()
+        # Multiplexed stream frame: stream 1 (stdout), then the payload size
+        sock.sendall(struct.pack(">BxxxL", 1, len(response)) + response)
+        sock.close()
+
+    def exec_inspect(self, exec_id):
+        return {"ExitCode": 0}
+
+
+def test_worker_requests_are_sent_over_exec_stdin():
+    api = FakeExecAPI()
+    container = types.SimpleNamespace(id="container-1", client=types.SimpleNamespace(api=api))
+    service = DeploymentService.__new__(DeploymentService)
+    # Larger than the kernel's limit on a single argument
+    text = "x" * 200_000
+
+    result = service._execute_via_worker(container, "aghub-persis", {"operation": "execute", "input": {"text": text}})
+
+    assert result["result"] == {"size": len(text)}
+    assert api.commands == [["python", PERSISTENT_AGENT_WORKER_PATH, "call"]]
+    assert json.loads(api.received)["input"]["text"] == text
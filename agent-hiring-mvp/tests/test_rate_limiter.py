@@ -0,0 +1,148 @@
+"""Tests for the provider rate limiter's local token buckets and shared database windows."""
+
+import asyncio
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from server.database import config as database_config
+from server.models.resource_usage import ResourceRateLimitWindow
+from server.services.resources import rate_limiter
+from server.services.resources.rate_limiter import (
+    BucketLimit,
+    DatabaseRateLimitBackend,
+    LocalRateLimitBackend,
+    ProviderRateLimiter,
+    RateLimitExceeded,
+)
+
+MODEL = BucketLimit("openai:gpt-4o", requests_per_minute=2, tokens_per_minute=100)
+USER = BucketLimit("openai:gpt-4o:user:1", tokens_per_minute=1000)
+
+
+class FakeClock:
+    def __init__(self, now=6000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def shared(db_engine, monkeypatch):
+    monkeypatch.setattr(database_config, "get_session", sessionmaker(bind=db_engine))
+    return DatabaseRateLimitBackend()
+
+
+def bucket(limiter, limit):
+    return limiter.local._buckets[limit.key]
+
+
+def windows(db_session):
+    db_session.expire_all()
+    return {
+        (w.bucket_key, w.window_start): (w.requests, w.tokens)
+        for w in db_session.query(ResourceRateLimitWindow)
+    }
+
+
+def test_bucket_waits_for_refill_and_admits_after_it(clock):
+    local = LocalRateLimitBackend()
+
+    assert local.try_acquire([MODEL], 60) == 0
+    assert local.try_acquire([MODEL], 60) == pytest.approx(12)  # 20 more tokens at 100 per minute
+
+    clock.now += 12
+    assert local.try_acquire([MODEL], 60) == 0
+    assert local.try_acquire([MODEL], 0) == pytest.approx(18)  # 0.6 of a request at 2 per minute
+
+
+def test_rejected_acquire_takes_nothing_from_any_bucket(clock):
+    local = LocalRateLimitBackend()
+    local.try_acquire([MODEL, USER], 90)
+
+    assert local.try_acquire([MODEL, USER], 50) > 0
+    assert local._buckets[USER.key].tokens == 910
+
+
+def test_settle_refunds_what_each_bucket_charged(clock):
+    limiter = ProviderRateLimiter(backend="local")
+
+    async def scenario():
+        # The model bucket only charged its whole-minute allowance of 100
+        grant = await limiter.acquire([MODEL, USER], 500)
+        await limiter.settle(grant, 40)
+
+    asyncio.run(scenario())
+
+    assert bucket(limiter, MODEL).tokens == 60
+    assert bucket(limiter, USER).tokens == 960
+
+
+def test_acquire_raises_after_max_wait(clock):
+    limiter = ProviderRateLimiter(backend="local", max_wait_seconds=0)
+
+    async def scenario():
+        await limiter.acquire([MODEL], 100)
+        await limiter.acquire([MODEL], 100)
+
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(scenario())
+    assert limiter.get_stats()["rejections"] == 1
+
+
+def test_database_window_admits_up_to_the_limit_then_waits_for_next_minute(db_session, shared, clock):
+    clock.now = 6030.0
+
+    assert shared.try_acquire([MODEL], 60) == (0, 100)
+    assert shared.try_acquire([MODEL], 30) == (0, 100)
+    wait, window_start = shared.try_acquire([MODEL], 20)
+
+    assert wait == pytest.approx(30) and window_start == 100
+    assert windows(db_session) == {(MODEL.key, 100): (2, 90)}
+
+
+def test_database_acquire_is_all_or_nothing_across_buckets(db_session, shared, clock):
+    shared.try_acquire([MODEL], 100)
+
+    wait, _ = shared.try_acquire([USER, MODEL], 10)
+
+    assert wait > 0
+    assert windows(db_session) == {(MODEL.key, 100): (1, 100)}
+
+
+def test_settle_adjusts_the_window_the_call_was_counted_in(db_session, shared, clock):
+    limiter = ProviderRateLimiter(backend="database")
+
+    async def scenario():
+        grant = await limiter.acquire([MODEL, USER], 500)
+        clock.now += 60  # The call finishes in the next minute
+        await limiter.acquire([MODEL, USER], 10)
+        await limiter.settle(grant, 40)
+
+    asyncio.run(scenario())
+
+    assert windows(db_session) == {
+        (MODEL.key, 100): (1, 40),
+        (USER.key, 100): (1, 40),
+        (MODEL.key, 101): (1, 10),
+        (USER.key, 101): (1, 10),
+    }
+
+
+def test_database_adjust_never_goes_below_zero(db_session, shared, clock):
+    shared.try_acquire([MODEL], 10)
+
+    shared.adjust([MODEL], 5, {MODEL.key: 50}, 100)
+
+    assert windows(db_session) == {(MODEL.key, 100): (0, 0)}
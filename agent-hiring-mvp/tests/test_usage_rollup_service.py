@@ -0,0 +1,195 @@
+"""Tests for container usage rollups and raw snapshot retention."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import docker
+import pytest
+
+from server.models.container_resource_usage import (
+    ContainerResourceUsage,
+    HiringUsageActivity,
+    UsageAggregation,
+    UsageRollupWatermark,
+)
+from server.models.deployment import AgentDeployment
+from server.models.hiring import Hiring
+from server.services.usage_rollup_service import UsageRollupService, rollup_status, sum_rollups
+
+NOW = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0)
+
+
+def add_snapshot(db, timestamp, hiring_id=1, cost=1.0):
+    db.add(ContainerResourceUsage(
+        container_id="c1",
+        container_name="aghub-func-1",
+        deployment_id=f"dep-{hiring_id}",
+        agent_id="agent-1",
+        hiring_id=hiring_id,
+        user_id=7,
+        cpu_usage_percent=50.0,
+        memory_usage_bytes=1024 ** 3,
+        memory_limit_bytes=2 * 1024 ** 3,
+        network_rx_bytes=0,
+        network_tx_bytes=0,
+        block_read_bytes=0,
+        block_write_bytes=0,
+        container_status="running",
+        cpu_cost=cost / 2,
+        memory_cost=cost / 2,
+        total_cost=cost,
+        snapshot_timestamp=timestamp,
+        collection_interval_seconds=3600,
+        deployment_type="function",
+    ))
+    db.commit()
+
+
+def daily_cost(db, hiring_id=1):
+    return sum_rollups(db, "daily", UsageAggregation.hiring_id == hiring_id)["total_cost"]
+
+
+def test_rollup_folds_snapshots_once(db_session):
+    add_snapshot(db_session, NOW - timedelta(hours=2), cost=1.0)
+    add_snapshot(db_session, NOW - timedelta(hours=2, minutes=10), cost=2.0)
+    add_snapshot(db_session, NOW - timedelta(hours=1), cost=4.0)
+    service = UsageRollupService(db_session, batch_size=2, lag_seconds=0)
+
+    assert service.run_incremental_rollup() == 3
+    assert service.run_incremental_rollup() == 0
+
+    assert daily_cost(db_session) == pytest.approx(7.0)
+    hourly = sum_rollups(db_session, "hourly", UsageAggregation.hiring_id == 1)
+    assert hourly["total_cost"] == pytest.approx(7.0)
+    # Three one-hour snapshots at 50% CPU
+    assert hourly["total_cpu_hours"] == pytest.approx(1.5)
+    watermark = db_session.query(UsageRollupWatermark).one()
+    assert watermark.last_snapshot_id == db_session.query(ContainerResourceUsage.id).order_by(
+        ContainerResourceUsage.id.desc()
+    ).first()[0]
+
+
+def test_rollup_counts_snapshots_of_each_hiring_across_batches(db_session):
+    add_snapshot(db_session, NOW - timedelta(hours=3))
+    add_snapshot(db_session, NOW - timedelta(hours=5))
+    add_snapshot(db_session, NOW - timedelta(hours=1))
+    add_snapshot(db_session, NOW - timedelta(hours=2), hiring_id=2)
+
+    UsageRollupService(db_session, batch_size=2, lag_seconds=0).run_incremental_rollup()
+
+    activity = db_session.query(HiringUsageActivity).filter(HiringUsageActivity.hiring_id == 1).one()
+    assert activity.snapshots_count == 3
+    assert activity.first_snapshot_at.replace(tzinfo=timezone.utc) == NOW - timedelta(hours=5)
+    assert activity.last_snapshot_at.replace(tzinfo=timezone.utc) == NOW - timedelta(hours=1)
+    assert db_session.query(HiringUsageActivity).filter(HiringUsageActivity.hiring_id == 2).one().snapshots_count == 1
+
+
+def test_rollup_status_reports_snapshots_not_rolled_up(db_session):
+    add_snapshot(db_session, NOW - timedelta(hours=1))
+    assert rollup_status(db_session) == {"rolled_up_at": None, "pending_snapshots": 1}
+
+    UsageRollupService(db_session, lag_seconds=0).run_incremental_rollup()
+    add_snapshot(db_session, NOW - timedelta(minutes=20))
+
+    status = rollup_status(db_session)
+    assert status["rolled_up_at"] is not None
+    assert status["pending_snapshots"] == 1
+
+
+def test_rollup_leaves_fresh_snapshots_for_next_run(db_session):
+    add_snapshot(db_session, NOW - timedelta(hours=1), cost=1.0)
+    add_snapshot(db_session, datetime.now(timezone.utc), cost=2.0)
+
+    assert UsageRollupService(db_session, lag_seconds=600).run_incremental_rollup() == 1
+    assert daily_cost(db_session) == pytest.approx(1.0)
+
+
+def test_retention_only_deletes_rolled_up_snapshots(db_session):
+    add_snapshot(db_session, NOW - timedelta(days=10), cost=3.0)
+    service = UsageRollupService(db_session, lag_seconds=0)
+    service.run_incremental_rollup()
+    # Old snapshot inserted after the rollup ran, e.g. by a delayed collector
+    add_snapshot(db_session, NOW - timedelta(days=9), cost=5.0)
+
+    deleted = service.apply_retention(raw_retention_days=7, hourly_retention_days=30)
+
+    assert deleted["snapshots"] == 1
+    assert db_session.query(ContainerResourceUsage).count() == 1
+    assert daily_cost(db_session) == pytest.approx(3.0)
+
+
+def test_hourly_retention_keeps_daily_rollups(db_session):
+    add_snapshot(db_session, NOW - timedelta(days=40), cost=2.0)
+    service = UsageRollupService(db_session, lag_seconds=0)
+    service.run_incremental_rollup()
+
+    deleted = service.apply_retention(raw_retention_days=7, hourly_retention_days=30)
+
+    assert deleted == {"snapshots": 1, "hourly_aggregations": 1}
+    assert daily_cost(db_session) == pytest.approx(2.0)
+
+
+def test_billing_reports_costs_after_raw_snapshots_expire(db_session, monkeypatch):
+    monkeypatch.setattr(docker, "from_env", lambda: None)
+    from server.services.enhanced_billing_service import EnhancedBillingService
+
+    db_session.add(AgentDeployment(
+        agent_id="agent-1", hiring_id=1, deployment_id="dep-1", deployment_type="function",
+        status="running", created_at=(NOW - timedelta(days=30)).replace(tzinfo=None)
+    ))
+    db_session.commit()
+    add_snapshot(db_session, NOW - timedelta(days=20), cost=1.5)
+    add_snapshot(db_session, NOW - timedelta(days=12), cost=2.5)
+    service = UsageRollupService(db_session, lag_seconds=0)
+    service.run_incremental_rollup()
+    service.apply_retention(raw_retention_days=7)
+    assert db_session.query(ContainerResourceUsage).count() == 0
+
+    billing = EnhancedBillingService(db_session)
+    costs = asyncio.run(billing._get_container_resource_costs(7, NOW - timedelta(days=25), NOW))
+    trends = asyncio.run(billing._get_cost_trends(7, 1))
+
+    assert [d["deployment_id"] for d in costs["deployments"]] == ["dep-1"]
+    assert costs["deployments"][0]["total_cost"] == pytest.approx(4.0)
+    assert [d["cost"] for d in trends["daily_breakdown"]] == [1.5, 2.5]
+
+
+def test_billing_reads_do_not_roll_up(db_session, monkeypatch):
+    monkeypatch.setattr(docker, "from_env", lambda: None)
+    from server.services.enhanced_billing_service import EnhancedBillingService
+
+    add_snapshot(db_session, NOW - timedelta(hours=2), cost=1.5)
+
+    costs = asyncio.run(EnhancedBillingService(db_session)._get_container_resource_costs(
+        7, NOW - timedelta(days=1), NOW
+    ))
+
+    assert costs["deployments"] == []
+    assert db_session.query(UsageAggregation).count() == 0
+    assert rollup_status(db_session)["pending_snapshots"] == 1
+
+
+def test_hiring_resources_report_snapshot_counts_after_raw_snapshots_expire(db_session, monkeypatch):
+    monkeypatch.setattr(docker, "from_env", lambda: None)
+    from server.api.billing import get_hiring_resources
+
+    db_session.add(Hiring(id=1, agent_id="agent-1", user_id=7, hired_at=(NOW - timedelta(days=30)).replace(tzinfo=None)))
+    db_session.add(AgentDeployment(
+        agent_id="agent-1", hiring_id=1, deployment_id="dep-1", deployment_type="function", status="running"
+    ))
+    db_session.commit()
+    add_snapshot(db_session, NOW - timedelta(days=20), cost=1.5)
+    add_snapshot(db_session, NOW - timedelta(days=20, minutes=10), cost=1.0)
+    add_snapshot(db_session, NOW - timedelta(days=12), cost=2.5)
+    service = UsageRollupService(db_session, lag_seconds=0)
+    service.run_incremental_rollup()
+    service.apply_retention(raw_retention_days=7)
+
+    container_resources = asyncio.run(get_hiring_resources(1, user_id=7, db=db_session))["container_resources"]
+
+    assert container_resources["container_cost"] == pytest.approx(5.0)
+    assert container_resources["snapshots_count"] == 3
+    assert container_resources["active_days"] == 2
+    assert container_resources["start_time"] == (NOW - timedelta(days=20, minutes=10)).replace(tzinfo=None).isoformat()
+    assert container_resources["end_time"] == (NOW - timedelta(days=12)).replace(tzinfo=None).isoformat()
+    assert container_resources["usage_rollup"]["pending_snapshots"] == 0
@@ -0,0 +1,180 @@
+"""Tests for the warm container pool claim, adoption and orphan cleanup paths."""
+
+import asyncio
+
+import pytest
+from docker import errors as docker_errors
+
+from server.models.deployment import AgentDeployment, DeploymentStatus
+from server.services import function_deployment_service
+from server.services.container_utils import find_container_deployment
+from server.services.function_deployment_service import FunctionDeploymentService
+from server.services.warm_container_pool import (
+    WarmContainerPool,
+    WARM_CONTAINER_NAME_PREFIX,
+    _WarmContainer,
+)
+
+
+class FakeContainer:
+    def __init__(self, container_id, name, status="running", labels=None, rename_error=None):
+        self.id = container_id
+        self.name = name
+        self.status = status
+        self.labels = labels or {}
+        self.rename_error = rename_error
+        self.removed = False
+
+    def rename(self, name):
+        if self.rename_error:
+            raise self.rename_error
+        self.name = name
+
+    def reload(self):
+        pass
+
+    def stop(self, timeout=None):
+        self.status = "exited"
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeContainers:
+    def __init__(self, containers):
+        self.by_id = {c.id: c for c in containers}
+
+    def get(self, container_id):
+        if container_id not in self.by_id:
+            raise docker_errors.NotFound("missing")
+        return self.by_id[container_id]
+
+    def list(self, all=False, filters=None):
+        return list(self.by_id.values())
+
+    def run(self, name, labels, **options):
+        container = FakeContainer(f"id-{name}", name, labels=labels)
+        self.by_id[container.id] = container
+        return container
+
+
+class FakeDockerClient:
+    def __init__(self, containers):
+        self.containers = FakeContainers(containers)
+
+
+@pytest.fixture
+def claims(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(WarmContainerPool, "_record_claim",
+                        staticmethod(lambda agent_id, hit, reason: recorded.append(hit)))
+    monkeypatch.setattr(WarmContainerPool, "_report_size", staticmethod(lambda agent_id, size: None))
+    monkeypatch.setattr(WarmContainerPool, "_refill_in_background", lambda self, image_name: None)
+    return recorded
+
+
+def make_pool(containers):
+    pool = WarmContainerPool(min_size=1, max_size=2, idle_timeout=600, enabled=True)
+    pool._docker_client = FakeDockerClient(containers)
+    return pool
+
+
+def warm(container):
+    return _WarmContainer(container_id=container.id, container_name=container.name, created_at=0.0)
+
+
+def test_claim_returns_running_idle_container(claims):
+    stopped = FakeContainer("c1", f"{WARM_CONTAINER_NAME_PREFIX}a-1", status="exited")
+    running = FakeContainer("c2", f"{WARM_CONTAINER_NAME_PREFIX}a-2")
+    pool = make_pool([stopped, running])
+    pool.register_image("agent-a", "image-a", refill=False)
+    pool._pools["image-a"].idle.extend([warm(stopped), warm(running)])
+
+    assert pool.claim("agent-a", "image-a") is running
+    assert stopped.removed
+    assert not pool._pools["image-a"].idle
+    assert claims == [True]
+
+
+def test_claim_misses_for_unregistered_image(claims):
+    pool = make_pool([])
+
+    assert pool.claim("agent-a", "image-a") is None
+    assert claims == [False]
+
+
+def test_remove_orphaned_containers_keeps_claimed_containers(claims):
+    idle = FakeContainer("idle", f"{WARM_CONTAINER_NAME_PREFIX}a-1")
+    orphan = FakeContainer("orphan", f"{WARM_CONTAINER_NAME_PREFIX}a-2")
+    renamed = FakeContainer("renamed", "aghub-func-deployment-1")
+    # Rename failed on adoption, but the deployment references the container
+    assigned = FakeContainer("assigned", f"{WARM_CONTAINER_NAME_PREFIX}a-3")
+    pool = make_pool([idle, orphan, renamed, assigned])
+    pool.register_image("agent-a", "image-a", refill=False)
+    pool._pools["image-a"].idle.append(warm(idle))
+
+    removed = pool.remove_orphaned_containers({"assigned"})
+
+    assert removed == 1
+    assert orphan.removed
+    assert not any(c.removed for c in (idle, renamed, assigned))
+
+
+def test_remove_orphaned_containers_disabled_pool(claims):
+    orphan = FakeContainer("orphan", f"{WARM_CONTAINER_NAME_PREFIX}a-1")
+    pool = make_pool([orphan])
+    pool.enabled = False
+
+    assert pool.remove_orphaned_containers() == 0
+    assert not orphan.removed
+
+
+def test_warm_containers_carry_the_hire_independent_agent_labels(claims):
+    pool = make_pool([])
+    pool.register_image("agent-a", "image-a", refill=False)
+
+    started = pool._start_container(pool._pools["image-a"])
+
+    labels = pool.docker_client.containers.get(started.container_id).labels
+    assert labels["service"] == "agenthub-agent"
+    assert labels["agent_id"] == "agent-a"
+    assert labels["agent_type"] == "function"
+
+
+@pytest.fixture
+def deployment(db_session):
+    deployment = AgentDeployment(
+        agent_id="agent-a", hiring_id=1, deployment_id="deployment-1", deployment_type="function",
+        status=DeploymentStatus.BUILDING.value
+    )
+    db_session.add(deployment)
+    db_session.commit()
+    return deployment
+
+
+def adopt(db_session, deployment, container, monkeypatch):
+    monkeypatch.setattr(function_deployment_service, "warm_container_pool", make_pool([container]))
+    service = FunctionDeploymentService.__new__(FunctionDeploymentService)
+    service.db = db_session
+    return asyncio.run(service._adopt_warm_container(deployment, container, "image-a"))
+
+
+def test_adopted_container_is_renamed_and_found_by_id(db_session, deployment, monkeypatch):
+    container = FakeContainer("c1", f"{WARM_CONTAINER_NAME_PREFIX}a-1")
+
+    assert adopt(db_session, deployment, container, monkeypatch) is container
+
+    assert not container.name.startswith(WARM_CONTAINER_NAME_PREFIX)
+    assert (deployment.container_id, deployment.container_name) == ("c1", container.name)
+    assert deployment.status == DeploymentStatus.RUNNING.value
+    assert find_container_deployment(db_session, container) is deployment
+
+
+def test_failed_rename_discards_container_for_a_cold_start(db_session, deployment, monkeypatch):
+    container = FakeContainer("c1", f"{WARM_CONTAINER_NAME_PREFIX}a-1", rename_error=RuntimeError("conflict"))
+
+    assert adopt(db_session, deployment, container, monkeypatch) is None
+
+    assert container.removed
+    assert deployment.container_id is None
+    assert deployment.status == DeploymentStatus.BUILDING.value